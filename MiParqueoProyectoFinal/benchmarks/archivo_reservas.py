@@ -0,0 +1,173 @@
+"""
+Benchmark del archivo de reservas: latencia de las vistas del día a día
+cuando el histórico crece diez veces, sin archivar y archivado.
+
+Escenarios sobre la misma base de datos temporal (db.sqlite3 no se toca):
+    base          N reservas de generar_datos_carga (--dias de histórico)
+    x10           10N: se agregan 9N reservas terminadas más antiguas
+                  (copias de las de base desplazadas en el tiempo)
+    x10 archivado las mismas 10N tras archivar_reservas --dias <dias>:
+                  las 9N copias pasan a ReservaHistorica
+
+Las vistas calientes deberían medir lo mismo en base y en x10 archivado.
+El historial del cliente lee las dos tablas y crece con el histórico en
+cualquier caso; se muestra como referencia.
+
+Ejecutar con:
+    python benchmarks/archivo_reservas.py
+    python benchmarks/archivo_reservas.py --reservas 50000 --repeticiones 100
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from core.archivo import ESTADOS_ARCHIVABLES, archivar_reservas  # noqa: E402
+from core.models import Reserva, ReservaHistorica  # noqa: E402
+
+COLUMNAS_COPIA = (
+    'usuario_id', 'espacio_id', 'parqueadero_id', 'fecha', 'hora_inicio', 'hora_fin',
+    'tipo_vehiculo', 'placa', 'estado', 'hora_entrada', 'hora_salida',
+)
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def preparar(reservas, dias):
+    call_command(
+        'generar_datos_carga',
+        usuarios=max(reservas // 100, 50), vigilantes=2, espacios=max(reservas // 200, 60),
+        reservas=reservas, incidencias=0, dias=dias, semilla=7, stdout=StringIO(),
+    )
+    cliente = User.objects.filter(username__startswith='carga_cliente_').order_by('id').first()
+    vigilante = User.objects.filter(groups__name='VIGILANTE').order_by('id').first()
+    placa_hoy = (
+        Reserva.objects.filter(fecha=timezone.localdate(), estado='RESERVADA').values_list('placa', flat=True).first()
+        or 'ZZZ999'
+    )
+    return cliente, vigilante, placa_hoy
+
+
+def multiplicar_historico(factor, dias):
+    """Agrega (factor - 1) copias terminadas de cada reserva, todas anteriores a hoy - dias."""
+    originales = list(Reserva.objects.values(*COLUMNAS_COPIA))
+    # generar_datos_carga cubre [hoy - dias, hoy + 7]: cada copia se desplaza un periodo completo
+    periodo = timedelta(days=dias + 8)
+    for k in range(1, factor):
+        Reserva.objects.bulk_create(
+            (Reserva(**dict(
+                fila,
+                fecha=fila['fecha'] - periodo * k,
+                estado=fila['estado'] if fila['estado'] in ESTADOS_ARCHIVABLES else 'COMPLETADA',
+            )) for fila in originales),
+            batch_size=5000,
+        )
+
+
+def medir(cliente, vigilante, placa_hoy, repeticiones):
+    peticiones = [
+        ('cliente_reservas_activas', cliente, 'get', reverse('cliente_reservas_activas'), None),
+        ('vigilante_validar_placa', vigilante, 'post', reverse('vigilante_validar_placa'), {'placa': placa_hoy}),
+        ('vigilante_salida', vigilante, 'get', reverse('vigilante_salida'), None),
+        ('api_reservas_activas', cliente, 'get', reverse('api_v1:reservas') + '?estado=RESERVADA', None),
+        ('cliente_historial', cliente, 'get', reverse('cliente_historial'), None),
+    ]
+    clientes = {}
+    for usuario in (cliente, vigilante):
+        clientes[usuario.id] = Client()
+        clientes[usuario.id].force_login(usuario)
+
+    resultados = {}
+    for nombre, usuario, metodo, url, datos in peticiones:
+        navegador = clientes[usuario.id]
+        getattr(navegador, metodo)(url, datos)  # calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            respuesta = getattr(navegador, metodo)(url, datos)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            assert respuesta.status_code < 400, f'{url}: {respuesta.status_code}'
+        resultados[nombre] = (percentil(tiempos, 50), percentil(tiempos, 95))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vistas calientes con el histórico x10, sin archivar y archivado')
+    parser.add_argument('--reservas', type=int, default=20000, help='Reservas del escenario base')
+    parser.add_argument('--dias', type=int, default=120, help='Días de histórico del escenario base')
+    parser.add_argument('--factor', type=int, default=10, help='Crecimiento del histórico')
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    directorio = tempfile.mkdtemp(prefix='miparqueo_archivo_')
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    escenarios = {}
+    try:
+        cliente, vigilante, placa_hoy = preparar(args.reservas, args.dias)
+        print(f"[OK] Escenario base: {Reserva.objects.count()} reservas")
+        escenarios['base'] = (Reserva.objects.count(), 0, medir(cliente, vigilante, placa_hoy, args.repeticiones))
+
+        inicio = time.perf_counter()
+        multiplicar_historico(args.factor, args.dias)
+        print(f"[OK] Histórico x{args.factor}: {Reserva.objects.count()} reservas ({time.perf_counter() - inicio:.1f}s)")
+        escenarios[f'x{args.factor}'] = (
+            Reserva.objects.count(), 0, medir(cliente, vigilante, placa_hoy, args.repeticiones)
+        )
+
+        resumen = archivar_reservas(dias=args.dias)
+        print(f"[OK] {resumen['archivadas']} reservas archivadas en {resumen['lotes']} lotes ({resumen['segundos']:.1f}s)")
+        escenarios[f'x{args.factor} archivado'] = (
+            Reserva.objects.count(), ReservaHistorica.objects.count(),
+            medir(cliente, vigilante, placa_hoy, args.repeticiones),
+        )
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    nombres = list(escenarios)
+    vistas = list(next(iter(escenarios.values()))[2])
+    print("\n" + "=" * 84)
+    print(f"ARCHIVO DE RESERVAS - p50 / p95 en ms ({args.repeticiones} peticiones por vista)")
+    print("=" * 84)
+    print(f"{'':<26}" + ''.join(f'{nombre:>19}' for nombre in nombres))
+    print(f"{'Reserva / Histórica':<26}" + ''.join(
+        f"{f'{calientes} / {frias}':>19}" for calientes, frias, _ in escenarios.values()
+    ))
+    for vista in vistas:
+        celdas = ''.join(f"{f'{p50:.2f} / {p95:.2f}':>19}" for p50, p95 in (e[2][vista] for e in escenarios.values()))
+        print(f'{vista:<26}{celdas}')
+    print("=" * 84)
+
+
+if __name__ == '__main__':
+    main()
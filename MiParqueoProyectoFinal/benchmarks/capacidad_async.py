@@ -0,0 +1,171 @@
+"""
+Capacidad de conexiones concurrentes bajo ASGI: vistas de lectura síncronas vs async.
+
+Arranca uvicorn dos veces (MIPARQUEO_VISTAS_ASYNC=0 y =1) y, para cada
+nivel de concurrencia, mantiene N conexiones abiertas de tableros y
+vigilantes que consultan sin pausa ocupación, salida e incidencias.
+Reporta peticiones/s, latencias p50/p95 y errores por nivel.
+
+Requisitos:
+    pip install httpx uvicorn
+    python manage.py generar_datos_carga     # usuarios carga_* con contraseña cliente123
+
+Ejecutar con:
+    python benchmarks/capacidad_async.py
+    python benchmarks/capacidad_async.py --concurrencia 10 50 100 200 --duracion 10
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Configurar Django (solo para elegir el usuario de carga)
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+
+try:
+    import httpx
+except ImportError:
+    print("[ERROR] Esta prueba requiere httpx. Instale con: pip install httpx uvicorn")
+    sys.exit(1)
+
+PATRON_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+URLS = [
+    '/vigilante/ocupacion/',
+    '/vigilante/salida/',
+    '/incidencias/listar/?tipo=DANIO_ESPACIO',
+]
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def iniciar_uvicorn(vistas_async, puerto):
+    entorno = dict(os.environ, MIPARQUEO_VISTAS_ASYNC='1' if vistas_async else '0', MIPARQUEO_METRICAS='0')
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'mi_parqueo.asgi:application', '--port', str(puerto), '--log-level', 'warning'],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{puerto}'
+    for _ in range(100):
+        try:
+            httpx.get(f'{url}/login/', timeout=1)
+            return proceso, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError(f'uvicorn no respondió en {url}')
+
+
+async def iniciar_sesion(url_base, username, password):
+    """Una sola sesión de vigilante compartida por todas las conexiones."""
+    async with httpx.AsyncClient(base_url=url_base, follow_redirects=True, timeout=30) as cliente:
+        respuesta = await cliente.get('/login/')
+        token = PATRON_CSRF.search(respuesta.text)
+        await cliente.post('/login/', data={
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': token.group(1) if token else '',
+        }, headers={'Referer': url_base})
+        return dict(cliente.cookies)
+
+
+async def conexion(cliente, fin, indice, latencias, errores):
+    i = indice
+    while time.perf_counter() < fin:
+        url = URLS[i % len(URLS)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.get(url)
+            if respuesta.status_code != 200:
+                errores.append(respuesta.status_code)
+        except httpx.HTTPError as e:
+            errores.append(type(e).__name__)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+
+async def medir_nivel(url_base, cookies, concurrencia, duracion):
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=url_base, cookies=cookies, limits=limites, timeout=60) as cliente:
+        # Calentamiento: templates compilados y conexiones abiertas
+        await asyncio.gather(*[cliente.get(url) for url in URLS])
+        latencias, errores = [], []
+        inicio = time.perf_counter()
+        await asyncio.gather(*[
+            conexion(cliente, inicio + duracion, i, latencias, errores) for i in range(concurrencia)
+        ])
+        transcurrido = time.perf_counter() - inicio
+    return {
+        'peticiones_s': len(latencias) / transcurrido,
+        'p50': percentil(latencias, 50),
+        'p95': percentil(latencias, 95),
+        'errores': len(errores),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Capacidad concurrente bajo ASGI: vistas sync vs async')
+    parser.add_argument('--concurrencia', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--duracion', type=int, default=10, help='Segundos por nivel')
+    parser.add_argument('--usuario', help='Vigilante con el que se consulta (por defecto, el primero de carga)')
+    parser.add_argument('--password', default='cliente123')
+    parser.add_argument('--puerto', type=int, default=8766)
+    args = parser.parse_args()
+
+    if not args.usuario:
+        args.usuario = User.objects.filter(
+            username__startswith='carga_vigilante_'
+        ).order_by('username').values_list('username', flat=True).first()
+        connection.close()
+    if not args.usuario:
+        print("[ERROR] Faltan datos de carga. Ejecute: python manage.py generar_datos_carga")
+        sys.exit(1)
+
+    resultados = {}
+    for modo, vistas_async in (('sync', False), ('async', True)):
+        proceso, url_base = iniciar_uvicorn(vistas_async, args.puerto)
+        print(f"[OK] uvicorn con vistas {modo} en {url_base}")
+        try:
+            cookies = asyncio.run(iniciar_sesion(url_base, args.usuario, args.password))
+            if 'sessionid' not in cookies:
+                print(f"[ERROR] No se pudo iniciar sesión como {args.usuario}. Ejecute: python manage.py generar_datos_carga")
+                sys.exit(1)
+            for nivel in args.concurrencia:
+                print(f"  {nivel} conexiones durante {args.duracion}s...")
+                resultados[(modo, nivel)] = asyncio.run(medir_nivel(url_base, cookies, nivel, args.duracion))
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+    print("\n" + "=" * 72)
+    print("CAPACIDAD CONCURRENTE BAJO ASGI (uvicorn, 1 proceso)")
+    print("=" * 72)
+    print(f"{'Conexiones':>10}  {'Vistas':<7}{'pet/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'Errores':>9}")
+    for nivel in args.concurrencia:
+        for modo in ('sync', 'async'):
+            r = resultados[(modo, nivel)]
+            print(f"{nivel:>10}  {modo:<7}{r['peticiones_s']:>9.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['errores']:>9}")
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    main()
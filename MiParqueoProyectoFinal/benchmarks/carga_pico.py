@@ -0,0 +1,408 @@
+"""
+Prueba de carga del pico de llegada de la mañana (7-9am) para MiParqueo.
+
+Simula de forma concurrente (asyncio + httpx):
+- Clientes que consultan disponibilidad y crean reservas
+- Vigilantes que validan placas y registran entradas
+- Tableros que consultan la ocupación periódicamente
+
+Reporta throughput, latencias p50/p95/p99, tasa de errores (respuestas 5xx
+y fallos de conexión), tasa de "database is locked" de SQLite y reservas
+solapadas (doble reserva).
+
+Los servidores son los de producción: gunicorn (o waitress donde gunicorn
+no existe, como en Windows) para WSGI y uvicorn para ASGI, con --workers
+procesos y la configuración de producción (ENTORNO_SERVIDOR): caché
+compartido entre workers y perfil de SQLite de producción. Los errores se cuentan por código de estado; los bloqueos, en el
+log del servidor (el logger django.request registra cada 500 con su
+traza, ver LOGGING en settings). Con --url el log se indica con
+--log-servidor.
+
+Requisitos:
+    pip install httpx gunicorn uvicorn       # waitress en vez de gunicorn en Windows
+    python manage.py generar_datos_carga     # usuarios carga_* con contraseña cliente123
+
+Ejecutar con:
+    python benchmarks/carga_pico.py --iniciar-servidor wsgi --duracion 60
+    python benchmarks/carga_pico.py --iniciar-servidor asgi --clientes 100
+    python benchmarks/carga_pico.py --url http://127.0.0.1:8000 --log-servidor gunicorn.log
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Configurar Django (para preparar el escenario y verificar el resultado en la BD)
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from core.models import EspacioParqueadero, Reserva  # noqa: E402
+
+try:
+    import httpx
+except ImportError:
+    print("[ERROR] Esta prueba requiere httpx. Instale con: pip install httpx")
+    sys.exit(1)
+
+
+PATRON_CSRF = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+TEXTO_BLOQUEO = 'database is locked'
+# Primera línea de cada 500 en el log de django.request
+PATRON_ERROR_SERVIDOR = re.compile(r'^Internal Server Error: (\S+)', re.MULTILINE)
+# Ruta → operación, para repartir los bloqueos del log
+RUTAS_OPERACIONES = [
+    ('/cliente/disponibilidad/', 'disponibilidad'),
+    ('/cliente/crear-reserva/', 'crear_reserva'),
+    ('/vigilante/validar-placa/', 'validar_placa'),
+    ('/vigilante/registrar-entrada/', 'registrar_entrada'),
+    ('/vigilante/ocupacion/', 'ocupacion'),
+]
+# Entorno del servidor iniciado. Con el caché en memoria local cada worker
+# tendría sus propios límites, cupos, cerrojos de idempotencia, grillas y
+# sesiones: la prueba no mediría lo que corre en producción
+ENTORNO_SERVIDOR = {'MIPARQUEO_CACHE': 'archivos', 'MIPARQUEO_PERFIL_BD': 'produccion'}
+
+
+# ============================================================
+# MÉTRICAS
+# ============================================================
+
+class Metricas:
+    """Acumula latencias y resultados por operación."""
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.bloqueos = defaultdict(int)
+
+    def registrar(self, operacion, inicio, respuesta=None, error=None):
+        self.latencias[operacion].append((time.perf_counter() - inicio) * 1000)
+        if error is not None or respuesta is None or respuesta.status_code >= 500:
+            self.errores[operacion] += 1
+
+    def contar_bloqueos(self, log):
+        """Reparte por operación los 500 del log causados por "database is locked"."""
+        errores = PATRON_ERROR_SERVIDOR.split(log)
+        # split deja [antes, ruta1, traza1, ruta2, traza2, ...]
+        for ruta, traza in zip(errores[1::2], errores[2::2]):
+            if TEXTO_BLOQUEO not in traza:
+                continue
+            operacion = next((op for prefijo, op in RUTAS_OPERACIONES if ruta.startswith(prefijo)), ruta)
+            self.bloqueos[operacion] += 1
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def peticion(metricas, operacion, cliente, metodo, url, datos=None):
+    """Ejecuta una petición (siguiendo redirecciones, como un navegador) y la mide."""
+    inicio = time.perf_counter()
+    try:
+        if metodo == 'post':
+            datos = dict(datos or {}, csrfmiddlewaretoken=cliente.cookies.get('csrftoken', ''))
+            respuesta = await cliente.post(url, data=datos, headers={'Referer': str(cliente.base_url)})
+        else:
+            respuesta = await cliente.get(url)
+    except httpx.HTTPError as e:
+        metricas.registrar(operacion, inicio, error=e)
+        return None
+    metricas.registrar(operacion, inicio, respuesta)
+    return respuesta
+
+
+async def iniciar_sesion(url_base, username, password):
+    cliente = httpx.AsyncClient(base_url=url_base, follow_redirects=True, timeout=30)
+    respuesta = await cliente.get('/login/')
+    token = PATRON_CSRF.search(respuesta.text)
+    await cliente.post('/login/', data={
+        'username': username,
+        'password': password,
+        'csrfmiddlewaretoken': token.group(1) if token else '',
+    }, headers={'Referer': url_base})
+    return cliente
+
+
+# ============================================================
+# ACTORES
+# ============================================================
+
+async def actor_cliente(cliente, metricas, espacios, fin, rnd):
+    """Consulta disponibilidad y reserva un espacio para hoy entre 7 y 9."""
+    hoy = timezone.localdate().isoformat()
+    while time.perf_counter() < fin:
+        await peticion(metricas, 'disponibilidad', cliente, 'get', '/cliente/disponibilidad/')
+        espacio_id = rnd.choice(espacios)
+        hora = rnd.choice(['07:00', '07:30', '08:00', '08:30'])
+        hora_fin = f'{int(hora[:2]) + 2:02d}{hora[2:]}'
+        await peticion(metricas, 'crear_reserva', cliente, 'post', f'/cliente/crear-reserva/{espacio_id}/', {
+            'fecha': hoy,
+            'hora_inicio': hora,
+            'hora_fin': hora_fin,
+            'tipo_vehiculo': 'CARRO',
+            'placa': f'PIC{rnd.randint(0, 999):03d}',
+        })
+        await asyncio.sleep(rnd.uniform(0.5, 2.0))
+
+
+async def actor_vigilante(cliente, metricas, fin, rnd):
+    """Valida placas de reservas de hoy y registra la entrada."""
+    while time.perf_counter() < fin:
+        pendientes = await asyncio.to_thread(reservas_pendientes_hoy)
+        if not pendientes:
+            await asyncio.sleep(0.5)
+            continue
+        reserva_id, placa = rnd.choice(pendientes)
+        await peticion(metricas, 'validar_placa', cliente, 'post', '/vigilante/validar-placa/', {'placa': placa})
+        await peticion(metricas, 'registrar_entrada', cliente, 'post', f'/vigilante/registrar-entrada/{reserva_id}/')
+        await asyncio.sleep(rnd.uniform(0.1, 0.5))
+
+
+async def actor_tablero(cliente, metricas, fin, intervalo):
+    """Tablero de ocupación que se refresca periódicamente."""
+    while time.perf_counter() < fin:
+        await peticion(metricas, 'ocupacion', cliente, 'get', '/vigilante/ocupacion/')
+        await asyncio.sleep(intervalo)
+
+
+def reservas_pendientes_hoy():
+    filas = list(
+        Reserva.objects.filter(fecha=timezone.localdate(), estado='RESERVADA', hora_entrada__isnull=True)
+        .values_list('id', 'placa')[:200]
+    )
+    connection.close()
+    return filas
+
+
+# ============================================================
+# VERIFICACIÓN
+# ============================================================
+
+def contar_dobles_reservas(desde):
+    """Pares de reservas activas solapadas en el mismo espacio, creadas durante la prueba."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT COUNT(*) FROM core_reserva a
+            JOIN core_reserva b ON a.espacio_id = b.espacio_id AND a.fecha = b.fecha AND a.id < b.id
+            WHERE a.estado = 'RESERVADA' AND b.estado = 'RESERVADA'
+              AND a.hora_inicio < b.hora_fin AND b.hora_inicio < a.hora_fin
+              AND b.creado_en >= %s
+            """,
+            [desde],
+        )
+        return cursor.fetchone()[0]
+
+
+# ============================================================
+# SERVIDOR
+# ============================================================
+
+def comando_servidor(modo, puerto, workers):
+    """
+    Returns:
+        list | None: Comando del servidor, o None si no está instalado
+    """
+    direccion = f'127.0.0.1:{puerto}'
+    if modo == 'asgi':
+        if importlib.util.find_spec('uvicorn') is None:
+            return None
+        return [sys.executable, '-m', 'uvicorn', 'mi_parqueo.asgi:application',
+                '--host', '127.0.0.1', '--port', str(puerto), '--workers', str(workers)]
+    if importlib.util.find_spec('gunicorn') is not None:
+        return [sys.executable, '-m', 'gunicorn', 'mi_parqueo.wsgi:application',
+                '--bind', direccion, '--workers', str(workers), '--timeout', '60']
+    if importlib.util.find_spec('waitress') is not None:
+        # waitress atiende con hilos en un solo proceso
+        return [sys.executable, '-m', 'waitress', f'--listen={direccion}', f'--threads={workers}',
+                'mi_parqueo.wsgi:application']
+    return None
+
+
+def iniciar_servidor(modo, puerto, workers, log):
+    comando = comando_servidor(modo, puerto, workers)
+    if comando is None:
+        requisito = 'uvicorn' if modo == 'asgi' else 'gunicorn (o waitress)'
+        print(f"[ERROR] El modo {modo} requiere {requisito}. Instale con: pip install {requisito.split()[0]}")
+        sys.exit(1)
+    # WEB_CONCURRENCY: settings verifica que varios workers usen el caché compartido
+    entorno = {**os.environ, **ENTORNO_SERVIDOR, 'WEB_CONCURRENCY': str(workers)}
+    proceso = subprocess.Popen(comando, cwd=RAIZ, stdout=log, stderr=subprocess.STDOUT, env=entorno)
+
+    url = f'http://127.0.0.1:{puerto}'
+    for _ in range(100):
+        try:
+            httpx.get(f'{url}/login/', timeout=1)
+            return proceso, url
+        except httpx.HTTPError:
+            if proceso.poll() is not None:
+                break
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError(f'El servidor {modo} no respondió en {url} (ver {log.name})')
+
+
+def leer_log(ruta, desde=0):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(desde)
+        return archivo.read().decode('utf-8', errors='replace')
+
+
+# ============================================================
+# PRINCIPAL
+# ============================================================
+
+def preparar_escenario(args):
+    """Selecciona los usuarios de carga y los espacios de carro disponibles."""
+    clientes = list(
+        User.objects.filter(username__startswith='carga_cliente_').values_list('username', flat=True)[:args.clientes]
+    )
+    vigilantes = list(
+        User.objects.filter(username__startswith='carga_vigilante_').values_list('username', flat=True)[:args.vigilantes]
+    )
+    espacios = list(EspacioParqueadero.objects.filter(tipo='CARRO').values_list('id', flat=True))
+    if not clientes or not vigilantes or not espacios:
+        print("[ERROR] Faltan datos de carga. Ejecute: python manage.py generar_datos_carga")
+        sys.exit(1)
+    connection.close()
+    return clientes, vigilantes, espacios
+
+
+async def ejecutar(args, url_base, clientes, vigilantes, espacios):
+    rnd = random.Random(args.semilla)
+
+    print(f"\nIniciando sesión: {len(clientes)} clientes, {len(vigilantes)} vigilantes, {args.tableros} tableros...")
+    sesiones_clientes = await asyncio.gather(*[iniciar_sesion(url_base, u, args.password) for u in clientes])
+    sesiones_vigilantes = await asyncio.gather(*[iniciar_sesion(url_base, u, args.password) for u in vigilantes])
+    sesiones_tableros = await asyncio.gather(
+        *[iniciar_sesion(url_base, vigilantes[i % len(vigilantes)], args.password) for i in range(args.tableros)]
+    )
+
+    metricas = Metricas()
+    inicio_prueba = timezone.now()
+    inicio = time.perf_counter()
+    fin = inicio + args.duracion
+    print(f"Ejecutando escenario durante {args.duracion}s...")
+
+    await asyncio.gather(
+        *[actor_cliente(s, metricas, espacios, fin, random.Random(rnd.random())) for s in sesiones_clientes],
+        *[actor_vigilante(s, metricas, fin, random.Random(rnd.random())) for s in sesiones_vigilantes],
+        *[actor_tablero(s, metricas, fin, args.intervalo_tablero) for s in sesiones_tableros],
+    )
+    duracion = time.perf_counter() - inicio
+
+    for sesion in sesiones_clientes + sesiones_vigilantes + sesiones_tableros:
+        await sesion.aclose()
+
+    return metricas, duracion, inicio_prueba
+
+
+def describir_servidor(args):
+    """Servidor, workers, caché y perfil de BD con que se midió."""
+    if args.url:
+        return f"{args.url} (caché y perfil de BD: los del servidor indicado, no verificados)"
+    comando = comando_servidor(args.iniciar_servidor, args.puerto, args.workers)
+    return (
+        f"{Path(comando[2]).name} ({args.iniciar_servidor}), {args.workers} workers, "
+        f"MIPARQUEO_CACHE={ENTORNO_SERVIDOR['MIPARQUEO_CACHE']}, "
+        f"MIPARQUEO_PERFIL_BD={ENTORNO_SERVIDOR['MIPARQUEO_PERFIL_BD']}"
+    )
+
+
+def imprimir_reporte(metricas, duracion, dobles, con_log, servidor):
+    print("\n" + "=" * 78)
+    print("RESULTADOS - PICO DE LLEGADA")
+    print("=" * 78)
+    print(f"Servidor: {servidor}")
+    print(f"{'Operación':<20}{'Total':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Error %':>9}{'Lock %':>8}")
+    total = 0
+    for operacion, latencias in sorted(metricas.latencias.items()):
+        n = len(latencias)
+        total += n
+        bloqueos = f"{100 * metricas.bloqueos[operacion] / n:>8.2f}" if con_log else f"{'-':>8}"
+        print(
+            f"{operacion:<20}{n:>8}{n / duracion:>9.1f}"
+            f"{percentil(latencias, 50):>9.1f}{percentil(latencias, 95):>9.1f}{percentil(latencias, 99):>9.1f}"
+            f"{100 * metricas.errores[operacion] / n:>9.2f}{bloqueos}"
+        )
+    print("-" * 78)
+    print(f"Throughput total: {total / duracion:.1f} peticiones/s en {duracion:.1f}s")
+    if not con_log:
+        print("[AVISO] Sin log del servidor (--log-servidor): no se cuentan los bloqueos")
+    if dobles:
+        print(f"[ERROR] Reservas solapadas (doble reserva): {dobles}")
+    else:
+        print("[OK] Sin dobles reservas")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga del pico de llegada de la mañana')
+    parser.add_argument('--url', default=None, help='URL de un servidor ya iniciado')
+    parser.add_argument('--iniciar-servidor', choices=['wsgi', 'asgi'], default='wsgi',
+                        help='Servidor a iniciar si no se indica --url (wsgi: gunicorn/waitress, asgi: uvicorn)')
+    parser.add_argument('--workers', type=int, default=4, help='Procesos del servidor (hilos con waitress)')
+    parser.add_argument('--log-servidor', default=None, help='Log del servidor indicado con --url')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--clientes', type=int, default=50)
+    parser.add_argument('--vigilantes', type=int, default=5)
+    parser.add_argument('--tableros', type=int, default=3)
+    parser.add_argument('--intervalo-tablero', type=float, default=2.0)
+    parser.add_argument('--duracion', type=int, default=30, help='Segundos de prueba')
+    parser.add_argument('--password', default='cliente123')
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    clientes, vigilantes, espacios = preparar_escenario(args)
+
+    proceso = log = None
+    url_base = args.url
+    ruta_log = args.log_servidor
+    if url_base is None:
+        log = tempfile.NamedTemporaryFile('wb', prefix='miparqueo_servidor_', suffix='.log', delete=False)
+        ruta_log = log.name
+        proceso, url_base = iniciar_servidor(args.iniciar_servidor, args.puerto, args.workers, log)
+        print(f"[OK] Servidor {args.iniciar_servidor} iniciado en {url_base} (log: {ruta_log})")
+    desde = os.path.getsize(ruta_log) if ruta_log else 0
+
+    try:
+        metricas, duracion, inicio_prueba = asyncio.run(
+            ejecutar(args, url_base, clientes, vigilantes, espacios)
+        )
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+            log.close()
+
+    if ruta_log:
+        metricas.contar_bloqueos(leer_log(ruta_log, desde))
+    imprimir_reporte(
+        metricas, duracion, contar_dobles_reservas(inicio_prueba), con_log=bool(ruta_log),
+        servidor=describir_servidor(args),
+    )
+
+
+if __name__ == '__main__':
+    main()
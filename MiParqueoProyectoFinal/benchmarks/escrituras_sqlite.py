@@ -0,0 +1,297 @@
+"""
+Benchmark de escrituras concurrentes en SQLite: perfil por defecto vs perfil de producción.
+
+Lanza N procesos escritores (por defecto 20, como N workers de gunicorn) que
+repiten el ciclo de portería sobre la misma base de datos:
+    crear reserva (verificar conflicto + insertar + marcar espacio)
+    -> registrar entrada -> registrar salida
+
+- antes:    configuración original (journal por defecto, transacciones diferidas)
+            y las escrituras en autocommit, como hacían las vistas originales
+- despues:  MIPARQUEO_PERFIL_BD=produccion (WAL, busy_timeout, synchronous=NORMAL,
+            mmap, BEGIN IMMEDIATE) y cada paso en una transacción corta
+
+Cada modo usa una copia nueva de la misma base de datos sembrada en un
+directorio temporal; db.sqlite3 no se toca.
+
+Reporta operaciones/s, latencias p50/p95/p99, tasa de "database is locked"
+y reservas solapadas (doble reserva).
+
+Ejecutar con:
+    python benchmarks/escrituras_sqlite.py
+    python benchmarks/escrituras_sqlite.py --escritores 20 --duracion 20 --espacios 100
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import time as dtime, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+TEXTO_BLOQUEO = 'database is locked'
+MODOS = ('antes', 'despues')
+
+
+def configurar_django(ruta_bd, perfil):
+    """Django se configura después de fijar la base de datos y el perfil en el entorno."""
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'mi_parqueo.settings'
+    os.environ['MIPARQUEO_BD_NOMBRE'] = str(ruta_bd)
+    os.environ['MIPARQUEO_PERFIL_BD'] = perfil
+    os.environ['MIPARQUEO_METRICAS'] = '0'
+
+    import django
+    django.setup()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+# ============================================================
+# PREPARACIÓN
+# ============================================================
+
+def sembrar(ruta_bd, espacios, escritores):
+    """Crea la base de datos plantilla con el esquema, espacios y un cliente por escritor."""
+    configurar_django(ruta_bd, 'desarrollo')
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from core.models import EspacioParqueadero, Parqueadero
+
+    call_command('migrate', verbosity=0)
+    parqueadero = Parqueadero.objects.create(nombre='Sede Benchmark', codigo='benchmark')
+    EspacioParqueadero.objects.bulk_create(
+        EspacioParqueadero(parqueadero=parqueadero, numero=i + 1, tipo='CARRO', estado='LIBRE')
+        for i in range(espacios)
+    )
+    User.objects.bulk_create(
+        User(username=f'escritor_{i:02d}', password='!') for i in range(escritores)
+    )
+
+
+# ============================================================
+# ESCRITOR
+# ============================================================
+
+def escritor(args):
+    """Proceso escritor: repite el ciclo de portería hasta args.fin e imprime sus métricas en JSON."""
+    configurar_django(args.bd, 'produccion' if args.modo == 'despues' else 'desarrollo')
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, transaction
+    from django.db.models import Q
+    from django.utils import timezone
+
+    from core.models import EspacioParqueadero, Reserva
+
+    # Antes: cada sentencia en autocommit (vistas originales). Después: transacción corta.
+    transaccion = transaction.atomic if args.modo == 'despues' else nullcontext
+    rnd = random.Random(args.semilla)
+    usuario = User.objects.get(username=f'escritor_{args.indice:02d}')
+    espacios = list(EspacioParqueadero.objects.values_list('id', flat=True))
+    manana = timezone.localdate() + timedelta(days=1)
+
+    def crear_reserva():
+        espacio = EspacioParqueadero.objects.get(id=rnd.choice(espacios))
+        hora = rnd.randint(6, 19)
+        inicio, fin = dtime(hora, 0), dtime(hora + 1, 0)
+        with transaccion():
+            conflicto = Reserva.objects.filter(
+                espacio=espacio, fecha=manana, estado='RESERVADA'
+            ).filter(Q(hora_inicio__lt=fin, hora_fin__gt=inicio)).exists()
+            if conflicto:
+                return None
+            reserva = Reserva.objects.create(
+                usuario=usuario, espacio=espacio, fecha=manana,
+                hora_inicio=inicio, hora_fin=fin,
+                tipo_vehiculo='CARRO', placa=f'ESC{args.indice:02d}{rnd.randint(0, 9)}',
+                estado='RESERVADA',
+            )
+            espacio.estado = 'RESERVADO'
+            espacio.save()
+        return reserva
+
+    def registrar_entrada(reserva):
+        with transaccion():
+            reserva.hora_entrada = dtime(reserva.hora_inicio.hour, 5)
+            reserva.save()
+            reserva.espacio.estado = 'OCUPADO'
+            reserva.espacio.save()
+
+    def registrar_salida(reserva):
+        with transaccion():
+            reserva.hora_salida = dtime(reserva.hora_inicio.hour, 55)
+            reserva.estado = 'COMPLETADA'
+            reserva.save()
+            reserva.espacio.estado = 'LIBRE'
+            reserva.espacio.save()
+
+    def medir(operacion, *argumentos):
+        inicio = time.perf_counter()
+        try:
+            resultado = operacion(*argumentos)
+        except OperationalError as e:
+            resultado = None
+            if TEXTO_BLOQUEO in str(e):
+                metricas['bloqueos'] += 1
+            else:
+                metricas['otros_errores'] += 1
+        metricas['latencias'].append(round((time.perf_counter() - inicio) * 1000, 3))
+        return resultado
+
+    metricas = {'latencias': [], 'bloqueos': 0, 'otros_errores': 0, 'conflictos': 0}
+    time.sleep(max(0.0, args.inicio - time.time()))
+    while time.time() < args.fin:
+        reserva = medir(crear_reserva)
+        if reserva is None:
+            metricas['conflictos'] += 1
+            continue
+        # La mitad de las reservas se quedan activas para que haya conflictos reales
+        if rnd.random() < 0.5:
+            medir(registrar_entrada, reserva)
+            medir(registrar_salida, reserva)
+
+    print(json.dumps(metricas))
+
+
+# ============================================================
+# PRINCIPAL
+# ============================================================
+
+def contar_dobles_reservas(ruta_bd):
+    """Pares de reservas activas solapadas en el mismo espacio."""
+    import sqlite3
+
+    with sqlite3.connect(ruta_bd) as conexion:
+        return conexion.execute(
+            """
+            SELECT COUNT(*) FROM core_reserva a
+            JOIN core_reserva b ON a.espacio_id = b.espacio_id AND a.fecha = b.fecha AND a.id < b.id
+            WHERE a.estado = 'RESERVADA' AND b.estado = 'RESERVADA'
+              AND a.hora_inicio < b.hora_fin AND b.hora_inicio < a.hora_fin
+            """
+        ).fetchone()[0]
+
+
+def ejecutar_modo(modo, plantilla, directorio, args):
+    ruta_bd = Path(directorio) / f'{modo}.sqlite3'
+    shutil.copyfile(plantilla, ruta_bd)
+
+    inicio = time.time() + args.arranque
+    fin = inicio + args.duracion
+    procesos = [
+        subprocess.Popen(
+            [
+                sys.executable, __file__, '--trabajador',
+                '--modo', modo, '--bd', str(ruta_bd), '--indice', str(i),
+                '--inicio', str(inicio), '--fin', str(fin), '--semilla', str(args.semilla + i),
+            ],
+            cwd=RAIZ, stdout=subprocess.PIPE, text=True,
+        )
+        for i in range(args.escritores)
+    ]
+
+    latencias, bloqueos, otros, conflictos = [], 0, 0, 0
+    for proceso in procesos:
+        salida, _ = proceso.communicate()
+        if proceso.returncode != 0 or not salida.strip():
+            otros += 1
+            continue
+        datos = json.loads(salida.strip().splitlines()[-1])
+        latencias += datos['latencias']
+        bloqueos += datos['bloqueos']
+        otros += datos['otros_errores']
+        conflictos += datos['conflictos']
+
+    return {
+        'operaciones': len(latencias),
+        'ops_s': len(latencias) / args.duracion,
+        'p50': percentil(latencias, 50),
+        'p95': percentil(latencias, 95),
+        'p99': percentil(latencias, 99),
+        'bloqueo_pct': 100 * bloqueos / max(1, len(latencias)),
+        'otros_errores': otros,
+        'conflictos': conflictos,
+        'dobles': contar_dobles_reservas(ruta_bd),
+    }
+
+
+def imprimir_reporte(resultados, args):
+    print("\n" + "=" * 78)
+    print(f"ESCRITURAS CONCURRENTES EN SQLITE - {args.escritores} escritores, {args.duracion}s")
+    print("=" * 78)
+    print(f"{'Modo':<10}{'Ops':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Lock %':>9}{'Otros':>7}{'Dobles':>8}")
+    for modo, r in resultados.items():
+        print(
+            f"{modo:<10}{r['operaciones']:>8}{r['ops_s']:>9.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}"
+            f"{r['p99']:>9.1f}{r['bloqueo_pct']:>9.2f}{r['otros_errores']:>7}{r['dobles']:>8}"
+        )
+    print("-" * 78)
+    if len(resultados) == 2:
+        antes, despues = resultados['antes'], resultados['despues']
+        mejora = despues['ops_s'] / antes['ops_s'] if antes['ops_s'] else float('inf')
+        print(f"Throughput: x{mejora:.2f}  |  Lock %: {antes['bloqueo_pct']:.2f} -> {despues['bloqueo_pct']:.2f}")
+    print("=" * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Escrituras concurrentes en SQLite: antes y después del perfil de producción')
+    parser.add_argument('--escritores', type=int, default=20)
+    parser.add_argument('--duracion', type=int, default=15, help='Segundos por modo')
+    parser.add_argument('--espacios', type=int, default=100)
+    parser.add_argument('--modos', nargs='+', choices=MODOS, default=list(MODOS))
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--arranque', type=float, default=3.0,
+                        help='Segundos de espera para que todos los escritores arranquen a la vez')
+    # Uso interno: procesos de siembra y escritores
+    parser.add_argument('--sembrar', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--trabajador', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--modo', choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument('--bd', help=argparse.SUPPRESS)
+    parser.add_argument('--indice', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--inicio', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--fin', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sembrar:
+        sembrar(args.bd, args.espacios, args.escritores)
+        return
+    if args.trabajador:
+        escritor(args)
+        return
+
+    directorio = tempfile.mkdtemp(prefix='miparqueo_escrituras_')
+    try:
+        plantilla = Path(directorio) / 'plantilla.sqlite3'
+        # La siembra corre en un proceso aparte para no dejar Django configurado en este
+        subprocess.run(
+            [sys.executable, __file__, '--sembrar', '--bd', str(plantilla),
+             '--espacios', str(args.espacios), '--escritores', str(args.escritores)],
+            cwd=RAIZ, check=True,
+        )
+        print(f"[OK] Base de datos sembrada: {args.espacios} espacios, {args.escritores} clientes")
+
+        resultados = {}
+        for modo in args.modos:
+            print(f"Ejecutando modo '{modo}' durante {args.duracion}s...")
+            resultados[modo] = ejecutar_modo(modo, plantilla, directorio, args)
+        imprimir_reporte(resultados, args)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
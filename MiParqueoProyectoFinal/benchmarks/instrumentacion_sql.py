@@ -0,0 +1,153 @@
+"""
+Benchmark del costo de InstrumentacionSQLMiddleware por petición.
+
+Compara las mismas peticiones con MIPARQUEO_INSTRUMENTACION_SQL desactivada
+(Django descarta el middleware al arrancar) y activada (execute_wrapper por
+consulta, cabecera Server-Timing y una línea JSON en core.instrumentacion,
+escrita a un archivo como lo haría un servidor real).
+
+Corre en proceso con el cliente de pruebas de Django sobre una base de
+datos temporal en archivo (db.sqlite3 no se toca). Las dos variantes se
+alternan por rondas para que el ruido de la máquina afecte a ambas por igual.
+
+Ejecutar con:
+    python benchmarks/instrumentacion_sql.py
+    python benchmarks/instrumentacion_sql.py --repeticiones 2000 --rondas 5
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import Group, User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from core.models import EspacioParqueadero, Parqueadero  # noqa: E402
+
+VISTAS = [
+    '/vigilante/ocupacion/',
+    '/vigilante/validar-placa/',
+    '/vigilante/salida/',
+    '/incidencias/registrar/',
+]
+
+# Sobrecosto aceptable de la instrumentación activada
+LIMITE_SOBRECOSTO = 0.05
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def preparar(espacios):
+    parqueadero = Parqueadero.objects.create(nombre='Sede Benchmark', codigo='benchmark')
+    EspacioParqueadero.objects.bulk_create(
+        EspacioParqueadero(parqueadero=parqueadero, numero=i + 1, tipo='CARRO', estado='LIBRE')
+        for i in range(espacios)
+    )
+    vigilante = User.objects.create_user('bench_vigilante', password='x')
+    vigilante.groups.add(Group.objects.get_or_create(name='VIGILANTE')[0])
+    parqueadero.vigilantes.add(vigilante)
+    return vigilante
+
+
+def crear_cliente(activada, usuario):
+    with override_settings(MIPARQUEO_INSTRUMENTACION_SQL=activada):
+        # El middleware se carga (o se descarta) con la primera petición
+        cliente = Client()
+        cliente.force_login(usuario)
+        for url in VISTAS:
+            respuesta = cliente.get(url)
+            assert ('Server-Timing' in respuesta) == activada, url
+    return cliente
+
+
+def medir(cliente, repeticiones, tiempos):
+    for i in range(repeticiones):
+        url = VISTAS[i % len(VISTAS)]
+        inicio = time.perf_counter()
+        respuesta = cliente.get(url)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        assert respuesta.status_code == 200, f'{url}: {respuesta.status_code}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sobrecosto por petición de la instrumentación SQL')
+    parser.add_argument('--repeticiones', type=int, default=1000, help='Peticiones por ronda y variante')
+    parser.add_argument('--rondas', type=int, default=3)
+    parser.add_argument('--espacios', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    directorio = tempfile.mkdtemp(prefix='miparqueo_instrumentacion_')
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+
+    registro = logging.getLogger('core.instrumentacion')
+    manejador = logging.FileHandler(Path(directorio) / 'instrumentacion.log', encoding='utf-8')
+    registro.addHandler(manejador)
+    registro.propagate = False
+    try:
+        usuario = preparar(args.espacios)
+        print(f"[OK] Base de datos temporal con {args.espacios} espacios")
+        clientes = {activada: crear_cliente(activada, usuario) for activada in (False, True)}
+        tiempos = {False: [], True: []}
+        for _ in range(args.rondas):
+            for activada, cliente in clientes.items():
+                medir(cliente, args.repeticiones, tiempos[activada])
+        manejador.flush()
+        lineas = sum(1 for _ in open(manejador.baseFilename, encoding='utf-8'))
+    finally:
+        registro.removeHandler(manejador)
+        manejador.close()
+        registro.propagate = True
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    total = args.repeticiones * args.rondas
+    resultados = {
+        activada: {
+            'media': sum(valores) / len(valores),
+            'p50': percentil(valores, 50),
+            'p95': percentil(valores, 95),
+        }
+        for activada, valores in tiempos.items()
+    }
+    sobrecosto = resultados[True]['p50'] / resultados[False]['p50'] - 1
+
+    print("\n" + "=" * 64)
+    print(f"INSTRUMENTACIÓN SQL - {total} peticiones de vigilante por variante")
+    print("=" * 64)
+    print(f"{'Variante':<14}{'media ms':>12}{'p50 ms':>12}{'p95 ms':>12}")
+    for activada, r in resultados.items():
+        nombre = 'activada' if activada else 'desactivada'
+        print(f"{nombre:<14}{r['media']:>12.3f}{r['p50']:>12.3f}{r['p95']:>12.3f}")
+    print("=" * 64)
+    print(f"Líneas de log escritas: {lineas}")
+    if sobrecosto <= LIMITE_SOBRECOSTO:
+        print(f"[OK] Sobrecosto en p50: {sobrecosto:+.1%} (límite {LIMITE_SOBRECOSTO:.0%})")
+    else:
+        print(f"[AVISO] Sobrecosto en p50: {sobrecosto:+.1%} supera el límite de {LIMITE_SOBRECOSTO:.0%}")
+
+
+if __name__ == '__main__':
+    main()
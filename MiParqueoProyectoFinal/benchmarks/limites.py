@@ -0,0 +1,201 @@
+"""
+Micro-benchmark de los límites de escritura de reservas (core/limites.py).
+
+Sobre una base de datos temporal (db.sqlite3 no se toca):
+
+    consumir       decisión de la cubeta de fichas (usuario + IP), admitida
+                   y rechazada, con el caché en memoria y el de archivos
+                   (MIPARQUEO_CACHE=archivos, compartido entre procesos)
+    tormenta       un cliente reintenta en bucle POST cliente_crear_reserva:
+                   latencia y consultas SQL de las peticiones rechazadas
+                   (429) frente a una admitida por el límite (que luego
+                   rechaza el cupo, sin crear nada)
+    cupo           reservas activas del cliente: contador en caché frente a
+                   COUNT(*) sobre un cliente con --reservas reservas
+
+El objetivo es que una petición rechazada no haga ninguna consulta.
+
+Ejecutar con:
+    python benchmarks/limites.py
+    python benchmarks/limites.py --repeticiones 20000 --reservas 5000
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from io import StringIO
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from core.limites import CLAVE_CUBETA, consumir, reservas_activas  # noqa: E402
+from core.models import EspacioParqueadero, Reserva  # noqa: E402
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def medir_consumir(repeticiones):
+    """Decisiones admitidas (cubeta enorme) y rechazadas (cubeta sin recarga)."""
+    llenas = [('usuario', 'bench:u:llena', 10 ** 9, 10 ** 9), ('ip', 'bench:ip:llena', 10 ** 9, 10 ** 9)]
+    vacias = [('usuario', 'bench:u:vacia', 1, 1e-9), ('ip', 'bench:ip:vacia', 10 ** 9, 10 ** 9)]
+    consumir(vacias)
+    return {
+        'admitida': cronometrar(lambda: consumir(llenas), repeticiones),
+        'rechazada': cronometrar(lambda: consumir(vacias), repeticiones),
+    }
+
+
+def preparar(n_reservas):
+    call_command(
+        'generar_datos_carga', usuarios=50, vigilantes=1, espacios=200,
+        reservas=0, incidencias=0, semilla=5, stdout=StringIO(),
+    )
+    cliente = User.objects.filter(username__startswith='carga_cliente_').order_by('id').first()
+    espacios = list(EspacioParqueadero.objects.values_list('id', 'parqueadero_id'))
+    inicio = date.today() + timedelta(days=1)
+    Reserva.objects.bulk_create([
+        Reserva(
+            usuario=cliente, espacio_id=espacios[i % len(espacios)][0],
+            parqueadero_id=espacios[i % len(espacios)][1],
+            fecha=inicio + timedelta(days=i // len(espacios)), hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0),
+            tipo_vehiculo='CARRO', placa='LIM001', estado='RESERVADA',
+        ) for i in range(n_reservas)
+    ], batch_size=2000)
+    return cliente
+
+
+def medir_tormenta(cliente, repeticiones):
+    """Peticiones de crear reserva con la cubeta del cliente vacía y con fichas."""
+    navegador = Client()
+    navegador.force_login(cliente)
+    espacio = EspacioParqueadero.objects.filter(estado='LIBRE', tipo='CARRO').first()
+    url = reverse('cliente_crear_reserva', args=[espacio.id])
+    datos = {
+        'fecha': (date.today() + timedelta(days=1)).isoformat(), 'hora_inicio': '10:00',
+        'hora_fin': '11:00', 'tipo_vehiculo': 'CARRO', 'placa': 'LIM002',
+    }
+    clave = CLAVE_CUBETA.format('usuario', cliente.id)
+    resultados = {}
+
+    # Admitida: el cupo la rechaza después de pasar el límite (no crea nada)
+    with override_settings(MIPARQUEO_CUPO_RESERVAS=0):
+        navegador.post(url, datos)
+        tiempos, consultas = [], []
+        for _ in range(min(repeticiones, 500)):
+            cache.delete(clave)
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                navegador.post(url, datos)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(capturadas))
+        resultados['admitida'] = (tiempos, max(consultas), None)
+
+    tiempos, consultas, estados = [], [], set()
+    for _ in range(repeticiones):
+        cache.set(clave, (0, time.time()))
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = navegador.post(url, datos)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(len(capturadas))
+        estados.add(respuesta.status_code)
+    resultados['rechazada'] = (tiempos, max(consultas), estados)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cubetas de fichas y cupo de reservas activas')
+    parser.add_argument('--repeticiones', type=int, default=5000)
+    parser.add_argument('--reservas', type=int, default=2000, help='Reservas activas del cliente del cupo')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    # Cada 429 deja un aviso en django.request
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    directorio = tempfile.mkdtemp(prefix='miparqueo_limites_')
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    archivos = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(Path(directorio) / 'cache'),
+    }}
+    try:
+        consumo = {('memoria', k): v for k, v in medir_consumir(args.repeticiones).items()}
+        with override_settings(CACHES=archivos):
+            consumo.update({('archivos', k): v for k, v in medir_consumir(args.repeticiones // 5).items()})
+
+        cliente = preparar(args.reservas)
+        print(f"[OK] Cliente con {args.reservas} reservas activas")
+        tormenta = medir_tormenta(cliente, args.repeticiones // 5)
+
+        cache.clear()
+        reservas_activas(cliente.id)
+        cupo = {
+            'contador': cronometrar(lambda: reservas_activas(cliente.id), args.repeticiones),
+            'count': cronometrar(
+                lambda: Reserva.objects.filter(usuario_id=cliente.id, estado='RESERVADA').count(),
+                args.repeticiones // 5,
+            ),
+        }
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print("\n" + "=" * 64)
+    print(f"LÍMITES - {args.repeticiones} repeticiones")
+    print("=" * 64)
+    print(f"{'':<28}{'p50 ms':>12}{'p95 ms':>12}{'consultas':>12}")
+    for (almacen, decision), tiempos in consumo.items():
+        print(f"{'consumir ' + almacen + ' ' + decision:<28}"
+              f"{percentil(tiempos, 50):>12.4f}{percentil(tiempos, 95):>12.4f}{'0':>12}")
+    for decision, (tiempos, consultas, _estados) in tormenta.items():
+        print(f"{'tormenta ' + decision:<28}"
+              f"{percentil(tiempos, 50):>12.3f}{percentil(tiempos, 95):>12.3f}{consultas:>12}")
+    for nombre, tiempos in cupo.items():
+        consultas = 0 if nombre == 'contador' else 1
+        print(f"{'cupo ' + nombre:<28}{percentil(tiempos, 50):>12.4f}{percentil(tiempos, 95):>12.4f}{consultas:>12}")
+    print("=" * 64)
+
+    _tiempos, consultas, estados = tormenta['rechazada']
+    if estados != {429}:
+        print(f"[ERROR] Respuestas de la tormenta: {sorted(estados)} (se esperaba solo 429)")
+    marca = '[OK]' if consultas == 0 else '[AVISO]'
+    print(f"{marca} Petición rechazada: {consultas} consultas SQL")
+
+
+if __name__ == '__main__':
+    main()
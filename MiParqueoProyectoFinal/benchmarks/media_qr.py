@@ -0,0 +1,124 @@
+"""
+Benchmark de entrega de imágenes QR: ruta anterior vs servir_media.
+
+Compara, con el cliente de pruebas de Django y toda la pila de middleware:
+- anterior:   django.views.static.serve (lo que montaba static() con DEBUG=True)
+- django:     servir_media con FileResponse (200 con cuerpo)
+- 304:        servir_media con If-None-Match (revalidación sin cuerpo)
+- x-accel:    servir_media delegando el cuerpo a nginx (X-Accel-Redirect)
+
+Además, con Cache-Control immutable el navegador no vuelve a pedir un QR ya
+visto: en el historial, las visitas repetidas no generan ninguna petición.
+
+Usa un MEDIA_ROOT temporal con QR reales generados con qrcode.
+
+Ejecutar con:
+    python benchmarks/media_qr.py
+    python benchmarks/media_qr.py --archivos 300 --peticiones 3000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import include, path, re_path  # noqa: E402
+from django.views.static import serve  # noqa: E402
+
+try:
+    import qrcode
+except ImportError:
+    print("[ERROR] Este benchmark requiere qrcode. Instale con: pip install qrcode pillow")
+    sys.exit(1)
+
+# URLconf del benchmark: la ruta anterior en /media-anterior/ junto a las del proyecto
+urlpatterns = [
+    re_path(r'^media-anterior/(?P<path>.*)$', serve, {'document_root': None}),
+    path('', include('mi_parqueo.urls')),
+]
+
+
+def generar_archivos(directorio, cantidad):
+    (Path(directorio) / 'qr').mkdir()
+    nombres = []
+    for i in range(cantidad):
+        nombre = f'qr/{uuid.uuid4()}.png'
+        qrcode.make(f'RESERVA-{i}-{uuid.uuid4()}').save(Path(directorio) / nombre)
+        nombres.append(nombre)
+    return nombres
+
+
+def medir(cliente, urls, cabeceras=None):
+    bytes_enviados = 0
+    inicio = time.perf_counter()
+    for url in urls:
+        respuesta = cliente.get(url, headers=(cabeceras or {}).get(url, {}))
+        assert respuesta.status_code in (200, 304), f'{url}: {respuesta.status_code}'
+        if respuesta.streaming:
+            bytes_enviados += sum(len(parte) for parte in respuesta.streaming_content)
+        else:
+            bytes_enviados += len(respuesta.content)
+    duracion = time.perf_counter() - inicio
+    return {'peticiones_s': len(urls) / duracion, 'kb': bytes_enviados / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peticiones por segundo al servir imágenes QR')
+    parser.add_argument('--archivos', type=int, default=200)
+    parser.add_argument('--peticiones', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    directorio = tempfile.mkdtemp(prefix='miparqueo_media_')
+    try:
+        nombres = generar_archivos(directorio, args.archivos)
+        print(f"[OK] {len(nombres)} QR generados en {directorio}")
+        secuencia = [nombres[i % len(nombres)] for i in range(args.peticiones)]
+        urlpatterns[0].default_args['document_root'] = directorio
+
+        resultados = {}
+        with override_settings(MEDIA_ROOT=directorio, ROOT_URLCONF=__name__):
+            cliente = Client()
+            resultados['anterior'] = medir(cliente, [f'/media-anterior/{n}' for n in secuencia])
+
+            urls = [f'{settings.MEDIA_URL}{n}' for n in secuencia]
+            resultados['django'] = medir(cliente, urls)
+
+            etags = {url: {'If-None-Match': cliente.get(url)['ETag']} for url in set(urls)}
+            resultados['304'] = medir(cliente, urls, etags)
+
+            with override_settings(MEDIA_ENTREGA='x-accel-redirect'):
+                resultados['x-accel'] = medir(cliente, urls)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    base = resultados['anterior']['peticiones_s']
+    print("\n" + "=" * 60)
+    print(f"MEDIA QR - {args.peticiones} peticiones sobre {args.archivos} archivos")
+    print("=" * 60)
+    print(f"{'Ruta':<12}{'pet/s':>10}{'vs anterior':>14}{'KB enviados':>14}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<12}{r['peticiones_s']:>10.0f}{r['peticiones_s'] / base:>13.2f}x{r['kb']:>14.0f}")
+    print("-" * 60)
+    print("Con Cache-Control immutable las visitas repetidas no llegan al servidor.")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Benchmark del envío de recordatorios (core/notificaciones.py).
+
+Crea --reservas reservas que empiezan en los próximos minutos, cada una con
+su imagen QR, sobre una base de datos temporal (db.sqlite3 no se toca) y
+las envía a un servidor SMTP local mínimo que acepta y descarta los
+mensajes (en un hilo de este proceso):
+
+    por_mensaje    lo ingenuo: una conexión SMTP y un UPDATE por reserva
+                   (sobre --muestra reservas; el total se extrapola)
+    despachador    enviar_notificaciones: una consulta, una conexión y un
+                   UPDATE por lote
+    locmem         el despachador con el backend en memoria: solo consulta,
+                   plantillas, adjuntos y marcado
+
+Verifica además que una segunda ejecución no reenvía nada. El objetivo es
+enviar los recordatorios de una ejecución dentro de la ventana del cron
+(--ventana segundos).
+
+Ejecutar con:
+    python benchmarks/notificaciones.py
+    python benchmarks/notificaciones.py --reservas 20000 --lote 1000
+"""
+
+import argparse
+import os
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, time as dtime, timedelta
+from io import StringIO
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.mail import EmailMessage, get_connection  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.template.loader import get_template  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from core.models import EspacioParqueadero, Reserva  # noqa: E402
+from core.notificaciones import (  # noqa: E402
+    NOTIFICACIONES, enviar_notificaciones, recordatorios_pendientes, _con_datos, _mensaje,
+)
+from core.utils import generar_qr_reserva  # noqa: E402
+
+SMTP = 'django.core.mail.backends.smtp.EmailBackend'
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class SumideroSMTP(socketserver.StreamRequestHandler):
+    """Servidor SMTP mínimo: acepta todo y descarta el contenido."""
+
+    def responder(self, linea):
+        self.wfile.write(linea.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.conexiones += 1
+        self.responder('220 sumidero')
+        while linea := self.rfile.readline():
+            comando = linea.strip().upper()
+            if comando.startswith(b'EHLO'):
+                self.responder('250 sumidero')
+            elif comando == b'DATA':
+                self.responder('354 fin con <CRLF>.<CRLF>')
+                while (linea := self.rfile.readline()) not in (b'.\r\n', b''):
+                    pass
+                self.server.mensajes += 1
+                self.responder('250 OK')
+            elif comando == b'QUIT':
+                self.responder('221 adios')
+                return
+            else:
+                self.responder('250 OK')
+
+
+class ServidorSMTP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    conexiones = mensajes = 0
+
+
+def preparar(n_reservas, ahora):
+    call_command(
+        'generar_datos_carga',
+        usuarios=max(n_reservas // 10, 50), vigilantes=1, espacios=max(n_reservas // 4, 60),
+        reservas=0, incidencias=0, semilla=3, stdout=StringIO(),
+    )
+    clientes = list(User.objects.filter(username__startswith='carga_cliente_').values_list('id', flat=True))
+    espacios = list(EspacioParqueadero.objects.values_list('id', 'parqueadero_id'))
+    inicio = timezone.localtime(ahora)
+    reservas = []
+    for i in range(n_reservas):
+        espacio_id, parqueadero_id = espacios[i % len(espacios)]
+        # Cuatro turnos por espacio a lo largo de la ventana del recordatorio
+        hora = (inicio + timedelta(minutes=1 + (i // len(espacios)) * 7)).time().replace(second=0, microsecond=0)
+        reservas.append(Reserva(
+            usuario_id=clientes[i % len(clientes)], espacio_id=espacio_id, parqueadero_id=parqueadero_id,
+            fecha=inicio.date(), hora_inicio=hora, hora_fin=dtime(hora.hour + 1, hora.minute),
+            tipo_vehiculo='CARRO', placa=f'BEN{i % 1000:03d}', estado='RESERVADA', confirmacion_enviada_en=ahora,
+        ))
+    Reserva.objects.bulk_create(reservas, batch_size=2000)
+    # Un QR real por reserva (como en producción), generado una vez y copiado
+    qr = generar_qr_reserva(Reserva.objects.first())
+    origen = Path(settings.MEDIA_ROOT) / qr
+    actualizadas = []
+    for reserva in Reserva.objects.only('id'):
+        ruta = f'qr/bench-{reserva.id}.png'
+        shutil.copyfile(origen, Path(settings.MEDIA_ROOT) / ruta)
+        reserva.codigo_qr = ruta
+        actualizadas.append(reserva)
+    Reserva.objects.bulk_update(actualizadas, ['codigo_qr'], batch_size=2000)
+
+
+def reiniciar():
+    Reserva.objects.update(recordatorio_enviado_en=None)
+
+
+def por_mensaje(ahora, muestra):
+    """Una conexión SMTP (EmailMessage.send) y un UPDATE por reserva."""
+    notificacion = NOTIFICACIONES['recordatorio']
+    plantilla = get_template(notificacion['plantilla'])
+    reservas = _con_datos(recordatorios_pendientes(ahora, 30))[:muestra]
+    inicio = time.perf_counter()
+    for reserva in reservas:
+        mensaje = _mensaje(notificacion, plantilla, reserva, None)
+        mensaje.send()
+        Reserva.objects.filter(id=reserva.id).update(recordatorio_enviado_en=ahora)
+    return time.perf_counter() - inicio, len(reservas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recordatorios por lotes sobre una conexión vs uno por uno')
+    parser.add_argument('--reservas', type=int, default=10000)
+    parser.add_argument('--muestra', type=int, default=1000, help='Reservas del escenario por_mensaje')
+    parser.add_argument('--lote', type=int, default=500)
+    parser.add_argument('--ventana', type=int, default=300, help='Segundos entre ejecuciones del cron')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    directorio = tempfile.mkdtemp(prefix='miparqueo_notificaciones_')
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    servidor = ServidorSMTP(('127.0.0.1', 0), SumideroSMTP)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    smtp = {'EMAIL_BACKEND': SMTP, 'EMAIL_HOST': '127.0.0.1', 'EMAIL_PORT': servidor.server_address[1],
+            'EMAIL_USE_TLS': False, 'EMAIL_HOST_USER': '', 'EMAIL_HOST_PASSWORD': ''}
+    # A media mañana: la ventana del recordatorio no cruza la medianoche
+    ahora = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), dtime(7, 0)))
+    resultados = {}
+    try:
+        with override_settings(MEDIA_ROOT=Path(directorio) / 'media'):
+            (Path(settings.MEDIA_ROOT) / 'qr').mkdir(parents=True)
+            inicio = time.perf_counter()
+            preparar(args.reservas, ahora)
+            print(f"[OK] {args.reservas} reservas con QR en la ventana ({time.perf_counter() - inicio:.1f}s)")
+
+            with override_settings(**smtp):
+                segundos, enviados = por_mensaje(ahora, args.muestra)
+                resultados['por_mensaje'] = (segundos / enviados * args.reservas, enviados, servidor.conexiones, None)
+                reiniciar()
+
+                servidor.conexiones = servidor.mensajes = 0
+                with CaptureQueriesContext(connection) as consultas:
+                    resumen = enviar_notificaciones(minutos=30, lote=args.lote, ahora=ahora)
+                resultados['despachador'] = (
+                    resumen['segundos'], resumen['recordatorios'], servidor.conexiones, len(consultas)
+                )
+                repetido = enviar_notificaciones(minutos=30, lote=args.lote, ahora=ahora)
+                reiniciar()
+
+            with override_settings(EMAIL_BACKEND=LOCMEM), CaptureQueriesContext(connection) as consultas:
+                resumen = enviar_notificaciones(minutos=30, lote=args.lote, ahora=ahora)
+                resultados['locmem'] = (resumen['segundos'], resumen['recordatorios'], 0, len(consultas))
+    finally:
+        servidor.shutdown()
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print("\n" + "=" * 72)
+    print(f"RECORDATORIOS - {args.reservas} reservas con QR adjunto, lotes de {args.lote}")
+    print("=" * 72)
+    print(f"{'':<14}{'segundos':>12}{'mensajes/s':>14}{'conexiones':>14}{'consultas':>12}")
+    for nombre, (segundos, enviados, conexiones, n_consultas) in resultados.items():
+        tasa = args.reservas / segundos if segundos else 0
+        extrapolado = '*' if nombre == 'por_mensaje' else ' '
+        print(f"{nombre:<14}{segundos:>11.1f}{extrapolado}{tasa:>14.0f}{conexiones:>14}{n_consultas or '-':>12}")
+    print("=" * 72)
+    print(f"* extrapolado de {resultados['por_mensaje'][1]} mensajes")
+
+    if repetido['recordatorios']:
+        print(f"[ERROR] La segunda ejecución reenvió {repetido['recordatorios']} recordatorios")
+    else:
+        print("[OK] La segunda ejecución no reenvió ningún recordatorio")
+    segundos = resultados['despachador'][0]
+    marca = '[OK]' if segundos < args.ventana else '[AVISO]'
+    print(f"{marca} {args.reservas} recordatorios en {segundos:.1f}s (ventana del cron {args.ventana}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark de la recomendación del espacio libre más cercano a una entrada
+(core/recomendacion.py) frente a la búsqueda por fuerza bruta.
+
+Sobre una base de datos temporal (db.sqlite3 no se toca) con una sede de
+--espacios espacios ubicados en el plano por generar_datos_carga:
+
+    indice         recomendar() con el índice ya sincronizado (sin consultas)
+    fuerza_bruta   leer los espacios libres del tipo y recorrerlos todos
+    sql            ORDER BY de la distancia en la base de datos
+    resincronizar  recomendar() justo después de cambiar el estado de un
+                   espacio: lee la sede y aplica solo esa diferencia
+
+Cada repetición usa un punto de partida distinto (las entradas y puntos
+aleatorios del plano) y verifica que el índice y la fuerza bruta coinciden.
+
+Ejecutar con:
+    python benchmarks/recomendacion.py
+    python benchmarks/recomendacion.py --espacios 5000 --repeticiones 2000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import F  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from core.models import EntradaEdificio, EspacioParqueadero, Parqueadero  # noqa: E402
+from core.recomendacion import recomendar  # noqa: E402
+
+OBJETIVO_MS = 5.0
+TIPOS = ('CARRO', 'MOTO', 'DISCAPACIDAD')
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def preparar(n_espacios, ocupacion, rnd):
+    call_command(
+        'generar_datos_carga',
+        usuarios=10, vigilantes=1, parqueaderos=1, espacios=n_espacios,
+        reservas=0, incidencias=0, semilla=11, stdout=StringIO(),
+    )
+    parqueadero = Parqueadero.objects.get(codigo='sede-1')
+    ids = list(EspacioParqueadero.objects.filter(parqueadero=parqueadero).values_list('id', flat=True))
+    ocupados = rnd.sample(ids, int(len(ids) * ocupacion))
+    EspacioParqueadero.objects.filter(id__in=ocupados).update(estado='OCUPADO')
+    return parqueadero
+
+
+def fuerza_bruta(parqueadero_id, x, y, tipo):
+    libres = EspacioParqueadero.objects.filter(
+        parqueadero_id=parqueadero_id, tipo=tipo, estado='LIBRE', x__isnull=False, y__isnull=False
+    ).values_list('id', 'numero', 'x', 'y')
+    mejor = min(libres, key=lambda e: ((e[2] - x) ** 2 + (e[3] - y) ** 2, e[1]), default=None)
+    return mejor and mejor[0]
+
+
+def por_sql(parqueadero_id, x, y, tipo):
+    return (
+        EspacioParqueadero.objects
+        .filter(parqueadero_id=parqueadero_id, tipo=tipo, estado='LIBRE', x__isnull=False, y__isnull=False)
+        .annotate(d2=(F('x') - x) * (F('x') - x) + (F('y') - y) * (F('y') - y))
+        .order_by('d2', 'numero')
+        .values_list('id', flat=True)
+        .first()
+    )
+
+
+def cronometrar(funcion, puntos):
+    tiempos, resultados = [], []
+    for x, y, tipo in puntos:
+        inicio = time.perf_counter()
+        resultados.append(funcion(x, y, tipo))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recomendación de espacio: índice en grilla vs fuerza bruta')
+    parser.add_argument('--espacios', type=int, default=2000, help='Espacios de la sede')
+    parser.add_argument('--ocupacion', type=float, default=0.7, help='Fracción de espacios no libres')
+    parser.add_argument('--repeticiones', type=int, default=1000)
+    args = parser.parse_args()
+
+    rnd = random.Random(11)
+    setup_test_environment()
+    directorio = tempfile.mkdtemp(prefix='miparqueo_recomendacion_')
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        parqueadero = preparar(args.espacios, args.ocupacion, rnd)
+        pid = parqueadero.id
+        entradas = list(EntradaEdificio.objects.filter(parqueadero=parqueadero).values_list('x', 'y'))
+        ancho = max(EspacioParqueadero.objects.values_list('x', flat=True))
+        fondo = max(EspacioParqueadero.objects.values_list('y', flat=True))
+        puntos = [
+            (*(rnd.choice(entradas) if i % 2 else (rnd.uniform(0, ancho), rnd.uniform(0, fondo))), rnd.choice(TIPOS))
+            for i in range(args.repeticiones)
+        ]
+        libres = EspacioParqueadero.objects.filter(parqueadero=parqueadero, estado='LIBRE').count()
+        print(f"[OK] {args.espacios} espacios ({libres} libres) y {len(entradas)} entradas")
+
+        inicio = time.perf_counter()
+        recomendar(pid, 0.0, 0.0, 'CARRO')
+        print(f"[OK] Sincronización inicial del índice: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+        mediciones = {}
+        mediciones['indice'], del_indice = cronometrar(
+            lambda x, y, tipo: (recomendar(pid, x, y, tipo) or {}).get('id'), puntos
+        )
+        mediciones['fuerza_bruta'], de_fuerza_bruta = cronometrar(
+            lambda x, y, tipo: fuerza_bruta(pid, x, y, tipo), puntos
+        )
+        mediciones['sql'], _ = cronometrar(lambda x, y, tipo: por_sql(pid, x, y, tipo), puntos)
+        distintos = sum(a != b for a, b in zip(del_indice, de_fuerza_bruta))
+
+        # Cada repetición libera u ocupa un espacio (save() cambia la versión de la sede)
+        espacios = list(EspacioParqueadero.objects.filter(parqueadero=parqueadero)[:args.repeticiones])
+        tiempos = []
+        for espacio, (x, y, tipo) in zip(espacios, puntos):
+            espacio.estado = 'OCUPADO' if espacio.estado == 'LIBRE' else 'LIBRE'
+            espacio.save()
+            inicio = time.perf_counter()
+            recomendar(pid, x, y, tipo)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        mediciones['resincronizar'] = tiempos
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print("\n" + "=" * 60)
+    print(f"RECOMENDACIÓN - {args.espacios} espacios, {args.repeticiones} búsquedas")
+    print("=" * 60)
+    print(f"{'':<16}{'p50 ms':>12}{'p95 ms':>12}{'máx ms':>12}")
+    for nombre, tiempos in mediciones.items():
+        print(f"{nombre:<16}{percentil(tiempos, 50):>12.3f}{percentil(tiempos, 95):>12.3f}{max(tiempos):>12.3f}")
+    print("=" * 60)
+    if distintos:
+        print(f"[ERROR] {distintos} recomendaciones del índice difieren de la fuerza bruta")
+    else:
+        print("[OK] El índice coincide con la fuerza bruta en todas las búsquedas")
+    p95 = percentil(mediciones['indice'], 95)
+    marca = '[OK]' if p95 < OBJETIVO_MS else '[AVISO]'
+    print(f"{marca} p95 del índice {p95:.3f} ms (objetivo < {OBJETIVO_MS:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
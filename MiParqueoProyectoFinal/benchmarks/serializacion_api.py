@@ -0,0 +1,164 @@
+"""
+Benchmark de serialización de la API: milisegundos por cada 1000 reservas.
+
+Compara, para la misma respuesta JSON (consulta + conversión + codificación):
+- instancias:  objetos del modelo con select_related y un dict armado a mano
+               (lo que haría un serializer clásico)
+- django:      django.core.serializers 'json' sobre las instancias
+- values:      core.api.RESERVA (values() con JOIN), lo que usa /api/v1/
+- values_3:    core.api.RESERVA con ?campos=fecha,estado,espacio_numero
+
+Corre en proceso sobre una base de datos temporal en archivo (db.sqlite3
+no se toca).
+
+Ejecutar con:
+    python benchmarks/serializacion_api.py
+    python benchmarks/serializacion_api.py --reservas 20000 --repeticiones 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core import serializers  # noqa: E402
+from django.core.serializers.json import DjangoJSONEncoder  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+from core.api import RESERVA  # noqa: E402
+from core.models import EspacioParqueadero, Parqueadero, Reserva  # noqa: E402
+
+
+def preparar(cantidad):
+    usuario = User.objects.create_user('bench_api', password='x')
+    parqueadero = Parqueadero.objects.create(nombre='Sede Benchmark', codigo='benchmark')
+    espacios = EspacioParqueadero.objects.bulk_create(
+        EspacioParqueadero(parqueadero=parqueadero, numero=i + 1, tipo='CARRO', estado='LIBRE')
+        for i in range(100)
+    )
+    hoy = date.today()
+    Reserva.objects.bulk_create(
+        (Reserva(
+            usuario=usuario,
+            parqueadero=parqueadero,
+            espacio=espacios[i % len(espacios)],
+            fecha=hoy - timedelta(days=i % 365),
+            hora_inicio=dtime(7 + i % 10, 0),
+            hora_fin=dtime(8 + i % 10, 0),
+            tipo_vehiculo='CARRO',
+            placa=f'ABC{i % 1000:03d}',
+            estado='COMPLETADA',
+            codigo_qr=f'qr/{i:08d}.png',
+        ) for i in range(cantidad)),
+        batch_size=2000,
+    )
+
+
+def con_instancias(queryset):
+    filas = [{
+        'id': r.id,
+        'fecha': r.fecha,
+        'hora_inicio': r.hora_inicio,
+        'hora_fin': r.hora_fin,
+        'estado': r.estado,
+        'tipo_vehiculo': r.tipo_vehiculo,
+        'placa': r.placa,
+        'hora_entrada': r.hora_entrada,
+        'hora_salida': r.hora_salida,
+        'codigo_qr': r.codigo_qr,
+        'espacio_id': r.espacio_id,
+        'espacio_numero': r.espacio.numero,
+        'espacio_tipo': r.espacio.tipo,
+        'creado_en': r.creado_en,
+        'actualizado_en': r.actualizado_en,
+    } for r in queryset.select_related('espacio')]
+    return json.dumps(filas, cls=DjangoJSONEncoder)
+
+
+def con_django(queryset):
+    return serializers.serialize('json', queryset.select_related('espacio'))
+
+
+def con_values(queryset, campos=None):
+    filas = list(RESERVA.valores(queryset, RESERVA.seleccionar(campos)))
+    return json.dumps(filas, cls=DjangoJSONEncoder)
+
+
+ESTRATEGIAS = {
+    'instancias': con_instancias,
+    'django': con_django,
+    'values': con_values,
+    'values_3': lambda qs: con_values(qs, 'fecha,estado,espacio_numero'),
+}
+
+
+def medir(funcion, cantidad, repeticiones):
+    queryset = Reserva.objects.order_by('-id')[:cantidad]
+    funcion(queryset)  # calentamiento
+    tiempos, consultas, tamano = [], 0, 0
+    for _ in range(repeticiones):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            salida = funcion(Reserva.objects.order_by('-id')[:cantidad])
+            tiempos.append(time.perf_counter() - inicio)
+        consultas = len(capturadas)
+        tamano = len(salida)
+    mejor = min(tiempos)
+    return {
+        'ms_por_1k': mejor * 1000 / (cantidad / 1000),
+        'consultas': consultas,
+        'kb_por_1k': tamano / 1024 / (cantidad / 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Costo de serializar reservas a JSON por cada 1000 filas')
+    parser.add_argument('--reservas', type=int, default=10000, help='Filas serializadas por medición')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    directorio = tempfile.mkdtemp(prefix='miparqueo_api_')
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        preparar(args.reservas)
+        print(f"[OK] Base de datos temporal con {args.reservas} reservas")
+        resultados = {
+            nombre: medir(funcion, args.reservas, args.repeticiones) for nombre, funcion in ESTRATEGIAS.items()
+        }
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    base = resultados['instancias']['ms_por_1k']
+    print("\n" + "=" * 64)
+    print(f"SERIALIZACIÓN API - {args.reservas} reservas, mejor de {args.repeticiones}")
+    print("=" * 64)
+    print(f"{'Estrategia':<12}{'ms/1k filas':>13}{'vs instancias':>15}{'Consultas':>11}{'KB/1k':>10}")
+    for nombre, r in resultados.items():
+        print(
+            f"{nombre:<12}{r['ms_por_1k']:>13.2f}{base / r['ms_por_1k']:>14.2f}x"
+            f"{r['consultas']:>11}{r['kb_por_1k']:>10.1f}"
+        )
+    print("=" * 64)
+
+
+if __name__ == '__main__':
+    main()
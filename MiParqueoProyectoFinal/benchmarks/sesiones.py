@@ -0,0 +1,135 @@
+"""
+Benchmark del motor de sesiones: consultas SQL y latencia por petición autenticada.
+
+Compara el motor original (django.contrib.sessions.backends.db, una lectura
+de django_session por petición) con cached_db y el caché 'sesiones' (el que
+usa settings con MIPARQUEO_CACHE=archivos).
+
+Corre en proceso con el cliente de pruebas de Django sobre una base de
+datos temporal en archivo (db.sqlite3 no se toca), recorriendo las vistas
+que más consultan los vigilantes y los tableros de portería.
+
+Ejecutar con:
+    python benchmarks/sesiones.py
+    python benchmarks/sesiones.py --repeticiones 500 --espacios 200
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+os.environ.setdefault('MIPARQUEO_METRICAS', '0')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import Group, User  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+from core.models import EspacioParqueadero, Parqueadero  # noqa: E402
+
+MOTORES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}
+
+VISTAS = [
+    '/vigilante/ocupacion/',
+    '/vigilante/validar-placa/',
+    '/vigilante/salida/',
+    '/incidencias/registrar/',
+]
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def preparar(espacios):
+    parqueadero = Parqueadero.objects.create(nombre='Sede Benchmark', codigo='benchmark')
+    EspacioParqueadero.objects.bulk_create(
+        EspacioParqueadero(parqueadero=parqueadero, numero=i + 1, tipo='CARRO', estado='LIBRE')
+        for i in range(espacios)
+    )
+    vigilante = User.objects.create_user('bench_vigilante', password='x')
+    vigilante.groups.add(Group.objects.get_or_create(name='VIGILANTE')[0])
+    parqueadero.vigilantes.add(vigilante)
+    return vigilante
+
+
+def medir(motor, usuario, repeticiones):
+    with override_settings(SESSION_ENGINE=motor):
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+        # Un cliente nuevo carga el middleware con el motor de sesiones indicado
+        cliente = Client()
+        cliente.force_login(usuario)
+        for url in VISTAS:
+            cliente.get(url)
+
+        tiempos, consultas, de_sesion = [], 0, 0
+        for i in range(repeticiones):
+            url = VISTAS[i % len(VISTAS)]
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                respuesta = cliente.get(url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            assert respuesta.status_code == 200, f'{url}: {respuesta.status_code}'
+            consultas += len(capturadas)
+            de_sesion += sum('django_session' in q['sql'] for q in capturadas)
+
+    return {
+        'consultas': consultas / repeticiones,
+        'sesion': de_sesion / repeticiones,
+        'p50': percentil(tiempos, 50),
+        'p95': percentil(tiempos, 95),
+        'peticiones_s': repeticiones / (sum(tiempos) / 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultas y latencia por petición según el motor de sesiones')
+    parser.add_argument('--repeticiones', type=int, default=400)
+    parser.add_argument('--espacios', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    directorio = tempfile.mkdtemp(prefix='miparqueo_sesiones_')
+    connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'bench.sqlite3')
+    nombre_original = connection.creation.create_test_db(verbosity=0)
+    try:
+        usuario = preparar(args.espacios)
+        print(f"[OK] Base de datos temporal con {args.espacios} espacios")
+        resultados = {nombre: medir(motor, usuario, args.repeticiones) for nombre, motor in MOTORES.items()}
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print("\n" + "=" * 72)
+    print(f"SESIONES - {args.repeticiones} peticiones autenticadas de vigilante")
+    print("=" * 72)
+    print(f"{'Motor':<12}{'Consultas/pet':>15}{'Sesión/pet':>12}{'p50 ms':>9}{'p95 ms':>9}{'pet/s':>10}")
+    for nombre, r in resultados.items():
+        print(
+            f"{nombre:<12}{r['consultas']:>15.2f}{r['sesion']:>12.2f}"
+            f"{r['p50']:>9.2f}{r['p95']:>9.2f}{r['peticiones_s']:>10.1f}"
+        )
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,24 @@
 from django.contrib import admin
-from .models import EspacioParqueadero, Reserva, Incidencia
+from .models import EntradaEdificio, EspacioParqueadero, Parqueadero, Reserva, ReservaHistorica, SolicitudEspera, Incidencia, PronosticoDemanda
+
+
+class EntradaEdificioInline(admin.TabularInline):
+    """Entradas de edificio de la sede (puntos de referencia de la recomendación)."""
+    model = EntradaEdificio
+    extra = 0
+
+
+@admin.register(Parqueadero)
+class ParqueaderoAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para las sedes y sus vigilantes.
+    """
+    list_display = ('nombre', 'codigo', 'direccion', 'activo')
+    list_filter = ('activo',)
+    search_fields = ('nombre', 'codigo')
+    prepopulated_fields = {'codigo': ('nombre',)}
+    filter_horizontal = ('vigilantes',)
+    inlines = (EntradaEdificioInline,)
 
 
 @admin.register(EspacioParqueadero)
@@ -7,15 +26,18 @@ class EspacioParqueaderoAdmin(admin.ModelAdmin):
     """
     Configuración del panel de administración para los espacios de parqueadero.
     """
-    list_display = ('numero', 'tipo', 'estado')
-    list_filter = ('tipo', 'estado')
+    list_display = ('numero', 'parqueadero', 'tipo', 'zona', 'estado')
+    list_filter = ('parqueadero', 'tipo', 'zona', 'estado')
     search_fields = ('numero',)
-    ordering = ('numero',)
+    ordering = ('parqueadero', 'numero')
     list_editable = ('estado',)
     
     fieldsets = (
         ('Información del Espacio', {
-            'fields': ('numero', 'tipo', 'estado')
+            'fields': ('parqueadero', 'numero', 'tipo', 'estado')
+        }),
+        ('Ubicación', {
+            'fields': ('zona', ('x', 'y'))
         }),
     )
 
@@ -29,6 +51,7 @@ class ReservaAdmin(admin.ModelAdmin):
     list_display = (
         'id', 
         'usuario', 
+        'parqueadero',
         'espacio', 
         'fecha', 
         'hora_inicio', 
@@ -37,14 +60,14 @@ class ReservaAdmin(admin.ModelAdmin):
         'tipo_vehiculo',
         'estado'
     )
-    list_filter = ('estado', 'fecha', 'tipo_vehiculo')
+    list_filter = ('parqueadero', 'estado', 'fecha', 'tipo_vehiculo')
     search_fields = ('usuario__username', 'placa', 'espacio__numero')
     ordering = ('-fecha', '-hora_inicio')
     date_hierarchy = 'fecha'
     
     fieldsets = (
         ('Información de la Reserva', {
-            'fields': ('usuario', 'espacio', 'fecha')
+            'fields': ('usuario', 'espacio', 'parqueadero', 'fecha')
         }),
         ('Horario', {
             'fields': ('hora_inicio', 'hora_fin')
@@ -55,13 +78,52 @@ class ReservaAdmin(admin.ModelAdmin):
         ('Estado y Control', {
             'fields': ('estado', 'hora_entrada', 'hora_salida')
         }),
+        ('Notificaciones', {
+            'fields': ('confirmacion_enviada_en', 'recordatorio_enviado_en'),
+            'classes': ('collapse',)
+        }),
         ('Auditoría', {
             'fields': ('creado_en', 'actualizado_en'),
             'classes': ('collapse',)
         }),
     )
     
-    readonly_fields = ('creado_en', 'actualizado_en')
+    readonly_fields = (
+        'parqueadero', 'confirmacion_enviada_en', 'recordatorio_enviado_en', 'creado_en', 'actualizado_en'
+    )
+
+
+@admin.register(ReservaHistorica)
+class ReservaHistoricaAdmin(admin.ModelAdmin):
+    """
+    Consulta de las reservas archivadas por el comando archivar_reservas.
+    """
+    list_display = ('id', 'usuario', 'parqueadero', 'espacio', 'fecha', 'placa', 'estado', 'archivado_en')
+    list_filter = ('parqueadero', 'estado', 'tipo_vehiculo')
+    search_fields = ('usuario__username', 'placa')
+    ordering = ('-fecha', '-hora_inicio')
+    date_hierarchy = 'fecha'
+    list_select_related = ('usuario', 'parqueadero', 'espacio')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SolicitudEspera)
+class SolicitudEsperaAdmin(admin.ModelAdmin):
+    """
+    Lista de espera: las solicitudes se asignan solas al liberarse un espacio.
+    """
+    list_display = ('id', 'usuario', 'parqueadero', 'tipo_espacio', 'fecha', 'hora_inicio', 'hora_fin', 'estado', 'reserva')
+    list_filter = ('parqueadero', 'estado', 'tipo_espacio')
+    search_fields = ('usuario__username', 'placa')
+    ordering = ('fecha', 'hora_inicio', 'id')
+    date_hierarchy = 'fecha'
+    list_select_related = ('usuario', 'parqueadero', 'reserva')
+    readonly_fields = ('reserva', 'creado_en', 'asignada_en')
 
 
 @admin.register(Incidencia)
@@ -69,15 +131,15 @@ class IncidenciaAdmin(admin.ModelAdmin):
     """
     Configuración del panel de administración para las incidencias.
     """
-    list_display = ('id', 'tipo', 'espacio', 'reportado_por', 'fecha_hora')
-    list_filter = ('tipo', 'fecha_hora')
+    list_display = ('id', 'tipo', 'parqueadero', 'espacio', 'reportado_por', 'fecha_hora')
+    list_filter = ('parqueadero', 'tipo', 'fecha_hora')
     search_fields = ('descripcion', 'reportado_por__username')
     ordering = ('-fecha_hora',)
     date_hierarchy = 'fecha_hora'
     
     fieldsets = (
         ('Información de la Incidencia', {
-            'fields': ('tipo', 'espacio', 'descripcion')
+            'fields': ('tipo', 'parqueadero', 'espacio', 'descripcion')
         }),
         ('Reporte', {
             'fields': ('reportado_por', 'fecha_hora')
@@ -85,3 +147,14 @@ class IncidenciaAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ('fecha_hora',)
+
+
+@admin.register(PronosticoDemanda)
+class PronosticoDemandaAdmin(admin.ModelAdmin):
+    """
+    Consulta del pronóstico de demanda generado por el comando actualizar_pronostico.
+    """
+    list_display = ('fecha', 'hora', 'tipo', 'demanda', 'generado_en')
+    list_filter = ('tipo', 'fecha')
+    ordering = ('fecha', 'hora', 'tipo')
+    readonly_fields = ('tipo', 'fecha', 'hora', 'demanda', 'generado_en')
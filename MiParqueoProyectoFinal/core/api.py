@@ -0,0 +1,517 @@
+"""
+API JSON v1 (/api/v1/) sobre reservas, espacios e incidencias, para la app móvil.
+
+- Serialización con values(): cada respuesta es una lista de dicts salida de
+  un único SELECT, sin instanciar modelos. Los campos de relaciones
+  (espacio_numero, reportado_por_username, ...) se resuelven con JOIN en el
+  mismo SELECT, que es lo que haría select_related.
+- ?campos=id,fecha,espacio_numero limita las columnas consultadas ('id'
+  siempre se incluye).
+- Paginación por cursor sobre id descendente (?cursor=...&limite=N): el costo
+  de una página no depende de cuántas hay antes. La respuesta trae
+  'siguiente' (o null en la última página).
+- Las reservas archivadas (ReservaHistorica, mismo id y campos) aparecen en
+  los listados y el detalle como las demás.
+- Autenticación por sesión, la misma del login web. Las escrituras exigen
+  la cabecera X-CSRFToken con el valor de la cookie csrftoken.
+- Las escrituras de reservas tienen límite de frecuencia por usuario e IP:
+  al superarlo responden 429 con Retry-After (core/limites.py).
+- POST /reservas/ acepta la cabecera Idempotency-Key: un reintento con la
+  misma clave y el mismo cuerpo recibe la respuesta original
+  (core/idempotencia.py).
+- Espacios e incidencias son de una sede: ?parqueadero_id= (una de
+  /api/v1/parqueaderos/) o, si no se indica, la elegida en la sesión.
+
+Las reglas de negocio de reservas están en core/servicios.py.
+"""
+import base64
+import binascii
+import json
+from datetime import date, time
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.http import Http404, JsonResponse
+
+from .archivo import ESTADOS_ARCHIVABLES
+from .idempotencia import idempotente
+from .limites import limitar_reservas
+from .models import EspacioParqueadero, Incidencia, Reserva, ReservaHistorica
+from .parqueaderos import entrada_de, parqueadero_actual, parqueaderos_permitidos
+from .recomendacion import recomendar
+from .roles import es_vigilante as usuario_es_vigilante
+from .servicios import (
+    ErrorReserva, cancelar_reserva, cancelar_reservas_lote, crear_reserva,
+    crear_reservas_lote, modificar_reserva,
+)
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+LOTE_MAXIMO = 100
+
+
+class ErrorApi(Exception):
+    """Error con código HTTP, se responde como {"error": mensaje}."""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class Serializador:
+    """
+    Campos expuestos de un modelo: nombre en la API → ruta para values().
+    Las rutas con '__' atraviesan relaciones con JOIN.
+    """
+
+    def __init__(self, campos, por_defecto=None):
+        self.campos = campos
+        self.por_defecto = por_defecto or list(campos)
+
+    def seleccionar(self, parametro):
+        """
+        Campos pedidos en ?campos= (o los por defecto), con 'id' siempre incluido.
+
+        Raises:
+            ErrorApi: Si se pide un campo que no existe
+        """
+        if not parametro:
+            return self.por_defecto
+        nombres = list(dict.fromkeys(c.strip() for c in parametro.split(',') if c.strip()))
+        desconocidos = [nombre for nombre in nombres if nombre not in self.campos]
+        if desconocidos:
+            raise ErrorApi(400, f"Campos desconocidos: {', '.join(desconocidos)}")
+        return nombres if 'id' in nombres else ['id'] + nombres
+
+    def valores(self, queryset, nombres):
+        """QuerySet de dicts con exactamente los campos pedidos."""
+        directos = [nombre for nombre in nombres if self.campos[nombre] == nombre]
+        relacionados = {nombre: F(self.campos[nombre]) for nombre in nombres if self.campos[nombre] != nombre}
+        return queryset.values(*directos, **relacionados)
+
+
+ESPACIO = Serializador({
+    'id': 'id',
+    'parqueadero_id': 'parqueadero_id',
+    'numero': 'numero',
+    'tipo': 'tipo',
+    'estado': 'estado',
+    'zona': 'zona',
+    'x': 'x',
+    'y': 'y',
+})
+
+RESERVA = Serializador({
+    'id': 'id',
+    'fecha': 'fecha',
+    'hora_inicio': 'hora_inicio',
+    'hora_fin': 'hora_fin',
+    'estado': 'estado',
+    'tipo_vehiculo': 'tipo_vehiculo',
+    'placa': 'placa',
+    'hora_entrada': 'hora_entrada',
+    'hora_salida': 'hora_salida',
+    'codigo_qr': 'codigo_qr',
+    'parqueadero_id': 'parqueadero_id',
+    'espacio_id': 'espacio_id',
+    'espacio_numero': 'espacio__numero',
+    'espacio_tipo': 'espacio__tipo',
+    'creado_en': 'creado_en',
+    'actualizado_en': 'actualizado_en',
+})
+
+INCIDENCIA = Serializador({
+    'id': 'id',
+    'tipo': 'tipo',
+    'descripcion': 'descripcion',
+    'fecha_hora': 'fecha_hora',
+    'parqueadero_id': 'parqueadero_id',
+    'espacio_id': 'espacio_id',
+    'espacio_numero': 'espacio__numero',
+    'reportado_por_id': 'reportado_por_id',
+    'reportado_por_username': 'reportado_por__username',
+})
+
+
+# ============================================================
+# INFRAESTRUCTURA
+# ============================================================
+
+def _error(estado, mensaje):
+    return JsonResponse({'error': mensaje}, status=estado)
+
+
+def vista_api(*metodos, solo_vigilantes=False):
+    """
+    Decorador de las vistas de la API: responde 401/403/405 en JSON (en vez
+    de redirigir al login) y convierte ErrorApi y ErrorReserva en respuestas.
+    Las reglas de disponibilidad y conflicto de horario responden 409.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return _error(401, 'Autenticación requerida.')
+            if solo_vigilantes and not (usuario_es_vigilante(request.user) or request.user.is_superuser):
+                return _error(403, 'Solo vigilantes y administradores.')
+            if request.method not in metodos:
+                respuesta = _error(405, f'Método {request.method} no permitido.')
+                respuesta['Allow'] = ', '.join(metodos)
+                return respuesta
+            try:
+                return vista(request, *args, **kwargs)
+            except ErrorApi as e:
+                return _error(e.estado, str(e))
+            except ErrorReserva as e:
+                return _error(409 if e.motivo else 400, str(e))
+        return envoltura
+    return decorador
+
+
+def _leer_json(request):
+    try:
+        datos = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        raise ErrorApi(400, 'El cuerpo debe ser JSON válido.')
+    if not isinstance(datos, dict):
+        raise ErrorApi(400, 'El cuerpo debe ser un objeto JSON.')
+    return datos
+
+
+def _codificar_cursor(ultimo_id):
+    return base64.urlsafe_b64encode(str(ultimo_id).encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, binascii.Error):
+        raise ErrorApi(400, 'Cursor inválido.')
+
+
+def _entero(valor, nombre):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErrorApi(400, f'{nombre} debe ser un número entero.')
+
+
+def listar(request, queryset, serializador, archivo=None):
+    """
+    Página de resultados por cursor (keyset sobre id descendente).
+
+    Args:
+        archivo: QuerySet de la tabla fría con los mismos filtros; sus filas
+                 se mezclan por id con las de queryset
+
+    Returns:
+        JsonResponse: {"resultados": [...], "siguiente": cursor o null}
+    """
+    nombres = serializador.seleccionar(request.GET.get('campos'))
+    limite = max(1, min(_entero(request.GET.get('limite', LIMITE_POR_DEFECTO), 'limite'), LIMITE_MAXIMO))
+    cursor = _decodificar_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+
+    def pagina(queryset):
+        queryset = queryset.order_by('-id')
+        if cursor is not None:
+            queryset = queryset.filter(id__lt=cursor)
+        # Una fila extra indica si hay página siguiente sin un COUNT
+        return list(serializador.valores(queryset, nombres)[:limite + 1])
+
+    filas = pagina(queryset)
+    if archivo is not None:
+        if len(filas) > limite:
+            # Solo pueden entrar en esta página las archivadas con id mayor que la fila extra
+            archivo = archivo.filter(id__gt=filas[limite]['id'])
+        filas = sorted(filas + pagina(archivo), key=lambda fila: fila['id'], reverse=True)
+
+    siguiente = _codificar_cursor(filas[limite - 1]['id']) if len(filas) > limite else None
+    return JsonResponse({'resultados': filas[:limite], 'siguiente': siguiente})
+
+
+def detalle(request, queryset, serializador, estado=200):
+    fila = serializador.valores(queryset, serializador.seleccionar(request.GET.get('campos'))).first()
+    if fila is None:
+        raise ErrorApi(404, 'No encontrado.')
+    return JsonResponse(fila, status=estado)
+
+
+def _filtrar(queryset, request, campos):
+    """Filtros exactos ?campo=valor para los campos permitidos."""
+    filtros = {campo: request.GET[campo] for campo in campos if request.GET.get(campo)}
+    try:
+        return queryset.filter(**filtros)
+    except (ValidationError, ValueError):
+        raise ErrorApi(400, f"Filtro inválido: {', '.join(filtros)}")
+
+
+def _parqueadero(request):
+    """
+    Sede de ?parqueadero_id= (entre las que el usuario puede usar) o, sin
+    el parámetro, la elegida en la sesión.
+    """
+    valor = request.GET.get('parqueadero_id')
+    if not valor:
+        try:
+            return parqueadero_actual(request)
+        except Http404:
+            raise ErrorApi(404, 'No hay parqueaderos activos.')
+    parqueadero_id = _entero(valor, 'parqueadero_id')
+    for parqueadero in parqueaderos_permitidos(request.user):
+        if parqueadero.id == parqueadero_id:
+            return parqueadero
+    raise ErrorApi(404, 'El parqueadero no existe o no tiene acceso a él.')
+
+
+def _datos_reserva(datos, con_espacio=True):
+    """
+    Convierte y valida el JSON de una reserva.
+
+    Returns:
+        dict: espacio_id, fecha, hora_inicio, hora_fin, tipo_vehiculo y placa
+    """
+    try:
+        convertidos = {
+            'fecha': date.fromisoformat(datos['fecha']),
+            'hora_inicio': time.fromisoformat(datos['hora_inicio']),
+            'hora_fin': time.fromisoformat(datos['hora_fin']),
+        }
+    except KeyError as e:
+        raise ErrorApi(400, f'Falta el campo {e.args[0]}.')
+    except (TypeError, ValueError):
+        raise ErrorApi(400, 'Formato de fecha (AAAA-MM-DD) u hora (HH:MM) inválido.')
+    if not con_espacio:
+        return convertidos
+
+    tipo_vehiculo = datos.get('tipo_vehiculo')
+    if tipo_vehiculo not in dict(Reserva.TIPO_VEHICULO_CHOICES):
+        raise ErrorApi(400, 'tipo_vehiculo debe ser CARRO o MOTO.')
+    placa = str(datos.get('placa') or '').strip().upper()
+    if not placa or len(placa) > Reserva._meta.get_field('placa').max_length:
+        raise ErrorApi(400, 'Placa inválida.')
+    convertidos.update(
+        espacio_id=_entero(datos.get('espacio_id'), 'espacio_id'),
+        tipo_vehiculo=tipo_vehiculo,
+        placa=placa,
+    )
+    return convertidos
+
+
+def _lista_lote(datos, clave):
+    elementos = datos.get(clave)
+    if not isinstance(elementos, list) or not elementos:
+        raise ErrorApi(400, f'{clave} debe ser una lista no vacía.')
+    if len(elementos) > LOTE_MAXIMO:
+        raise ErrorApi(400, f'Máximo {LOTE_MAXIMO} elementos por lote.')
+    return elementos
+
+
+# ============================================================
+# PARQUEADEROS Y ESPACIOS
+# ============================================================
+
+@vista_api('GET')
+def parqueaderos(request):
+    """Sedes en las que el usuario puede trabajar (sin consultas: lista cacheada)."""
+    permitidos = parqueaderos_permitidos(request.user)
+    actual_id = parqueadero_actual(request).id if permitidos else None
+    return JsonResponse({'resultados': [
+        {
+            'id': parqueadero.id,
+            'nombre': parqueadero.nombre,
+            'codigo': parqueadero.codigo,
+            'direccion': parqueadero.direccion,
+            'entradas': parqueadero.lista_entradas,
+            'actual': parqueadero.id == actual_id,
+        }
+        for parqueadero in permitidos
+    ]})
+
+
+@vista_api('GET')
+def espacios(request):
+    """Espacios de una sede. Filtros: ?parqueadero_id=&estado=LIBRE&tipo=CARRO"""
+    queryset = EspacioParqueadero.objects.filter(parqueadero=_parqueadero(request))
+    return listar(request, _filtrar(queryset, request, ('estado', 'tipo')), ESPACIO)
+
+
+@vista_api('GET')
+def espacio_recomendado(request):
+    """
+    Espacio libre más cercano a una entrada de edificio de la sede (índice
+    espacial en memoria, sin consultas si el estado no cambió).
+    Parámetros: ?entrada_id= (obligatorio), ?tipo=CARRO|MOTO|DISCAPACIDAD
+    (por defecto CARRO) y ?parqueadero_id=.
+    """
+    parqueadero = _parqueadero(request)
+    entrada = entrada_de(parqueadero, _entero(request.GET.get('entrada_id'), 'entrada_id'))
+    if entrada is None:
+        raise ErrorApi(404, 'La entrada no existe en este parqueadero.')
+    tipo = request.GET.get('tipo', 'CARRO')
+    if tipo not in dict(EspacioParqueadero.TIPO_CHOICES):
+        raise ErrorApi(400, 'tipo debe ser CARRO, MOTO o DISCAPACIDAD.')
+    espacio = recomendar(parqueadero.id, entrada['x'], entrada['y'], tipo)
+    if espacio is None:
+        raise ErrorApi(404, 'No hay espacios libres de ese tipo.')
+    return JsonResponse(dict(espacio, parqueadero_id=parqueadero.id, entrada_id=entrada['id']))
+
+
+@vista_api('GET')
+def espacio_detalle(request, espacio_id):
+    """Un espacio de una de las sedes del usuario (404 si es de otra)."""
+    queryset = EspacioParqueadero.objects.filter(
+        id=espacio_id, parqueadero__in=parqueaderos_permitidos(request.user)
+    )
+    return detalle(request, queryset, ESPACIO)
+
+
+# ============================================================
+# RESERVAS (siempre del usuario autenticado)
+# ============================================================
+
+@idempotente('POST', api=True)
+@limitar_reservas('POST', api=True)
+@vista_api('GET', 'POST')
+def reservas(request):
+    """
+    GET: reservas del usuario (filtros ?estado= y ?fecha=AAAA-MM-DD).
+    POST: crea una reserva (HU 008). Responde 201 con la reserva.
+    """
+    propias = Reserva.objects.filter(usuario=request.user)
+    if request.method == 'GET':
+        filtros = ('estado', 'fecha', 'parqueadero_id')
+        archivadas = None
+        # Las reservas activas (?estado=RESERVADA) nunca se archivan
+        if request.GET.get('estado', ESTADOS_ARCHIVABLES[0]) in ESTADOS_ARCHIVABLES:
+            archivadas = _filtrar(ReservaHistorica.objects.filter(usuario=request.user), request, filtros)
+        return listar(request, _filtrar(propias, request, filtros), RESERVA, archivo=archivadas)
+
+    datos = _datos_reserva(_leer_json(request))
+    # Igual que espacio_detalle: un espacio de otra sede (o de una inactiva) no existe
+    espacio = EspacioParqueadero.objects.filter(
+        id=datos.pop('espacio_id'), parqueadero__in=parqueaderos_permitidos(request.user)
+    ).first()
+    if espacio is None:
+        raise ErrorApi(404, 'El espacio no existe.')
+    reserva = crear_reserva(request.user, espacio, **datos)
+    return detalle(request, propias.filter(id=reserva.id), RESERVA, estado=201)
+
+
+@limitar_reservas('PATCH', api=True)
+@vista_api('GET', 'PATCH')
+def reserva_detalle(request, reserva_id):
+    """
+    GET: una reserva del usuario (también si está archivada).
+    PATCH: cambia fecha, hora_inicio y hora_fin (mismas reglas que la web).
+    """
+    propia = Reserva.objects.filter(usuario=request.user, id=reserva_id)
+    if request.method == 'PATCH':
+        reserva = propia.first()
+        if reserva is None:
+            raise ErrorApi(404, 'No encontrado.')
+        modificar_reserva(reserva, **_datos_reserva(_leer_json(request), con_espacio=False))
+        return detalle(request, propia, RESERVA)
+    try:
+        return detalle(request, propia, RESERVA)
+    except ErrorApi:
+        # Solo se consulta el archivo si no está en la tabla caliente
+        return detalle(request, ReservaHistorica.objects.filter(usuario=request.user, id=reserva_id), RESERVA)
+
+
+@limitar_reservas('POST', api=True)
+@vista_api('POST')
+def reserva_cancelar(request, reserva_id):
+    """HU 010 – Cancela una reserva activa del usuario."""
+    propia = Reserva.objects.filter(usuario=request.user, id=reserva_id)
+    reserva = propia.select_related('espacio').first()
+    if reserva is None:
+        raise ErrorApi(404, 'No encontrado.')
+    cancelar_reserva(reserva)
+    return detalle(request, propia, RESERVA)
+
+
+@limitar_reservas('POST', api=True)
+@vista_api('POST')
+def reservas_lote(request):
+    """
+    Crea varias reservas: {"reservas": [{espacio_id, fecha, ...}, ...]}.
+    Cada una se valida por separado; responde 207 si alguna falló.
+
+    Returns:
+        {"resultados": [{"id": ...} | {"error": ...}, ...]} en el orden recibido
+    """
+    solicitudes = [_datos_reserva(elemento) for elemento in _lista_lote(_leer_json(request), 'reservas')]
+    creadas = crear_reservas_lote(request.user, solicitudes)
+
+    resultados = [
+        {'error': str(r)} if isinstance(r, ErrorReserva) else {'id': r.id, 'codigo_qr': r.codigo_qr}
+        for r in creadas
+    ]
+    errores = sum('error' in r for r in resultados)
+    return JsonResponse({'resultados': resultados}, status=207 if errores else 201)
+
+
+@limitar_reservas('POST', api=True)
+@vista_api('POST')
+def reservas_lote_cancelar(request):
+    """
+    Cancela varias reservas del usuario: {"ids": [1, 2, 3]}.
+    Responde 207 si alguna no se pudo cancelar.
+    """
+    ids = [_entero(i, 'ids') for i in _lista_lote(_leer_json(request), 'ids')]
+    canceladas = cancelar_reservas_lote(request.user, ids)
+
+    resultados = [
+        {'id': reserva_id, 'error': str(error)} if error else {'id': reserva_id}
+        for reserva_id, error in canceladas.items()
+    ]
+    errores = sum('error' in r for r in resultados)
+    return JsonResponse({'resultados': resultados}, status=207 if errores else 200)
+
+
+# ============================================================
+# INCIDENCIAS (vigilantes y administradores)
+# ============================================================
+
+@vista_api('GET', 'POST', solo_vigilantes=True)
+def incidencias(request):
+    """
+    GET: incidencias de una sede (filtros ?parqueadero_id=, ?tipo= y ?espacio_id=).
+    POST: registra una incidencia {tipo, descripcion, espacio_id opcional}
+    en la sede de ?parqueadero_id= o la de la sesión.
+    """
+    parqueadero = _parqueadero(request)
+    if request.method == 'GET':
+        queryset = Incidencia.objects.filter(parqueadero=parqueadero)
+        return listar(request, _filtrar(queryset, request, ('tipo', 'espacio_id')), INCIDENCIA)
+
+    datos = _leer_json(request)
+    if datos.get('tipo') not in dict(Incidencia.TIPO_CHOICES):
+        raise ErrorApi(400, 'Tipo de incidencia inválido.')
+    descripcion = str(datos.get('descripcion') or '').strip()
+    if not descripcion:
+        raise ErrorApi(400, 'Debe proporcionar una descripción.')
+    espacio_id = datos.get('espacio_id')
+    if espacio_id is not None:
+        espacio_id = _entero(espacio_id, 'espacio_id')
+        if not EspacioParqueadero.objects.filter(id=espacio_id, parqueadero=parqueadero).exists():
+            raise ErrorApi(404, 'El espacio no existe en este parqueadero.')
+
+    incidencia = Incidencia.objects.create(
+        parqueadero=parqueadero,
+        tipo=datos['tipo'],
+        espacio_id=espacio_id,
+        descripcion=descripcion,
+        reportado_por=request.user
+    )
+    return detalle(request, Incidencia.objects.filter(id=incidencia.id), INCIDENCIA, estado=201)
+
+
+@vista_api('GET', solo_vigilantes=True)
+def incidencia_detalle(request, incidencia_id):
+    """Una incidencia de una de las sedes del usuario (404 si es de otra)."""
+    queryset = Incidencia.objects.filter(
+        id=incidencia_id, parqueadero__in=parqueaderos_permitidos(request.user)
+    )
+    return detalle(request, queryset, INCIDENCIA)
@@ -0,0 +1,152 @@
+"""
+Archivo de reservas: tabla caliente (Reserva) y tabla fría (ReservaHistorica).
+
+Las consultas del día a día (validación de placa, salida, reservas activas,
+conflictos de horario) filtran Reserva; con el paso de los semestres la
+tabla quedaría dominada por reservas terminadas que ninguna de ellas
+necesita. archivar_reservas mueve las terminadas anteriores al horizonte
+(settings.MIPARQUEO_ARCHIVO_DIAS) a ReservaHistorica:
+
+- Por lotes ordenados por id, cada uno copiado y borrado en su propia
+  transacción: se puede interrumpir y volver a ejecutar sin perder ni
+  duplicar filas, y no bloquea la base de datos durante todo el proceso.
+- Conserva el id: los enlaces y cursores de la API siguen siendo válidos.
+
+Las lecturas del histórico completo (historial del cliente, API, pronóstico)
+usan las funciones de este módulo y combinan las dos tablas.
+"""
+import heapq
+import time
+from datetime import timedelta
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .limites import olvidar_activas
+from .models import Reserva, ReservaHistorica
+
+ESTADOS_ARCHIVABLES = ('COMPLETADA', 'CANCELADA', 'VENCIDA')
+LOTE_ARCHIVO = 5000
+ORDEN_HISTORIAL = ('-fecha', '-hora_inicio')
+
+
+def fecha_corte(dias=None):
+    """Primera fecha que se mantiene en la tabla caliente."""
+    if dias is None:
+        dias = settings.MIPARQUEO_ARCHIVO_DIAS
+    return timezone.localdate() - timedelta(days=dias)
+
+
+def _columnas():
+    """Columnas comunes a las dos tablas (attname: usuario_id, espacio_id, ...)."""
+    return [campo.attname for campo in ReservaHistorica._meta.concrete_fields if campo.name != 'archivado_en']
+
+
+def archivar_reservas(dias=None, lote=LOTE_ARCHIVO, maximo_lotes=None, progreso=None):
+    """
+    Mueve a ReservaHistorica las reservas terminadas con fecha anterior al corte.
+
+    Args:
+        dias: Horizonte en días (por defecto settings.MIPARQUEO_ARCHIVO_DIAS)
+        lote: Reservas por transacción
+        maximo_lotes: Detenerse tras este número de lotes (None = hasta terminar)
+        progreso: Función opcional llamada con el total archivado tras cada lote
+
+    Returns:
+        dict: corte, archivadas, lotes, pendientes (True si quedó por archivar)
+              y segundos
+    """
+    inicio = time.perf_counter()
+    corte = fecha_corte(dias)
+    columnas = _columnas()
+    candidatas = Reserva.objects.filter(fecha__lt=corte, estado__in=ESTADOS_ARCHIVABLES).order_by('id')
+
+    archivadas = lotes = ultimo_id = 0
+    pendientes = False
+    while True:
+        if maximo_lotes is not None and lotes >= maximo_lotes:
+            pendientes = candidatas.filter(id__gt=ultimo_id).exists()
+            break
+        with transaction.atomic():
+            # Keyset sobre id: cada lote empieza donde terminó el anterior
+            filas = list(candidatas.filter(id__gt=ultimo_id).values(*columnas)[:lote])
+            if not filas:
+                break
+            ids = [fila['id'] for fila in filas]
+            # ignore_conflicts: una fila ya copiada por otra ejecución no aborta el lote
+            ReservaHistorica.objects.bulk_create(
+                [ReservaHistorica(**fila) for fila in filas], ignore_conflicts=True
+            )
+            Reserva.objects.filter(id__in=ids).delete()
+            # Un solo delete_many por lote (reserva_eliminada ignora las terminadas)
+            olvidar_activas(*{fila['usuario_id'] for fila in filas})
+        ultimo_id = ids[-1]
+        archivadas += len(ids)
+        lotes += 1
+        if progreso:
+            progreso(archivadas)
+
+    return {
+        'corte': corte,
+        'archivadas': archivadas,
+        'lotes': lotes,
+        'pendientes': pendientes,
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+# ============================================================
+# LECTURA DE LAS DOS TABLAS
+# ============================================================
+
+_clave_historial = attrgetter('fecha', 'hora_inicio')
+
+
+def _historial(usuario):
+    return [
+        modelo.objects.filter(usuario=usuario).select_related('espacio').order_by(*ORDEN_HISTORIAL)
+        for modelo in (Reserva, ReservaHistorica)
+    ]
+
+
+def historial_usuario(usuario):
+    """
+    Reservas del usuario en las dos tablas, de la más reciente a la más
+    antigua (cada consulta ya viene ordenada; se mezclan sin reordenar).
+
+    Returns:
+        list: Instancias de Reserva y ReservaHistorica (mismos atributos)
+    """
+    activas, archivadas = _historial(usuario)
+    return list(heapq.merge(activas, archivadas, key=_clave_historial, reverse=True))
+
+
+async def ahistorial_usuario(usuario):
+    """Versión asíncrona de historial_usuario."""
+    activas, archivadas = _historial(usuario)
+    return list(heapq.merge(
+        [reserva async for reserva in activas],
+        [reserva async for reserva in archivadas],
+        key=_clave_historial,
+        reverse=True,
+    ))
+
+
+def primera_fecha():
+    """Fecha de la reserva más antigua en cualquiera de las dos tablas (None si no hay)."""
+    fechas = [
+        modelo.objects.aggregate(primera=Min('fecha'))['primera']
+        for modelo in (Reserva, ReservaHistorica)
+    ]
+    return min((fecha for fecha in fechas if fecha), default=None)
+
+
+def reservas_entre(desde, hasta):
+    """Reservas de las dos tablas con fecha entre desde y hasta (inclusive), sin orden."""
+    return [
+        modelo.objects.filter(fecha__gte=desde, fecha__lte=hasta).order_by()
+        for modelo in (Reserva, ReservaHistorica)
+    ]
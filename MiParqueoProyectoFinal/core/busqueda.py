@@ -0,0 +1,137 @@
+"""
+Búsqueda de texto completo sobre las descripciones de las incidencias.
+En SQLite usa una tabla virtual FTS5 (core_incidencia_fts) que los triggers
+de la migración 0003 mantienen sincronizada con core_incidencia. En otros
+motores, o si SQLite no trae FTS5, se recurre a un filtro icontains.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Incidencia
+
+TABLA_FTS = 'core_incidencia_fts'
+
+# Marcadores temporales para el resaltado: se escapa el texto del usuario
+# y después se reemplazan por etiquetas <mark>
+_INICIO_MARCA = '\x02'
+_FIN_MARCA = '\x03'
+
+
+def fts_disponible():
+    """Indica si la tabla FTS5 de incidencias existe en la base de datos actual."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [TABLA_FTS],
+        )
+        return cursor.fetchone() is not None
+
+
+def construir_consulta_fts(texto):
+    """
+    Convierte el texto libre del vigilante en una consulta FTS5 segura.
+    Cada palabra se cita como frase (así los caracteres especiales de FTS5
+    no producen errores de sintaxis) y la última admite prefijo, de modo que
+    "placa ABC1" encuentra "placa ABC123".
+
+    Returns:
+        str: Consulta MATCH, o cadena vacía si el texto no tiene palabras
+    """
+    palabras = re.findall(r'\w+', texto or '')
+    if not palabras:
+        return ''
+    terminos = [f'"{palabra}"' for palabra in palabras]
+    terminos[-1] += '*'
+    return ' '.join(terminos)
+
+
+def _resaltar(fragmento):
+    """Escapa el fragmento devuelto por snippet() y aplica el resaltado."""
+    html = escape(fragmento)
+    html = html.replace(_INICIO_MARCA, '<mark>').replace(_FIN_MARCA, '</mark>')
+    return mark_safe(html)
+
+
+def buscar_incidencias(texto, tipo=None, limite=50, parqueadero_id=None):
+    """
+    Busca incidencias por su descripción, ordenadas por relevancia (bm25).
+
+    Args:
+        texto: Texto libre a buscar (ej: "rayón", "placa ABC123")
+        tipo: Filtra además por tipo de incidencia (opcional)
+        parqueadero_id: Solo incidencias de esa sede (opcional)
+        limite: Número máximo de resultados
+
+    Returns:
+        list: Instancias de Incidencia con el atributo extra `fragmento`
+              (HTML seguro con las coincidencias resaltadas)
+    """
+    consulta = construir_consulta_fts(texto)
+    if not consulta:
+        return []
+
+    if not fts_disponible():
+        return _buscar_sin_fts(texto, tipo, limite, parqueadero_id)
+
+    sql = (
+        f"SELECT i.id, snippet({TABLA_FTS}, 0, %s, %s, '…', 16) "
+        f"FROM {TABLA_FTS} f JOIN core_incidencia i ON i.id = f.rowid "
+        f"WHERE {TABLA_FTS} MATCH %s"
+    )
+    params = [_INICIO_MARCA, _FIN_MARCA, consulta]
+    if tipo:
+        sql += " AND i.tipo = %s"
+        params.append(tipo)
+    if parqueadero_id:
+        sql += " AND i.parqueadero_id = %s"
+        params.append(parqueadero_id)
+    sql += f" ORDER BY bm25({TABLA_FTS}) LIMIT %s"
+    params.append(limite)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+
+    por_id = Incidencia.objects.select_related('espacio', 'reportado_por').in_bulk(
+        [fila[0] for fila in filas]
+    )
+    resultados = []
+    for incidencia_id, fragmento in filas:
+        incidencia = por_id.get(incidencia_id)
+        if incidencia is not None:
+            incidencia.fragmento = _resaltar(fragmento)
+            resultados.append(incidencia)
+    return resultados
+
+
+def _buscar_sin_fts(texto, tipo, limite, parqueadero_id):
+    """Alternativa sin FTS5: escaneo con icontains, sin ranking."""
+    incidencias = Incidencia.objects.select_related('espacio', 'reportado_por')
+    for palabra in re.findall(r'\w+', texto):
+        incidencias = incidencias.filter(descripcion__icontains=palabra)
+    if tipo:
+        incidencias = incidencias.filter(tipo=tipo)
+    if parqueadero_id:
+        incidencias = incidencias.filter(parqueadero_id=parqueadero_id)
+    resultados = list(incidencias.order_by('-fecha_hora')[:limite])
+    for incidencia in resultados:
+        incidencia.fragmento = escape(incidencia.descripcion)
+    return resultados
+
+
+def reconstruir_indice():
+    """
+    Reconstruye el índice FTS5 a partir de core_incidencia.
+
+    Returns:
+        int: Número de incidencias indexadas
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('optimize')")
+    return Incidencia.objects.count()
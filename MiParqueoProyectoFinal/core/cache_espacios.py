@@ -0,0 +1,177 @@
+"""
+Caché de las grillas de espacios (disponibilidad del cliente y ocupación del vigilante).
+
+Todo lo cacheado lleva en la clave el parqueadero (sede) y una versión del
+estado de sus espacios. Cualquier post_save/post_delete de EspacioParqueadero
+cambia la versión de su sede (core/signals.py; los update() masivos llaman a
+invalidar_espacios_tras_escritura), así que una lectura nunca ve datos
+viejos: las entradas anteriores simplemente dejan de consultarse y expiran
+solas. Un cambio en una sede no invalida lo cacheado de las demás.
+
+La versión es un número nuevo en cada cambio (time.time_ns()), no un
+contador: si la clave se pierde por desalojo del caché o dos procesos la
+cambian a la vez, nunca se reutiliza una versión ya cacheada.
+
+Dentro de una transacción que modificó espacios, las lecturas usan una
+versión propia de esa transacción: lo que cacheen (estado aún sin
+confirmar) no lo ve nadie más, y si la transacción se revierte esa versión
+se descarta junto con su invalidación pendiente.
+
+Con varios procesos el caché debe ser compartido (MIPARQUEO_CACHE=archivos):
+el caché en memoria local solo invalida dentro del mismo proceso, y
+settings rechaza WEB_CONCURRENCY > 1 sin el caché compartido.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils.safestring import mark_safe
+
+from .models import EspacioParqueadero
+
+CLAVE_VERSION = 'miparqueo:espacios:version:{}'
+TIEMPO_CACHE = 60 * 60
+
+# Por hilo: sede → [(versión de la transacción, su invalidación al confirmar), ...]
+# en el orden de las escrituras (savepoints anidados)
+_local = threading.local()
+
+
+def _vigentes(parqueadero_id):
+    """
+    Versiones de la sede cuya invalidación al confirmar sigue pendiente: al
+    confirmar o revertir (también un savepoint) Django la descarta.
+
+    Returns:
+        list: (versión, al_confirmar) vigentes, descartando las demás
+    """
+    pendientes = getattr(_local, 'pendientes', None)
+    if not pendientes or parqueadero_id not in pendientes:
+        return []
+    en_espera = set()
+    if connection.in_atomic_block:
+        en_espera = {id(func) for _sids, func, _robust in connection.run_on_commit}
+    vigentes = [par for par in pendientes[parqueadero_id] if id(par[1]) in en_espera]
+    if vigentes:
+        pendientes[parqueadero_id] = vigentes
+    else:
+        del pendientes[parqueadero_id]
+    return vigentes
+
+
+def _version_transaccion(parqueadero_id):
+    """
+    Returns:
+        int | None: Versión propia de la transacción en curso si modificó
+                    los espacios de la sede y aún no se confirma ni revierte
+    """
+    vigentes = _vigentes(parqueadero_id)
+    return vigentes[-1][0] if vigentes else None
+
+
+def version_espacios(parqueadero_id):
+    """
+    Returns:
+        int: Versión actual del estado de los espacios de la sede
+    """
+    version = _version_transaccion(parqueadero_id)
+    if version is not None:
+        return version
+    clave = CLAVE_VERSION.format(parqueadero_id)
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, time.time_ns(), None)
+        version = cache.get(clave)
+    return version
+
+
+def invalidar_espacios(*parqueadero_ids):
+    """Asigna una versión nueva: todo lo cacheado con la anterior deja de usarse."""
+    cache.set_many({CLAVE_VERSION.format(parqueadero_id): time.time_ns() for parqueadero_id in parqueadero_ids}, None)
+
+
+def invalidar_espacios_tras_escritura(*parqueadero_ids):
+    """
+    Invalida de inmediato y otra vez al confirmar: una lectura concurrente
+    que cacheó el estado anterior al commit queda con una versión que ya no
+    se consulta. Dentro de una transacción, las lecturas de la misma
+    transacción pasan a usar una versión propia hasta confirmar o revertir.
+
+    Args:
+        parqueadero_ids: Sedes de los espacios modificados
+    """
+    parqueadero_ids = set(parqueadero_ids)
+    invalidar_espacios(*parqueadero_ids)
+
+    def al_confirmar():
+        invalidar_espacios(*parqueadero_ids)
+
+    transaction.on_commit(al_confirmar)
+    if connection.in_atomic_block:
+        if not hasattr(_local, 'pendientes'):
+            _local.pendientes = {}
+        # Negativa: nunca coincide con una versión compartida
+        version = -time.time_ns()
+        for parqueadero_id in parqueadero_ids:
+            _local.pendientes[parqueadero_id] = _vigentes(parqueadero_id) + [(version, al_confirmar)]
+
+
+def _clave_conteos(parqueadero_id, version):
+    return f'miparqueo:espacios:conteos:{parqueadero_id}:{version}'
+
+
+def _conteos_vacios():
+    return dict.fromkeys((estado for estado, _ in EspacioParqueadero.ESTADO_CHOICES), 0)
+
+
+def conteos_por_estado(parqueadero_id, version=None):
+    """
+    Número de espacios de la sede por estado, cacheado por versión.
+
+    Args:
+        version: Versión ya leída en la petición (evita una segunda lectura del caché)
+
+    Returns:
+        dict: {estado: cantidad} con todos los estados de ESTADO_CHOICES
+    """
+    clave = _clave_conteos(parqueadero_id, version or version_espacios(parqueadero_id))
+    conteos = cache.get(clave)
+    if conteos is None:
+        conteos = _conteos_vacios()
+        conteos.update(
+            EspacioParqueadero.objects.filter(parqueadero_id=parqueadero_id)
+            .order_by().values_list('estado').annotate(total=Count('id'))
+        )
+        cache.set(clave, conteos, TIEMPO_CACHE)
+    return conteos
+
+
+async def aconteos_por_estado(parqueadero_id, version):
+    """Versión asíncrona de conteos_por_estado (ORM async, sin saltos de hilo en el acierto)."""
+    clave = _clave_conteos(parqueadero_id, version)
+    conteos = cache.get(clave)
+    if conteos is None:
+        conteos = _conteos_vacios()
+        filas = (
+            EspacioParqueadero.objects.filter(parqueadero_id=parqueadero_id)
+            .order_by().values_list('estado').annotate(total=Count('id'))
+        )
+        conteos.update([fila async for fila in filas])
+        cache.set(clave, conteos, TIEMPO_CACHE)
+    return conteos
+
+
+def grilla_cacheada(nombre, parqueadero_id, version):
+    """
+    HTML del fragmento {% cache ... nombre parqueadero.id version_espacios %}
+    si ya está en caché. Las vistas async lo pasan al template como
+    grilla_html y solo consultan los espacios cuando no está.
+
+    Returns:
+        SafeString: Fragmento renderizado, o None
+    """
+    html = cache.get(make_template_fragment_key(nombre, [parqueadero_id, version]))
+    return mark_safe(html) if html is not None else None
@@ -0,0 +1,20 @@
+"""
+Funciones que ejecutan los procesos del pool de core/importacion.py.
+
+Con 'spawn' el proceso hijo importa este módulo antes de correr el
+inicializador, así que aquí no se importa nada que requiera django.setup()
+(modelos incluidos).
+"""
+import os
+
+
+def inicializar_proceso(settings_module):
+    """Carga la configuración de Django (PASSWORD_HASHERS) en el proceso hijo."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def hashear_lote(passwords):
+    from django.contrib.auth.hashers import make_password
+    return [make_password(password) for password in passwords]
@@ -0,0 +1,149 @@
+"""
+Claves de idempotencia para las escrituras que los clientes reintentan
+(tabletas de portería y app móvil ante un timeout).
+
+El cliente envía la cabecera Idempotency-Key (o, desde un formulario HTML,
+el campo clave_idempotencia) con un valor único por operación. La primera
+petición con esa clave se ejecuta y su respuesta se guarda en el caché
+'idempotencia' durante MIPARQUEO_IDEMPOTENCIA_TTL junto con la huella de la
+petición (método, ruta y cuerpo). Un reintento con la misma clave y la
+misma huella recibe la respuesta guardada con la cabecera
+Idempotent-Replayed, sin ejecutar la vista: no toca Reserva, no genera otro
+QR y no consulta la base de datos (el usuario sale de la sesión).
+
+Reintentos simultáneos se unen: el primero toma un cerrojo con cache.add y
+los demás esperan su respuesta hasta MIPARQUEO_IDEMPOTENCIA_ESPERA
+segundos; si se agota la espera responden 409 con Retry-After.
+
+Las claves son por usuario. No se guardan las respuestas 429 ni 5xx: el
+reintento vuelve a ejecutarse.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+CABECERA = 'HTTP_IDEMPOTENCY_KEY'
+CAMPO_FORMULARIO = 'clave_idempotencia'
+CLAVE_RESPUESTA = 'miparqueo:idempotencia:{}:{}'
+CLAVE_CERROJO = 'miparqueo:idempotencia:cerrojo:{}:{}'
+LARGO_MAXIMO = 255
+INTERVALO_ESPERA_S = 0.05
+# Cabeceras de la respuesta que se repiten (nunca Set-Cookie)
+CABECERAS_GUARDADAS = ('Content-Type', 'Location')
+
+
+def _almacen():
+    return caches['idempotencia']
+
+
+def _huella(request):
+    digesto = hashlib.sha256()
+    for parte in (request.method, request.get_full_path()):
+        digesto.update(parte.encode())
+        digesto.update(b'\0')
+    digesto.update(request.body)
+    return digesto.hexdigest()
+
+
+def _clave_cliente(request):
+    """
+    Returns:
+        str | None: La clave enviada (cabecera o campo del formulario)
+    """
+    clave = request.META.get(CABECERA)
+    if clave is None and request.method == 'POST':
+        clave = request.POST.get(CAMPO_FORMULARIO)
+    return clave or None
+
+
+def _guardable(respuesta):
+    return respuesta.status_code < 500 and respuesta.status_code != 429 and not respuesta.streaming
+
+
+def _repetir(guardada):
+    huella, estado, cabeceras, contenido = guardada
+    respuesta = HttpResponse(contenido, status=estado)
+    for nombre, valor in cabeceras:
+        respuesta[nombre] = valor
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def _error(api, estado, mensaje):
+    if api:
+        return JsonResponse({'error': mensaje}, status=estado)
+    return HttpResponse(mensaje, status=estado, content_type='text/plain; charset=utf-8')
+
+
+def idempotente(*metodos, api=False):
+    """
+    Decorador de vistas de escritura. Debe ir por fuera de login_required /
+    vista_api y de limitar_reservas: un reintento repetido no gasta fichas.
+
+    Args:
+        metodos: Métodos HTTP atendidos (todos si no se indica ninguno)
+        api: Responder los errores en JSON ({"error": ...}) en vez de texto
+
+    Una clave reutilizada con otra huella responde 422 en la API; desde un
+    formulario (volver atrás y cambiar los datos) se atiende como una
+    petición nueva, sin guardarla.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            usuario_id = request.session.get(SESSION_KEY)
+            if (metodos and request.method not in metodos) or not usuario_id:
+                return vista(request, *args, **kwargs)
+            # La huella lee el cuerpo antes que request.POST
+            huella = _huella(request)
+            clave = _clave_cliente(request)
+            if clave is None:
+                return vista(request, *args, **kwargs)
+            if len(clave) > LARGO_MAXIMO:
+                return _error(api, 400, f'Idempotency-Key admite hasta {LARGO_MAXIMO} caracteres.')
+
+            almacen = _almacen()
+            clave = hashlib.sha256(clave.encode()).hexdigest()
+            clave_respuesta = CLAVE_RESPUESTA.format(usuario_id, clave)
+            clave_cerrojo = CLAVE_CERROJO.format(usuario_id, clave)
+            espera = settings.MIPARQUEO_IDEMPOTENCIA_ESPERA
+            limite = time.monotonic() + espera
+
+            while True:
+                guardada = almacen.get(clave_respuesta)
+                if guardada is None and almacen.add(clave_cerrojo, 1, espera * 6):
+                    try:
+                        # La respuesta pudo guardarse entre el get y el add
+                        guardada = almacen.get(clave_respuesta)
+                        if guardada is None:
+                            respuesta = vista(request, *args, **kwargs)
+                            if _guardable(respuesta):
+                                almacen.set(clave_respuesta, (
+                                    huella, respuesta.status_code,
+                                    [(nombre, respuesta[nombre]) for nombre in CABECERAS_GUARDADAS
+                                     if respuesta.has_header(nombre)],
+                                    respuesta.content,
+                                ), settings.MIPARQUEO_IDEMPOTENCIA_TTL)
+                            return respuesta
+                    finally:
+                        almacen.delete(clave_cerrojo)
+
+                if guardada is not None:
+                    if guardada[0] == huella:
+                        return _repetir(guardada)
+                    if api:
+                        return _error(api, 422, 'La Idempotency-Key ya se usó con otra solicitud.')
+                    return vista(request, *args, **kwargs)
+
+                if time.monotonic() >= limite:
+                    respuesta = _error(api, 409, 'La solicitud original con esta clave sigue en proceso.')
+                    respuesta['Retry-After'] = '1'
+                    return respuesta
+                time.sleep(INTERVALO_ESPERA_S)
+        return envoltura
+    return decorador
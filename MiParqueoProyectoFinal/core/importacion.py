@@ -0,0 +1,233 @@
+"""
+Importación masiva de usuarios desde CSV (inicio de semestre).
+
+Columnas: username, email, password (obligatorias) y first_name, last_name,
+rol (opcionales; rol = cliente | vigilante | admin, por defecto cliente).
+
+El costo lo domina el hash PBKDF2 de cada contraseña, así que el flujo es:
+1. Validar todas las filas y buscar duplicados en la BD con una sola consulta.
+2. Hashear las contraseñas en un pool de procesos, fuera de la transacción.
+3. Insertar con bulk_create y asignar los grupos con un solo INSERT en la
+   tabla intermedia auth_user_groups.
+
+Usado por el panel de administración (admin_usuarios_importar) y por el
+comando importar_usuarios. El panel hashea dentro de la petición, así que
+solo acepta archivos pequeños (IMPORTACION_MAXIMO_FILAS_WEB); los de inicio
+de semestre se importan con el comando.
+"""
+import csv
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.models import Group, User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .hash_paralelo import hashear_lote, inicializar_proceso
+
+# 2 parámetros por fila en la consulta de duplicados: por debajo del límite de SQLite (32766)
+IMPORTACION_MAXIMO_FILAS = 15000
+# Desde el panel: unos segundos de hash por petición con pocos núcleos
+IMPORTACION_MAXIMO_FILAS_WEB = 200
+COLUMNAS_OBLIGATORIAS = ('username', 'email', 'password')
+ROLES = ('cliente', 'vigilante', 'admin')
+# Por debajo de este número de contraseñas por proceso no compensa levantar el pool
+MINIMO_POR_PROCESO = 50
+LOTE_INSERCION = 1000
+
+
+class ErrorImportacion(Exception):
+    """
+    Archivo rechazado.
+
+    Attributes:
+        errores: Lista de (número de fila, mensaje); vacía si el problema es
+                 del archivo completo (encabezado, tamaño)
+    """
+
+    def __init__(self, mensaje, errores=None):
+        super().__init__(mensaje)
+        self.errores = errores or []
+
+
+def leer_csv(archivo, maximo_filas=IMPORTACION_MAXIMO_FILAS):
+    """
+    Lee las filas de un CSV de texto (acepta el BOM que agrega Excel).
+    Deja de leer en cuanto el archivo supera maximo_filas.
+
+    Returns:
+        list: Tuplas (número de fila, dict) con los valores sin espacios
+    """
+    lector = csv.DictReader(archivo)
+    columnas = [columna.strip().lstrip('\ufeff').lower() for columna in lector.fieldnames or []]
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in columnas]
+    if faltantes:
+        raise ErrorImportacion(f"Faltan columnas en el encabezado: {', '.join(faltantes)}.")
+    lector.fieldnames = columnas
+
+    filas = []
+    # La fila 1 es el encabezado
+    for numero, fila in enumerate(lector, start=2):
+        if len(filas) >= maximo_filas:
+            mensaje = f'Máximo {maximo_filas} usuarios por archivo.'
+            if maximo_filas < IMPORTACION_MAXIMO_FILAS:
+                mensaje += ' Para archivos más grandes use: python manage.py importar_usuarios archivo.csv'
+            raise ErrorImportacion(mensaje)
+        valores = {clave: (valor or '').strip() for clave, valor in fila.items() if clave}
+        if any(valores.values()):
+            filas.append((numero, valores))
+    return filas
+
+
+def validar_filas(filas):
+    """
+    Valida formato, duplicados dentro del archivo y duplicados contra la BD
+    (username o email ya registrados, en una sola consulta).
+
+    Returns:
+        tuple: (filas válidas, errores como lista de (fila, mensaje))
+    """
+    validas, errores = [], []
+    usernames, emails = {}, {}
+    for numero, fila in filas:
+        faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if not fila.get(columna)]
+        if faltantes:
+            errores.append((numero, f"Faltan datos: {', '.join(faltantes)}."))
+            continue
+        rol = (fila.get('rol') or 'cliente').lower()
+        try:
+            User.username_validator(fila['username'])
+            validate_email(fila['email'])
+        except ValidationError as e:
+            errores.append((numero, e.messages[0]))
+            continue
+        if len(fila['username']) > 150:
+            errores.append((numero, 'El nombre de usuario supera 150 caracteres.'))
+        elif rol not in ROLES:
+            errores.append((numero, f"Rol inválido: {fila['rol']}."))
+        elif fila['username'] in usernames:
+            errores.append((numero, f"Username repetido en el archivo (fila {usernames[fila['username']]})."))
+        elif fila['email'] in emails:
+            errores.append((numero, f"Email repetido en el archivo (fila {emails[fila['email']]})."))
+        else:
+            usernames[fila['username']] = numero
+            emails[fila['email']] = numero
+            validas.append((numero, dict(fila, rol=rol)))
+
+    if validas:
+        registrados = User.objects.filter(
+            Q(username__in=usernames) | Q(email__in=emails)
+        ).values_list('username', 'email')
+        usados_username, usados_email = set(), set()
+        for username, email in registrados:
+            usados_username.add(username)
+            usados_email.add(email)
+        sin_conflicto = []
+        for numero, fila in validas:
+            if fila['username'] in usados_username:
+                errores.append((numero, f"El nombre de usuario {fila['username']} ya existe."))
+            elif fila['email'] in usados_email:
+                errores.append((numero, f"El email {fila['email']} ya está registrado."))
+            else:
+                sin_conflicto.append((numero, fila))
+        validas = sin_conflicto
+
+    errores.sort()
+    return validas, errores
+
+
+def hashear_passwords(passwords, procesos=None):
+    """
+    Calcula make_password para cada contraseña, en paralelo si compensa.
+
+    El pool usa 'spawn': no hereda conexiones a la BD ni hilos del servidor,
+    y cada proceso carga la configuración de Django en core.hash_paralelo.
+
+    Args:
+        procesos: Número de procesos (por defecto os.cpu_count())
+
+    Returns:
+        list: Hashes en el mismo orden que passwords
+    """
+    procesos = min(procesos or os.cpu_count() or 1, len(passwords) // MINIMO_POR_PROCESO)
+    if procesos <= 1:
+        return hashear_lote(passwords)
+
+    # Varios lotes por proceso para repartir la carga si algún proceso arranca tarde
+    tamano = -(-len(passwords) // (procesos * 4))
+    lotes = [passwords[i:i + tamano] for i in range(0, len(passwords), tamano)]
+    with ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=inicializar_proceso,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings'),),
+    ) as pool:
+        return [hash_ for lote in pool.map(hashear_lote, lotes) for hash_ in lote]
+
+
+def importar_usuarios(archivo, omitir_errores=False, procesos=None, maximo_filas=IMPORTACION_MAXIMO_FILAS):
+    """
+    Importa los usuarios de un CSV.
+
+    Args:
+        archivo: Archivo de texto abierto (newline='')
+        omitir_errores: Si False, cualquier fila con error rechaza el archivo
+                        completo; si True, se importan solo las filas válidas
+        procesos: Procesos para el hash (por defecto os.cpu_count())
+        maximo_filas: Usuarios admitidos por archivo
+
+    Returns:
+        dict: creados, por_rol, errores y tiempos (segundos por etapa)
+
+    Raises:
+        ErrorImportacion: Archivo inválido o filas con error (sin omitir_errores)
+    """
+    tiempos = {}
+    inicio = time.perf_counter()
+    validas, errores = validar_filas(leer_csv(archivo, maximo_filas))
+    tiempos['validacion'] = time.perf_counter() - inicio
+    if errores and not omitir_errores:
+        raise ErrorImportacion(f'{len(errores)} fila(s) con errores; no se importó ningún usuario.', errores)
+
+    inicio = time.perf_counter()
+    hashes = hashear_passwords([fila['password'] for _, fila in validas], procesos)
+    tiempos['hash'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    usuarios = []
+    por_rol = dict.fromkeys(ROLES, 0)
+    for (_, fila), password in zip(validas, hashes):
+        es_admin = fila['rol'] == 'admin'
+        usuarios.append(User(
+            username=fila['username'],
+            email=fila['email'],
+            first_name=fila.get('first_name', '')[:150],
+            last_name=fila.get('last_name', '')[:150],
+            password=password,
+            is_staff=es_admin,
+            is_superuser=es_admin,
+        ))
+        por_rol[fila['rol']] += 1
+    vigilantes = [fila['username'] for _, fila in validas if fila['rol'] == 'vigilante']
+
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(usuarios, batch_size=LOTE_INSERCION)
+            if vigilantes:
+                grupo_vigilante, _ = Group.objects.get_or_create(name='VIGILANTE')
+                Membresia = User.groups.through
+                Membresia.objects.bulk_create(
+                    [Membresia(user_id=uid, group_id=grupo_vigilante.id)
+                     for uid in User.objects.filter(username__in=vigilantes).values_list('id', flat=True)],
+                    batch_size=LOTE_INSERCION,
+                )
+    except IntegrityError:
+        # Un username registrado por otra petición mientras se calculaban los hashes
+        raise ErrorImportacion('Algunos usuarios se registraron durante la importación; intente de nuevo.')
+    tiempos['insercion'] = time.perf_counter() - inicio
+
+    return {'creados': len(usuarios), 'por_rol': por_rol, 'errores': errores, 'tiempos': tiempos}
@@ -0,0 +1,68 @@
+"""
+Instrumentación de consultas SQL por petición.
+RegistroConsultas se instala con connection.execute_wrapper() y acumula
+número de consultas, tiempo total, consulta más lenta y firmas repetidas
+(la misma sentencia con distintos parámetros, típica de un N+1).
+"""
+import time
+from collections import Counter
+
+
+class RegistroConsultas:
+    """
+    Envoltorio de ejecución de la conexión que registra cada consulta.
+
+    Args:
+        guardar_sql: Si es True conserva cada sentencia con su duración
+                     (para trazas completas); si no, solo agregados.
+    """
+
+    def __init__(self, guardar_sql=False):
+        self.guardar_sql = guardar_sql
+        self.total = 0
+        self.tiempo = 0.0
+        self.mas_lenta = 0.0
+        self.sql_mas_lenta = ''
+        self.firmas = Counter()
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.total += 1
+            self.tiempo += duracion
+            # La sentencia con marcadores (%s) ya es la firma: no incluye parámetros
+            self.firmas[sql] += 1
+            if duracion > self.mas_lenta:
+                self.mas_lenta = duracion
+                self.sql_mas_lenta = sql
+            if self.guardar_sql:
+                self.consultas.append({
+                    'sql': sql,
+                    'params': [repr(p) for p in params] if params and not many else [],
+                    'many': many,
+                    'duracion_ms': round(duracion * 1000, 3),
+                })
+
+    def duplicadas(self):
+        """
+        Returns:
+            list: (sql, repeticiones) de las sentencias ejecutadas más de una vez,
+                  de la más repetida a la menos
+        """
+        return [(sql, n) for sql, n in self.firmas.most_common() if n > 1]
+
+    def resumen(self):
+        """Agregados en milisegundos, listos para serializar."""
+        duplicadas = self.duplicadas()
+        return {
+            'consultas': self.total,
+            'db_ms': round(self.tiempo * 1000, 2),
+            'max_ms': round(self.mas_lenta * 1000, 2),
+            'sql_mas_lenta': self.sql_mas_lenta[:200],
+            'firmas_duplicadas': len(duplicadas),
+            'duplicadas': [{'sql': sql[:200], 'veces': n} for sql, n in duplicadas[:5]],
+        }
@@ -0,0 +1,183 @@
+"""
+Límites de escritura sobre reservas (crear, modificar, cancelar).
+
+- Cubetas de fichas (token bucket) por usuario y por IP, guardadas en el
+  caché de Django. Cada petición limitada gasta una ficha de cada cubeta y
+  las cubetas se rellenan de forma continua hasta su capacidad: se admiten
+  ráfagas cortas y se corta el reintento en bucle. El usuario se toma de la
+  sesión (_auth_user_id), sin cargarlo de la base de datos, así que una
+  petición rechazada no hace ninguna consulta SQL (con la sesión en caché,
+  ver SESSION_ENGINE).
+- Cupo de reservas activas por usuario: un contador en caché que se
+  incrementa al crear y se descarta al salir una reserva de RESERVADA. Solo
+  se cuenta en la base de datos cuando falta el contador (la primera vez o
+  tras una cancelación), y caduca cada TIEMPO_ACTIVAS para corregir
+  desvíos. El contador solo rechaza rápido: al crear, el cupo se vuelve a
+  contar dentro de la transacción que inserta (contar_activas), así dos
+  creaciones simultáneas del mismo usuario no lo exceden.
+
+Con varios procesos el caché debe ser compartido (MIPARQUEO_CACHE=archivos).
+La lectura y escritura de una cubeta no es atómica: dos peticiones
+simultáneas del mismo usuario pueden gastar la misma ficha, lo que solo
+deja pasar alguna petición de más en una ráfaga.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from . import metricas
+from .models import Reserva
+
+CLAVE_CUBETA = 'miparqueo:limite:{}:{}'
+CLAVE_ACTIVAS = 'miparqueo:reservas_activas:{}'
+TIEMPO_ACTIVAS = 10 * 60
+
+
+# ============================================================
+# CUBETAS DE FICHAS
+# ============================================================
+
+def _cubetas(request):
+    """
+    Returns:
+        list: (alcance, clave, capacidad, fichas por minuto) de las cubetas
+              activas para la petición
+    """
+    cubetas = []
+    usuario_id = request.session.get(SESSION_KEY)
+    limite = getattr(settings, 'MIPARQUEO_LIMITE_USUARIO', None)
+    if usuario_id and limite:
+        cubetas.append(('usuario', CLAVE_CUBETA.format('usuario', usuario_id), *limite))
+    limite = getattr(settings, 'MIPARQUEO_LIMITE_IP', None)
+    if limite:
+        cubetas.append(('ip', CLAVE_CUBETA.format('ip', request.META.get('REMOTE_ADDR', '')), *limite))
+    return cubetas
+
+
+def consumir(cubetas, ahora=None):
+    """
+    Gasta una ficha de cada cubeta si todas tienen al menos una; si alguna
+    está vacía no gasta ninguna.
+
+    Args:
+        cubetas: Lista de (alcance, clave, capacidad, fichas por minuto)
+
+    Returns:
+        tuple: (segundos hasta la próxima ficha, alcance de la cubeta vacía),
+               o (0, None) si se admite la petición
+    """
+    if not cubetas:
+        return 0, None
+    ahora = time.time() if ahora is None else ahora
+    estados = cache.get_many([clave for _alcance, clave, _capacidad, _ritmo in cubetas])
+
+    nuevos, espera, alcance_vacio, caducidad = {}, 0, None, 0
+    for alcance, clave, capacidad, por_minuto in cubetas:
+        fichas, instante = estados.get(clave, (capacidad, ahora))
+        fichas = min(capacidad, fichas + (ahora - instante) * por_minuto / 60)
+        if fichas < 1:
+            faltan = (1 - fichas) * 60 / por_minuto
+            if faltan > espera:
+                espera, alcance_vacio = faltan, alcance
+        nuevos[clave] = (fichas - 1, ahora)
+        # Pasado este tiempo la cubeta estaría llena: la entrada puede caducar
+        caducidad = max(caducidad, math.ceil(capacidad * 60 / por_minuto))
+
+    if espera:
+        return espera, alcance_vacio
+    cache.set_many(nuevos, caducidad)
+    return 0, None
+
+
+def limitar_reservas(*metodos, api=False):
+    """
+    Decorador de las vistas de escritura de reservas. Debe ir por fuera de
+    login_required / vista_api, para rechazar antes de cargar el usuario.
+
+    Args:
+        metodos: Métodos HTTP limitados (todos si no se indica ninguno)
+        api: Responder el 429 en JSON ({"error": ...}) en vez de texto
+
+    Una petición rechazada responde 429 con la cabecera Retry-After.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if metodos and request.method not in metodos:
+                return vista(request, *args, **kwargs)
+            espera, alcance = consumir(_cubetas(request))
+            if not espera:
+                return vista(request, *args, **kwargs)
+
+            metricas.peticiones_limitadas.labels(alcance).inc()
+            mensaje = 'Demasiadas solicitudes de reserva. Intente de nuevo en unos segundos.'
+            if api:
+                respuesta = JsonResponse({'error': mensaje}, status=429)
+            else:
+                respuesta = HttpResponse(mensaje, status=429, content_type='text/plain; charset=utf-8')
+            respuesta['Retry-After'] = str(math.ceil(espera))
+            return respuesta
+        return envoltura
+    return decorador
+
+
+# ============================================================
+# CUPO DE RESERVAS ACTIVAS
+# ============================================================
+
+def contar_activas(usuario_id):
+    """
+    Returns:
+        int: Reservas RESERVADA del usuario que aún no terminan, contadas en
+             la base de datos
+    """
+    ahora = timezone.localtime()
+    # Una reserva pasada que nadie cerró (sin salida ni vencimiento) no ocupa cupo
+    vigentes = Q(fecha__gt=ahora.date()) | Q(fecha=ahora.date(), hora_fin__gt=ahora.time())
+    return Reserva.objects.filter(vigentes, usuario_id=usuario_id, estado='RESERVADA').count()
+
+
+def reservas_activas(usuario_id):
+    """
+    Returns:
+        int: Reservas RESERVADA del usuario que aún no terminan (del
+             contador en caché si existe)
+    """
+    clave = CLAVE_ACTIVAS.format(usuario_id)
+    activas = cache.get(clave)
+    if activas is None:
+        activas = contar_activas(usuario_id)
+        cache.add(clave, activas, TIEMPO_ACTIVAS)
+    return activas
+
+
+def cupo_disponible(usuario_id):
+    """
+    Returns:
+        int | None: Reservas que el usuario aún puede crear, o None sin cupo
+                    configurado (MIPARQUEO_CUPO_RESERVAS)
+    """
+    cupo = getattr(settings, 'MIPARQUEO_CUPO_RESERVAS', None)
+    if cupo is None:
+        return None
+    return max(0, cupo - reservas_activas(usuario_id))
+
+
+def sumar_activas(usuario_id, cantidad=1):
+    """Reservas RESERVADA nuevas del usuario (sin contador no hace nada)."""
+    try:
+        cache.incr(CLAVE_ACTIVAS.format(usuario_id), cantidad)
+    except ValueError:
+        pass
+
+
+def olvidar_activas(*usuario_ids):
+    """Descarta el contador: la próxima verificación vuelve a contar."""
+    cache.delete_many([CLAVE_ACTIVAS.format(usuario_id) for usuario_id in set(usuario_ids)])
@@ -0,0 +1,249 @@
+"""
+Lista de espera con asignación automática cuando se libera un espacio.
+
+Cada proceso mantiene, por sede y tipo de espacio, una cola de prioridad
+(heapq) con las solicitudes en espera ordenadas por el inicio de su franja
+(fecha, hora_inicio) y, a igual inicio, por antigüedad (id). Quien libera
+un espacio (cancelación, salida del vehículo) llama a
+asignar_espacios_liberados dentro de su misma transacción:
+
+1. La cola lee solo las solicitudes nuevas (id mayor que la última vista,
+   índice parcial espera_cola_idx): normalmente ninguna.
+2. Se extrae la solicitud de mayor prioridad en O(log n).
+3. En un savepoint, la solicitud se reclama con un UPDATE condicionado a
+   estado='ESPERANDO' (dos procesos no pueden asignar la misma) y se crea
+   la reserva con crear_reserva. Si el espacio tiene otra reserva que choca
+   con la franja, la solicitud vuelve a la cola y se prueba la siguiente.
+
+Las solicitudes canceladas o asignadas por otro proceso no se buscan dentro
+del heap: se descartan cuando salen (el UPDATE no las reclama), y las
+vencidas se marcan al salir, en un solo UPDATE por liberación. Cada
+RESINCRONIZAR_S la cola se recarga completa, lo que también recupera
+solicitudes de una transacción externa que se revirtió después de
+asignarlas.
+
+La reserva asignada queda con la confirmación pendiente: el comando
+enviar_notificaciones avisa al cliente (core/notificaciones.py).
+"""
+import heapq
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import servicios
+from .models import EspacioParqueadero, SolicitudEspera
+
+# Solicitudes cuya franja choca con otra reserva del espacio que se prueban
+# antes de dejar el espacio libre
+MAXIMO_CHOQUES = 20
+RESINCRONIZAR_S = 300
+# Solicitudes en espera por cliente
+MAXIMO_POR_USUARIO = 5
+
+_colas = {}
+_cerrojo_colas = threading.Lock()
+
+
+class ColaEspera:
+    """
+    Solicitudes en espera de una sede y tipo de espacio.
+
+    Attributes:
+        heap: Entradas (fecha, hora_inicio, id, hora_fin); heap[0] es la de
+              mayor prioridad
+        ultimo_id: Mayor id leído de la base de datos
+    """
+
+    def __init__(self, parqueadero_id, tipo_espacio):
+        self.parqueadero_id = parqueadero_id
+        self.tipo_espacio = tipo_espacio
+        self.heap = []
+        self.ultimo_id = 0
+        self.recargada_en = None
+        self.cerrojo = threading.Lock()
+
+    def _en_espera(self):
+        return SolicitudEspera.objects.filter(
+            parqueadero_id=self.parqueadero_id, tipo_espacio=self.tipo_espacio, estado='ESPERANDO'
+        ).order_by().values_list('fecha', 'hora_inicio', 'id', 'hora_fin')
+
+    def sincronizar(self):
+        """
+        Agrega las solicitudes creadas desde la última lectura (o recarga
+        todo cada RESINCRONIZAR_S).
+
+        Returns:
+            int: Solicitudes leídas
+        """
+        if self.recargada_en is None or time.monotonic() - self.recargada_en > RESINCRONIZAR_S:
+            self.heap = list(self._en_espera())
+            heapq.heapify(self.heap)
+            self.recargada_en = time.monotonic()
+            nuevas = self.heap
+        else:
+            # Los id crecen en orden de commit: SQLite admite un solo escritor a la vez
+            nuevas = list(self._en_espera().filter(id__gt=self.ultimo_id))
+            for entrada in nuevas:
+                heapq.heappush(self.heap, entrada)
+        if nuevas:
+            self.ultimo_id = max(self.ultimo_id, max(entrada[2] for entrada in nuevas))
+        return len(nuevas)
+
+    def asignar(self, espacio, ahora):
+        """
+        Crea la reserva de la solicitud de mayor prioridad que quepa en el espacio.
+
+        Returns:
+            Reserva: La reserva creada, o None si ninguna solicitud cabe
+        """
+        hoy, hora = ahora.date(), ahora.time()
+        pospuestas, vencidas = [], []
+        try:
+            while self.heap and len(pospuestas) < MAXIMO_CHOQUES:
+                entrada = heapq.heappop(self.heap)
+                fecha, hora_inicio, solicitud_id, hora_fin = entrada
+                if (fecha, hora_fin) <= (hoy, hora):
+                    vencidas.append(solicitud_id)
+                    continue
+                try:
+                    reserva = _reservar(solicitud_id, espacio, entrada, ahora)
+                except servicios.ErrorReserva:
+                    pospuestas.append(entrada)
+                    continue
+                except Exception:
+                    pospuestas.append(entrada)
+                    raise
+                if reserva is not None:
+                    return reserva
+            return None
+        finally:
+            for entrada in pospuestas:
+                heapq.heappush(self.heap, entrada)
+            if vencidas:
+                SolicitudEspera.objects.filter(id__in=vencidas, estado='ESPERANDO').update(estado='VENCIDA')
+
+
+def _reservar(solicitud_id, espacio, entrada, ahora):
+    """
+    Returns:
+        Reserva: Creada para la solicitud, o None si ya no estaba en espera
+
+    Raises:
+        ErrorReserva: La franja choca con otra reserva del espacio (el
+            savepoint deshace el reclamo)
+    """
+    fecha, hora_inicio, _id, hora_fin = entrada
+    with transaction.atomic():
+        reclamada = SolicitudEspera.objects.filter(id=solicitud_id, estado='ESPERANDO').update(
+            estado='ASIGNADA', asignada_en=ahora
+        )
+        if not reclamada:
+            return None
+        solicitud = SolicitudEspera.objects.select_related('usuario').get(id=solicitud_id)
+        reserva = servicios.crear_reserva(
+            solicitud.usuario, espacio, fecha, hora_inicio, hora_fin, solicitud.tipo_vehiculo, solicitud.placa
+        )
+        SolicitudEspera.objects.filter(id=solicitud_id).update(reserva=reserva)
+    return reserva
+
+
+def cola_de(parqueadero_id, tipo_espacio):
+    """Cola del proceso para la sede y el tipo (vacía hasta la primera sincronización)."""
+    clave = (parqueadero_id, tipo_espacio)
+    cola = _colas.get(clave)
+    if cola is None:
+        with _cerrojo_colas:
+            cola = _colas.setdefault(clave, ColaEspera(parqueadero_id, tipo_espacio))
+    return cola
+
+
+def asignar_espacios_liberados(espacios, ahora=None):
+    """
+    Asigna cada espacio recién liberado a la mejor solicitud en espera de su
+    sede y tipo. Llamar dentro de la transacción que liberó los espacios.
+
+    Args:
+        espacios: EspacioParqueadero ya guardados con estado LIBRE
+
+    Returns:
+        list: Reservas creadas
+    """
+    ahora = timezone.localtime(ahora or timezone.now())
+    por_cola = defaultdict(list)
+    for espacio in espacios:
+        por_cola[(espacio.parqueadero_id, espacio.tipo)].append(espacio)
+
+    asignadas = []
+    for (parqueadero_id, tipo_espacio), libres in por_cola.items():
+        cola = cola_de(parqueadero_id, tipo_espacio)
+        with cola.cerrojo:
+            cola.sincronizar()
+            for espacio in libres:
+                if not cola.heap:
+                    break
+                reserva = cola.asignar(espacio, ahora)
+                if reserva is not None:
+                    asignadas.append(reserva)
+    return asignadas
+
+
+# ============================================================
+# SOLICITUDES DEL CLIENTE
+# ============================================================
+
+def crear_solicitud(usuario, parqueadero, tipo_espacio, fecha, hora_inicio, hora_fin, tipo_vehiculo, placa):
+    """
+    Agrega una solicitud a la lista de espera.
+
+    Returns:
+        SolicitudEspera: La solicitud creada
+
+    Raises:
+        ErrorReserva: Datos inválidos, hay espacios libres del tipo o el
+            cliente ya tiene demasiadas solicitudes en espera
+    """
+    if tipo_espacio not in dict(EspacioParqueadero.TIPO_CHOICES):
+        raise servicios.ErrorReserva('Tipo de espacio inválido.')
+    if fecha < date.today():
+        raise servicios.ErrorReserva('No se pueden hacer solicitudes para fechas pasadas.')
+    if hora_inicio >= hora_fin:
+        raise servicios.ErrorReserva('La hora de fin debe ser posterior a la hora de inicio.')
+    if tipo_vehiculo == 'CARRO' and tipo_espacio == 'MOTO':
+        raise servicios.ErrorReserva('No se puede reservar un espacio de moto para un carro.')
+    if EspacioParqueadero.objects.filter(parqueadero=parqueadero, tipo=tipo_espacio, estado='LIBRE').exists():
+        raise servicios.ErrorReserva('Hay espacios libres de ese tipo: puede reservar directamente.')
+    if SolicitudEspera.objects.filter(usuario=usuario, estado='ESPERANDO').count() >= MAXIMO_POR_USUARIO:
+        raise servicios.ErrorReserva(f'Ya tiene {MAXIMO_POR_USUARIO} solicitudes en espera.')
+
+    return SolicitudEspera.objects.create(
+        usuario=usuario,
+        parqueadero=parqueadero,
+        tipo_espacio=tipo_espacio,
+        fecha=fecha,
+        hora_inicio=hora_inicio,
+        hora_fin=hora_fin,
+        tipo_vehiculo=tipo_vehiculo,
+        placa=placa,
+    )
+
+
+def cancelar_solicitud(solicitud):
+    """
+    Raises:
+        ErrorReserva: La solicitud ya no está en espera
+    """
+    if not SolicitudEspera.objects.filter(id=solicitud.id, estado='ESPERANDO').update(estado='CANCELADA'):
+        raise servicios.ErrorReserva('Solo se pueden cancelar solicitudes en espera.')
+    solicitud.estado = 'CANCELADA'
+
+
+def vencer_solicitudes(usuario, ahora=None):
+    """Marca VENCIDA las solicitudes en espera del cliente cuya franja ya terminó."""
+    ahora = timezone.localtime(ahora or timezone.now())
+    return SolicitudEspera.objects.filter(usuario=usuario, estado='ESPERANDO', fecha__lte=ahora.date()).exclude(
+        fecha=ahora.date(), hora_fin__gt=ahora.time()
+    ).update(estado='VENCIDA')
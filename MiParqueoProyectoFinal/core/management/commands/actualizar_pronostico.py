@@ -0,0 +1,42 @@
+"""
+Actualiza el pronóstico de demanda con los días nuevos del histórico.
+Pensado para ejecutarse cada noche (cron / Programador de tareas):
+    python manage.py actualizar_pronostico
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Actualiza incrementalmente el pronóstico de demanda por tipo de espacio'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Descarta los acumulados y reentrena con todo el histórico',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError('El pronóstico requiere numpy. Instale con: pip install numpy')
+
+        from core.pronostico import actualizar_pronostico
+
+        inicio = time.perf_counter()
+        resumen = actualizar_pronostico(reiniciar=options['reiniciar'])
+        duracion = time.perf_counter() - inicio
+
+        if resumen['dias_procesados']:
+            self.stdout.write(
+                f"   Histórico procesado: {resumen['desde']} a {resumen['hasta']} "
+                f"({resumen['dias_procesados']} días)"
+            )
+        else:
+            self.stdout.write('   [INFO] No hay días nuevos en el histórico')
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {resumen['filas_pronostico']} filas de pronóstico generadas en {duracion:.2f}s"
+        ))
@@ -0,0 +1,52 @@
+"""
+Mueve las reservas terminadas anteriores al horizonte a ReservaHistorica.
+Pensado para ejecutarse cada noche (cron / Programador de tareas):
+    python manage.py archivar_reservas
+    python manage.py archivar_reservas --dias 90 --maximo-lotes 20
+
+Se puede interrumpir en cualquier momento: cada lote se copia y borra en su
+propia transacción y la siguiente ejecución continúa con lo pendiente.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archivo import LOTE_ARCHIVO, archivar_reservas
+
+
+class Command(BaseCommand):
+    help = 'Archiva por lotes las reservas terminadas más antiguas que el horizonte'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=settings.MIPARQUEO_ARCHIVO_DIAS,
+            help='Archivar reservas con fecha anterior a hoy menos estos días (por defecto MIPARQUEO_ARCHIVO_DIAS)'
+        )
+        parser.add_argument('--lote', type=int, default=LOTE_ARCHIVO, help='Reservas por transacción')
+        parser.add_argument(
+            '--maximo-lotes', type=int, default=None,
+            help='Detenerse tras este número de lotes (lo pendiente queda para la siguiente ejecución)'
+        )
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1 or options['lote'] < 1:
+            raise CommandError('--dias y --lote deben ser mayores que 0.')
+
+        def progreso(archivadas):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'   {archivadas} reservas archivadas...')
+
+        resumen = archivar_reservas(
+            dias=options['dias'],
+            lote=options['lote'],
+            maximo_lotes=options['maximo_lotes'],
+            progreso=progreso,
+        )
+
+        if not resumen['archivadas']:
+            self.stdout.write(f"   [INFO] No hay reservas terminadas anteriores a {resumen['corte']}")
+        if resumen['pendientes']:
+            self.stdout.write('   [AVISO] Quedan reservas por archivar: vuelva a ejecutar el comando')
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {resumen['archivadas']} reservas anteriores a {resumen['corte']} archivadas "
+            f"en {resumen['lotes']} lote(s) ({resumen['segundos']:.1f}s)"
+        ))
@@ -0,0 +1,44 @@
+"""
+Envía por correo las confirmaciones de reservas nuevas y los recordatorios
+de las que empiezan pronto. Pensado para ejecutarse cada 5 minutos
+(cron / Programador de tareas):
+    python manage.py enviar_notificaciones
+    python manage.py enviar_notificaciones --minutos 45 --lote 200
+
+Cada lote se reclama con un UPDATE condicional antes de enviarlo, así que
+dos ejecuciones solapadas no repiten una notificación (ver
+core/notificaciones.py).
+"""
+import smtplib
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.notificaciones import LOTE_CORREOS, enviar_notificaciones
+
+
+class Command(BaseCommand):
+    help = 'Envía las confirmaciones y recordatorios de reservas pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutos', type=int, default=settings.MIPARQUEO_RECORDATORIO_MINUTOS,
+            help='Recordar las reservas que empiezan en los próximos N minutos (por defecto MIPARQUEO_RECORDATORIO_MINUTOS)'
+        )
+        parser.add_argument('--lote', type=int, default=LOTE_CORREOS, help='Mensajes por envío')
+
+    def handle(self, *args, **options):
+        if options['minutos'] < 1 or options['lote'] < 1:
+            raise CommandError('--minutos y --lote deben ser mayores que 0.')
+
+        try:
+            resumen = enviar_notificaciones(minutos=options['minutos'], lote=options['lote'])
+        except (smtplib.SMTPException, OSError) as e:
+            raise CommandError(f'Error del servidor de correo (lo pendiente se reintenta en la siguiente ejecución): {e}')
+
+        if not resumen['confirmaciones'] and not resumen['recordatorios']:
+            self.stdout.write('   [INFO] No hay notificaciones pendientes')
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {resumen['confirmaciones']} confirmaciones y {resumen['recordatorios']} recordatorios "
+            f"enviados ({resumen['segundos']:.1f}s)"
+        ))
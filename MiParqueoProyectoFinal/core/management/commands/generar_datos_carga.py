@@ -0,0 +1,393 @@
+"""
+Genera datos sintéticos a gran escala para pruebas de carga y rendimiento.
+Con la misma semilla y el mismo --referencia produce siempre los mismos
+datos; sin --referencia las fechas se toman del momento de ejecución.
+
+Ejemplos:
+    python manage.py generar_datos_carga
+    python manage.py generar_datos_carga --usuarios 20000 --espacios 2000 --reservas 1000000
+    python manage.py generar_datos_carga --parqueaderos 4 --espacios 1200
+    python manage.py generar_datos_carga --referencia 2025-03-03T12:00
+"""
+import random
+import time
+from datetime import datetime, timedelta, time as dtime
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from core.models import EntradaEdificio, EspacioParqueadero, Parqueadero, Reserva, Incidencia
+
+
+# Picos de llegada a lo largo del día: (hora media, desviación en horas, peso)
+PICOS_LLEGADA = [
+    (7.0, 0.75, 0.45),   # entrada de la mañana
+    (10.0, 1.0, 0.15),
+    (14.0, 0.75, 0.25),  # jornada de la tarde
+    (18.0, 0.5, 0.15),   # clases nocturnas
+]
+
+DISTRIBUCION_TIPOS = [('CARRO', 0.70), ('MOTO', 0.25), ('DISCAPACIDAD', 0.05)]
+
+# Plano de cada sede: filas de 50 espacios de 2.5 m de ancho y 5.5 m de
+# fondo (incluida la vía), cuatro filas por zona; entradas en el borde y = -5
+ESPACIOS_POR_FILA = 50
+ANCHO_ESPACIO = 2.5
+FONDO_FILA = 5.5
+FILAS_POR_ZONA = 4
+ENTRADAS = [('Entrada Occidental', 0.0, -5.0), ('Entrada Principal', 62.5, -5.0), ('Entrada Oriental', 125.0, -5.0)]
+
+
+def nombre_zona(indice):
+    """0 → 'A', 25 → 'Z', 26 → 'AA', ... (como las columnas de una hoja de cálculo)."""
+    nombre = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        nombre = chr(ord('A') + resto) + nombre
+    return nombre
+
+DESCRIPCIONES_INCIDENCIA = {
+    'SIN_RESERVA': 'Vehículo placa {placa} ingresó sin reserva al espacio {numero}.',
+    'DANIO_ESPACIO': 'Daño en la señalización del espacio {numero}, pintura y rayón en el piso.',
+    'OCUPACION_INDEBIDA': 'Vehículo placa {placa} ocupa el espacio {numero} reservado para otro usuario.',
+    'OTRO': 'Reporte general en el espacio {numero}: iluminación deficiente en la zona.',
+}
+
+HORA_APERTURA = 6
+HORA_CIERRE = 22
+
+
+class Command(BaseCommand):
+    help = 'Genera usuarios, espacios, reservas e incidencias sintéticos de forma determinista'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1000, help='Número de clientes a crear')
+        parser.add_argument('--vigilantes', type=int, default=10, help='Número de vigilantes a crear')
+        parser.add_argument('--parqueaderos', type=int, default=1, help='Sedes entre las que se reparten los espacios')
+        parser.add_argument('--espacios', type=int, default=300, help='Número de espacios a crear (total)')
+        parser.add_argument('--reservas', type=int, default=100000, help='Número de reservas a crear')
+        parser.add_argument('--incidencias', type=int, default=1000, help='Número de incidencias a crear')
+        parser.add_argument('--dias', type=int, default=365, help='Días de histórico hacia atrás')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador aleatorio')
+        parser.add_argument(
+            '--referencia', help='Fecha y hora "actual" de los datos (AAAA-MM-DDTHH:MM); por defecto, ahora'
+        )
+        parser.add_argument('--lote', type=int, default=5000, help='Tamaño de lote para bulk_create')
+        parser.add_argument('--prefijo', default='carga', help='Prefijo de los nombres de usuario')
+        parser.add_argument('--password', default='cliente123', help='Contraseña de todos los usuarios')
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['semilla'])
+        self.lote = options['lote']
+        prefijo = options['prefijo']
+
+        if options['parqueaderos'] < 1:
+            raise CommandError('--parqueaderos debe ser al menos 1.')
+        self.ahora = self._referencia(options['referencia'])
+        if User.objects.filter(username__startswith=f'{prefijo}_').exists():
+            raise CommandError(
+                f"Ya existen usuarios con el prefijo '{prefijo}_'. "
+                "Use --prefijo con otro valor o limpie la base de datos (python manage.py flush)."
+            )
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            clientes = self._crear_usuarios(prefijo, options['usuarios'], options['vigilantes'], options)
+            parqueaderos = self._crear_parqueaderos(options['parqueaderos'])
+            espacios = self._crear_espacios(parqueaderos, options['espacios'])
+            self._crear_reservas(clientes, espacios, options['reservas'], options['dias'])
+            self._crear_incidencias(espacios, options['incidencias'], options['dias'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] Datos generados en {time.perf_counter() - inicio:.1f}s (semilla {options["semilla"]})'
+        ))
+
+    @staticmethod
+    def _referencia(valor):
+        if not valor:
+            return timezone.localtime()
+        try:
+            referencia = datetime.fromisoformat(valor)
+        except ValueError:
+            raise CommandError('--referencia debe tener el formato AAAA-MM-DDTHH:MM.')
+        if timezone.is_naive(referencia):
+            referencia = timezone.make_aware(referencia)
+        return timezone.localtime(referencia)
+
+    # ------------------------------------------------------------
+    # Usuarios
+    # ------------------------------------------------------------
+
+    def _crear_usuarios(self, prefijo, n_clientes, n_vigilantes, options):
+        """Crea clientes y vigilantes con una sola contraseña hasheada de antemano."""
+        # Un solo hash PBKDF2 para todos; la sal se deriva de la semilla (determinista)
+        sal = f"{prefijo}{options['semilla']:08d}"
+        password = make_password(options['password'], salt=sal)
+
+        usuarios = []
+        for i in range(n_clientes + n_vigilantes):
+            rol = 'vigilante' if i >= n_clientes else 'cliente'
+            username = f'{prefijo}_{rol}_{i:07d}'
+            usuarios.append(User(
+                username=username,
+                email=f'{username}@campusucc.edu.co',
+                first_name=rol.capitalize(),
+                last_name=f'{i:07d}',
+                password=password,
+            ))
+        User.objects.bulk_create(usuarios, batch_size=self.lote)
+
+        creados = list(
+            User.objects.filter(username__startswith=f'{prefijo}_')
+            .order_by('username')
+            .values_list('id', 'username')
+        )
+        clientes = [uid for uid, username in creados if '_cliente_' in username]
+        vigilantes = [uid for uid, username in creados if '_vigilante_' in username]
+
+        grupo_vigilante, _ = Group.objects.get_or_create(name='VIGILANTE')
+        Membresia = User.groups.through
+        Membresia.objects.bulk_create(
+            [Membresia(user_id=uid, group_id=grupo_vigilante.id) for uid in vigilantes],
+            batch_size=self.lote,
+        )
+        self.vigilantes = vigilantes
+
+        # Cada cliente tiene un vehículo fijo
+        self.placas = {uid: self._placa() for uid in clientes}
+
+        self.stdout.write(f'   [OK] {len(clientes)} clientes y {len(vigilantes)} vigilantes')
+        return clientes
+
+    def _placa(self):
+        letras = ''.join(self.rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))
+        return f'{letras}{self.rnd.randint(0, 999):03d}'
+
+    # ------------------------------------------------------------
+    # Parqueaderos y espacios
+    # ------------------------------------------------------------
+
+    def _crear_parqueaderos(self, n_parqueaderos):
+        """Sedes 'Sede 1'..'Sede N' (reutiliza las existentes) con los vigilantes repartidos."""
+        parqueaderos = [
+            Parqueadero.objects.get_or_create(codigo=f'sede-{k}', defaults={'nombre': f'Sede {k}'})[0]
+            for k in range(1, n_parqueaderos + 1)
+        ]
+        for parqueadero in parqueaderos:
+            for nombre, x, y in ENTRADAS:
+                EntradaEdificio.objects.get_or_create(
+                    parqueadero=parqueadero, nombre=nombre, defaults={'x': x, 'y': y}
+                )
+        Asignacion = Parqueadero.vigilantes.through
+        Asignacion.objects.bulk_create(
+            [Asignacion(parqueadero_id=parqueaderos[i % n_parqueaderos].id, user_id=uid)
+             for i, uid in enumerate(self.vigilantes)],
+            batch_size=self.lote,
+        )
+        self.stdout.write(f'   [OK] {n_parqueaderos} parqueadero(s)')
+        return parqueaderos
+
+    def _crear_espacios(self, parqueaderos, n_espacios):
+        """
+        Reparte los espacios entre las sedes, numerados en cada una a
+        continuación de su mayor número existente y ubicados en el plano
+        según su número (ver ESPACIOS_POR_FILA).
+
+        Returns:
+            list: Tuplas (id, numero, tipo, parqueadero_id)
+        """
+        ultimos = dict(
+            EspacioParqueadero.objects.filter(parqueadero__in=parqueaderos)
+            .order_by().values_list('parqueadero_id').annotate(ultimo=Max('numero'))
+        )
+        siguiente = {parqueadero.id: ultimos.get(parqueadero.id, 0) + 1 for parqueadero in parqueaderos}
+        tipos = [tipo for tipo, _ in DISTRIBUCION_TIPOS]
+        pesos = [peso for _, peso in DISTRIBUCION_TIPOS]
+
+        espacios = []
+        for i in range(n_espacios):
+            parqueadero_id = parqueaderos[i % len(parqueaderos)].id
+            fila, columna = divmod(siguiente[parqueadero_id] - 1, ESPACIOS_POR_FILA)
+            espacios.append(EspacioParqueadero(
+                parqueadero_id=parqueadero_id,
+                numero=siguiente[parqueadero_id],
+                tipo=self.rnd.choices(tipos, pesos)[0],
+                estado='LIBRE',
+                zona=nombre_zona(fila // FILAS_POR_ZONA),
+                x=columna * ANCHO_ESPACIO,
+                y=fila * FONDO_FILA,
+            ))
+            siguiente[parqueadero_id] += 1
+        EspacioParqueadero.objects.bulk_create(espacios, batch_size=self.lote)
+
+        nuevos = Q(pk__in=[])
+        for parqueadero in parqueaderos:
+            nuevos |= Q(parqueadero=parqueadero, numero__gt=ultimos.get(parqueadero.id, 0))
+        creados = list(
+            EspacioParqueadero.objects.filter(nuevos)
+            .order_by('parqueadero_id', 'numero')
+            .values_list('id', 'numero', 'tipo', 'parqueadero_id')
+        )
+        self.stdout.write(f'   [OK] {len(creados)} espacios en {len(parqueaderos)} parqueadero(s)')
+        return creados
+
+    # ------------------------------------------------------------
+    # Reservas
+    # ------------------------------------------------------------
+
+    def _hora_llegada(self):
+        """Hora de llegada (en horas decimales) según los picos del día."""
+        media, desviacion, _ = self.rnd.choices(PICOS_LLEGADA, [p[2] for p in PICOS_LLEGADA])[0]
+        hora = self.rnd.gauss(media, desviacion)
+        # Redondear a bloques de 15 minutos dentro del horario de atención
+        hora = round(hora * 4) / 4
+        return min(max(hora, HORA_APERTURA), HORA_CIERRE - 1)
+
+    def _duracion(self):
+        """Duración en horas: la mayoría entre 1 y 4 horas, algunas jornadas completas."""
+        return min(max(round(self.rnd.lognormvariate(0.8, 0.5) * 4) / 4, 0.5), 10)
+
+    @staticmethod
+    def _a_time(horas):
+        minutos = int(round(horas * 60))
+        return dtime(minutos // 60, minutos % 60)
+
+    def _crear_reservas(self, clientes, espacios, n_reservas, dias):
+        """
+        Reparte las reservas entre `dias` de histórico y la semana siguiente,
+        sin solapamientos en un mismo espacio y día.
+        """
+        if not clientes or not espacios:
+            self.stdout.write('   [AVISO] Sin clientes o espacios: no se crean reservas')
+            return
+
+        ahora = self.ahora
+        hoy = ahora.date()
+        fechas = [hoy - timedelta(days=d) for d in range(dias, 0, -1)]
+        fechas += [hoy + timedelta(days=d) for d in range(0, 8)]
+        # Los días de semana tienen el triple de demanda que los fines de semana
+        pesos_fechas = [3 if f.weekday() < 5 else 1 for f in fechas]
+        total_pesos = sum(pesos_fechas)
+        # Parte entera de la cuota de cada día; el resto (menos de un día por
+        # fecha) suma una reserva a cada uno de los primeros `resto` días
+        cantidades = [divmod(n_reservas * peso, total_pesos)[0] for peso in pesos_fechas]
+        resto = n_reservas - sum(cantidades)
+        cantidades = [cantidad + (indice < resto) for indice, cantidad in enumerate(cantidades)]
+
+        lote = []
+        creadas = 0
+        reservados_hoy = set()
+
+        for fecha, cantidad in zip(fechas, cantidades):
+            ocupacion = {}  # espacio_id -> [(inicio, fin)]
+            for _ in range(cantidad):
+                reserva = self._reserva_para_fecha(fecha, hoy, ahora, clientes, espacios, ocupacion)
+                if reserva is None:
+                    continue
+                if fecha == hoy and reserva.estado == 'RESERVADA':
+                    reservados_hoy.add(reserva.espacio_id)
+                lote.append(reserva)
+                if len(lote) >= self.lote:
+                    Reserva.objects.bulk_create(lote)
+                    creadas += len(lote)
+                    lote = []
+
+        if lote:
+            Reserva.objects.bulk_create(lote)
+            creadas += len(lote)
+
+        EspacioParqueadero.objects.filter(id__in=reservados_hoy).update(estado='RESERVADO')
+        self.stdout.write(f'   [OK] {creadas} reservas ({len(reservados_hoy)} espacios reservados hoy)')
+
+    def _reserva_para_fecha(self, fecha, hoy, ahora, clientes, espacios, ocupacion):
+        """Construye una reserva sin solapamiento; None si no encuentra hueco."""
+        for _ in range(5):
+            espacio_id, _numero, tipo_espacio, parqueadero_id = self.rnd.choice(espacios)
+            inicio = self._hora_llegada()
+            fin = min(inicio + self._duracion(), HORA_CIERRE)
+            intervalos = ocupacion.setdefault(espacio_id, [])
+            if any(inicio < f and fin > i for i, f in intervalos):
+                continue
+            intervalos.append((inicio, fin))
+            break
+        else:
+            return None
+
+        usuario_id = self.rnd.choice(clientes)
+        hora_inicio = self._a_time(inicio)
+        hora_fin = self._a_time(fin)
+        reserva = Reserva(
+            usuario_id=usuario_id,
+            parqueadero_id=parqueadero_id,
+            espacio_id=espacio_id,
+            fecha=fecha,
+            hora_inicio=hora_inicio,
+            hora_fin=hora_fin,
+            tipo_vehiculo='MOTO' if tipo_espacio == 'MOTO' else 'CARRO',
+            placa=self.placas[usuario_id],
+            # Histórico sintético: sin confirmaciones pendientes (los recordatorios sí)
+            confirmacion_enviada_en=ahora,
+        )
+
+        # Siempre los mismos sorteos por reserva, sea futura o pasada: la
+        # secuencia aleatoria no depende de la hora de referencia
+        sorteo = self.rnd.random()
+        desvio_entrada = self.rnd.uniform(-0.25, 0.25)
+        desvio_salida = self.rnd.uniform(-0.5, 0.25)
+
+        if fecha > hoy or (fecha == hoy and hora_inicio > ahora.time()):
+            reserva.estado = 'RESERVADA'
+        elif sorteo < 0.10:
+            reserva.estado = 'CANCELADA'
+        elif sorteo < 0.15:
+            reserva.estado = 'VENCIDA'
+        else:
+            reserva.estado = 'COMPLETADA'
+            entrada = min(inicio + desvio_entrada, fin - 0.25)
+            salida = max(fin + desvio_salida, entrada + 0.25)
+            reserva.hora_entrada = self._a_time(max(entrada, 0))
+            reserva.hora_salida = self._a_time(min(salida, 23.75))
+        return reserva
+
+    # ------------------------------------------------------------
+    # Incidencias
+    # ------------------------------------------------------------
+
+    def _crear_incidencias(self, espacios, n_incidencias, dias):
+        """
+        Reparte las incidencias en los `dias` de histórico, en horas de
+        llegada. fecha_hora es auto_now_add (bulk_create la pisa con la hora
+        actual): se fija con un bulk_update después de insertarlas.
+        """
+        if not self.vigilantes or not espacios or not n_incidencias:
+            return
+
+        tipos = list(DESCRIPCIONES_INCIDENCIA)
+        placas = list(self.placas.values()) or ['AAA000']
+        medianoche = self.ahora.replace(hour=0, minute=0, second=0, microsecond=0)
+        incidencias = []
+        fechas_hora = []
+        for _ in range(n_incidencias):
+            tipo = self.rnd.choice(tipos)
+            espacio_id, numero, _tipo_espacio, parqueadero_id = self.rnd.choice(espacios)
+            incidencias.append(Incidencia(
+                tipo=tipo,
+                parqueadero_id=parqueadero_id,
+                espacio_id=espacio_id,
+                descripcion=DESCRIPCIONES_INCIDENCIA[tipo].format(
+                    placa=self.rnd.choice(placas), numero=numero
+                ),
+                reportado_por_id=self.rnd.choice(self.vigilantes),
+            ))
+            dia = self.rnd.randint(1, max(dias, 1))
+            fechas_hora.append(medianoche - timedelta(days=dia) + timedelta(hours=self._hora_llegada()))
+        Incidencia.objects.bulk_create(incidencias, batch_size=self.lote)
+        for incidencia, fecha_hora in zip(incidencias, fechas_hora):
+            incidencia.fecha_hora = fecha_hora
+        Incidencia.objects.bulk_update(incidencias, ['fecha_hora'], batch_size=self.lote)
+        self.stdout.write(f'   [OK] {len(incidencias)} incidencias')
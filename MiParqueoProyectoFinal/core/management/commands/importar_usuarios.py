@@ -0,0 +1,45 @@
+"""
+Importa usuarios desde un CSV (username, email, password[, first_name, last_name, rol]).
+Ejecutar con: python manage.py importar_usuarios estudiantes.csv
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacion import ErrorImportacion, importar_usuarios
+
+
+class Command(BaseCommand):
+    help = 'Importa usuarios desde un CSV con hash de contraseñas en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV (UTF-8, con encabezado)')
+        parser.add_argument(
+            '--omitir-errores', action='store_true',
+            help='Importar las filas válidas aunque otras tengan errores'
+        )
+        parser.add_argument('--procesos', type=int, default=None, help='Procesos para el hash (por defecto: núcleos)')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                resumen = importar_usuarios(
+                    archivo, omitir_errores=options['omitir_errores'], procesos=options['procesos']
+                )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+        except ErrorImportacion as e:
+            for fila, mensaje in e.errores:
+                self.stderr.write(f'   [ERROR] Fila {fila}: {mensaje}')
+            raise CommandError(str(e))
+
+        for fila, mensaje in resumen['errores']:
+            self.stdout.write(f'   [AVISO] Fila {fila} omitida: {mensaje}')
+        tiempos = resumen['tiempos']
+        por_rol = ', '.join(f'{cantidad} {rol}' for rol, cantidad in resumen['por_rol'].items() if cantidad)
+        self.stdout.write(
+            f"   Validación {tiempos['validacion']:.2f}s | hash {tiempos['hash']:.2f}s"
+            f" | inserción {tiempos['insercion']:.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {resumen['creados']} usuarios importados ({por_rol or 'ninguno'})"
+            f" en {sum(tiempos.values()):.1f}s"
+        ))
@@ -0,0 +1,49 @@
+"""
+Elimina por lotes las sesiones vencidas de django_session. Pensado para
+ejecutarse cada noche (cron / Programador de tareas):
+    python manage.py limpiar_sesiones
+    python manage.py limpiar_sesiones --lote 500
+
+A diferencia de clearsessions (un solo DELETE), cada lote se borra en su
+propia transacción: el bloqueo de escritura de SQLite se libera entre lotes
+y los inicios de sesión no esperan a que termine el barrido. Las copias en
+el caché 'sesiones' (cached_db) vencen solas junto con la sesión.
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+LOTE_SESIONES = 2000
+
+
+class Command(BaseCommand):
+    help = 'Elimina por lotes las sesiones vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=LOTE_SESIONES, help='Sesiones por transacción')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        if lote < 1:
+            raise CommandError('--lote debe ser mayor que 0.')
+
+        inicio = time.perf_counter()
+        vencidas = Session.objects.filter(expire_date__lt=timezone.now())
+        eliminadas = lotes = 0
+        while True:
+            with transaction.atomic():
+                claves = list(vencidas.values_list('session_key', flat=True)[:lote])
+                if not claves:
+                    break
+                eliminadas += Session.objects.filter(session_key__in=claves).delete()[0]
+            lotes += 1
+
+        if not eliminadas:
+            self.stdout.write('   [INFO] No hay sesiones vencidas')
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] {eliminadas} sesiones vencidas eliminadas en {lotes} lote(s) '
+            f'({time.perf_counter() - inicio:.1f}s)'
+        ))
@@ -0,0 +1,28 @@
+"""
+Reconstruye el índice de texto completo de las incidencias.
+Ejecutar con: python manage.py reconstruir_indice_incidencias
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.busqueda import fts_disponible, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice FTS5 de descripciones de incidencias'
+
+    def handle(self, *args, **options):
+        if not fts_disponible():
+            raise CommandError(
+                'El índice FTS5 no existe. Verifique que la base de datos sea SQLite '
+                'con soporte FTS5 y ejecute: python manage.py migrate'
+            )
+
+        inicio = time.perf_counter()
+        total = reconstruir_indice()
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] Índice reconstruido: {total} incidencias en {duracion:.2f}s'
+        ))
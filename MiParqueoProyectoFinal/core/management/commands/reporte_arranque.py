@@ -0,0 +1,51 @@
+"""
+Reporte de arranque en frío: tiempo de importación por módulo y hasta la
+primera petición servida, medido en un proceso nuevo (python -X importtime).
+Ejecutar con: python manage.py reporte_arranque
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from mi_parqueo.arranque import medir_arranque
+
+
+class Command(BaseCommand):
+    help = 'Muestra qué módulos cuestan más al arrancar un worker y el tiempo hasta la primera petición'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Módulos a listar por tabla')
+        parser.add_argument('--url', default='/login/', help='Ruta de la primera petición')
+
+    def handle(self, *args, **options):
+        medicion = medir_arranque(url=options['url'], importtime=True)
+        modulos = medicion['modulos']
+        top = options['top']
+
+        # Tiempo propio sumado por paquete de primer nivel (sin contar dos veces los anidados)
+        por_paquete = defaultdict(int)
+        for modulo, propio, _acumulado, _nivel in modulos:
+            por_paquete[modulo.split('.')[0]] += propio
+
+        self.stdout.write('=' * 60)
+        self.stdout.write(f"REPORTE DE ARRANQUE ({options['url']})")
+        self.stdout.write('=' * 60)
+        self.stdout.write(f"{'Paquete':<40}{'Propio ms':>14}")
+        for paquete, propio in sorted(por_paquete.items(), key=lambda p: -p[1])[:top]:
+            self.stdout.write(f'{paquete:<40}{propio / 1000:>14.1f}')
+
+        self.stdout.write('-' * 60)
+        self.stdout.write(f"{'Módulo (tiempo propio)':<40}{'Propio ms':>14}")
+        for modulo, propio, _acumulado, _nivel in sorted(modulos, key=lambda m: -m[1])[:top]:
+            self.stdout.write(f'{modulo:<40}{propio / 1000:>14.1f}')
+
+        self.stdout.write('-' * 60)
+        self.stdout.write(f"   Importación + calentamiento: {medicion['importar_ms']:.0f} ms")
+        self.stdout.write(f"   Primera petición:            {medicion['primera_peticion_ms']:.0f} ms ({medicion['estado']})")
+        self.stdout.write(f"   Proceso completo:            {medicion['proceso_ms']:.0f} ms (incluye el intérprete)")
+        if medicion['cargados']:
+            self.stdout.write(self.style.WARNING(
+                f"[AVISO] Dependencias pesadas cargadas al arrancar: {', '.join(medicion['cargados'])}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('[OK] qrcode, PIL y numpy se cargan recién en su primer uso'))
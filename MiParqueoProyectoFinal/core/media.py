@@ -0,0 +1,77 @@
+"""
+Entrega de archivos media (imágenes QR) en producción.
+
+Modos (MEDIA_ENTREGA en settings):
+- 'django':           FileResponse; con gunicorn/uwsgi el archivo sale por
+                      wsgi.file_wrapper (sendfile del sistema operativo)
+- 'x-sendfile':       cabecera X-Sendfile con la ruta absoluta (Apache mod_xsendfile, lighttpd)
+- 'x-accel-redirect': cabecera X-Accel-Redirect hacia MEDIA_INTERNA_URL (nginx, location internal)
+
+En todos los modos se calcula un ETag a partir del contenido y se responde
+304 a If-None-Match. Los QR tienen nombre UUID y nunca se reescriben: se
+marcan Cache-Control immutable por un año, así el navegador no vuelve a pedirlos.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+PATRON_INMUTABLE = re.compile(r'^qr/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.png$')
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'public, max-age=0, must-revalidate'
+
+
+def resolver_ruta(ruta):
+    """
+    Ruta absoluta de un archivo dentro de MEDIA_ROOT.
+
+    Returns:
+        str: Ruta absoluta, o None si sale de MEDIA_ROOT o no es un archivo
+    """
+    try:
+        absoluta = safe_join(settings.MEDIA_ROOT, ruta)
+    except SuspiciousFileOperation:
+        return None
+    return absoluta if os.path.isfile(absoluta) else None
+
+
+@lru_cache(maxsize=4096)
+def _hash_contenido(absoluta, mtime_ns, tamano):
+    # mtime y tamaño forman parte de la clave: si el archivo cambia, se recalcula
+    with open(absoluta, 'rb') as archivo:
+        return hashlib.blake2b(archivo.read(), digest_size=12).hexdigest()
+
+
+def etag_archivo(absoluta, estado):
+    """
+    Args:
+        absoluta: Ruta absoluta del archivo
+        estado: os.stat_result del archivo
+
+    Returns:
+        str: ETag fuerte basado en el contenido (entre comillas)
+    """
+    return f'"{_hash_contenido(absoluta, estado.st_mtime_ns, estado.st_size)}"'
+
+
+def cache_control(ruta):
+    return CACHE_INMUTABLE if PATRON_INMUTABLE.match(ruta) else CACHE_REVALIDAR
+
+
+def tipo_contenido(ruta):
+    tipo, _ = mimetypes.guess_type(ruta)
+    return tipo or 'application/octet-stream'
+
+
+def coincide_etag(cabecera, etag):
+    """Compara If-None-Match (lista separada por comas o '*') con el ETag del archivo."""
+    if not cabecera:
+        return False
+    if cabecera.strip() == '*':
+        return True
+    return etag in (valor.strip().removeprefix('W/') for valor in cabecera.split(','))
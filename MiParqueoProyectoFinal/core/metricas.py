@@ -0,0 +1,147 @@
+"""
+Métricas de MiParqueo en formato Prometheus (expuestas en /metrics).
+
+Requiere prometheus_client (pip install prometheus-client). Sin la librería
+todas las métricas son objetos nulos y el resto del sistema funciona igual.
+
+Varios procesos (gunicorn, uvicorn --workers): definir la variable de entorno
+PROMETHEUS_MULTIPROC_DIR con un directorio vacío antes de arrancar; cada
+proceso escribe sus valores en archivos mmap y /metrics los agrega.
+"""
+import os
+from contextlib import ContextDecorator
+
+from django.db.models import Count
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:  # pragma: no cover - dependencia opcional
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+    Counter = Histogram = None
+
+DISPONIBLE = Counter is not None
+
+
+class _MetricaNula(ContextDecorator):
+    """Sustituto sin efecto cuando prometheus_client no está instalado."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def time(self):
+        return self
+
+
+def _crear(tipo, *args, **kwargs):
+    return tipo(*args, **kwargs) if DISPONIBLE else _MetricaNula()
+
+
+BUCKETS_VISTAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+peticion_duracion = _crear(
+    Histogram, 'miparqueo_peticion_duracion_segundos',
+    'Latencia de las peticiones por nombre de URL',
+    ['vista', 'metodo'], buckets=BUCKETS_VISTAS,
+)
+peticiones = _crear(
+    Counter, 'miparqueo_peticiones',
+    'Peticiones atendidas por nombre de URL y código de estado',
+    ['vista', 'metodo', 'estado'],
+)
+consultas_por_peticion = _crear(
+    Histogram, 'miparqueo_consultas_sql_por_peticion',
+    'Número de consultas SQL por petición',
+    ['vista'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+qr_duracion = _crear(
+    Histogram, 'miparqueo_qr_generacion_segundos',
+    'Duración de generar_qr_reserva',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+intentos_reserva = _crear(
+    Counter, 'miparqueo_intentos_reserva',
+    'Intentos de crear reserva por resultado (creada, conflicto, no_disponible, cupo, error)',
+    ['resultado'],
+)
+peticiones_limitadas = _crear(
+    Counter, 'miparqueo_peticiones_limitadas',
+    'Escrituras de reservas rechazadas con 429 por la cubeta vacía (usuario, ip)',
+    ['alcance'],
+)
+validaciones_placa = _crear(
+    Counter, 'miparqueo_validaciones_placa',
+    'Validaciones de placa en portería por resultado (encontrada, no_encontrada)',
+    ['resultado'],
+)
+registros_porteria = _crear(
+    Counter, 'miparqueo_registros_porteria',
+    'Entradas y salidas de vehículos registradas por los vigilantes',
+    ['tipo'],
+)
+
+
+class OcupacionCollector:
+    """
+    Ocupación actual por sede y estado de EspacioParqueadero, leída de la
+    base de datos en cada scrape: es el mismo valor en todos los procesos.
+    """
+
+    def collect(self):
+        from .models import EspacioParqueadero, Parqueadero
+
+        conteos = {
+            (codigo, estado): total
+            for codigo, estado, total in EspacioParqueadero.objects.order_by()
+            .values_list('parqueadero__codigo', 'estado').annotate(total=Count('id'))
+        }
+        familia = GaugeMetricFamily(
+            'miparqueo_espacios', 'Espacios de parqueadero por sede y estado',
+            labels=['parqueadero', 'estado'],
+        )
+        for codigo in Parqueadero.objects.values_list('codigo', flat=True):
+            for estado, _ in EspacioParqueadero.ESTADO_CHOICES:
+                familia.add_metric([codigo, estado], conteos.get((codigo, estado), 0))
+        yield familia
+
+
+def exportar():
+    """
+    Genera el texto de exposición de Prometheus.
+
+    Returns:
+        bytes: Métricas en formato de texto
+    """
+    if not DISPONIBLE:
+        return b''
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        salida = generate_latest(registro)
+    else:
+        salida = generate_latest(REGISTRY)
+
+    ocupacion = CollectorRegistry()
+    ocupacion.register(OcupacionCollector())
+    return salida + generate_latest(ocupacion)
@@ -0,0 +1,225 @@
+"""
+Middleware de la aplicación core.
+"""
+import cProfile
+import json
+import logging
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metricas
+from .instrumentacion import RegistroConsultas
+from .perfiles import guardar_perfil
+
+logger = logging.getLogger('core.instrumentacion')
+
+
+class _MiddlewareSyncAsync:
+    """
+    Base para middleware que funciona igual bajo WSGI y ASGI: en una cadena
+    async no obliga a Django a saltar a un hilo en cada petición.
+    Las subclases implementan procesar() (sync) y aprocesar() (async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.aprocesar(request)
+        return self.procesar(request)
+
+
+def _instalar_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _quitar_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+async def acon_execute_wrapper(wrapper, corrutina):
+    """
+    Equivalente async de connection.execute_wrapper(): espera la corrutina
+    con el wrapper instalado en la conexión del hilo donde corre el ORM.
+
+    Bajo ASGI las vistas síncronas y el ORM de las vistas async corren con
+    sync_to_async(thread_sensitive=True), en un hilo por petición cuya
+    conexión no es la del bucle de eventos; instalarlo en el bucle no vería
+    ninguna consulta. Cuesta dos saltos a ese hilo por petición.
+    """
+    await sync_to_async(_instalar_wrapper)(wrapper)
+    try:
+        return await corrutina
+    finally:
+        await sync_to_async(_quitar_wrapper)(wrapper)
+
+
+class InstrumentacionSQLMiddleware(_MiddlewareSyncAsync):
+    """
+    Mide las consultas SQL de cada petición y las publica en la cabecera
+    Server-Timing y en una línea de log JSON (logger core.instrumentacion).
+    Se activa con MIPARQUEO_INSTRUMENTACION_SQL = True; desactivado, Django
+    lo descarta al arrancar y no tiene ningún costo por petición.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MIPARQUEO_INSTRUMENTACION_SQL', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def procesar(self, request):
+        registro = RegistroConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(registro):
+            response = self.get_response(request)
+        return self._publicar(request, response, registro, inicio)
+
+    async def aprocesar(self, request):
+        registro = RegistroConsultas()
+        inicio = time.perf_counter()
+        response = await acon_execute_wrapper(registro, self.get_response(request))
+        return self._publicar(request, response, registro, inicio)
+
+    @staticmethod
+    def _publicar(request, response, registro, inicio):
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        resumen = registro.resumen()
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={resumen["db_ms"]};desc="{registro.total} consultas"',
+            f'db-max;dur={resumen["max_ms"]}',
+            f'db-dup;desc="{resumen["firmas_duplicadas"]} firmas repetidas"',
+            f'total;dur={duracion_ms:.2f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        logger.info(json.dumps({
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': match.url_name if match else None,
+            'estado': response.status_code,
+            'duracion_ms': round(duracion_ms, 2),
+            **resumen,
+        }, ensure_ascii=False))
+        return response
+
+
+class PerfiladoMiddleware(_MiddlewareSyncAsync):
+    """
+    Perfila una sola petición bajo demanda con cProfile, junto con su traza SQL.
+    Se solicita con ?perfilar=1 o la cabecera X-MiParqueo-Perfilar, y solo
+    se atiende para superusuarios. El perfil queda en PERFILES_DIR y se
+    descarga desde el panel de administración.
+    Las peticiones que no lo solicitan solo pagan una comprobación de texto;
+    si aparece 'perfilar=' se analiza la consulta y solo ?perfilar=1 cuenta.
+    Bajo ASGI el perfil cubre el hilo del bucle de eventos (vistas async);
+    lo que corre en el pool de hilos (vistas síncronas, ORM) no aparece en
+    el perfil, pero sí en la traza SQL (ver acon_execute_wrapper).
+    """
+
+    @staticmethod
+    def _solicitado(request):
+        if 'HTTP_X_MIPARQUEO_PERFILAR' in request.META:
+            return True
+        # Filtro previo barato: request.GET solo se construye si puede estar
+        return 'perfilar=' in request.META.get('QUERY_STRING', '') and request.GET.get('perfilar') == '1'
+
+    def procesar(self, request):
+        if not self._solicitado(request) or not request.user.is_superuser:
+            return self.get_response(request)
+
+        perfil = cProfile.Profile()
+        registro = RegistroConsultas(guardar_sql=True)
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(registro):
+            response = perfil.runcall(self.get_response, request)
+        return self._guardar(request, request.user, response, perfil, registro, inicio)
+
+    async def aprocesar(self, request):
+        if not self._solicitado(request):
+            return await self.get_response(request)
+        usuario = await request.auser()
+        if not usuario.is_superuser:
+            return await self.get_response(request)
+
+        perfil = cProfile.Profile()
+        registro = RegistroConsultas(guardar_sql=True)
+        inicio = time.perf_counter()
+        perfil.enable()
+        try:
+            response = await acon_execute_wrapper(registro, self.get_response(request))
+        finally:
+            perfil.disable()
+        return await sync_to_async(self._guardar)(request, usuario, response, perfil, registro, inicio)
+
+    def _guardar(self, request, usuario, response, perfil, registro, inicio):
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        match = getattr(request, 'resolver_match', None)
+        identificador = guardar_perfil(perfil, registro, {
+            'id': uuid.uuid4().hex[:12],
+            'metodo': request.method,
+            'ruta': request.get_full_path(),
+            'vista': match.url_name if match else None,
+            'usuario': usuario.username,
+            'estado': response.status_code,
+            'duracion_ms': round(duracion_ms, 2),
+        })
+        response['X-MiParqueo-Perfil'] = identificador
+        return response
+
+
+class MetricasMiddleware(_MiddlewareSyncAsync):
+    """
+    Registra latencia, código de estado y número de consultas SQL de cada
+    petición en las métricas de Prometheus, agrupadas por nombre de URL
+    (nunca por ruta, para no crear una serie por cada id).
+    Se activa con MIPARQUEO_METRICAS = True y requiere prometheus_client.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MIPARQUEO_METRICAS', False) or not metricas.DISPONIBLE:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def procesar(self, request):
+        consultas = [0]
+
+        def contar(execute, sql, params, many, context):
+            consultas[0] += 1
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contar):
+            response = self.get_response(request)
+        self._registrar(request, response, time.perf_counter() - inicio, consultas[0])
+        return response
+
+    async def aprocesar(self, request):
+        consultas = [0]
+
+        def contar(execute, sql, params, many, context):
+            consultas[0] += 1
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        response = await acon_execute_wrapper(contar, self.get_response(request))
+        self._registrar(request, response, time.perf_counter() - inicio, consultas[0])
+        return response
+
+    @staticmethod
+    def _registrar(request, response, duracion, consultas):
+        match = getattr(request, 'resolver_match', None)
+        vista = (match.url_name or match.view_name) if match else 'sin_ruta'
+        metricas.peticion_duracion.labels(vista, request.method).observe(duracion)
+        metricas.peticiones.labels(vista, request.method, str(response.status_code)).inc()
+        metricas.consultas_por_peticion.labels(vista).observe(consultas)
@@ -0,0 +1,72 @@
+from django.db import migrations, OperationalError
+
+
+CREAR_FTS = [
+    """
+    CREATE VIRTUAL TABLE core_incidencia_fts USING fts5(
+        descripcion,
+        content='core_incidencia',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_incidencia_fts_ai AFTER INSERT ON core_incidencia BEGIN
+        INSERT INTO core_incidencia_fts(rowid, descripcion) VALUES (new.id, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER core_incidencia_fts_ad AFTER DELETE ON core_incidencia BEGIN
+        INSERT INTO core_incidencia_fts(core_incidencia_fts, rowid, descripcion)
+        VALUES ('delete', old.id, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER core_incidencia_fts_au AFTER UPDATE OF descripcion ON core_incidencia BEGIN
+        INSERT INTO core_incidencia_fts(core_incidencia_fts, rowid, descripcion)
+        VALUES ('delete', old.id, old.descripcion);
+        INSERT INTO core_incidencia_fts(rowid, descripcion) VALUES (new.id, new.descripcion);
+    END
+    """,
+    "INSERT INTO core_incidencia_fts(core_incidencia_fts) VALUES ('rebuild')",
+]
+
+ELIMINAR_FTS = [
+    "DROP TRIGGER IF EXISTS core_incidencia_fts_ai",
+    "DROP TRIGGER IF EXISTS core_incidencia_fts_ad",
+    "DROP TRIGGER IF EXISTS core_incidencia_fts_au",
+    "DROP TABLE IF EXISTS core_incidencia_fts",
+]
+
+
+def crear_indice_fts(apps, schema_editor):
+    # Solo SQLite; en otros motores la búsqueda usa icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREAR_FTS[0])
+        except OperationalError:
+            # SQLite compilado sin FTS5
+            return
+        for sql in CREAR_FTS[1:]:
+            cursor.execute(sql)
+
+
+def eliminar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in ELIMINAR_FTS:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_reserva_codigo_qr'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
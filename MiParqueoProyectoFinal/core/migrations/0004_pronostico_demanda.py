@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_incidencia_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilDemanda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CARRO', 'Carro'), ('MOTO', 'Moto'), ('DISCAPACIDAD', 'Discapacidad')], max_length=20, verbose_name='Tipo de espacio')),
+                ('dia_semana', models.PositiveSmallIntegerField(verbose_name='Día de la semana')),
+                ('hora', models.PositiveSmallIntegerField(verbose_name='Hora')),
+                ('suma', models.FloatField(default=0, verbose_name='Ocupación acumulada (ponderada)')),
+                ('peso', models.FloatField(default=0, verbose_name='Días acumulados (ponderados)')),
+                ('procesado_hasta', models.DateField(verbose_name='Histórico procesado hasta')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Demanda',
+                'verbose_name_plural': 'Perfiles de Demanda',
+                'unique_together': {('tipo', 'dia_semana', 'hora')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PronosticoDemanda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CARRO', 'Carro'), ('MOTO', 'Moto'), ('DISCAPACIDAD', 'Discapacidad')], max_length=20, verbose_name='Tipo de espacio')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('hora', models.PositiveSmallIntegerField(verbose_name='Hora')),
+                ('demanda', models.FloatField(verbose_name='Demanda esperada')),
+                ('generado_en', models.DateTimeField(auto_now=True, verbose_name='Generado en')),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de Demanda',
+                'verbose_name_plural': 'Pronósticos de Demanda',
+                'ordering': ['fecha', 'hora', 'tipo'],
+                'unique_together': {('tipo', 'fecha', 'hora')},
+            },
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def asignar_parqueadero_principal(apps, schema_editor):
+    """
+    Los datos existentes pasan a una sede 'Sede Principal', con los vigilantes
+    actuales asignados a ella. En una base de datos vacía no se crea ninguna
+    (init_data.py, generar_datos_carga o el admin crean las sedes).
+    """
+    Parqueadero = apps.get_model('core', 'Parqueadero')
+    EspacioParqueadero = apps.get_model('core', 'EspacioParqueadero')
+    Reserva = apps.get_model('core', 'Reserva')
+    Incidencia = apps.get_model('core', 'Incidencia')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    if not EspacioParqueadero.objects.exists():
+        return
+    principal = Parqueadero.objects.create(nombre='Sede Principal', codigo='principal')
+    EspacioParqueadero.objects.update(parqueadero=principal)
+    Reserva.objects.update(parqueadero=principal)
+    Incidencia.objects.update(parqueadero=principal)
+    principal.vigilantes.set(User.objects.filter(groups__name='VIGILANTE'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_pronostico_demanda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Parqueadero',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('codigo', models.SlugField(max_length=30, unique=True, verbose_name='Código')),
+                ('direccion', models.CharField(blank=True, max_length=200, verbose_name='Dirección')),
+                ('activo', models.BooleanField(default=True, verbose_name='Activo')),
+                ('vigilantes', models.ManyToManyField(blank=True, related_name='parqueaderos_asignados', to=settings.AUTH_USER_MODEL, verbose_name='Vigilantes asignados')),
+            ],
+            options={
+                'verbose_name': 'Parqueadero',
+                'verbose_name_plural': 'Parqueaderos',
+                'ordering': ['nombre'],
+            },
+        ),
+        # Primero nulas, se llenan y después pasan a obligatorias
+        migrations.AddField(
+            model_name='espacioparqueadero',
+            name='parqueadero',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='espacios', to='core.parqueadero', verbose_name='Parqueadero'),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='parqueadero',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='reservas', to='core.parqueadero', verbose_name='Parqueadero'),
+        ),
+        # Columna nula agregada con ALTER TABLE: core_incidencia no se reconstruye
+        # y conserva los triggers del índice FTS5 (migración 0003)
+        migrations.AddField(
+            model_name='incidencia',
+            name='parqueadero',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='incidencias', to='core.parqueadero', verbose_name='Parqueadero'),
+        ),
+        migrations.RunPython(asignar_parqueadero_principal, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='espacioparqueadero',
+            name='parqueadero',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='espacios', to='core.parqueadero', verbose_name='Parqueadero'),
+        ),
+        migrations.AlterField(
+            model_name='reserva',
+            name='parqueadero',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='reservas', to='core.parqueadero', verbose_name='Parqueadero'),
+        ),
+        migrations.AlterField(
+            model_name='espacioparqueadero',
+            name='numero',
+            field=models.IntegerField(verbose_name='Número de espacio'),
+        ),
+        migrations.AddConstraint(
+            model_name='espacioparqueadero',
+            constraint=models.UniqueConstraint(fields=('parqueadero', 'numero'), name='espacio_numero_por_parqueadero'),
+        ),
+        migrations.AddIndex(
+            model_name='espacioparqueadero',
+            index=models.Index(fields=['parqueadero', 'estado'], name='espacio_parq_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['parqueadero', 'fecha', 'placa'], name='reserva_parq_fecha_placa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['parqueadero', 'estado', 'fecha'], name='reserva_parq_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['parqueadero', '-fecha_hora'], name='incidencia_parq_fecha_idx'),
+        ),
+    ]
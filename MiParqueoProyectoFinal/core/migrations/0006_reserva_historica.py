@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_parqueadero'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaHistorica',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha de reserva')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de inicio')),
+                ('hora_fin', models.TimeField(verbose_name='Hora de fin')),
+                ('tipo_vehiculo', models.CharField(choices=[('CARRO', 'Carro'), ('MOTO', 'Moto')], max_length=10, verbose_name='Tipo de vehículo')),
+                ('placa', models.CharField(max_length=10, verbose_name='Placa del vehículo')),
+                ('estado', models.CharField(choices=[('RESERVADA', 'Reservada'), ('CANCELADA', 'Cancelada'), ('COMPLETADA', 'Completada'), ('VENCIDA', 'Vencida')], max_length=20, verbose_name='Estado')),
+                ('hora_entrada', models.TimeField(blank=True, null=True, verbose_name='Hora de entrada real')),
+                ('hora_salida', models.TimeField(blank=True, null=True, verbose_name='Hora de salida real')),
+                ('codigo_qr', models.CharField(blank=True, max_length=255, null=True, verbose_name='Código QR')),
+                ('creado_en', models.DateTimeField(verbose_name='Creado en')),
+                ('actualizado_en', models.DateTimeField(verbose_name='Actualizado en')),
+                ('archivado_en', models.DateTimeField(auto_now_add=True, verbose_name='Archivado en')),
+                ('espacio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_historicas', to='core.espacioparqueadero', verbose_name='Espacio')),
+                ('parqueadero', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservas_historicas', to='core.parqueadero', verbose_name='Parqueadero')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservas_historicas', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Reserva Histórica',
+                'verbose_name_plural': 'Reservas Históricas',
+                'ordering': ['-fecha', '-hora_inicio'],
+                'indexes': [models.Index(fields=['usuario', 'fecha'], name='reserva_hist_usuario_idx'), models.Index(fields=['fecha'], name='reserva_hist_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_reserva_historica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='espacioparqueadero',
+            name='x',
+            field=models.FloatField(blank=True, null=True, verbose_name='Coordenada X (m)'),
+        ),
+        migrations.AddField(
+            model_name='espacioparqueadero',
+            name='y',
+            field=models.FloatField(blank=True, null=True, verbose_name='Coordenada Y (m)'),
+        ),
+        migrations.AddField(
+            model_name='espacioparqueadero',
+            name='zona',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Zona'),
+        ),
+        migrations.CreateModel(
+            name='EntradaEdificio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('x', models.FloatField(verbose_name='Coordenada X (m)')),
+                ('y', models.FloatField(verbose_name='Coordenada Y (m)')),
+                ('parqueadero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entradas', to='core.parqueadero', verbose_name='Parqueadero')),
+            ],
+            options={
+                'verbose_name': 'Entrada de Edificio',
+                'verbose_name_plural': 'Entradas de Edificios',
+                'ordering': ['nombre'],
+                'constraints': [models.UniqueConstraint(fields=('parqueadero', 'nombre'), name='entrada_nombre_por_parqueadero')],
+            },
+        ),
+    ]
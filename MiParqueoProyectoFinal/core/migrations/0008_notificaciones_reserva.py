@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def marcar_confirmaciones_existentes(apps, schema_editor):
+    """Las reservas existentes no reciben una confirmación tardía (sí el recordatorio)."""
+    Reserva = apps.get_model('core', 'Reserva')
+    Reserva.objects.filter(confirmacion_enviada_en__isnull=True).update(confirmacion_enviada_en=F('creado_en'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_ubicacion_espacios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='confirmacion_enviada_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Confirmación enviada en'),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='recordatorio_enviado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Recordatorio enviado en'),
+        ),
+        migrations.RunPython(marcar_confirmaciones_existentes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('estado', 'RESERVADA'), ('recordatorio_enviado_en__isnull', True)), fields=['fecha', 'hora_inicio'], name='reserva_recordatorio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('confirmacion_enviada_en__isnull', True), ('estado', 'RESERVADA')), fields=['creado_en'], name='reserva_confirmacion_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_notificaciones_reserva'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_espacio', models.CharField(choices=[('CARRO', 'Carro'), ('MOTO', 'Moto'), ('DISCAPACIDAD', 'Discapacidad')], max_length=20, verbose_name='Tipo de espacio')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de inicio')),
+                ('hora_fin', models.TimeField(verbose_name='Hora de fin')),
+                ('tipo_vehiculo', models.CharField(choices=[('CARRO', 'Carro'), ('MOTO', 'Moto')], max_length=10, verbose_name='Tipo de vehículo')),
+                ('placa', models.CharField(max_length=10, verbose_name='Placa del vehículo')),
+                ('estado', models.CharField(choices=[('ESPERANDO', 'En espera'), ('ASIGNADA', 'Asignada'), ('CANCELADA', 'Cancelada'), ('VENCIDA', 'Vencida')], default='ESPERANDO', max_length=20, verbose_name='Estado')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Creado en')),
+                ('asignada_en', models.DateTimeField(blank=True, null=True, verbose_name='Asignada en')),
+                ('parqueadero', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_espera', to='core.parqueadero', verbose_name='Parqueadero')),
+                ('reserva', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solicitud_espera', to='core.reserva', verbose_name='Reserva asignada')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_espera', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Solicitud en Lista de Espera',
+                'verbose_name_plural': 'Lista de Espera',
+                'ordering': ['fecha', 'hora_inicio', 'id'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'ESPERANDO')), fields=['parqueadero', 'tipo_espacio', 'id'], name='espera_cola_idx'), models.Index(fields=['usuario', 'fecha'], name='espera_usuario_idx')],
+            },
+        ),
+    ]
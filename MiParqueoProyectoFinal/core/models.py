@@ -4,10 +4,37 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 
+class Parqueadero(models.Model):
+    """
+    Parqueadero (sede) de la universidad. Es dueño de sus espacios; las
+    reservas e incidencias también guardan el parqueadero, y sus índices
+    empiezan por él, así las consultas de una sede solo recorren sus filas.
+    Los vigilantes asignados solo pueden trabajar en sus parqueaderos.
+    """
+    nombre = models.CharField(max_length=100, unique=True, verbose_name='Nombre')
+    codigo = models.SlugField(max_length=30, unique=True, verbose_name='Código')
+    direccion = models.CharField(max_length=200, blank=True, verbose_name='Dirección')
+    activo = models.BooleanField(default=True, verbose_name='Activo')
+    vigilantes = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name='parqueaderos_asignados',
+        verbose_name='Vigilantes asignados'
+    )
+    
+    class Meta:
+        verbose_name = 'Parqueadero'
+        verbose_name_plural = 'Parqueaderos'
+        ordering = ['nombre']
+    
+    def __str__(self):
+        return self.nombre
+
+
 class EspacioParqueadero(models.Model):
     """
     Modelo que representa un espacio de parqueadero en la universidad.
-    Cada espacio tiene un número único, tipo y estado actual.
+    Cada espacio tiene un número único dentro de su parqueadero, tipo y estado actual.
     """
     TIPO_CHOICES = [
         ('CARRO', 'Carro'),
@@ -22,19 +49,65 @@ class EspacioParqueadero(models.Model):
         ('BLOQUEADO', 'Bloqueado'),
     ]
     
-    numero = models.IntegerField(unique=True, verbose_name='Número de espacio')
+    parqueadero = models.ForeignKey(
+        Parqueadero,
+        on_delete=models.PROTECT,
+        related_name='espacios',
+        db_index=False,  # cubierto por los índices compuestos que empiezan por parqueadero
+        verbose_name='Parqueadero'
+    )
+    numero = models.IntegerField(verbose_name='Número de espacio')
     tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name='Tipo de espacio')
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='LIBRE', verbose_name='Estado')
+    # Ubicación en el plano de la sede (metros); sin coordenadas no se recomienda
+    zona = models.CharField(max_length=20, blank=True, verbose_name='Zona')
+    x = models.FloatField(null=True, blank=True, verbose_name='Coordenada X (m)')
+    y = models.FloatField(null=True, blank=True, verbose_name='Coordenada Y (m)')
     
     class Meta:
         verbose_name = 'Espacio de Parqueadero'
         verbose_name_plural = 'Espacios de Parqueadero'
         ordering = ['numero']
+        constraints = [
+            # También es el índice de la grilla de una sede (ordenada por número)
+            models.UniqueConstraint(fields=['parqueadero', 'numero'], name='espacio_numero_por_parqueadero'),
+        ]
+        indexes = [
+            models.Index(fields=['parqueadero', 'estado'], name='espacio_parq_estado_idx'),
+        ]
     
     def __str__(self):
         return f"Espacio {self.numero} - {self.tipo} ({self.estado})"
 
 
+class EntradaEdificio(models.Model):
+    """
+    Entrada peatonal de un edificio, en el mismo plano que los espacios de la
+    sede. El cliente la elige para que se le recomiende el espacio libre más
+    cercano (core/recomendacion.py).
+    """
+    parqueadero = models.ForeignKey(
+        Parqueadero,
+        on_delete=models.CASCADE,
+        related_name='entradas',
+        verbose_name='Parqueadero'
+    )
+    nombre = models.CharField(max_length=100, verbose_name='Nombre')
+    x = models.FloatField(verbose_name='Coordenada X (m)')
+    y = models.FloatField(verbose_name='Coordenada Y (m)')
+    
+    class Meta:
+        verbose_name = 'Entrada de Edificio'
+        verbose_name_plural = 'Entradas de Edificios'
+        ordering = ['nombre']
+        constraints = [
+            models.UniqueConstraint(fields=['parqueadero', 'nombre'], name='entrada_nombre_por_parqueadero'),
+        ]
+    
+    def __str__(self):
+        return self.nombre
+
+
 class Reserva(models.Model):
     """
     Modelo que representa una reserva de espacio de parqueadero.
@@ -54,6 +127,15 @@ class Reserva(models.Model):
     
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Usuario')
     espacio = models.ForeignKey(EspacioParqueadero, on_delete=models.CASCADE, verbose_name='Espacio')
+    # Copia de espacio.parqueadero (se asigna en save()): permite filtrar por sede sin JOIN
+    parqueadero = models.ForeignKey(
+        Parqueadero,
+        on_delete=models.PROTECT,
+        related_name='reservas',
+        editable=False,
+        db_index=False,  # cubierto por los índices compuestos que empiezan por parqueadero
+        verbose_name='Parqueadero'
+    )
     fecha = models.DateField(verbose_name='Fecha de reserva')
     hora_inicio = models.TimeField(verbose_name='Hora de inicio')
     hora_fin = models.TimeField(verbose_name='Hora de fin')
@@ -68,6 +150,10 @@ class Reserva(models.Model):
     # Campo para código QR
     codigo_qr = models.CharField(max_length=255, blank=True, null=True, verbose_name='Código QR')
     
+    # Notificaciones por correo (core/notificaciones.py): None = pendiente
+    confirmacion_enviada_en = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Confirmación enviada en')
+    recordatorio_enviado_en = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Recordatorio enviado en')
+    
     # Campos de auditoría
     creado_en = models.DateTimeField(auto_now_add=True, verbose_name='Creado en')
     actualizado_en = models.DateTimeField(auto_now=True, verbose_name='Actualizado en')
@@ -76,6 +162,22 @@ class Reserva(models.Model):
         verbose_name = 'Reserva'
         verbose_name_plural = 'Reservas'
         ordering = ['-fecha', '-hora_inicio']
+        indexes = [
+            # Validación de placa en portería (placa + fecha de hoy)
+            models.Index(fields=['parqueadero', 'fecha', 'placa'], name='reserva_parq_fecha_placa_idx'),
+            # Vehículos adentro (salida) y reservas activas de la sede
+            models.Index(fields=['parqueadero', 'estado', 'fecha'], name='reserva_parq_estado_idx'),
+            # Notificaciones pendientes: índices parciales, solo contienen las
+            # reservas activas aún sin notificar (se vacían al enviar)
+            models.Index(
+                fields=['fecha', 'hora_inicio'], name='reserva_recordatorio_idx',
+                condition=models.Q(estado='RESERVADA', recordatorio_enviado_en__isnull=True),
+            ),
+            models.Index(
+                fields=['creado_en'], name='reserva_confirmacion_idx',
+                condition=models.Q(estado='RESERVADA', confirmacion_enviada_en__isnull=True),
+            ),
+        ]
     
     def __str__(self):
         return f"Reserva {self.id} - {self.usuario.username} - Espacio {self.espacio.numero} ({self.estado})"
@@ -93,10 +195,136 @@ class Reserva(models.Model):
             raise ValidationError('No se puede reservar un espacio de moto para un carro.')
     
     def save(self, *args, **kwargs):
-        self.full_clean()
+        if self.espacio_id:
+            self.parqueadero_id = self.espacio.parqueadero_id
+        # parqueadero se copia del espacio ya validado: sin consulta extra para validarlo
+        self.full_clean(exclude=['parqueadero'])
         super().save(*args, **kwargs)
 
 
+class ReservaHistorica(models.Model):
+    """
+    Reserva terminada (completada, cancelada o vencida) anterior al horizonte
+    de archivo, movida desde Reserva por el comando archivar_reservas.
+
+    Conserva el id y los nombres de campo de Reserva: el historial del
+    cliente, la API y el pronóstico leen las dos tablas con las mismas
+    consultas (core/archivo.py), y la tabla caliente solo crece con las
+    reservas recientes.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='reservas_historicas',
+        db_index=False,  # cubierto por el índice (usuario, fecha)
+        verbose_name='Usuario'
+    )
+    espacio = models.ForeignKey(
+        EspacioParqueadero,
+        on_delete=models.CASCADE,
+        related_name='reservas_historicas',
+        verbose_name='Espacio'
+    )
+    parqueadero = models.ForeignKey(
+        Parqueadero,
+        on_delete=models.PROTECT,
+        related_name='reservas_historicas',
+        verbose_name='Parqueadero'
+    )
+    fecha = models.DateField(verbose_name='Fecha de reserva')
+    hora_inicio = models.TimeField(verbose_name='Hora de inicio')
+    hora_fin = models.TimeField(verbose_name='Hora de fin')
+    tipo_vehiculo = models.CharField(max_length=10, choices=Reserva.TIPO_VEHICULO_CHOICES, verbose_name='Tipo de vehículo')
+    placa = models.CharField(max_length=10, verbose_name='Placa del vehículo')
+    estado = models.CharField(max_length=20, choices=Reserva.ESTADO_CHOICES, verbose_name='Estado')
+    hora_entrada = models.TimeField(null=True, blank=True, verbose_name='Hora de entrada real')
+    hora_salida = models.TimeField(null=True, blank=True, verbose_name='Hora de salida real')
+    codigo_qr = models.CharField(max_length=255, blank=True, null=True, verbose_name='Código QR')
+    # Copiados de Reserva tal cual (sin auto_now)
+    creado_en = models.DateTimeField(verbose_name='Creado en')
+    actualizado_en = models.DateTimeField(verbose_name='Actualizado en')
+    archivado_en = models.DateTimeField(auto_now_add=True, verbose_name='Archivado en')
+    
+    class Meta:
+        verbose_name = 'Reserva Histórica'
+        verbose_name_plural = 'Reservas Históricas'
+        ordering = ['-fecha', '-hora_inicio']
+        indexes = [
+            # Historial del cliente
+            models.Index(fields=['usuario', 'fecha'], name='reserva_hist_usuario_idx'),
+            # Rangos de fechas (pronóstico)
+            models.Index(fields=['fecha'], name='reserva_hist_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Reserva {self.id} (archivada) - {self.fecha} ({self.estado})"
+
+
+class SolicitudEspera(models.Model):
+    """
+    Solicitud en lista de espera: el cliente pide un espacio de un tipo en
+    una sede para una fecha y horario. Cuando un espacio de ese tipo se
+    libera, core/lista_espera.py le crea la reserva automáticamente.
+    """
+    ESTADO_CHOICES = [
+        ('ESPERANDO', 'En espera'),
+        ('ASIGNADA', 'Asignada'),
+        ('CANCELADA', 'Cancelada'),
+        ('VENCIDA', 'Vencida'),
+    ]
+    
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='solicitudes_espera',
+        db_index=False,  # cubierto por el índice (usuario, fecha)
+        verbose_name='Usuario'
+    )
+    parqueadero = models.ForeignKey(
+        Parqueadero,
+        on_delete=models.CASCADE,
+        related_name='solicitudes_espera',
+        db_index=False,  # cubierto por el índice de la cola
+        verbose_name='Parqueadero'
+    )
+    tipo_espacio = models.CharField(max_length=20, choices=EspacioParqueadero.TIPO_CHOICES, verbose_name='Tipo de espacio')
+    fecha = models.DateField(verbose_name='Fecha')
+    hora_inicio = models.TimeField(verbose_name='Hora de inicio')
+    hora_fin = models.TimeField(verbose_name='Hora de fin')
+    tipo_vehiculo = models.CharField(max_length=10, choices=Reserva.TIPO_VEHICULO_CHOICES, verbose_name='Tipo de vehículo')
+    placa = models.CharField(max_length=10, verbose_name='Placa del vehículo')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='ESPERANDO', verbose_name='Estado')
+    # Reserva creada al asignar (queda en None si luego se archiva)
+    reserva = models.OneToOneField(
+        Reserva,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='solicitud_espera',
+        verbose_name='Reserva asignada'
+    )
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name='Creado en')
+    asignada_en = models.DateTimeField(null=True, blank=True, verbose_name='Asignada en')
+    
+    class Meta:
+        verbose_name = 'Solicitud en Lista de Espera'
+        verbose_name_plural = 'Lista de Espera'
+        ordering = ['fecha', 'hora_inicio', 'id']
+        indexes = [
+            # Carga de la cola de una sede y tipo: solo las solicitudes en espera
+            models.Index(
+                fields=['parqueadero', 'tipo_espacio', 'id'], name='espera_cola_idx',
+                condition=models.Q(estado='ESPERANDO'),
+            ),
+            # Solicitudes del cliente
+            models.Index(fields=['usuario', 'fecha'], name='espera_usuario_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Espera {self.id} - {self.usuario.username} - {self.tipo_espacio} {self.fecha} ({self.estado})"
+
+
 class Incidencia(models.Model):
     """
     Modelo para registrar incidencias y situaciones irregulares en el parqueadero.
@@ -110,6 +338,15 @@ class Incidencia(models.Model):
     ]
     
     tipo = models.CharField(max_length=30, choices=TIPO_CHOICES, verbose_name='Tipo de incidencia')
+    parqueadero = models.ForeignKey(
+        Parqueadero,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='incidencias',
+        db_index=False,  # cubierto por los índices compuestos que empiezan por parqueadero
+        verbose_name='Parqueadero'
+    )
     espacio = models.ForeignKey(
         EspacioParqueadero, 
         on_delete=models.SET_NULL, 
@@ -125,6 +362,52 @@ class Incidencia(models.Model):
         verbose_name = 'Incidencia'
         verbose_name_plural = 'Incidencias'
         ordering = ['-fecha_hora']
+        indexes = [
+            models.Index(fields=['parqueadero', '-fecha_hora'], name='incidencia_parq_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"Incidencia {self.id} - {self.tipo} ({self.fecha_hora.strftime('%Y-%m-%d %H:%M')})"
+
+
+class PerfilDemanda(models.Model):
+    """
+    Acumulados del histórico de ocupación por tipo de espacio, día de la semana y hora.
+    Es el estado del modelo de pronóstico: permite actualizarlo cada noche
+    procesando solo los días nuevos, sin volver a leer todo el histórico.
+    """
+    tipo = models.CharField(max_length=20, choices=EspacioParqueadero.TIPO_CHOICES, verbose_name='Tipo de espacio')
+    dia_semana = models.PositiveSmallIntegerField(verbose_name='Día de la semana')  # 0 = lunes
+    hora = models.PositiveSmallIntegerField(verbose_name='Hora')
+    suma = models.FloatField(default=0, verbose_name='Ocupación acumulada (ponderada)')
+    peso = models.FloatField(default=0, verbose_name='Días acumulados (ponderados)')
+    procesado_hasta = models.DateField(verbose_name='Histórico procesado hasta')
+    
+    class Meta:
+        verbose_name = 'Perfil de Demanda'
+        verbose_name_plural = 'Perfiles de Demanda'
+        unique_together = [('tipo', 'dia_semana', 'hora')]
+    
+    def __str__(self):
+        return f"Perfil {self.tipo} - día {self.dia_semana} {self.hora:02d}h"
+
+
+class PronosticoDemanda(models.Model):
+    """
+    Demanda esperada (espacios ocupados) por tipo de espacio para cada hora
+    de los próximos días. Se regenera con: python manage.py actualizar_pronostico
+    """
+    tipo = models.CharField(max_length=20, choices=EspacioParqueadero.TIPO_CHOICES, verbose_name='Tipo de espacio')
+    fecha = models.DateField(verbose_name='Fecha')
+    hora = models.PositiveSmallIntegerField(verbose_name='Hora')
+    demanda = models.FloatField(verbose_name='Demanda esperada')
+    generado_en = models.DateTimeField(auto_now=True, verbose_name='Generado en')
+    
+    class Meta:
+        verbose_name = 'Pronóstico de Demanda'
+        verbose_name_plural = 'Pronósticos de Demanda'
+        ordering = ['fecha', 'hora', 'tipo']
+        unique_together = [('tipo', 'fecha', 'hora')]
+    
+    def __str__(self):
+        return f"Pronóstico {self.tipo} {self.fecha} {self.hora:02d}h: {self.demanda:.1f}"
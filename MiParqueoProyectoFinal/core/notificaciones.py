@@ -0,0 +1,187 @@
+"""
+Notificaciones por correo de las reservas: confirmación y recordatorio.
+
+Las envía el comando enviar_notificaciones (cron cada pocos minutos), no la
+petición que crea la reserva: así crear una reserva no espera al servidor
+de correo y los mensajes de muchas reservas comparten una sola conexión.
+
+- Una consulta por tipo de notificación, sobre índices parciales que solo
+  contienen las reservas activas aún sin notificar.
+- Las plantillas (templates/notificaciones/) se compilan una vez; cada
+  mensaje lleva adjunto el QR de la reserva si lo tiene.
+- Los mensajes se envían por lotes sobre la misma conexión. Antes de
+  enviar un lote, la ejecución lo reclama con un UPDATE condicional
+  (confirmacion_enviada_en / recordatorio_enviado_en aún en NULL → su
+  marca de tiempo) y solo envía las reservas que reclamó: dos ejecuciones
+  solapadas no repiten una notificación. Si el servidor de correo falla, se
+  libera la marca del lote y se reintenta en la siguiente ejecución; si el
+  proceso muere entre el UPDATE y el envío, ese lote no se envía.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .media import resolver_ruta
+from .models import Reserva
+
+LOTE_CORREOS = 500
+# Reservas creadas antes de esto ya no reciben confirmación (el comando estuvo detenido)
+VENTANA_CONFIRMACION = timedelta(days=1)
+
+NOTIFICACIONES = {
+    'confirmacion': {
+        'plantilla': 'notificaciones/confirmacion.txt',
+        'asunto': 'Reserva confirmada: espacio {espacio}, {fecha:%d/%m/%Y} {hora:%H:%M}',
+        'campo': 'confirmacion_enviada_en',
+    },
+    'recordatorio': {
+        'plantilla': 'notificaciones/recordatorio.txt',
+        'asunto': 'Recordatorio: su reserva del espacio {espacio} empieza a las {hora:%H:%M}',
+        'campo': 'recordatorio_enviado_en',
+    },
+}
+
+
+def confirmaciones_pendientes(ahora):
+    """Reservas activas creadas en la última VENTANA_CONFIRMACION sin confirmación enviada."""
+    return Reserva.objects.filter(
+        estado='RESERVADA',
+        confirmacion_enviada_en__isnull=True,
+        creado_en__gte=ahora - VENTANA_CONFIRMACION,
+    )
+
+
+def recordatorios_pendientes(ahora, minutos):
+    """Reservas activas sin recordatorio que empiezan en los próximos `minutos`."""
+    inicio = timezone.localtime(ahora)
+    fin = inicio + timedelta(minutes=minutos)
+    if fin.date() == inicio.date():
+        ventana = Q(fecha=inicio.date(), hora_inicio__gte=inicio.time(), hora_inicio__lt=fin.time())
+    else:
+        # La ventana cruza la medianoche
+        ventana = (
+            Q(fecha=inicio.date(), hora_inicio__gte=inicio.time())
+            | Q(fecha=fin.date(), hora_inicio__lt=fin.time())
+        )
+    return Reserva.objects.filter(ventana, estado='RESERVADA', recordatorio_enviado_en__isnull=True)
+
+
+def _con_datos(reservas):
+    """Una sola consulta con lo que usan las plantillas y el adjunto."""
+    return list(
+        reservas
+        .exclude(usuario__email='')
+        .select_related('usuario', 'espacio', 'parqueadero')
+        .only(
+            'id', 'fecha', 'hora_inicio', 'hora_fin', 'placa', 'codigo_qr',
+            'usuario__username', 'usuario__first_name', 'usuario__email',
+            'espacio__numero', 'espacio__tipo', 'parqueadero__nombre',
+        )
+        .order_by('id')
+    )
+
+
+def _mensaje(notificacion, plantilla, reserva, conexion):
+    mensaje = EmailMessage(
+        subject=notificacion['asunto'].format(
+            espacio=reserva.espacio.numero, fecha=reserva.fecha, hora=reserva.hora_inicio
+        ),
+        body=plantilla.render({'reserva': reserva}),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[reserva.usuario.email],
+        connection=conexion,
+    )
+    ruta = reserva.codigo_qr and resolver_ruta(reserva.codigo_qr)
+    if ruta:
+        with open(ruta, 'rb') as archivo:
+            mensaje.attach(f'reserva-{reserva.id}.png', archivo.read(), 'image/png')
+    return mensaje
+
+
+def _reclamar(campo, ids, marca):
+    """
+    Marca con `marca` las reservas del lote que ninguna ejecución marcó aún.
+
+    Returns:
+        set: Ids reclamados por esta ejecución
+    """
+    with transaction.atomic():
+        reclamadas = Reserva.objects.filter(id__in=ids, **{f'{campo}__isnull': True}).update(**{campo: marca})
+        if reclamadas == len(ids):
+            return set(ids)
+        # Otra ejecución reclamó parte del lote. El UPDATE retiene el cerrojo
+        # de escritura hasta el commit: nadie más marca entre las dos consultas
+        return set(Reserva.objects.filter(id__in=ids, **{campo: marca}).values_list('id', flat=True))
+
+
+def _enviar(tipo, reservas, conexion, ahora, lote):
+    """
+    Returns:
+        int: Mensajes enviados
+    """
+    notificacion = NOTIFICACIONES[tipo]
+    campo = notificacion['campo']
+    plantilla = get_template(notificacion['plantilla'])
+    enviadas = 0
+    for desde in range(0, len(reservas), lote):
+        grupo = reservas[desde:desde + lote]
+        reclamadas = _reclamar(campo, [reserva.id for reserva in grupo], ahora)
+        grupo = [reserva for reserva in grupo if reserva.id in reclamadas]
+        if not grupo:
+            continue
+        try:
+            conexion.send_messages([_mensaje(notificacion, plantilla, reserva, conexion) for reserva in grupo])
+        except Exception:
+            # Sin enviar: el lote vuelve a quedar pendiente
+            Reserva.objects.filter(id__in=reclamadas, **{campo: ahora}).update(**{campo: None})
+            raise
+        enviadas += len(grupo)
+    return enviadas
+
+
+def enviar_notificaciones(minutos=None, lote=LOTE_CORREOS, ahora=None):
+    """
+    Envía las confirmaciones y recordatorios pendientes por una sola conexión.
+
+    Args:
+        minutos: Anticipación del recordatorio (por defecto
+                 settings.MIPARQUEO_RECORDATORIO_MINUTOS)
+        lote: Mensajes por envío (y por UPDATE de marcado)
+        ahora: Momento de referencia (por defecto timezone.now()); también
+               es la marca con la que esta ejecución reclama cada lote
+
+    Returns:
+        dict: confirmaciones, recordatorios (enviados) y segundos
+
+    Raises:
+        smtplib.SMTPException, OSError: El servidor de correo falló; lo
+            enviado en lotes anteriores ya quedó marcado y el lote que
+            falló quedó pendiente
+    """
+    inicio = time.perf_counter()
+    if minutos is None:
+        minutos = settings.MIPARQUEO_RECORDATORIO_MINUTOS
+    ahora = ahora or timezone.now()
+
+    pendientes = {
+        'confirmacion': _con_datos(confirmaciones_pendientes(ahora)),
+        'recordatorio': _con_datos(recordatorios_pendientes(ahora, minutos)),
+    }
+    enviadas = dict.fromkeys(pendientes, 0)
+    if any(pendientes.values()):
+        # Una conexión para todo (SMTP: un solo login), abierta solo si hay algo que enviar
+        with get_connection() as conexion:
+            for tipo, reservas in pendientes.items():
+                enviadas[tipo] = _enviar(tipo, reservas, conexion, ahora, lote)
+
+    return {
+        'confirmaciones': enviadas['confirmacion'],
+        'recordatorios': enviadas['recordatorio'],
+        'segundos': time.perf_counter() - inicio,
+    }
@@ -0,0 +1,157 @@
+"""
+Parqueadero (sede) en el que trabaja cada petición.
+
+La lista de sedes activas, con los ids de sus vigilantes asignados y sus
+entradas de edificios, cambia muy poco: se cachea completa (core/signals.py
+la invalida) y resolver la sede de una petición no consulta la base de datos.
+
+- Un usuario asignado a una o más sedes (vigilante) solo trabaja en ellas.
+- Los demás (clientes, administradores y vigilantes sin asignar) pueden
+  elegir cualquier sede activa.
+
+La sede elegida se guarda en la sesión; por defecto, la primera por nombre.
+"""
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import EntradaEdificio, Parqueadero
+
+CLAVE_CACHE = 'miparqueo:parqueaderos'
+CLAVE_SESION = 'parqueadero_id'
+TIEMPO_CACHE = 60 * 60
+
+
+COLUMNAS_ENTRADA = ('id', 'parqueadero_id', 'nombre', 'x', 'y')
+
+
+def _con_vigilantes(parqueaderos, asignaciones, entradas):
+    """
+    Agrega a cada sede vigilante_ids (a partir de pares (parqueadero_id,
+    user_id)) y lista_entradas (dicts id, nombre, x, y) y guarda la lista.
+    """
+    por_parqueadero = {}
+    for parqueadero_id, user_id in asignaciones:
+        por_parqueadero.setdefault(parqueadero_id, set()).add(user_id)
+    entradas_por_parqueadero = {}
+    for entrada in entradas:
+        entradas_por_parqueadero.setdefault(entrada.pop('parqueadero_id'), []).append(entrada)
+    for parqueadero in parqueaderos:
+        parqueadero.vigilante_ids = frozenset(por_parqueadero.get(parqueadero.id, ()))
+        parqueadero.lista_entradas = entradas_por_parqueadero.get(parqueadero.id, [])
+    cache.set(CLAVE_CACHE, parqueaderos, TIEMPO_CACHE)
+    return parqueaderos
+
+
+def parqueaderos_activos():
+    """
+    Returns:
+        list: Parqueaderos activos con los atributos extra vigilante_ids
+              (frozenset) y lista_entradas
+    """
+    parqueaderos = cache.get(CLAVE_CACHE)
+    if parqueaderos is None:
+        parqueaderos = _con_vigilantes(
+            list(Parqueadero.objects.filter(activo=True)),
+            Parqueadero.vigilantes.through.objects.values_list('parqueadero_id', 'user_id'),
+            EntradaEdificio.objects.values(*COLUMNAS_ENTRADA),
+        )
+    return parqueaderos
+
+
+async def aparqueaderos_activos():
+    """Versión asíncrona de parqueaderos_activos (ORM async solo si no está en caché)."""
+    parqueaderos = cache.get(CLAVE_CACHE)
+    if parqueaderos is None:
+        asignaciones = Parqueadero.vigilantes.through.objects.values_list('parqueadero_id', 'user_id')
+        parqueaderos = _con_vigilantes(
+            [parqueadero async for parqueadero in Parqueadero.objects.filter(activo=True)],
+            [fila async for fila in asignaciones],
+            [entrada async for entrada in EntradaEdificio.objects.values(*COLUMNAS_ENTRADA)],
+        )
+    return parqueaderos
+
+
+def invalidar_parqueaderos():
+    cache.delete(CLAVE_CACHE)
+
+
+def _permitidos(user, activos):
+    asignados = [parqueadero for parqueadero in activos if user.id in parqueadero.vigilante_ids]
+    return asignados or activos
+
+
+def parqueaderos_permitidos(user):
+    """Sedes en las que puede trabajar el usuario (ver docstring del módulo)."""
+    return _permitidos(user, parqueaderos_activos())
+
+
+def _elegir(request, activos):
+    permitidos = _permitidos(request.user, activos)
+    if not permitidos:
+        raise Http404('No hay parqueaderos activos.')
+    elegido = request.session.get(CLAVE_SESION)
+    request._parqueadero = next((p for p in permitidos if p.id == elegido), permitidos[0])
+    return request._parqueadero
+
+
+def parqueadero_actual(request):
+    """
+    Sede de la petición, memorizada en el request.
+
+    Raises:
+        Http404: Si no hay ninguna sede activa
+    """
+    actual = getattr(request, '_parqueadero', None)
+    return actual if actual is not None else _elegir(request, parqueaderos_activos())
+
+
+async def aparqueadero_actual(request):
+    """
+    Versión asíncrona de parqueadero_actual. La sesión ya debe estar cargada
+    (request.auser() la carga).
+    """
+    actual = getattr(request, '_parqueadero', None)
+    return actual if actual is not None else _elegir(request, await aparqueaderos_activos())
+
+
+def seleccionar(request, parqueadero_id):
+    """
+    Guarda la sede elegida en la sesión.
+
+    Returns:
+        Parqueadero: La sede elegida, o None si el usuario no puede trabajar en ella
+    """
+    for parqueadero in parqueaderos_permitidos(request.user):
+        if parqueadero.id == parqueadero_id:
+            request.session[CLAVE_SESION] = parqueadero.id
+            request._parqueadero = parqueadero
+            return parqueadero
+    return None
+
+
+def entrada_de(parqueadero, entrada_id):
+    """
+    Returns:
+        dict: Entrada de la sede (id, nombre, x, y), o None si no es de la sede
+    """
+    return next((entrada for entrada in parqueadero.lista_entradas if entrada['id'] == entrada_id), None)
+
+
+def contexto(request):
+    """
+    Context processor: sede actual y sedes disponibles para el selector de
+    la barra de navegación. Solo se resuelve si el template lo usa.
+    """
+    if not request.user.is_authenticated:
+        return {}
+
+    def actual():
+        try:
+            return parqueadero_actual(request)
+        except Http404:
+            return None
+
+    return {
+        'parqueadero_actual': actual,
+        'parqueaderos_permitidos': lambda: parqueaderos_permitidos(request.user),
+    }
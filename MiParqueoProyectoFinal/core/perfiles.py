@@ -0,0 +1,99 @@
+"""
+Almacenamiento de los perfiles de peticiones generados por PerfiladoMiddleware.
+Cada perfil son dos archivos en PERFILES_DIR con el mismo identificador:
+- <id>.prof: estadísticas de cProfile (abrir con snakeviz o tuna para la gráfica de llama)
+- <id>.json: metadatos de la petición y traza SQL completa
+"""
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PATRON_IDENTIFICADOR = re.compile(r'^\d{8}T\d{6}_[0-9a-f]{12}$')
+
+EXTENSIONES = {
+    'prof': '.prof',
+    'sql': '.json',
+}
+
+
+def _directorio():
+    directorio = Path(settings.PERFILES_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def guardar_perfil(perfil, registro, metadatos):
+    """
+    Guarda un perfil y su traza SQL, y elimina los más antiguos si se supera
+    PERFILES_MAXIMO.
+
+    Args:
+        perfil: cProfile.Profile ya detenido
+        registro: RegistroConsultas con guardar_sql=True
+        metadatos: dict con los datos de la petición (debe incluir 'id')
+
+    Returns:
+        str: Identificador del perfil
+    """
+    directorio = _directorio()
+    ahora = timezone.localtime()
+    identificador = f"{ahora:%Y%m%dT%H%M%S}_{metadatos['id']}"
+
+    perfil.dump_stats(directorio / f'{identificador}.prof')
+    datos = dict(metadatos, id=identificador, fecha=ahora.isoformat(), **registro.resumen())
+    datos['traza_sql'] = registro.consultas
+    (directorio / f'{identificador}.json').write_text(
+        json.dumps(datos, indent=2, ensure_ascii=False), encoding='utf-8'
+    )
+
+    _rotar(directorio)
+    return identificador
+
+
+def _rotar(directorio):
+    maximo = getattr(settings, 'PERFILES_MAXIMO', 100)
+    perfiles = sorted(directorio.glob('*.prof'), reverse=True)
+    for sobrante in perfiles[maximo:]:
+        sobrante.unlink(missing_ok=True)
+        sobrante.with_suffix('.json').unlink(missing_ok=True)
+
+
+def listar_perfiles():
+    """
+    Returns:
+        list: Metadatos (sin la traza SQL) de los perfiles guardados, del más reciente al más antiguo
+    """
+    directorio = Path(settings.PERFILES_DIR)
+    if not directorio.exists():
+        return []
+
+    perfiles = []
+    for archivo in sorted(directorio.glob('*.json'), reverse=True):
+        try:
+            datos = json.loads(archivo.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        datos.pop('traza_sql', None)
+        perfiles.append(datos)
+    return perfiles
+
+
+def ruta_perfil(identificador, tipo):
+    """
+    Ruta del archivo de un perfil, validando el identificador.
+
+    Args:
+        identificador: Identificador devuelto por guardar_perfil
+        tipo: 'prof' o 'sql'
+
+    Returns:
+        Path: Ruta del archivo, o None si el identificador o el tipo no son válidos
+              o el archivo no existe
+    """
+    if tipo not in EXTENSIONES or not PATRON_IDENTIFICADOR.match(identificador):
+        return None
+    ruta = Path(settings.PERFILES_DIR) / f'{identificador}{EXTENSIONES[tipo]}'
+    return ruta if ruta.exists() else None
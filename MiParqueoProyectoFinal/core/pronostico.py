@@ -0,0 +1,240 @@
+"""
+Pronóstico de demanda horaria por tipo de espacio.
+
+Modelo: línea base estacional (día de la semana x hora) con decaimiento
+exponencial semanal, de modo que las semanas recientes pesan más. El estado
+del modelo son los acumulados de PerfilDemanda; cada actualización solo
+procesa los días nuevos del histórico de reservas (Reserva y
+ReservaHistorica), leídos en streaming y agregados de forma vectorizada
+con NumPy.
+
+NumPy solo se importa al entrenar; las vistas leen PronosticoDemanda.
+"""
+from datetime import timedelta
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .archivo import primera_fecha, reservas_entre
+from .models import EspacioParqueadero, PerfilDemanda, PronosticoDemanda
+
+TIPOS = [tipo for tipo, _ in EspacioParqueadero.TIPO_CHOICES]
+
+# Peso relativo de una semana respecto a la siguiente (0.9 → una semana de
+# hace 3 meses pesa ~25% de la más reciente)
+DECAIMIENTO_SEMANAL = 0.9
+
+DIAS_PRONOSTICO = 7
+
+TAMANO_LOTE = 50000
+
+
+def _extraer_lotes(desde, hasta):
+    """
+    Lee en streaming las reservas entre dos fechas (inclusive) y las entrega
+    en lotes de arreglos NumPy: (índice de día, índice de tipo, hora inicio, hora fin).
+    """
+    import numpy as np
+
+    indice_tipo = {tipo: i for i, tipo in enumerate(TIPOS)}
+    # Tabla caliente y archivo; el archivo solo aporta filas al reentrenar
+    filas = chain.from_iterable(
+        queryset
+        .exclude(estado='CANCELADA')
+        .values_list('fecha', 'espacio__tipo', 'hora_inicio', 'hora_fin')
+        .iterator(chunk_size=TAMANO_LOTE)
+        for queryset in reservas_entre(desde, hasta)
+    )
+
+    lote = []
+    for fecha, tipo, hora_inicio, hora_fin in filas:
+        # Una reserva ocupa cada hora que toca: [09:30, 11:15) → 9, 10 y 11
+        fin = hora_fin.hour + (1 if (hora_fin.minute or hora_fin.second) else 0)
+        lote.append(((fecha - desde).days, indice_tipo[tipo], hora_inicio.hour, fin))
+        if len(lote) >= TAMANO_LOTE:
+            yield np.array(lote, dtype=np.int64).reshape(-1, 4)
+            lote = []
+    if lote:
+        yield np.array(lote, dtype=np.int64).reshape(-1, 4)
+
+
+def calcular_acumulados(desde, hasta):
+    """
+    Agrega la ocupación horaria del periodo por tipo, día de la semana y hora.
+
+    Returns:
+        tuple: (suma, peso) con formas (tipos, 7, 24) y (7,), ponderados con
+               el decaimiento semanal respecto al día `hasta`
+    """
+    import numpy as np
+
+    n_dias = (hasta - desde).days + 1
+    # Arreglo de diferencias: +1 en la hora de inicio, -1 en la de fin;
+    # la suma acumulada sobre las horas da la ocupación de cada hora
+    diferencias = np.zeros((len(TIPOS), n_dias, 25), dtype=np.int64)
+    for lote in _extraer_lotes(desde, hasta):
+        dia, tipo, inicio, fin = lote.T
+        fin = np.clip(fin, 0, 24)
+        validas = fin > inicio
+        np.add.at(diferencias, (tipo[validas], dia[validas], inicio[validas]), 1)
+        np.add.at(diferencias, (tipo[validas], dia[validas], fin[validas]), -1)
+    ocupacion = np.cumsum(diferencias[:, :, :24], axis=2)
+
+    dias = np.arange(n_dias)
+    pesos = DECAIMIENTO_SEMANAL ** ((n_dias - 1 - dias) / 7.0)
+    dia_semana = (desde.weekday() + dias) % 7
+    una_caliente = np.zeros((n_dias, 7))
+    una_caliente[dias, dia_semana] = pesos
+
+    suma = np.einsum('tdh,dk->tkh', ocupacion, una_caliente)
+    peso = una_caliente.sum(axis=0)
+    return suma, peso
+
+
+def _cargar_perfil():
+    """Carga los acumulados guardados como arreglos (suma, peso, procesado_hasta)."""
+    import numpy as np
+
+    suma = np.zeros((len(TIPOS), 7, 24))
+    peso = np.zeros(7)
+    procesado_hasta = None
+    indice_tipo = {tipo: i for i, tipo in enumerate(TIPOS)}
+    for perfil in PerfilDemanda.objects.all():
+        if perfil.tipo not in indice_tipo:
+            continue
+        suma[indice_tipo[perfil.tipo], perfil.dia_semana, perfil.hora] = perfil.suma
+        peso[perfil.dia_semana] = perfil.peso
+        procesado_hasta = perfil.procesado_hasta
+    return suma, peso, procesado_hasta
+
+
+def actualizar_pronostico(reiniciar=False, hoy=None):
+    """
+    Incorpora al modelo los días completos aún no procesados y regenera el
+    pronóstico de los próximos DIAS_PRONOSTICO días.
+
+    Args:
+        reiniciar: Descarta los acumulados y reentrena con todo el histórico
+        hoy: Fecha de referencia (por defecto, la fecha local actual)
+
+    Returns:
+        dict: Resumen con los días procesados y las filas de pronóstico generadas
+    """
+    import numpy as np
+
+    hoy = hoy or timezone.localdate()
+    hasta = hoy - timedelta(days=1)  # solo días completos
+
+    if reiniciar:
+        suma, peso, procesado_hasta = np.zeros((len(TIPOS), 7, 24)), np.zeros(7), None
+    else:
+        suma, peso, procesado_hasta = _cargar_perfil()
+
+    if procesado_hasta is not None:
+        desde = procesado_hasta + timedelta(days=1)
+    else:
+        desde = primera_fecha() or hoy
+
+    dias_procesados = 0
+    if desde <= hasta:
+        nueva_suma, nuevo_peso = calcular_acumulados(desde, hasta)
+        dias_procesados = (hasta - desde).days + 1
+        # Envejecer lo acumulado tantas semanas como días nuevos se agregan
+        factor = DECAIMIENTO_SEMANAL ** (dias_procesados / 7.0)
+        suma = suma * factor + nueva_suma
+        peso = peso * factor + nuevo_peso
+        procesado_hasta = hasta
+
+    # Promedio ponderado por día de la semana; sin historia → 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        base = np.where(peso[None, :, None] > 0, suma / peso[None, :, None], 0.0)
+
+    pronosticos = []
+    for offset in range(DIAS_PRONOSTICO):
+        fecha = hoy + timedelta(days=offset)
+        for t, tipo in enumerate(TIPOS):
+            for hora in range(24):
+                pronosticos.append(PronosticoDemanda(
+                    tipo=tipo,
+                    fecha=fecha,
+                    hora=hora,
+                    demanda=round(float(base[t, fecha.weekday(), hora]), 2),
+                ))
+
+    with transaction.atomic():
+        if reiniciar or dias_procesados:
+            PerfilDemanda.objects.all().delete()
+        if dias_procesados:
+            PerfilDemanda.objects.bulk_create([
+                PerfilDemanda(
+                    tipo=tipo,
+                    dia_semana=dia,
+                    hora=hora,
+                    suma=float(suma[t, dia, hora]),
+                    peso=float(peso[dia]),
+                    procesado_hasta=procesado_hasta,
+                )
+                for t, tipo in enumerate(TIPOS)
+                for dia in range(7)
+                for hora in range(24)
+            ])
+        PronosticoDemanda.objects.all().delete()
+        PronosticoDemanda.objects.bulk_create(pronosticos)
+
+    return {
+        'desde': desde if dias_procesados else None,
+        'hasta': procesado_hasta,
+        'dias_procesados': dias_procesados,
+        'filas_pronostico': len(pronosticos),
+    }
+
+
+def _nivel_demanda(demanda, capacidad):
+    """Clasifica la demanda respecto a la capacidad disponible del tipo."""
+    if capacidad <= 0:
+        return 'alta' if demanda > 0 else 'baja'
+    ocupacion = demanda / capacidad
+    if ocupacion >= 0.9:
+        return 'alta'
+    if ocupacion >= 0.6:
+        return 'media'
+    return 'baja'
+
+
+def obtener_pronostico():
+    """
+    Organiza el pronóstico guardado para mostrarlo en el panel de administración.
+
+    Returns:
+        list: Un dict por tipo con 'tipo', 'capacidad' y 'dias', donde cada
+              día es (fecha, [{'demanda', 'nivel'} por hora])
+    """
+    capacidad = dict(
+        EspacioParqueadero.objects.exclude(estado='BLOQUEADO')
+        .values_list('tipo')
+        .order_by()
+        .annotate(total=Count('id'))
+    )
+
+    por_tipo = {tipo: {} for tipo in TIPOS}
+    for pronostico in PronosticoDemanda.objects.all():
+        horas = por_tipo.setdefault(pronostico.tipo, {}).setdefault(pronostico.fecha, [0.0] * 24)
+        horas[pronostico.hora] = pronostico.demanda
+
+    resultado = []
+    for tipo, dias in por_tipo.items():
+        capacidad_tipo = capacidad.get(tipo, 0)
+        resultado.append({
+            'tipo': tipo,
+            'capacidad': capacidad_tipo,
+            'dias': [
+                (fecha, [
+                    {'demanda': demanda, 'nivel': _nivel_demanda(demanda, capacidad_tipo)}
+                    for demanda in horas
+                ])
+                for fecha, horas in sorted(dias.items())
+            ],
+        })
+    return resultado
@@ -0,0 +1,210 @@
+"""
+Recomendación del espacio libre más cercano a una entrada de edificio.
+
+Cada proceso mantiene, por sede, un índice espacial en memoria: una grilla
+uniforme de celdas de TAMANO_CELDA metros que por cada tipo de espacio
+guarda solo los espacios LIBRES con coordenadas. La búsqueda recorre
+anillos de celdas alrededor de la entrada y se detiene en cuanto ningún
+anillo más lejano puede tener un espacio más cercano; no consulta la base
+de datos.
+
+El índice está ligado a la versión del estado de los espacios de la sede
+(core/cache_espacios.py), la misma de las grillas cacheadas de
+disponibilidad. Cuando la versión cambia (cualquier save/delete de un
+espacio o cambio masivo) el índice lee los espacios libres de la sede y
+aplica solo las diferencias: los que dejaron de estar libres salen de su
+celda, los liberados entran y los que cambiaron de ubicación o tipo se
+mueven. Nunca se reconstruye completo.
+"""
+import math
+import threading
+
+from .cache_espacios import version_espacios
+from .models import EspacioParqueadero
+from .parqueaderos import entrada_de
+
+TAMANO_CELDA = 10.0  # metros
+COLUMNAS = ('id', 'numero', 'tipo', 'zona', 'x', 'y')
+
+_indices = {}
+_cerrojo_indices = threading.Lock()
+
+
+class IndiceEspacial:
+    """
+    Grilla de espacios libres de una sede.
+
+    Attributes:
+        version: Versión de version_espacios con la que se sincronizó
+        espacios: id → (numero, tipo, zona, x, y) de los espacios libres
+                  con coordenadas
+        celdas: tipo → {(cx, cy): set de ids}
+        limites: tipo → [cx mín, cx máx, cy mín, cy máx] de las celdas que
+                 han tenido espacios (solo crece: acota la búsqueda)
+    """
+
+    def __init__(self, tamano_celda=TAMANO_CELDA):
+        self.tamano_celda = tamano_celda
+        self.version = None
+        self.espacios = {}
+        self.celdas = {}
+        self.limites = {}
+        self.cerrojo = threading.Lock()
+
+    def _celda(self, x, y):
+        return int(math.floor(x / self.tamano_celda)), int(math.floor(y / self.tamano_celda))
+
+    def _quitar(self, espacio_id):
+        _numero, tipo, _zona, x, y = self.espacios.pop(espacio_id)
+        self.celdas[tipo][self._celda(x, y)].discard(espacio_id)
+
+    def _agregar(self, espacio_id, datos):
+        _numero, tipo, _zona, x, y = datos
+        self.espacios[espacio_id] = datos
+        cx, cy = self._celda(x, y)
+        limites = self.limites.setdefault(tipo, [cx, cx, cy, cy])
+        limites[0], limites[1] = min(limites[0], cx), max(limites[1], cx)
+        limites[2], limites[3] = min(limites[2], cy), max(limites[3], cy)
+        self.celdas.setdefault(tipo, {}).setdefault((cx, cy), set()).add(espacio_id)
+
+    def sincronizar(self, filas, version):
+        """
+        Aplica las diferencias entre el índice y las filas actuales de la sede.
+
+        Args:
+            filas: Tuplas con COLUMNAS de los espacios libres con coordenadas
+
+        Returns:
+            int: Espacios agregados, quitados o modificados
+        """
+        cambios = 0
+        vistos = set()
+        for espacio_id, *datos in filas:
+            datos = tuple(datos)
+            vistos.add(espacio_id)
+            anterior = self.espacios.get(espacio_id)
+            if anterior == datos:
+                continue
+            if anterior is not None:
+                self._quitar(espacio_id)
+            self._agregar(espacio_id, datos)
+            cambios += 1
+        for espacio_id in self.espacios.keys() - vistos:
+            self._quitar(espacio_id)
+            cambios += 1
+        self.version = version
+        return cambios
+
+    def _anillo(self, cx, cy, radio):
+        """Celdas a distancia de Chebyshev exactamente `radio` de (cx, cy)."""
+        if radio == 0:
+            yield cx, cy
+            return
+        for dx in range(-radio, radio + 1):
+            yield cx + dx, cy - radio
+            yield cx + dx, cy + radio
+        for dy in range(-radio + 1, radio):
+            yield cx - radio, cy + dy
+            yield cx + radio, cy + dy
+
+    def mas_cercano(self, x, y, tipo):
+        """
+        Returns:
+            tuple: (id, distancia en metros) del espacio libre más cercano
+                   del tipo (a igual distancia, el de menor número), o None
+        """
+        celdas = self.celdas.get(tipo)
+        if not celdas or tipo not in self.limites:
+            return None
+        cx, cy = self._celda(x, y)
+        min_cx, max_cx, min_cy, max_cy = self.limites[tipo]
+        radio_maximo = max(cx - min_cx, max_cx - cx, cy - min_cy, max_cy - cy, 0)
+
+        mejor, mejor_clave = None, None
+        for radio in range(radio_maximo + 1):
+            # Todo punto del anillo está al menos a (radio - 1) celdas completas
+            if mejor is not None and mejor_clave[0] <= ((radio - 1) * self.tamano_celda) ** 2:
+                break
+            for celda in self._anillo(cx, cy, radio):
+                for espacio_id in celdas.get(celda, ()):
+                    numero, _tipo, _zona, ex, ey = self.espacios[espacio_id]
+                    clave = ((ex - x) ** 2 + (ey - y) ** 2, numero)
+                    if mejor is None or clave < mejor_clave:
+                        mejor, mejor_clave = espacio_id, clave
+        if mejor is None:
+            return None
+        return mejor, math.sqrt(mejor_clave[0])
+
+
+def _filas(parqueadero_id):
+    return (
+        EspacioParqueadero.objects
+        .filter(parqueadero_id=parqueadero_id, estado='LIBRE', x__isnull=False, y__isnull=False)
+        .order_by()
+        .values_list(*COLUMNAS)
+    )
+
+
+def indice_de(parqueadero_id):
+    """Índice del proceso para la sede (vacío hasta la primera sincronización)."""
+    indice = _indices.get(parqueadero_id)
+    if indice is None:
+        with _cerrojo_indices:
+            indice = _indices.setdefault(parqueadero_id, IndiceEspacial())
+    return indice
+
+
+def recomendar(parqueadero_id, x, y, tipo, version=None):
+    """
+    Espacio libre más cercano al punto (x, y) de la sede.
+
+    Args:
+        tipo: Tipo de espacio (CARRO, MOTO o DISCAPACIDAD)
+        version: Versión de version_espacios ya leída en la petición
+
+    Returns:
+        dict: id, numero, tipo, zona, x, y y distancia (metros), o None si
+              no hay espacios libres del tipo con coordenadas
+    """
+    version = version or version_espacios(parqueadero_id)
+    indice = indice_de(parqueadero_id)
+    with indice.cerrojo:
+        if indice.version != version:
+            # La versión se leyó antes que las filas: un cambio durante la
+            # lectura deja una versión nueva y la siguiente petición resincroniza
+            indice.sincronizar(_filas(parqueadero_id), version)
+        resultado = indice.mas_cercano(x, y, tipo)
+        if resultado is None:
+            return None
+        espacio_id, distancia = resultado
+        numero, tipo, zona, ex, ey = indice.espacios[espacio_id]
+    return {
+        'id': espacio_id,
+        'numero': numero,
+        'tipo': tipo,
+        'zona': zona,
+        'x': ex,
+        'y': ey,
+        'distancia': round(distancia, 1),
+    }
+
+
+def recomendacion_para(parqueadero, entrada_id, tipo='CARRO', version=None):
+    """
+    Recomendación del formulario de disponibilidad (?entrada=&tipo=).
+
+    Returns:
+        dict: entrada, tipo y espacio (None si no hay libres del tipo), o
+              None si la entrada no es de la sede o el tipo no existe
+    """
+    try:
+        entrada = entrada_de(parqueadero, int(entrada_id))
+    except (TypeError, ValueError):
+        return None
+    if entrada is None or tipo not in dict(EspacioParqueadero.TIPO_CHOICES):
+        return None
+    return {
+        'entrada': entrada,
+        'tipo': tipo,
+        'espacio': recomendar(parqueadero.id, entrada['x'], entrada['y'], tipo, version),
+    }
@@ -0,0 +1,64 @@
+"""
+Resolución de roles de usuario.
+Los roles (nombres de grupo) se calculan una sola vez por instancia de
+usuario, y por lo tanto una sola vez por petición, en lugar de consultar
+user.groups en cada vista, template o fila de un listado.
+"""
+ROL_VIGILANTE = 'VIGILANTE'
+
+
+def obtener_roles(user):
+    """
+    Retorna los nombres de los grupos del usuario, memorizados en la instancia.
+    Si los grupos se precargaron con prefetch_related('groups') no se hace
+    ninguna consulta.
+
+    Args:
+        user: Instancia de User (o AnonymousUser)
+
+    Returns:
+        frozenset: Nombres de los grupos del usuario
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        roles = frozenset(grupo.name for grupo in user.groups.all())
+        user._roles = roles
+    return roles
+
+
+async def aobtener_roles(user):
+    """
+    Versión asíncrona de obtener_roles para vistas async: deja los roles
+    memorizados en la instancia, así es_vigilante() y los templates ya no
+    consultan la base de datos.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_roles', None)
+    if roles is None:
+        roles = frozenset([nombre async for nombre in user.groups.values_list('name', flat=True)])
+        user._roles = roles
+    return roles
+
+
+def es_vigilante(user):
+    """Verifica si el usuario pertenece al grupo VIGILANTE."""
+    return ROL_VIGILANTE in obtener_roles(user)
+
+
+def rol_principal(user):
+    """
+    Retorna el rol que determina la navegación del usuario.
+
+    Returns:
+        str: 'admin', 'vigilante' o 'cliente'
+    """
+    if user.is_superuser:
+        return 'admin'
+    if es_vigilante(user):
+        return 'vigilante'
+    return 'cliente'
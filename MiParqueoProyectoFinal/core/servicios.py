@@ -0,0 +1,509 @@
+"""
+Reglas de negocio de las reservas, compartidas por las vistas HTML
+(core/views.py) y la API JSON (core/api.py), y operaciones en lote sobre
+espacios del panel de administración.
+
+Cada operación valida, escribe en una transacción corta y genera el código
+QR cuando esa transacción (o la de quien la llama, como la lista de espera)
+confirma. Los errores de negocio se reportan con ErrorReserva, cuyo
+mensaje se muestra tal cual al usuario.
+"""
+import logging
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import lista_espera, metricas
+from .cache_espacios import invalidar_espacios_tras_escritura
+from .limites import contar_activas, cupo_disponible, olvidar_activas, sumar_activas
+from .models import EspacioParqueadero, Reserva
+from .parqueaderos import parqueaderos_permitidos
+from .utils import generar_qr_reserva
+
+logger = logging.getLogger(__name__)
+
+# Anticipación mínima para modificar una reserva (15 minutos)
+ANTICIPACION_MODIFICAR_S = 900
+
+
+class ErrorReserva(Exception):
+    """
+    Regla de negocio incumplida.
+
+    Attributes:
+        motivo: Etiqueta para la métrica intentos_reserva ('no_disponible',
+                'conflicto', 'cupo'), o None si el intento no se contabiliza
+    """
+
+    def __init__(self, mensaje, motivo=None):
+        super().__init__(mensaje)
+        self.motivo = motivo
+
+
+def _validar_datos(espacio, fecha, hora_inicio, hora_fin, tipo_vehiculo):
+    """Validaciones que no consultan la base de datos."""
+    if espacio.estado != 'LIBRE':
+        raise ErrorReserva('El espacio seleccionado no está disponible.', 'no_disponible')
+    if fecha < date.today():
+        raise ErrorReserva('No se pueden hacer reservas para fechas pasadas.')
+    if hora_inicio >= hora_fin:
+        raise ErrorReserva('La hora de fin debe ser posterior a la hora de inicio.')
+    if tipo_vehiculo == 'CARRO' and espacio.tipo == 'MOTO':
+        raise ErrorReserva('No se puede reservar un espacio de moto para un carro.')
+
+
+def _error_cupo():
+    return ErrorReserva(
+        f'Alcanzó el máximo de {settings.MIPARQUEO_CUPO_RESERVAS} reservas activas. '
+        'Cancele o complete alguna antes de reservar otra.',
+        'cupo',
+    )
+
+
+def _cupo_en_transaccion(usuario):
+    """
+    Reservas que el usuario aún puede crear, contadas dentro de la
+    transacción que va a insertar. En SQLite de producción la transacción
+    ya tiene el bloqueo de escritura (BEGIN IMMEDIATE); en motores con
+    SELECT ... FOR UPDATE se bloquea la fila del usuario. Así una creación
+    simultánea del mismo usuario espera a que esta confirme.
+
+    Returns:
+        int | None: Reservas disponibles, o None sin cupo configurado
+    """
+    cupo = getattr(settings, 'MIPARQUEO_CUPO_RESERVAS', None)
+    if cupo is None:
+        return None
+    if connection.features.has_select_for_update:
+        list(type(usuario).objects.select_for_update().filter(pk=usuario.pk).values_list('pk', flat=True))
+    return max(0, cupo - contar_activas(usuario.id))
+
+
+def _asignar_qr(reservas):
+    """
+    Genera el QR de cada reserva y lo guarda sin pasar por save() (que
+    ejecuta full_clean y consulta las llaves foráneas otra vez).
+    Si falla la generación la reserva queda sin QR.
+    """
+    for reserva in reservas:
+        try:
+            reserva.codigo_qr = generar_qr_reserva(reserva)
+        except Exception:
+            logger.exception('Error al generar el QR de la reserva %s', reserva.pk)
+    con_qr = [reserva for reserva in reservas if reserva.codigo_qr]
+    if len(con_qr) == 1:
+        Reserva.objects.filter(pk=con_qr[0].pk).update(codigo_qr=con_qr[0].codigo_qr)
+    elif con_qr:
+        Reserva.objects.bulk_update(con_qr, ['codigo_qr'])
+
+
+def _asignar_qr_al_confirmar(reservas):
+    """
+    Programa _asignar_qr para cuando confirme la transacción en curso: el
+    archivo no se escribe mientras se tienen los cerrojos y no queda un QR
+    huérfano si se deshace. Sin transacción abierta se ejecuta de inmediato.
+    """
+    if reservas:
+        transaction.on_commit(lambda: _asignar_qr(reservas))
+
+
+def crear_reserva(usuario, espacio, fecha, hora_inicio, hora_fin, tipo_vehiculo, placa):
+    """
+    HU 008 – Crea una reserva y marca el espacio como RESERVADO.
+
+    Returns:
+        Reserva: La reserva creada (con codigo_qr si se pudo generar; si se
+            llama dentro de otra transacción, el QR se asigna cuando esta confirma)
+
+    Raises:
+        ErrorReserva: Espacio no disponible, datos inválidos, cupo de
+            reservas activas agotado o conflicto de horario
+    """
+    _validar_datos(espacio, fecha, hora_inicio, hora_fin, tipo_vehiculo)
+    # Contador en caché: rechazo rápido, sin consulta mientras esté vigente (core/limites.py)
+    if cupo_disponible(usuario.id) == 0:
+        raise _error_cupo()
+
+    # Verificación de cupo y conflictos y escritura en una transacción corta
+    # (BEGIN IMMEDIATE en producción): dos peticiones no pueden reservar el
+    # mismo horario ni pasar juntas el cupo entre la verificación y la creación
+    with transaction.atomic():
+        if _cupo_en_transaccion(usuario) == 0:
+            raise _error_cupo()
+        conflicto = Reserva.objects.filter(
+            espacio=espacio,
+            fecha=fecha,
+            estado='RESERVADA'
+        ).filter(
+            Q(hora_inicio__lt=hora_fin, hora_fin__gt=hora_inicio)
+        ).exists()
+        if conflicto:
+            raise ErrorReserva('Ya existe una reserva en ese horario para este espacio.', 'conflicto')
+
+        reserva = Reserva.objects.create(
+            usuario=usuario,
+            espacio=espacio,
+            fecha=fecha,
+            hora_inicio=hora_inicio,
+            hora_fin=hora_fin,
+            tipo_vehiculo=tipo_vehiculo,
+            placa=placa,
+            estado='RESERVADA'
+        )
+
+        espacio.estado = 'RESERVADO'
+        espacio.save()
+
+    # Código QR fuera de la transacción
+    _asignar_qr_al_confirmar([reserva])
+    metricas.intentos_reserva.labels('creada').inc()
+    return reserva
+
+
+@transaction.atomic
+def cancelar_reserva(reserva):
+    """
+    HU 010 – Cancela una reserva activa y libera su espacio.
+
+    Raises:
+        ErrorReserva: La reserva no está activa o ya inició
+    """
+    if reserva.estado != 'RESERVADA':
+        raise ErrorReserva('Solo se pueden cancelar reservas activas.')
+    if reserva.hora_entrada:
+        raise ErrorReserva('No se puede cancelar una reserva que ya ha iniciado.')
+
+    reserva.estado = 'CANCELADA'
+    reserva.save()
+
+    espacio = reserva.espacio
+    espacio.estado = 'LIBRE'
+    espacio.save()
+    lista_espera.asignar_espacios_liberados([espacio])
+
+
+def validar_modificable(reserva, ahora=None):
+    """
+    Reglas para modificar: reserva activa y faltan más de 15 minutos para su inicio.
+
+    Raises:
+        ErrorReserva: Si la reserva no se puede modificar
+    """
+    if reserva.estado != 'RESERVADA':
+        raise ErrorReserva('Solo se pueden modificar reservas activas.')
+    inicio_reserva = timezone.make_aware(datetime.combine(reserva.fecha, reserva.hora_inicio))
+    if (inicio_reserva - (ahora or timezone.now())).total_seconds() < ANTICIPACION_MODIFICAR_S:
+        raise ErrorReserva('No puede modificar una reserva a menos de 15 minutos de su inicio.')
+
+
+def modificar_reserva(reserva, fecha, hora_inicio, hora_fin):
+    """
+    Cambia fecha y horario de una reserva activa y regenera su QR.
+
+    Raises:
+        ErrorReserva: Reserva no modificable, horario pasado o solapado
+    """
+    ahora = timezone.now()
+    validar_modificable(reserva, ahora)
+
+    if timezone.make_aware(datetime.combine(fecha, hora_inicio)) <= ahora:
+        raise ErrorReserva('La nueva fecha y hora deben ser futuras.')
+
+    with transaction.atomic():
+        # Validar solapamiento (excluyendo la reserva actual)
+        solapamiento = Reserva.objects.filter(
+            espacio_id=reserva.espacio_id,
+            fecha=fecha,
+            estado='RESERVADA'
+        ).exclude(id=reserva.id).filter(
+            Q(hora_inicio__lt=hora_fin) & Q(hora_fin__gt=hora_inicio)
+        ).exists()
+        if solapamiento:
+            raise ErrorReserva('El espacio no está disponible en el nuevo horario seleccionado.')
+
+        reserva.fecha = fecha
+        reserva.hora_inicio = hora_inicio
+        reserva.hora_fin = hora_fin
+        # El recordatorio corresponde al nuevo horario (core/notificaciones.py)
+        reserva.recordatorio_enviado_en = None
+        reserva.save()
+
+    # Regenerar QR con los nuevos datos (fuera de la transacción)
+    _asignar_qr_al_confirmar([reserva])
+    return reserva
+
+
+def crear_reservas_lote(usuario, solicitudes):
+    """
+    Crea varias reservas con un número fijo de consultas: los espacios (solo
+    de las sedes permitidas al usuario) se leen con in_bulk, los conflictos de todo el lote en una sola consulta y las
+    reservas se insertan con bulk_create. Igual que en crear_reserva, cada
+    espacio solo se puede reservar una vez (queda RESERVADO).
+
+    Args:
+        usuario: Dueño de las reservas
+        solicitudes: Lista de dicts con espacio_id, fecha, hora_inicio,
+                     hora_fin, tipo_vehiculo y placa (ya convertidos)
+
+    Returns:
+        list: Por solicitud, en el mismo orden, la Reserva creada o el ErrorReserva
+    """
+    resultados = [None] * len(solicitudes)
+
+    with transaction.atomic():
+        # Contado en la transacción (no con el contador en caché): cada
+        # solicitud del lote necesita saber cuántas quedan
+        restantes = _cupo_en_transaccion(usuario)
+        espacios = EspacioParqueadero.objects.filter(
+            parqueadero__in=parqueaderos_permitidos(usuario)
+        ).in_bulk({s['espacio_id'] for s in solicitudes})
+
+        # Reservas activas que se cruzan con alguna solicitud, en una consulta
+        ocupadas = {}
+        filtro = Q()
+        for s in solicitudes:
+            if s['espacio_id'] in espacios:
+                filtro |= Q(espacio_id=s['espacio_id'], fecha=s['fecha'],
+                            hora_inicio__lt=s['hora_fin'], hora_fin__gt=s['hora_inicio'])
+        if filtro:
+            for espacio_id, fecha, inicio, fin in Reserva.objects.filter(
+                filtro, estado='RESERVADA'
+            ).values_list('espacio_id', 'fecha', 'hora_inicio', 'hora_fin'):
+                ocupadas.setdefault((espacio_id, fecha), []).append((inicio, fin))
+
+        nuevas = []
+        for indice, s in enumerate(solicitudes):
+            espacio = espacios.get(s['espacio_id'])
+            if espacio is None:
+                resultados[indice] = ErrorReserva('El espacio no existe.')
+                continue
+            try:
+                _validar_datos(espacio, s['fecha'], s['hora_inicio'], s['hora_fin'], s['tipo_vehiculo'])
+            except ErrorReserva as e:
+                resultados[indice] = e
+                continue
+            cruces = ocupadas.get((espacio.id, s['fecha']), [])
+            if any(inicio < s['hora_fin'] and fin > s['hora_inicio'] for inicio, fin in cruces):
+                resultados[indice] = ErrorReserva('Ya existe una reserva en ese horario para este espacio.', 'conflicto')
+                continue
+            if restantes is not None:
+                if restantes == 0:
+                    resultados[indice] = _error_cupo()
+                    continue
+                restantes -= 1
+
+            # bulk_create no pasa por save(): la sede se copia del espacio aquí
+            reserva = Reserva(
+                usuario=usuario, espacio=espacio, parqueadero_id=espacio.parqueadero_id, estado='RESERVADA',
+                **{campo: s[campo] for campo in ('fecha', 'hora_inicio', 'hora_fin', 'tipo_vehiculo', 'placa')}
+            )
+            espacio.estado = 'RESERVADO'
+            resultados[indice] = reserva
+            nuevas.append(reserva)
+
+        if nuevas:
+            # bulk_create no emite post_save: el contador del cupo se suma aquí
+            Reserva.objects.bulk_create(nuevas)
+            sumar_activas(usuario.id, len(nuevas))
+            # update() no emite post_save: se invalida la caché de espacios explícitamente
+            EspacioParqueadero.objects.filter(
+                id__in=[reserva.espacio_id for reserva in nuevas]
+            ).update(estado='RESERVADO')
+            invalidar_espacios_tras_escritura(*(reserva.parqueadero_id for reserva in nuevas))
+
+    _asignar_qr_al_confirmar(nuevas)
+    for resultado in resultados:
+        if isinstance(resultado, Reserva):
+            metricas.intentos_reserva.labels('creada').inc()
+        elif resultado.motivo:
+            metricas.intentos_reserva.labels(resultado.motivo).inc()
+    return resultados
+
+
+def cancelar_reservas_lote(usuario, ids):
+    """
+    Cancela varias reservas del usuario con dos UPDATE (reservas y espacios).
+
+    Returns:
+        dict: {id: None si se canceló, o ErrorReserva}
+    """
+    resultados = {}
+    with transaction.atomic():
+        encontradas = {
+            fila[0]: fila for fila in Reserva.objects.filter(
+                usuario=usuario, id__in=ids
+            ).values_list('id', 'estado', 'hora_entrada', 'espacio_id', 'parqueadero_id')
+        }
+        cancelables, espacios, parqueaderos = [], [], set()
+        for reserva_id in ids:
+            fila = encontradas.get(reserva_id)
+            if fila is None:
+                resultados[reserva_id] = ErrorReserva('La reserva no existe.')
+            elif fila[1] != 'RESERVADA':
+                resultados[reserva_id] = ErrorReserva('Solo se pueden cancelar reservas activas.')
+            elif fila[2]:
+                resultados[reserva_id] = ErrorReserva('No se puede cancelar una reserva que ya ha iniciado.')
+            else:
+                resultados[reserva_id] = None
+                cancelables.append(reserva_id)
+                espacios.append(fila[3])
+                parqueaderos.add(fila[4])
+
+        if cancelables:
+            # update() no actualiza auto_now ni emite post_save
+            Reserva.objects.filter(id__in=cancelables).update(
+                estado='CANCELADA', actualizado_en=timezone.now()
+            )
+            EspacioParqueadero.objects.filter(id__in=espacios).update(estado='LIBRE')
+            invalidar_espacios_tras_escritura(*parqueaderos)
+            olvidar_activas(usuario.id)
+            lista_espera.asignar_espacios_liberados(EspacioParqueadero.objects.filter(id__in=espacios))
+    return resultados
+
+
+# ============================================================
+# ESPACIOS EN LOTE (panel de administración)
+# ============================================================
+
+LOTE_ESPACIOS_MAXIMO = 1000
+
+
+class ErrorEspacios(Exception):
+    """Operación en lote sobre espacios rechazada; el mensaje se muestra al administrador."""
+
+
+def crear_espacios_rango(parqueadero, desde, hasta, tipo, estado='LIBRE', omitir_existentes=False):
+    """
+    Crea los espacios numerados desde..hasta (inclusive) de una sede con bulk_create.
+
+    Args:
+        omitir_existentes: Si False, cualquier número ya usado rechaza todo el
+                           rango; si True, solo se crean los que faltan
+
+    Returns:
+        dict: creados (int) y existentes (lista de números ya usados)
+
+    Raises:
+        ErrorEspacios: Rango inválido o números ya usados
+    """
+    if tipo not in dict(EspacioParqueadero.TIPO_CHOICES):
+        raise ErrorEspacios('Tipo de espacio inválido.')
+    if estado not in dict(EspacioParqueadero.ESTADO_CHOICES):
+        raise ErrorEspacios('Estado inválido.')
+    if desde < 1 or hasta < desde:
+        raise ErrorEspacios('El rango debe ir de un número positivo a otro mayor o igual.')
+    if hasta - desde + 1 > LOTE_ESPACIOS_MAXIMO:
+        raise ErrorEspacios(f'Máximo {LOTE_ESPACIOS_MAXIMO} espacios por lote.')
+
+    with transaction.atomic():
+        existentes = sorted(
+            EspacioParqueadero.objects.filter(
+                parqueadero=parqueadero, numero__range=(desde, hasta)
+            ).values_list('numero', flat=True)
+        )
+        if existentes and not omitir_existentes:
+            muestra = ', '.join(str(numero) for numero in existentes[:10])
+            raise ErrorEspacios(
+                f'{len(existentes)} número(s) del rango ya existen ({muestra}'
+                f"{', ...' if len(existentes) > 10 else ''})."
+            )
+
+        usados = set(existentes)
+        nuevos = [
+            EspacioParqueadero(parqueadero=parqueadero, numero=numero, tipo=tipo, estado=estado)
+            for numero in range(desde, hasta + 1) if numero not in usados
+        ]
+        # ignore_conflicts cubre un número creado por otra petición entre la verificación y el INSERT
+        EspacioParqueadero.objects.bulk_create(nuevos, batch_size=500, ignore_conflicts=omitir_existentes)
+        # bulk_create no emite post_save: una sola invalidación para todo el lote
+        invalidar_espacios_tras_escritura(parqueadero.id)
+    return {'creados': len(nuevos), 'existentes': existentes}
+
+
+def cambiar_estado_espacios(parqueadero, espacios, estado):
+    """
+    Cambia el estado de una selección de espacios de una sede con un solo UPDATE.
+
+    - Los espacios con un vehículo adentro (entrada sin salida) no se tocan.
+    - Al bloquear, las reservas pendientes (sin entrada, de hoy en adelante)
+      de esos espacios se cancelan.
+    - Al liberar u ocupar, los espacios con reservas pendientes no se tocan:
+      quedarían reservas sobre un espacio que no figura como reservado.
+    - Los espacios que pasan a LIBRE se ofrecen a la lista de espera en la
+      misma transacción.
+
+    Args:
+        parqueadero: Sede; los espacios de otras sedes se ignoran
+        espacios: QuerySet de EspacioParqueadero (por ids o por rango de números)
+        estado: Estado nuevo
+
+    Returns:
+        dict: actualizados, omitidos_en_uso, omitidos_reservados y
+              reservas_canceladas
+
+    Raises:
+        ErrorEspacios: Estado inválido, selección vacía o demasiado grande
+    """
+    if estado not in dict(EspacioParqueadero.ESTADO_CHOICES):
+        raise ErrorEspacios('Estado inválido.')
+
+    espacios = espacios.filter(parqueadero=parqueadero)
+    with transaction.atomic():
+        seleccionados = espacios.count()
+        if not seleccionados:
+            raise ErrorEspacios('No se seleccionó ningún espacio.')
+        if seleccionados > LOTE_ESPACIOS_MAXIMO:
+            raise ErrorEspacios(f'Máximo {LOTE_ESPACIOS_MAXIMO} espacios por lote.')
+
+        en_uso = set()
+        if estado != 'OCUPADO':
+            en_uso = set(Reserva.objects.filter(
+                espacio__in=espacios,
+                estado='RESERVADA',
+                hora_entrada__isnull=False,
+                hora_salida__isnull=True
+            ).values_list('espacio_id', flat=True))
+        afectados = espacios.exclude(id__in=en_uso)
+        pendientes = Reserva.objects.filter(
+            espacio__in=afectados,
+            estado='RESERVADA',
+            hora_entrada__isnull=True,
+            fecha__gte=date.today()
+        )
+
+        reservados = set()
+        if estado in ('LIBRE', 'OCUPADO'):
+            reservados = set(pendientes.values_list('espacio_id', flat=True))
+            afectados = afectados.exclude(id__in=reservados)
+
+        canceladas = 0
+        if estado == 'BLOQUEADO':
+            # update() no actualiza auto_now ni emite post_save: se descartan
+            # a mano los contadores del cupo de los afectados
+            usuarios = set(pendientes.values_list('usuario_id', flat=True))
+            if usuarios:
+                canceladas = pendientes.update(estado='CANCELADA', actualizado_en=timezone.now())
+                olvidar_activas(*usuarios)
+
+        cambiados = EspacioParqueadero.objects.filter(id__in=afectados.values('id')).exclude(estado=estado)
+        liberados = []
+        if estado == 'LIBRE':
+            # Se leen antes del UPDATE: después ya no se distinguen de los que estaban libres
+            liberados = list(cambiados)
+            cambiados = EspacioParqueadero.objects.filter(id__in=[espacio.id for espacio in liberados])
+        actualizados = cambiados.update(estado=estado)
+        # update() no emite post_save: una sola invalidación para todo el lote
+        invalidar_espacios_tras_escritura(parqueadero.id)
+        if liberados:
+            for espacio in liberados:
+                espacio.estado = 'LIBRE'
+            lista_espera.asignar_espacios_liberados(liberados)
+    return {
+        'actualizados': actualizados,
+        'omitidos_en_uso': len(en_uso),
+        'omitidos_reservados': len(reservados),
+        'reservas_canceladas': canceladas,
+    }
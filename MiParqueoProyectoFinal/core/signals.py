@@ -0,0 +1,45 @@
+"""
+Señales de la aplicación core. Se conectan en CoreConfig.ready().
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache_espacios import invalidar_espacios_tras_escritura
+from .limites import olvidar_activas, sumar_activas
+from .models import EntradaEdificio, EspacioParqueadero, Parqueadero, Reserva
+from .parqueaderos import invalidar_parqueaderos
+
+
+@receiver([post_save, post_delete], sender=EspacioParqueadero)
+def espacio_modificado(sender, instance, **kwargs):
+    """Invalida las grillas cacheadas del parqueadero del espacio."""
+    invalidar_espacios_tras_escritura(instance.parqueadero_id)
+
+
+@receiver([post_save, post_delete], sender=Parqueadero)
+@receiver([post_save, post_delete], sender=EntradaEdificio)
+@receiver(m2m_changed, sender=Parqueadero.vigilantes.through)
+def parqueadero_modificado(sender, **kwargs):
+    """Invalida la lista cacheada de sedes, vigilantes asignados y entradas."""
+    invalidar_parqueaderos()
+
+
+@receiver(post_save, sender=Reserva)
+def reserva_guardada(sender, instance, created, **kwargs):
+    """Mantiene el contador de reservas activas del cupo (core/limites.py)."""
+    if created:
+        if instance.estado == 'RESERVADA':
+            sumar_activas(instance.usuario_id)
+    elif instance.estado != 'RESERVADA':
+        olvidar_activas(instance.usuario_id)
+
+
+@receiver(post_delete, sender=Reserva)
+def reserva_eliminada(sender, instance, **kwargs):
+    """
+    Solo una reserva RESERVADA cuenta en el cupo. Así archivar (que borra
+    por lotes reservas terminadas, ver core/archivo.py) no descarta un
+    contador por fila.
+    """
+    if instance.estado == 'RESERVADA':
+        olvidar_activas(instance.usuario_id)
@@ -1,8 +1,9 @@
 from django import template
-from django.contrib.auth.models import Group
+
+from core.roles import obtener_roles
 
 register = template.Library()
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    return group_name in obtener_roles(user)
@@ -0,0 +1,232 @@
+"""
+Comportamiento de la API JSON v1 (core/api.py): autenticación, reservas
+del usuario (crear, listar con el archivo, cancelar, lotes), paginación por
+cursor, ?campos=, sedes y recomendación de espacio.
+
+Ejecutar con:
+    python manage.py test core.tests_api
+"""
+import json
+import shutil
+import tempfile
+from datetime import date, time as dtime, timedelta
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import EntradaEdificio, EspacioParqueadero, Incidencia, Parqueadero, Reserva, ReservaHistorica
+from .parqueaderos import invalidar_parqueaderos
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_api_media_')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL, MIPARQUEO_LIMITE_USUARIO=None, MIPARQUEO_LIMITE_IP=None)
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manana = date.today() + timedelta(days=1)
+        cls.sede = Parqueadero.objects.create(nombre='Sede API', codigo='api')
+        cls.entrada = EntradaEdificio.objects.create(parqueadero=cls.sede, nombre='Principal', x=0, y=0)
+        cls.espacios = EspacioParqueadero.objects.bulk_create(
+            EspacioParqueadero(parqueadero=cls.sede, numero=i, tipo='CARRO', x=i * 2.5, y=0)
+            for i in range(1, 11)
+        )
+        cls.cliente = User.objects.create_user('api_cliente', password='x')
+        cls.otro = User.objects.create_user('api_otro', password='x')
+        cls.vigilante = User.objects.create_user('api_vigilante', password='x')
+        cls.vigilante.groups.add(Group.objects.get_or_create(name='VIGILANTE')[0])
+        cls.sede.vigilantes.add(cls.vigilante)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        invalidar_parqueaderos()
+        self.client.force_login(self.cliente)
+
+    def _post(self, nombre, datos, *args):
+        return self.client.post(
+            reverse(f'api_v1:{nombre}', args=args), json.dumps(datos), content_type='application/json'
+        )
+
+    def _datos(self, espacio, **cambios):
+        return dict({
+            'espacio_id': espacio.id, 'fecha': self.manana.isoformat(), 'hora_inicio': '08:00',
+            'hora_fin': '10:00', 'tipo_vehiculo': 'CARRO', 'placa': 'abc123',
+        }, **cambios)
+
+    def test_sin_sesion_responde_401_json(self):
+        self.client.logout()
+        respuesta = self.client.get(reverse('api_v1:reservas'))
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertIn('error', respuesta.json())
+
+    def test_metodo_no_permitido(self):
+        respuesta = self.client.delete(reverse('api_v1:reservas'))
+        self.assertEqual(respuesta.status_code, 405)
+        self.assertEqual(respuesta['Allow'], 'GET, POST')
+
+    def test_crear_y_cancelar_reserva(self):
+        respuesta = self._post('reservas', self._datos(self.espacios[0]))
+        self.assertEqual(respuesta.status_code, 201)
+        reserva = respuesta.json()
+        self.assertEqual((reserva['estado'], reserva['placa'], reserva['espacio_numero']), ('RESERVADA', 'ABC123', 1))
+        self.assertEqual(EspacioParqueadero.objects.get(id=self.espacios[0].id).estado, 'RESERVADO')
+
+        # El espacio ya no está libre: regla de negocio → 409
+        self.assertEqual(self._post('reservas', self._datos(self.espacios[0])).status_code, 409)
+
+        respuesta = self._post('reserva_cancelar', {}, reserva['id'])
+        self.assertEqual(respuesta.json()['estado'], 'CANCELADA')
+        self.assertEqual(EspacioParqueadero.objects.get(id=self.espacios[0].id).estado, 'LIBRE')
+
+    def test_errores_de_validacion(self):
+        self.assertEqual(self._post('reservas', self._datos(self.espacios[0], fecha='mañana')).status_code, 400)
+        self.assertEqual(self._post('reservas', self._datos(self.espacios[0], tipo_vehiculo='BUS')).status_code, 400)
+        self.assertEqual(self._post('reservas', self._datos(self.espacios[0], espacio_id=10 ** 6)).status_code, 404)
+        respuesta = self.client.post(reverse('api_v1:reservas'), 'no es json', content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_reservas_ajenas_no_se_ven(self):
+        self.client.force_login(self.otro)
+        reserva_id = self._post('reservas', self._datos(self.espacios[0])).json()['id']
+        self.client.force_login(self.cliente)
+        self.assertEqual(self.client.get(reverse('api_v1:reserva_detalle', args=[reserva_id])).status_code, 404)
+        self.assertEqual(self._post('reserva_cancelar', {}, reserva_id).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_v1:reservas')).json()['resultados'], [])
+
+    def test_listado_pagina_por_cursor_y_mezcla_el_archivo(self):
+        pasado = date.today() - timedelta(days=400)
+        filas = [
+            dict(usuario=self.cliente, espacio=self.espacios[i % 10], parqueadero=self.sede,
+                 fecha=pasado + timedelta(days=i), hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0),
+                 tipo_vehiculo='CARRO', placa='ABC123', estado='COMPLETADA',
+                 creado_en=timezone.now(), actualizado_en=timezone.now())
+            for i in range(12)
+        ]
+        # Ids intercalados entre la tabla caliente y la fría
+        for i, fila in enumerate(filas):
+            modelo = ReservaHistorica if i % 2 else Reserva
+            modelo.objects.bulk_create([modelo(id=i + 1, **fila)])
+
+        vistos, cursor = [], None
+        while True:
+            parametros = {'limite': 5, 'campos': 'estado'}
+            if cursor:
+                parametros['cursor'] = cursor
+            pagina = self.client.get(reverse('api_v1:reservas'), parametros).json()
+            self.assertTrue(all(set(fila) == {'id', 'estado'} for fila in pagina['resultados']))
+            vistos += [fila['id'] for fila in pagina['resultados']]
+            cursor = pagina['siguiente']
+            if cursor is None:
+                break
+        self.assertEqual(vistos, list(range(12, 0, -1)))
+        # El detalle encuentra también las archivadas
+        self.assertEqual(self.client.get(reverse('api_v1:reserva_detalle', args=[2])).json()['id'], 2)
+
+        self.assertEqual(self.client.get(reverse('api_v1:reservas'), {'campos': 'clave'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_v1:reservas'), {'cursor': '%%%'}).status_code, 400)
+
+    def test_lotes_informan_cada_elemento(self):
+        respuesta = self._post('reservas_lote', {'reservas': [
+            self._datos(self.espacios[1]), self._datos(self.espacios[2]),
+            self._datos(self.espacios[3], fecha='2000-01-01'),
+        ]})
+        self.assertEqual(respuesta.status_code, 207)
+        resultados = respuesta.json()['resultados']
+        self.assertEqual(['id' in r for r in resultados], [True, True, False])
+
+        ids = [resultados[0]['id'], resultados[1]['id'], 10 ** 6]
+        respuesta = self._post('reservas_lote_cancelar', {'ids': ids})
+        self.assertEqual(respuesta.status_code, 207)
+        self.assertEqual(['error' in r for r in respuesta.json()['resultados']], [False, False, True])
+        self.assertEqual(Reserva.objects.filter(estado='CANCELADA').count(), 2)
+        self.assertEqual(self._post('reservas_lote', {'reservas': []}).status_code, 400)
+
+    def test_espacios_filtrados_y_recomendado(self):
+        EspacioParqueadero.objects.filter(id=self.espacios[0].id).update(estado='OCUPADO')
+        respuesta = self.client.get(reverse('api_v1:espacios'), {'estado': 'LIBRE', 'limite': 100})
+        self.assertEqual(len(respuesta.json()['resultados']), 9)
+
+        respuesta = self.client.get(reverse('api_v1:espacio_recomendado'), {'entrada_id': self.entrada.id})
+        self.assertEqual(respuesta.status_code, 200)
+        # El más cercano a la entrada está ocupado: se recomienda el siguiente
+        self.assertEqual(respuesta.json()['numero'], 2)
+        respuesta = self.client.get(reverse('api_v1:espacio_recomendado'), {'entrada_id': self.entrada.id, 'tipo': 'MOTO'})
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_v1:espacio_recomendado')).status_code, 400)
+
+    def test_detalles_limitados_a_las_sedes_del_usuario(self):
+        otra = Parqueadero.objects.create(nombre='Sede Ajena', codigo='ajena')
+        espacio_ajeno = EspacioParqueadero.objects.create(parqueadero=otra, numero=1, tipo='CARRO')
+        incidencia_ajena = Incidencia.objects.create(
+            tipo='OTRO', parqueadero=otra, descripcion='Ajena', reportado_por=self.vigilante
+        )
+        incidencia_propia = Incidencia.objects.create(
+            tipo='OTRO', parqueadero=self.sede, descripcion='Propia', reportado_por=self.vigilante
+        )
+        invalidar_parqueaderos()
+
+        def detalle(nombre, objeto):
+            return self.client.get(reverse(f'api_v1:{nombre}', args=[objeto.id]))
+
+        # El vigilante solo trabaja en su sede asignada
+        self.client.force_login(self.vigilante)
+        self.assertEqual(detalle('espacio_detalle', self.espacios[0]).status_code, 200)
+        self.assertEqual(detalle('espacio_detalle', espacio_ajeno).status_code, 404)
+        self.assertEqual(detalle('incidencia_detalle', incidencia_propia).status_code, 200)
+        self.assertEqual(detalle('incidencia_detalle', incidencia_ajena).status_code, 404)
+
+        # Un cliente ve los espacios de cualquier sede activa, no los de una inactiva
+        self.client.force_login(self.cliente)
+        self.assertEqual(detalle('espacio_detalle', espacio_ajeno).status_code, 200)
+        Parqueadero.objects.filter(id=otra.id).update(activo=False)
+        invalidar_parqueaderos()
+        self.assertEqual(detalle('espacio_detalle', espacio_ajeno).status_code, 404)
+
+    def test_crear_reserva_limitada_a_las_sedes_del_usuario(self):
+        otra = Parqueadero.objects.create(nombre='Sede Cerrada', codigo='cerrada')
+        espacio_ajeno = EspacioParqueadero.objects.create(parqueadero=otra, numero=1, tipo='CARRO')
+        invalidar_parqueaderos()
+
+        # El vigilante solo reserva en su sede asignada
+        self.client.force_login(self.vigilante)
+        self.assertEqual(self._post('reservas', self._datos(espacio_ajeno)).status_code, 404)
+
+        # Un cliente reserva en cualquier sede activa, pero no en una inactiva
+        self.client.force_login(self.cliente)
+        Parqueadero.objects.filter(id=otra.id).update(activo=False)
+        invalidar_parqueaderos()
+        respuesta = self._post('reservas', self._datos(espacio_ajeno))
+        self.assertEqual((respuesta.status_code, respuesta.json()['error']), (404, 'El espacio no existe.'))
+        respuesta = self._post('reservas_lote', {'reservas': [
+            self._datos(self.espacios[4]), self._datos(espacio_ajeno, hora_inicio='11:00', hora_fin='12:00'),
+        ]})
+        self.assertEqual(respuesta.status_code, 207)
+        self.assertEqual(respuesta.json()['resultados'][1], {'error': 'El espacio no existe.'})
+
+        # Formulario web: ni se muestra ni se crea
+        url = reverse('cliente_crear_reserva', args=[espacio_ajeno.id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        datos = self._datos(espacio_ajeno)
+        del datos['espacio_id']
+        self.assertEqual(self.client.post(url, datos).status_code, 404)
+        self.assertFalse(Reserva.objects.filter(espacio=espacio_ajeno).exists())
+        self.assertEqual(EspacioParqueadero.objects.get(id=espacio_ajeno.id).estado, 'LIBRE')
+
+    def test_incidencias_solo_vigilantes(self):
+        self.assertEqual(self.client.get(reverse('api_v1:incidencias')).status_code, 403)
+        self.client.force_login(self.vigilante)
+        respuesta = self._post('incidencias', {
+            'tipo': 'OTRO', 'descripcion': 'Luminaria apagada', 'espacio_id': self.espacios[0].id,
+        })
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['reportado_por_username'], 'api_vigilante')
+        self.assertEqual(self._post('incidencias', {'tipo': 'OTRO', 'descripcion': ' '}).status_code, 400)
+        self.assertEqual(Incidencia.objects.count(), 1)
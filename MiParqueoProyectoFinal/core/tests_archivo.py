@@ -0,0 +1,90 @@
+"""
+Archivo de reservas (core/archivo.py y el comando archivar_reservas):
+qué se mueve a ReservaHistorica, por lotes y sin duplicar, y la lectura
+combinada de las dos tablas.
+
+Ejecutar con:
+    python manage.py test core.tests_archivo
+"""
+from datetime import date, time as dtime, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from .archivo import archivar_reservas, historial_usuario, primera_fecha
+from .models import EspacioParqueadero, Parqueadero, Reserva, ReservaHistorica
+
+
+class ArchivoReservasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Archivo', codigo='archivo')
+        cls.espacio = EspacioParqueadero.objects.create(parqueadero=cls.sede, numero=1, tipo='CARRO')
+        cls.cliente = User.objects.create_user('archivo_cliente', password='x')
+        hoy = date.today()
+        cls.antiguas = [
+            cls._reserva(hoy - timedelta(days=200 + i), estado)
+            for i, estado in enumerate(['COMPLETADA', 'CANCELADA', 'VENCIDA'] * 4)
+        ]
+        # Antigua pero aún RESERVADA (no terminó): nunca se archiva
+        cls.sin_terminar = cls._reserva(hoy - timedelta(days=300), 'RESERVADA')
+        cls.recientes = [cls._reserva(hoy - timedelta(days=i), 'COMPLETADA') for i in range(1, 4)]
+
+    @classmethod
+    def _reserva(cls, fecha, estado):
+        reserva = Reserva(
+            usuario=cls.cliente, espacio=cls.espacio, parqueadero=cls.sede, fecha=fecha,
+            hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0), tipo_vehiculo='CARRO', placa='ARC001', estado=estado,
+        )
+        Reserva.objects.bulk_create([reserva])
+        return Reserva.objects.latest('id')
+
+    def test_mueve_solo_las_terminadas_anteriores_al_corte(self):
+        resumen = archivar_reservas(dias=180, lote=5)
+        self.assertEqual((resumen['archivadas'], resumen['lotes'], resumen['pendientes']), (12, 3, False))
+        self.assertEqual(
+            sorted(ReservaHistorica.objects.values_list('id', flat=True)), sorted(r.id for r in self.antiguas)
+        )
+        self.assertEqual(
+            sorted(Reserva.objects.values_list('id', flat=True)),
+            sorted([self.sin_terminar.id] + [r.id for r in self.recientes]),
+        )
+        # Se conservan los campos
+        archivada = ReservaHistorica.objects.get(id=self.antiguas[1].id)
+        self.assertEqual((archivada.estado, archivada.placa, archivada.fecha), ('CANCELADA', 'ARC001', self.antiguas[1].fecha))
+        self.assertIsNotNone(archivada.archivado_en)
+
+    def test_se_puede_interrumpir_y_continuar(self):
+        resumen = archivar_reservas(dias=180, lote=5, maximo_lotes=1)
+        self.assertEqual((resumen['archivadas'], resumen['pendientes']), (5, True))
+        # Una fila ya copiada por una ejecución interrumpida no se duplica ni aborta el lote
+        ReservaHistorica.objects.bulk_create([ReservaHistorica(**{
+            campo.attname: getattr(self.antiguas[-1], campo.attname)
+            for campo in ReservaHistorica._meta.concrete_fields if campo.name != 'archivado_en'
+        })])
+        resumen = archivar_reservas(dias=180, lote=5)
+        self.assertEqual((resumen['archivadas'], resumen['pendientes']), (7, False))
+        self.assertEqual(ReservaHistorica.objects.count(), 12)
+        self.assertEqual(archivar_reservas(dias=180)['archivadas'], 0)
+
+    def test_historial_combina_las_dos_tablas_en_orden(self):
+        antes = [r.id for r in historial_usuario(self.cliente)]
+        archivar_reservas(dias=180)
+        historial = historial_usuario(self.cliente)
+        self.assertEqual([r.id for r in historial], antes)
+        self.assertEqual(
+            [(r.fecha, r.hora_inicio) for r in historial],
+            sorted(((r.fecha, r.hora_inicio) for r in historial), reverse=True),
+        )
+        self.assertEqual(primera_fecha(), self.sin_terminar.fecha)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('archivar_reservas', dias=180, stdout=salida)
+        self.assertIn('[OK] 12 reservas', salida.getvalue())
+        salida = StringIO()
+        call_command('archivar_reservas', dias=180, stdout=salida)
+        self.assertIn('[INFO] No hay reservas terminadas', salida.getvalue())
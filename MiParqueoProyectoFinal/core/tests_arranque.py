@@ -0,0 +1,60 @@
+"""
+Arranque en frío: tiempo desde que inicia el proceso hasta la primera
+petición servida por mi_parqueo.wsgi, contra el presupuesto 'arranque' de
+core/presupuestos_rendimiento.json.
+
+Ejecutar con:
+    python manage.py test core.tests_arranque
+
+Variables de entorno:
+    MIPARQUEO_BENCH_LATENCIA      1 para comprobar los tiempos contra el presupuesto
+                                  (sin ella solo se informan)
+    MIPARQUEO_BENCH_TOLERANCIA    Multiplicador de los presupuestos (por defecto 1.0)
+"""
+import json
+import os
+import statistics
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from mi_parqueo.arranque import medir_arranque
+
+
+RUTA_PRESUPUESTOS = Path(__file__).resolve().parent / 'presupuestos_rendimiento.json'
+COMPROBAR_LATENCIA = os.environ.get('MIPARQUEO_BENCH_LATENCIA') == '1'
+TOLERANCIA = float(os.environ.get('MIPARQUEO_BENCH_TOLERANCIA', 1.0))
+MEDICIONES = 3
+
+
+class ArranqueTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # La primera petición (/login/ anónimo) no consulta la BD; igual se aísla de db.sqlite3
+        with tempfile.TemporaryDirectory() as directorio:
+            entorno = {'MIPARQUEO_BD_NOMBRE': str(Path(directorio) / 'arranque.sqlite3')}
+            cls.mediciones = [medir_arranque(entorno=entorno) for _ in range(MEDICIONES)]
+
+    def test_primera_peticion_dentro_del_presupuesto(self):
+        presupuesto = json.loads(RUTA_PRESUPUESTOS.read_text(encoding='utf-8'))['arranque']
+
+        for medicion in self.mediciones:
+            self.assertEqual(medicion['estado'], '200 OK')
+
+        for clave, limite in presupuesto.items():
+            mediana = statistics.median(m[clave] for m in self.mediciones)
+            print(f'\n   arranque.{clave}: {mediana:.0f} ms (presupuesto {limite} ms)', end='')
+            if not COMPROBAR_LATENCIA:
+                continue
+            self.assertLessEqual(
+                mediana, limite * TOLERANCIA,
+                f'arranque.{clave}: {mediana:.0f} ms > {limite} ms',
+            )
+
+    def test_dependencias_pesadas_diferidas(self):
+        # qrcode/PIL se importan al generar el primer QR y numpy al calcular el pronóstico
+        for medicion in self.mediciones:
+            self.assertEqual(medicion['cargados'], [])
@@ -0,0 +1,84 @@
+"""
+Búsqueda de texto completo de incidencias (core/busqueda.py y la vista
+buscar_incidencias), con FTS5 y con el filtro icontains de respaldo.
+
+Ejecutar con:
+    python manage.py test core.tests_busqueda
+"""
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from django.urls import reverse
+
+from . import busqueda
+from .busqueda import buscar_incidencias, construir_consulta_fts
+from .models import EspacioParqueadero, Incidencia, Parqueadero
+
+
+class BusquedaIncidenciasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Búsqueda', codigo='busqueda')
+        cls.otra_sede = Parqueadero.objects.create(nombre='Sede Otra', codigo='otra')
+        cls.vigilante = User.objects.create_user('busqueda_vigilante', password='x')
+        cls.vigilante.groups.add(Group.objects.get_or_create(name='VIGILANTE')[0])
+        cls.sede.vigilantes.add(cls.vigilante)
+        espacio = EspacioParqueadero.objects.create(parqueadero=cls.sede, numero=1, tipo='CARRO')
+        descripciones = [
+            ('DANIO_ESPACIO', 'Rayón en la señalización del espacio'),
+            ('SIN_RESERVA', 'Vehículo con placa ABC123 sin reserva'),
+            ('OTRO', 'Placa ilegible, rayón en el parachoques y rayón en la puerta'),
+        ] + [('OTRO', f'Reporte rutinario número {i}') for i in range(5)]
+        for tipo, descripcion in descripciones:
+            Incidencia.objects.create(
+                tipo=tipo, parqueadero=cls.sede, espacio=espacio, descripcion=descripcion,
+                reportado_por=cls.vigilante,
+            )
+        Incidencia.objects.create(
+            tipo='OTRO', parqueadero=cls.otra_sede, descripcion='Rayón en otra sede', reportado_por=cls.vigilante,
+        )
+
+    def test_consulta_fts_cita_palabras_y_admite_prefijo(self):
+        self.assertEqual(construir_consulta_fts('placa "ABC1'), '"placa" "ABC1"*')
+        self.assertEqual(construir_consulta_fts(' -*- '), '')
+
+    def test_fts_ordena_por_relevancia_y_resalta(self):
+        self.assertTrue(busqueda.fts_disponible())
+        resultados = buscar_incidencias('rayon', parqueadero_id=self.sede.id)
+        self.assertEqual(len(resultados), 2)
+        # Dos apariciones de la palabra pesan más que una
+        self.assertIn('parachoques', resultados[0].descripcion)
+        self.assertIn('<mark>', resultados[0].fragmento)
+
+    def test_fts_filtra_por_sede_tipo_y_prefijo(self):
+        self.assertEqual(len(buscar_incidencias('rayon')), 3)
+        self.assertEqual(len(buscar_incidencias('rayon', tipo='OTRO', parqueadero_id=self.sede.id)), 1)
+        [incidencia] = buscar_incidencias('placa ABC1', parqueadero_id=self.sede.id)
+        self.assertEqual(incidencia.tipo, 'SIN_RESERVA')
+
+    def test_sin_fts_usa_icontains(self):
+        with mock.patch.object(busqueda, 'fts_disponible', return_value=False):
+            resultados = buscar_incidencias('placa', parqueadero_id=self.sede.id)
+            self.assertEqual(len(resultados), 2)
+            self.assertNotIn('<mark>', resultados[0].fragmento)
+            self.assertEqual(len(buscar_incidencias('placa', limite=1, parqueadero_id=self.sede.id)), 1)
+
+    def test_vista_acota_el_limite(self):
+        self.client.force_login(self.vigilante)
+        url = reverse('buscar_incidencias')
+        for fts in (True, False):
+            with mock.patch.object(busqueda, 'fts_disponible', return_value=fts):
+                respuesta = self.client.get(url, {'q': 'reporte', 'limite': '-1'})
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(len(respuesta.json()['resultados']), 1)
+                respuesta = self.client.get(url, {'q': 'reporte', 'limite': '500'})
+                self.assertEqual(len(respuesta.json()['resultados']), 5)
+                respuesta = self.client.get(url, {'q': 'reporte', 'limite': 'x'})
+                self.assertEqual(len(respuesta.json()['resultados']), 5)
+
+    def test_vista_solo_vigilantes(self):
+        cliente = User.objects.create_user('busqueda_cliente', password='x')
+        self.client.force_login(cliente)
+        self.assertEqual(self.client.get(reverse('buscar_incidencias'), {'q': 'rayon'}).status_code, 403)
@@ -0,0 +1,156 @@
+"""
+Caché de las grillas de espacios (core/cache_espacios.py): la grilla de
+disponibilidad, la de ocupación y conteos_por_estado cambian tras un
+save(), un update() masivo y una transacción (confirmada o revertida), y
+settings exige el caché compartido con varios workers.
+
+Ejecutar con:
+    python manage.py test core.tests_cache_espacios
+"""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .cache_espacios import conteos_por_estado
+from .models import EspacioParqueadero, Parqueadero
+from .parqueaderos import invalidar_parqueaderos
+from .servicios import cambiar_estado_espacios
+
+
+class GrillaEspaciosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Grilla', codigo='grilla')
+        cls.espacios = EspacioParqueadero.objects.bulk_create(
+            EspacioParqueadero(parqueadero=cls.sede, numero=i, tipo='CARRO') for i in range(1, 5)
+        )
+        cls.cliente = User.objects.create_user('grilla_cliente', password='x')
+        cls.vigilante = User.objects.create_user('grilla_vigilante', password='x')
+        cls.vigilante.groups.add(Group.objects.get_or_create(name='VIGILANTE')[0])
+        cls.sede.vigilantes.add(cls.vigilante)
+
+    def setUp(self):
+        cache.clear()
+        invalidar_parqueaderos()
+
+    def _reservables(self):
+        """Espacios con el botón Reservar en la grilla del cliente."""
+        self.client.force_login(self.cliente)
+        contenido = self.client.get(reverse('cliente_disponibilidad')).content.decode()
+        return {e.numero for e in self.espacios if reverse('cliente_crear_reserva', args=[e.id]) in contenido}
+
+    def _ocupacion(self):
+        self.client.force_login(self.vigilante)
+        contexto = self.client.get(reverse('vigilante_ocupacion')).context
+        return contexto['libres'], contexto['ocupados']
+
+    def _cacheada(self):
+        """Primera visita llena el caché; la segunda ya no consulta los espacios."""
+        self.assertEqual(self._reservables(), {1, 2, 3, 4})
+        self.assertEqual(self._ocupacion(), (4, 0))
+        with CaptureQueriesContext(connection) as consultas:
+            self._reservables()
+        self.assertFalse(any('core_espacioparqueadero' in c['sql'] for c in consultas.captured_queries))
+
+    def test_save_fuera_de_transaccion(self):
+        self._cacheada()
+        espacio = EspacioParqueadero.objects.get(numero=1)
+        espacio.estado = 'OCUPADO'
+        espacio.save()
+        self.assertEqual(self._reservables(), {2, 3, 4})
+        self.assertEqual(self._ocupacion(), (3, 1))
+        self.assertEqual(conteos_por_estado(self.sede.id)['OCUPADO'], 1)
+
+    def test_save_dentro_de_transaccion(self):
+        self._cacheada()
+        with transaction.atomic():
+            espacio = EspacioParqueadero.objects.get(numero=2)
+            espacio.estado = 'BLOQUEADO'
+            espacio.save()
+            # La misma transacción ya ve su cambio
+            self.assertEqual(self._reservables(), {1, 3, 4})
+        self.assertEqual(self._reservables(), {1, 3, 4})
+        self.assertEqual(conteos_por_estado(self.sede.id)['BLOQUEADO'], 1)
+
+    def test_update_masivo(self):
+        self._cacheada()
+        cambiar_estado_espacios(self.sede, EspacioParqueadero.objects.filter(numero__in=[3, 4]), 'OCUPADO')
+        self.assertEqual(self._reservables(), {1, 2})
+        self.assertEqual(self._ocupacion(), (2, 2))
+
+    def test_transaccion_revertida_no_deja_el_estado_nuevo(self):
+        self._cacheada()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    EspacioParqueadero.objects.filter(numero=1).update(estado='OCUPADO')
+                    espacio = EspacioParqueadero.objects.get(numero=4)
+                    espacio.estado = 'OCUPADO'
+                    espacio.save()
+                    raise RuntimeError('falla después de escribir')
+            except RuntimeError:
+                pass
+        # La invalidación al confirmar nunca corre
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self._reservables(), {1, 2, 3, 4})
+        self.assertEqual(self._ocupacion(), (4, 0))
+
+    def test_lectura_dentro_de_transaccion_revertida(self):
+        self._cacheada()
+        with transaction.atomic():
+            espacio = EspacioParqueadero.objects.get(numero=1)
+            espacio.estado = 'OCUPADO'
+            espacio.save()
+            try:
+                with transaction.atomic():
+                    espacio = EspacioParqueadero.objects.get(numero=2)
+                    espacio.estado = 'OCUPADO'
+                    espacio.save()
+                    self.assertEqual(self._reservables(), {3, 4})
+                    raise RuntimeError('falla el savepoint')
+            except RuntimeError:
+                pass
+            # El savepoint revertido no deja su estado; la escritura externa sigue vigente
+            self.assertEqual(self._reservables(), {2, 3, 4})
+            self.assertEqual(self._ocupacion(), (3, 1))
+            transaction.set_rollback(True)
+        # Lo que se cacheó dentro de la transacción revertida no se vuelve a ver
+        self.assertEqual(self._reservables(), {1, 2, 3, 4})
+        self.assertEqual(self._ocupacion(), (4, 0))
+
+    def test_invalidacion_al_confirmar(self):
+        self._cacheada()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                espacio = EspacioParqueadero.objects.get(numero=3)
+                espacio.estado = 'RESERVADO'
+                espacio.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._reservables(), {1, 2, 4})
+        self.assertEqual(self._ocupacion(), (3, 0))
+
+
+class CacheCompartidoTest(SimpleTestCase):
+
+    def _arrancar(self, **entorno):
+        entorno = {k: v for k, v in os.environ.items() if k not in ('MIPARQUEO_CACHE', 'WEB_CONCURRENCY')} | entorno
+        return subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup()'],
+            cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True, timeout=60,
+        )
+
+    def test_varios_workers_exigen_cache_compartido(self):
+        proceso = self._arrancar(WEB_CONCURRENCY='4')
+        self.assertNotEqual(proceso.returncode, 0)
+        self.assertIn('WEB_CONCURRENCY > 1 requiere MIPARQUEO_CACHE=archivos', proceso.stderr)
+        self.assertEqual(self._arrancar(WEB_CONCURRENCY='4', MIPARQUEO_CACHE='archivos').returncode, 0)
+        self.assertEqual(self._arrancar(WEB_CONCURRENCY='1').returncode, 0)
@@ -0,0 +1,81 @@
+"""
+Reproducibilidad de generar_datos_carga: con la misma semilla y la misma
+--referencia los datos son idénticos, y la hora de referencia solo cambia
+el estado de las reservas, no la secuencia aleatoria. Además, reparto de
+reservas por día y fechas de las incidencias.
+
+Ejecutar con:
+    python manage.py test core.tests_datos_carga
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import EspacioParqueadero, Incidencia, Parqueadero, Reserva
+
+
+class GenerarDatosCargaTest(TestCase):
+
+    def _generar(self, referencia):
+        Reserva.objects.all().delete()
+        Incidencia.objects.all().delete()
+        EspacioParqueadero.objects.all().delete()
+        Parqueadero.objects.all().delete()
+        User.objects.filter(username__startswith='repro_').delete()
+        call_command(
+            'generar_datos_carga', usuarios=20, vigilantes=2, espacios=30, reservas=600, incidencias=10,
+            dias=10, semilla=7, prefijo='repro', referencia=referencia, stdout=StringIO(),
+        )
+        return list(Reserva.objects.order_by('id').values_list(
+            'usuario__username', 'espacio__numero', 'fecha', 'hora_inicio', 'hora_fin', 'placa',
+            'estado', 'hora_entrada', 'hora_salida',
+        ))
+
+    def test_misma_semilla_y_referencia_generan_los_mismos_datos(self):
+        primera = self._generar('2025-03-05T12:00')
+        self.assertGreater(len(primera), 500)
+        self.assertEqual(self._generar('2025-03-05T12:00'), primera)
+
+    def test_la_referencia_solo_cambia_estados(self):
+        manana = self._generar('2025-03-05T06:00')
+        tarde = self._generar('2025-03-05T18:00')
+        self.assertEqual([r[:6] for r in manana], [r[:6] for r in tarde])
+        estados = {r[6] for r in tarde if r[2].isoformat() == '2025-03-05'}
+        self.assertGreater(len(estados), 1)
+        self.assertNotEqual(manana, tarde)
+
+    def test_referencia_invalida(self):
+        with self.assertRaisesMessage(CommandError, '--referencia'):
+            call_command('generar_datos_carga', referencia='mañana', stdout=StringIO())
+
+    def test_reparte_el_resto_entre_los_primeros_dias(self):
+        # Espacios de sobra: ningún sorteo choca y cada día recibe exactamente su cuota
+        call_command(
+            'generar_datos_carga', usuarios=5, vigilantes=1, espacios=400, reservas=53, incidencias=0,
+            dias=10, semilla=3, prefijo='reparto', referencia='2025-03-05T12:00', stdout=StringIO(),
+        )
+        por_dia = Counter(Reserva.objects.values_list('fecha', flat=True))
+        fechas = [date(2025, 3, 5) + timedelta(days=d) for d in range(-10, 8)]
+        pesos = [3 if f.weekday() < 5 else 1 for f in fechas]
+        cuotas = [53 * peso // sum(pesos) for peso in pesos]
+        resto = 53 - sum(cuotas)
+        self.assertGreater(resto, 0)
+        self.assertEqual(sum(por_dia.values()), 53)
+        self.assertEqual([por_dia[f] - cuota for f, cuota in zip(fechas, cuotas)], [1] * resto + [0] * (18 - resto))
+
+    def test_incidencias_repartidas_en_el_historico(self):
+        call_command(
+            'generar_datos_carga', usuarios=5, vigilantes=2, espacios=20, reservas=0, incidencias=200,
+            dias=30, semilla=5, prefijo='incid', referencia='2025-03-05T12:00', stdout=StringIO(),
+        )
+        referencia = timezone.make_aware(datetime(2025, 3, 5, 12, 0))
+        fechas = [timezone.localtime(f) for f in Incidencia.objects.values_list('fecha_hora', flat=True)]
+        self.assertEqual(len(fechas), 200)
+        self.assertTrue(all(referencia - timedelta(days=31) < f < referencia for f in fechas))
+        self.assertGreater(len({f.date() for f in fechas}), 20)
+        self.assertTrue(all(6 <= f.hour < 22 for f in fechas))
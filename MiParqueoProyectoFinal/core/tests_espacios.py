@@ -0,0 +1,158 @@
+"""
+Administración de espacios por lotes (crear_espacios_rango y
+cambiar_estado_espacios de core/servicios.py, y sus vistas del panel).
+
+Ejecutar con:
+    python manage.py test core.tests_espacios
+"""
+import shutil
+import tempfile
+from datetime import date, time as dtime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import lista_espera
+from .models import EspacioParqueadero, Parqueadero, Reserva, SolicitudEspera
+from .parqueaderos import invalidar_parqueaderos
+from .servicios import ErrorEspacios, cambiar_estado_espacios, crear_espacios_rango
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_espacios_media_')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL)
+class EspaciosLoteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Lote', codigo='lote')
+        cls.otra_sede = Parqueadero.objects.create(nombre='Sede Vecina', codigo='vecina')
+        cls.admin = User.objects.create_superuser('lote_admin', password='x')
+        cls.cliente = User.objects.create_user('lote_cliente', password='x')
+        crear_espacios_rango(cls.sede, 1, 20, 'CARRO')
+        crear_espacios_rango(cls.otra_sede, 1, 20, 'MOTO')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        invalidar_parqueaderos()
+
+    def _espacio(self, numero, sede=None):
+        return EspacioParqueadero.objects.get(parqueadero=sede or self.sede, numero=numero)
+
+    def _reserva(self, numero, fecha, **campos):
+        return Reserva.objects.create(
+            usuario=self.cliente, espacio=self._espacio(numero), fecha=fecha, hora_inicio=dtime(8, 0),
+            hora_fin=dtime(9, 0), tipo_vehiculo='CARRO', placa='LOT001', **campos
+        )
+
+    def test_crear_rango_rechaza_o_omite_existentes(self):
+        with self.assertRaisesMessage(ErrorEspacios, '5 número(s) del rango ya existen'):
+            crear_espacios_rango(self.sede, 16, 25, 'CARRO')
+        resumen = crear_espacios_rango(self.sede, 16, 25, 'MOTO', omitir_existentes=True)
+        self.assertEqual((resumen['creados'], resumen['existentes']), (5, [16, 17, 18, 19, 20]))
+        self.assertEqual(self._espacio(25).tipo, 'MOTO')
+        self.assertEqual(self._espacio(20).tipo, 'CARRO')
+        with self.assertRaises(ErrorEspacios):
+            crear_espacios_rango(self.sede, 10, 5, 'CARRO')
+
+    def test_bloquear_cancela_pendientes_y_respeta_vehiculos_adentro(self):
+        manana = date.today() + timedelta(days=1)
+        pendiente = self._reserva(1, manana)
+        adentro = self._reserva(2, date.today(), hora_entrada=dtime(7, 55))
+        espacios = EspacioParqueadero.objects.filter(numero__range=(1, 5))
+
+        resumen = cambiar_estado_espacios(self.sede, espacios, 'BLOQUEADO')
+        self.assertEqual(resumen, {
+            'actualizados': 4, 'omitidos_en_uso': 1, 'omitidos_reservados': 0, 'reservas_canceladas': 1,
+        })
+        pendiente.refresh_from_db()
+        adentro.refresh_from_db()
+        self.assertEqual((pendiente.estado, adentro.estado), ('CANCELADA', 'RESERVADA'))
+        # El espacio con el vehículo adentro conserva su estado
+        self.assertEqual(self._espacio(2).estado, 'LIBRE')
+        # Los espacios con el mismo número en otra sede no se tocan
+        self.assertEqual(self._espacio(1, self.otra_sede).estado, 'LIBRE')
+
+    def test_liberar_u_ocupar_omite_espacios_con_reservas_pendientes(self):
+        manana = date.today() + timedelta(days=1)
+        EspacioParqueadero.objects.filter(parqueadero=self.sede, numero__range=(1, 4)).update(estado='RESERVADO')
+        pendiente = self._reserva(1, manana)
+        # Reservas ya terminadas o canceladas no impiden el cambio
+        self._reserva(2, date.today() - timedelta(days=1))
+        self._reserva(3, manana, estado='CANCELADA')
+        espacios = EspacioParqueadero.objects.filter(numero__range=(1, 4))
+
+        for estado in ('LIBRE', 'OCUPADO'):
+            resumen = cambiar_estado_espacios(self.sede, espacios, estado)
+            self.assertEqual((resumen['actualizados'], resumen['omitidos_reservados']), (3, 1))
+            self.assertEqual(self._espacio(1).estado, 'RESERVADO')
+            self.assertEqual(self._espacio(4).estado, estado)
+        pendiente.refresh_from_db()
+        self.assertEqual(pendiente.estado, 'RESERVADA')
+
+        self.client.force_login(self.admin)
+        respuesta = self.client.post(
+            reverse('admin_espacios_estado_lote'), {'desde': '1', 'hasta': '4', 'estado': 'LIBRE'}, follow=True
+        )
+        self.assertContains(respuesta, '1 espacios con reservas pendientes no se modificaron')
+
+    @override_settings(MIPARQUEO_CUPO_RESERVAS=None)
+    def test_liberar_asigna_la_lista_de_espera(self):
+        lista_espera._colas.clear()
+        manana = date.today() + timedelta(days=1)
+        EspacioParqueadero.objects.filter(parqueadero=self.sede, numero__range=(1, 3)).update(estado='BLOQUEADO')
+        solicitud = SolicitudEspera.objects.create(
+            usuario=self.cliente, parqueadero=self.sede, tipo_espacio='CARRO', fecha=manana,
+            hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0), tipo_vehiculo='CARRO', placa='ESP001',
+        )
+        SolicitudEspera.objects.create(
+            usuario=self.cliente, parqueadero=self.otra_sede, tipo_espacio='MOTO', fecha=manana,
+            hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0), tipo_vehiculo='MOTO', placa='ESP002',
+        )
+
+        # Espacios ya libres no cuentan como liberados
+        cambiar_estado_espacios(self.sede, EspacioParqueadero.objects.filter(numero__range=(4, 6)), 'LIBRE')
+        self.assertFalse(Reserva.objects.exists())
+
+        resumen = cambiar_estado_espacios(self.sede, EspacioParqueadero.objects.filter(numero__range=(1, 3)), 'LIBRE')
+        self.assertEqual(resumen['actualizados'], 3)
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.estado, 'ASIGNADA')
+        reserva = Reserva.objects.get()
+        self.assertEqual((reserva.usuario, reserva.espacio.parqueadero, reserva.fecha), (self.cliente, self.sede, manana))
+        self.assertEqual(reserva.espacio.estado, 'RESERVADO')
+        # La solicitud de la otra sede sigue esperando
+        self.assertEqual(SolicitudEspera.objects.filter(estado='ESPERANDO').count(), 1)
+
+    def test_vista_por_rango_y_por_seleccion(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin_espacios_estado_lote')
+        respuesta = self.client.post(url, {'desde': '3', 'hasta': '6', 'estado': 'BLOQUEADO'}, follow=True)
+        self.assertContains(respuesta, '4 espacios actualizados.')
+        ids = [self._espacio(n).id for n in (3, 4)]
+        self.client.post(url, {'espacios': ids, 'estado': 'LIBRE'})
+        estados = dict(EspacioParqueadero.objects.filter(parqueadero=self.sede, numero__range=(3, 6)).values_list('numero', 'estado'))
+        self.assertEqual(estados, {3: 'LIBRE', 4: 'LIBRE', 5: 'BLOQUEADO', 6: 'BLOQUEADO'})
+
+        respuesta = self.client.post(url, {'desde': 'a', 'hasta': '6', 'estado': 'LIBRE'}, follow=True)
+        self.assertContains(respuesta, 'El rango debe ser numérico.')
+        respuesta = self.client.post(url, {'estado': 'LIBRE'}, follow=True)
+        self.assertContains(respuesta, 'No se seleccionó ningún espacio.')
+
+    def test_vista_crear_lote(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.post(
+            reverse('admin_espacios_crear_lote'), {'desde': '21', 'hasta': '30', 'tipo': 'DISCAPACIDAD'}, follow=True
+        )
+        self.assertContains(respuesta, '10 espacios creados (21 a 30).')
+        self.assertEqual(EspacioParqueadero.objects.filter(parqueadero=self.sede, tipo='DISCAPACIDAD').count(), 10)
+
+    def test_solo_superusuarios(self):
+        self.client.force_login(self.cliente)
+        self.client.post(reverse('admin_espacios_estado_lote'), {'desde': '1', 'hasta': '20', 'estado': 'BLOQUEADO'})
+        self.assertFalse(EspacioParqueadero.objects.filter(estado='BLOQUEADO').exists())
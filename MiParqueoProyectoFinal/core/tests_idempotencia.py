@@ -0,0 +1,189 @@
+"""
+Claves de idempotencia (core/idempotencia.py) sobre POST /api/v1/reservas/:
+repetición de la respuesta guardada, clave reutilizada con otro cuerpo,
+reintento mientras la original sigue en proceso y respuestas que no se
+guardan (429 y 5xx). Además, los formularios de portería (entrada y
+salida) envían su clave y un doble envío se registra una sola vez.
+
+Ejecutar con:
+    python manage.py test core.tests_idempotencia
+"""
+import hashlib
+import json
+import re
+import shutil
+import tempfile
+from datetime import date, time as dtime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import api, views
+from .idempotencia import CLAVE_CERROJO
+from .models import EspacioParqueadero, Parqueadero, Reserva
+from .parqueaderos import invalidar_parqueaderos
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_idempotencia_media_')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL, MIPARQUEO_LIMITE_USUARIO=None, MIPARQUEO_LIMITE_IP=None)
+class IdempotenciaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        sede = Parqueadero.objects.create(nombre='Sede Idempotencia', codigo='idempotencia')
+        cls.espacios = EspacioParqueadero.objects.bulk_create(
+            EspacioParqueadero(parqueadero=sede, numero=i, tipo='CARRO') for i in range(1, 4)
+        )
+        cls.cliente = User.objects.create_user('idem_cliente', password='x')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        caches['idempotencia'].clear()
+        cache.clear()
+        self.client.force_login(self.cliente)
+
+    def _crear(self, clave, espacio=None, cliente=None):
+        datos = {
+            'espacio_id': (espacio or self.espacios[0]).id,
+            'fecha': (date.today() + timedelta(days=1)).isoformat(),
+            'hora_inicio': '08:00', 'hora_fin': '10:00', 'tipo_vehiculo': 'CARRO', 'placa': 'IDE001',
+        }
+        return (cliente or self.client).post(
+            reverse('api_v1:reservas'), json.dumps(datos), content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def test_reintento_repite_la_respuesta_guardada(self):
+        primera = self._crear('clave-1')
+        self.assertEqual(primera.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', primera)
+
+        repetida = self._crear('clave-1')
+        self.assertEqual(repetida.status_code, 201)
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetida.json(), primera.json())
+        self.assertEqual(Reserva.objects.count(), 1)
+
+    def test_misma_clave_con_otro_cuerpo_responde_422(self):
+        self.assertEqual(self._crear('clave-2').status_code, 201)
+        respuesta = self._crear('clave-2', espacio=self.espacios[1])
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertIn('error', respuesta.json())
+        self.assertEqual(Reserva.objects.count(), 1)
+
+    @override_settings(MIPARQUEO_IDEMPOTENCIA_ESPERA=0.2)
+    def test_clave_en_proceso_responde_409(self):
+        # Otra petición con la misma clave tiene el cerrojo y aún no responde
+        clave = hashlib.sha256(b'clave-3').hexdigest()
+        caches['idempotencia'].add(CLAVE_CERROJO.format(self.cliente.id, clave), 1, 60)
+        respuesta = self._crear('clave-3')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta['Retry-After'], '1')
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_no_guarda_429(self):
+        with override_settings(MIPARQUEO_LIMITE_USUARIO=(1, 1)):
+            self.assertEqual(self._crear('clave-4a').status_code, 201)
+            self.assertEqual(self._crear('clave-4b', espacio=self.espacios[1]).status_code, 429)
+        # Con fichas de nuevo, el reintento se ejecuta en vez de repetir el 429
+        respuesta = self._crear('clave-4b', espacio=self.espacios[1])
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', respuesta)
+
+    def test_no_guarda_5xx(self):
+        crear = api.crear_reserva
+        llamadas = []
+
+        def falla_la_primera(*args, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 1:
+                raise RuntimeError('base de datos no disponible')
+            return crear(*args, **kwargs)
+
+        cliente = Client(raise_request_exception=False)
+        cliente.force_login(self.cliente)
+        with mock.patch.object(api, 'crear_reserva', side_effect=falla_la_primera):
+            with self.assertLogs('django.request', 'ERROR'):
+                self.assertEqual(self._crear('clave-5', cliente=cliente).status_code, 500)
+            respuesta = self._crear('clave-5', cliente=cliente)
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', respuesta)
+        self.assertEqual(len(llamadas), 2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL)
+class PorteriaIdempotenciaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Portería', codigo='porteria')
+        cls.vigilante = User.objects.create_user('idem_vigilante', password='x')
+        cls.vigilante.groups.add(Group.objects.get_or_create(name='VIGILANTE')[0])
+        cls.sede.vigilantes.add(cls.vigilante)
+        cliente = User.objects.create_user('idem_porteria', password='x')
+        espacios = EspacioParqueadero.objects.bulk_create(
+            EspacioParqueadero(parqueadero=cls.sede, numero=i, tipo='CARRO', estado='RESERVADO') for i in (1, 2)
+        )
+        Reserva.objects.bulk_create(
+            Reserva(
+                usuario=cliente, espacio=espacio, parqueadero=cls.sede, fecha=date.today(),
+                hora_inicio=dtime(0, 0), hora_fin=dtime(23, 59), tipo_vehiculo='CARRO', placa=placa,
+            )
+            for espacio, placa in zip(espacios, ('POR001', 'POR002'))
+        )
+        cls.reservas = list(Reserva.objects.filter(parqueadero=cls.sede).order_by('placa'))
+
+    def setUp(self):
+        caches['idempotencia'].clear()
+        invalidar_parqueaderos()
+        self.client.force_login(self.vigilante)
+
+    @staticmethod
+    def _claves(respuesta):
+        return re.findall(r'name="clave_idempotencia"\s+value="([^"]+)"', respuesta.content.decode())
+
+    def _dos_veces(self, url, clave):
+        primera = self.client.post(url, {'clave_idempotencia': clave})
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self.client.post(url, {'clave_idempotencia': clave})
+        self.assertNotIn('Idempotent-Replayed', primera)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual((segunda.status_code, segunda['Location']), (primera.status_code, primera['Location']))
+        self.assertFalse([c['sql'] for c in consultas.captured_queries if c['sql'].startswith('UPDATE')])
+
+    def test_entrada_enviada_dos_veces(self):
+        reserva = self.reservas[0]
+        formulario = self.client.post(reverse('vigilante_validar_placa'), {'placa': reserva.placa})
+        self.assertContains(formulario, reverse('vigilante_registrar_entrada', args=[reserva.id]))
+        [clave] = self._claves(formulario)
+
+        self._dos_veces(reverse('vigilante_registrar_entrada', args=[reserva.id]), clave)
+        reserva.refresh_from_db()
+        self.assertIsNotNone(reserva.hora_entrada)
+        self.assertEqual(reserva.espacio.estado, 'OCUPADO')
+
+    def test_salida_enviada_dos_veces(self):
+        Reserva.objects.filter(parqueadero=self.sede).update(hora_entrada=dtime(7, 0))
+        listado = self.client.get(reverse('vigilante_salida'))
+        # Una clave distinta por reserva del listado
+        claves = {int(clave.rsplit('-', 1)[1]): clave for clave in self._claves(listado)}
+        self.assertEqual(sorted(claves), [r.id for r in self.reservas])
+        self.assertEqual(len(set(claves.values())), 2)
+
+        reserva = self.reservas[0]
+        with mock.patch.object(views, 'asignar_espacios_liberados', wraps=views.asignar_espacios_liberados) as asignar:
+            self._dos_veces(reverse('vigilante_registrar_salida', args=[reserva.id]), claves[reserva.id])
+        self.assertEqual(asignar.call_count, 1)
+        reserva.refresh_from_db()
+        self.assertEqual((reserva.estado, reserva.espacio.estado), ('COMPLETADA', 'LIBRE'))
+        self.assertEqual(Reserva.objects.get(id=self.reservas[1].id).estado, 'RESERVADA')
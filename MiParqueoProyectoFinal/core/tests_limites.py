@@ -0,0 +1,147 @@
+"""
+Cupo de reservas activas por usuario (core/limites.py): qué reservas
+cuentan, cuándo se descarta el contador en caché y que dos creaciones
+simultáneas no lo exceden.
+
+Ejecutar con:
+    python manage.py test core.tests_limites
+"""
+import shutil
+import tempfile
+from datetime import date, time as dtime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from . import limites, servicios
+from .archivo import archivar_reservas
+from .limites import CLAVE_ACTIVAS, reservas_activas
+from .models import EspacioParqueadero, Parqueadero, Reserva
+from .servicios import cambiar_estado_espacios
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_limites_media_')
+
+
+class CupoReservasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Cupo', codigo='cupo')
+        cls.espacio = EspacioParqueadero.objects.create(parqueadero=cls.sede, numero=1, tipo='CARRO')
+        cls.cliente = User.objects.create_user('cupo_cliente', password='x')
+        cls.otro = User.objects.create_user('cupo_otro', password='x')
+
+    def setUp(self):
+        cache.clear()
+
+    def _reservas(self, usuario, fechas_y_fin, estado='RESERVADA'):
+        Reserva.objects.bulk_create(
+            Reserva(
+                usuario=usuario, espacio=self.espacio, parqueadero=self.sede, fecha=fecha,
+                hora_inicio=dtime(0, 0), hora_fin=fin, tipo_vehiculo='CARRO', placa='CUP001', estado=estado,
+            )
+            for fecha, fin in fechas_y_fin
+        )
+
+    def test_solo_cuentan_las_que_no_terminaron(self):
+        hoy = date.today()
+        self._reservas(self.cliente, [
+            (hoy - timedelta(days=1), dtime(23, 0)),   # Ayer: terminó sin cerrarse
+            (hoy, dtime(0, 0)),                        # Hoy, ya terminó
+            (hoy, dtime(23, 59, 59)),                  # Hoy, aún no termina
+            (hoy + timedelta(days=1), dtime(1, 0)),
+        ])
+        self._reservas(self.cliente, [(hoy + timedelta(days=2), dtime(1, 0))], estado='CANCELADA')
+        self.assertEqual(reservas_activas(self.cliente.id), 2)
+
+    def test_bloquear_descarta_el_contador_de_los_afectados(self):
+        self._reservas(self.cliente, [(date.today() + timedelta(days=1), dtime(9, 0))])
+        self.assertEqual(reservas_activas(self.cliente.id), 1)
+        reservas_activas(self.otro.id)
+
+        cambiar_estado_espacios(self.sede, EspacioParqueadero.objects.all(), 'BLOQUEADO')
+        self.assertIsNone(cache.get(CLAVE_ACTIVAS.format(self.cliente.id)))
+        self.assertEqual(reservas_activas(self.cliente.id), 0)
+        # Sin reservas en el espacio: su contador sigue
+        self.assertEqual(cache.get(CLAVE_ACTIVAS.format(self.otro.id)), 0)
+
+    def test_archivar_descarta_contadores_una_vez_por_lote(self):
+        antigua = date.today() - timedelta(days=400)
+        self._reservas(self.cliente, [(antigua, dtime(9, 0))] * 6, estado='COMPLETADA')
+        self._reservas(self.otro, [(antigua, dtime(9, 0))] * 6, estado='CANCELADA')
+        with mock.patch.object(limites, 'cache', wraps=limites.cache) as envoltura:
+            resumen = archivar_reservas(dias=180, lote=5)
+        self.assertEqual(resumen['lotes'], 3)
+        self.assertEqual(envoltura.delete_many.call_count, 3)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL)
+class CupoConcurrenteTest(TestCase):
+    """
+    Dos creaciones simultáneas del mismo usuario con el contador en caché
+    desactualizado: la segunda termina entre la verificación rápida de la
+    primera y su transacción.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Concurrencia', codigo='concurrencia')
+        cls.espacios = EspacioParqueadero.objects.bulk_create(
+            EspacioParqueadero(parqueadero=cls.sede, numero=i, tipo='CARRO') for i in range(1, 5)
+        )
+        cls.cliente = User.objects.create_user('concurrente_cliente', password='x')
+        cls.manana = date.today() + timedelta(days=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def _crear(self, numero):
+        return servicios.crear_reserva(
+            self.cliente, EspacioParqueadero.objects.get(numero=numero, parqueadero=self.sede),
+            self.manana, dtime(8, 0), dtime(9, 0), 'CARRO', 'CON001',
+        )
+
+    def _con_otra_creacion_intercalada(self, otra):
+        """cupo_disponible de la primera petición ve el contador antes de que la otra cree."""
+        verificar = servicios.cupo_disponible
+
+        def verificar_e_intercalar(usuario_id):
+            disponible = verificar(usuario_id)
+            if not intercalada:
+                intercalada.append(True)
+                otra()
+            return disponible
+
+        intercalada = []
+        return mock.patch.object(servicios, 'cupo_disponible', side_effect=verificar_e_intercalar)
+
+    @override_settings(MIPARQUEO_CUPO_RESERVAS=2)
+    def test_creaciones_simultaneas_no_exceden_el_cupo(self):
+        self._crear(1)
+        with self._con_otra_creacion_intercalada(lambda: self._crear(2)):
+            with self.assertRaises(servicios.ErrorReserva) as error:
+                self._crear(3)
+        self.assertEqual(error.exception.motivo, 'cupo')
+        self.assertEqual(Reserva.objects.filter(usuario=self.cliente, estado='RESERVADA').count(), 2)
+        self.assertEqual(EspacioParqueadero.objects.get(numero=3, parqueadero=self.sede).estado, 'LIBRE')
+
+    @override_settings(MIPARQUEO_CUPO_RESERVAS=2)
+    def test_lote_cuenta_el_cupo_en_la_transaccion(self):
+        self.assertEqual(reservas_activas(self.cliente.id), 0)
+        # Otra petición creó una reserva sin que el contador se enterara
+        self._crear(1)
+        cache.set(CLAVE_ACTIVAS.format(self.cliente.id), 0)
+        resultados = servicios.crear_reservas_lote(self.cliente, [
+            dict(espacio_id=self.espacios[i].id, fecha=self.manana, hora_inicio=dtime(8, 0),
+                 hora_fin=dtime(9, 0), tipo_vehiculo='CARRO', placa='CON001')
+            for i in (1, 2)
+        ])
+        self.assertIsInstance(resultados[0], Reserva)
+        self.assertEqual(resultados[1].motivo, 'cupo')
@@ -0,0 +1,247 @@
+"""
+Simulación de la lista de espera (core/lista_espera.py): miles de
+solicitudes en espera y una secuencia aleatoria de espacios liberados
+(cancelaciones y salidas registradas por el vigilante), intercalada con
+solicitudes nuevas y retiradas. Cada liberación se compara con un modelo
+de referencia por fuerza bruta.
+
+Ejecutar con:
+    python manage.py test core.tests_lista_espera
+
+Variables de entorno:
+    MIPARQUEO_SIM_SOLICITUDES     Solicitudes en espera iniciales (por defecto 3000)
+    MIPARQUEO_SIM_LIBERACIONES    Espacios liberados (por defecto 600)
+"""
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, time as dtime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import lista_espera, servicios
+from .models import EspacioParqueadero, Parqueadero, Reserva, SolicitudEspera
+from .servicios import cancelar_reserva
+
+SOLICITUDES = int(os.environ.get('MIPARQUEO_SIM_SOLICITUDES', 3000))
+LIBERACIONES = int(os.environ.get('MIPARQUEO_SIM_LIBERACIONES', 600))
+ESPACIOS = 40
+USUARIOS = 200
+# Consultas de una liberación con asignación, sin importar cuántas solicitudes esperen
+CONSULTAS_MAXIMAS = 30
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_sim_media_')
+
+
+# Sin cupo de reservas activas: los clientes simulados reciben muchas asignaciones
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL, MIPARQUEO_CUPO_RESERVAS=None)
+class SimulacionListaEsperaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rnd = random.Random(48)
+        cls.manana = date.today() + timedelta(days=1)
+        cls.parqueadero = Parqueadero.objects.create(nombre='Sede Simulación', codigo='simulacion')
+        cls.vigilante = User.objects.create_user('sim_vigilante', password='x')
+        cls.vigilante.groups.add(Group.objects.get_or_create(name='VIGILANTE')[0])
+        cls.parqueadero.vigilantes.add(cls.vigilante)
+        cls.usuarios = User.objects.bulk_create(
+            User(username=f'sim_cliente_{i}', email=f'sim_cliente_{i}@campusucc.edu.co') for i in range(USUARIOS)
+        )
+        tipos = ['CARRO'] * 6 + ['MOTO'] * 3 + ['DISCAPACIDAD']
+        EspacioParqueadero.objects.bulk_create(
+            EspacioParqueadero(parqueadero=cls.parqueadero, numero=i + 1, tipo=tipos[i % len(tipos)], estado='RESERVADO')
+            for i in range(ESPACIOS)
+        )
+        # Lleno: cada espacio con una reserva de madrugada que luego se libera
+        Reserva.objects.bulk_create(
+            Reserva(
+                usuario=cls.usuarios[0], espacio=espacio, parqueadero=cls.parqueadero, fecha=cls.manana,
+                hora_inicio=dtime(5, 0), hora_fin=dtime(5, 30), tipo_vehiculo='MOTO', placa='OCU000',
+            )
+            for espacio in EspacioParqueadero.objects.filter(parqueadero=cls.parqueadero)
+        )
+        SolicitudEspera.objects.bulk_create(cls._solicitud(cls.rnd) for _ in range(SOLICITUDES))
+        # Franjas ya terminadas: se vencen al salir de la cola, nunca se asignan
+        SolicitudEspera.objects.bulk_create(
+            cls._solicitud(cls.rnd, fecha=date.today() - timedelta(days=1)) for _ in range(SOLICITUDES // 20)
+        )
+
+    @classmethod
+    def _solicitud(cls, rnd, fecha=None):
+        tipo = rnd.choice(['CARRO', 'CARRO', 'MOTO', 'DISCAPACIDAD'])
+        inicio = rnd.randrange(6 * 4, 20 * 4)  # cuartos de hora
+        fin = min(inicio + rnd.randrange(2, 16), 22 * 4)
+        return SolicitudEspera(
+            usuario=rnd.choice(cls.usuarios),
+            parqueadero=cls.parqueadero,
+            tipo_espacio=tipo,
+            fecha=fecha or cls.manana + timedelta(days=rnd.randrange(0, 10)),
+            hora_inicio=dtime(inicio // 4, inicio % 4 * 15),
+            hora_fin=dtime(fin // 4, fin % 4 * 15),
+            tipo_vehiculo='MOTO' if tipo == 'MOTO' else 'CARRO',
+            placa=f'SIM{rnd.randrange(1000):03d}',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        # Las colas viven en memoria del proceso; cada prueba parte de la base de datos
+        lista_espera._colas.clear()
+
+    def _esperadas(self):
+        """Modelo de referencia: tipo → {id: clave de prioridad} de las solicitudes en espera vigentes."""
+        ahora = timezone.localtime()
+        esperadas = {}
+        for solicitud_id, tipo, fecha, hora_inicio, hora_fin in SolicitudEspera.objects.filter(
+            parqueadero=self.parqueadero, estado='ESPERANDO'
+        ).values_list('id', 'tipo_espacio', 'fecha', 'hora_inicio', 'hora_fin'):
+            if (fecha, hora_fin) > (ahora.date(), ahora.time()):
+                esperadas.setdefault(tipo, {})[solicitud_id] = (fecha, hora_inicio, solicitud_id)
+        return esperadas
+
+    def _liberar(self, reserva, por_salida):
+        if por_salida:
+            Reserva.objects.filter(id=reserva.id).update(hora_entrada=dtime(7, 0))
+            self.client.post(reverse('vigilante_registrar_salida', args=[reserva.id]))
+        else:
+            cancelar_reserva(Reserva.objects.select_related('espacio').get(id=reserva.id))
+
+    def test_cada_liberacion_asigna_la_solicitud_de_mayor_prioridad(self):
+        self.client.force_login(self.vigilante)
+        esperadas = self._esperadas()
+        activas = {r.espacio_id: r for r in Reserva.objects.filter(parqueadero=self.parqueadero, estado='RESERVADA')}
+        tipos = dict(EspacioParqueadero.objects.filter(parqueadero=self.parqueadero).values_list('id', 'tipo'))
+        consultas, asignadas = [], 0
+
+        for paso in range(LIBERACIONES):
+            if paso % 25 == 0:
+                # Solicitudes nuevas y retiradas entre liberaciones
+                SolicitudEspera.objects.bulk_create(self._solicitud(self.rnd) for _ in range(20))
+                retirada = SolicitudEspera.objects.filter(parqueadero=self.parqueadero, estado='ESPERANDO').order_by('?').first()
+                lista_espera.cancelar_solicitud(retirada)
+                esperadas = self._esperadas()
+
+            if not activas:
+                break
+            espacio_id = self.rnd.choice(sorted(activas))
+            reserva = activas.pop(espacio_id)
+            candidatas = esperadas.get(tipos[espacio_id], {})
+            esperada = min(candidatas.values(), default=None)
+
+            with CaptureQueriesContext(connection) as capturadas:
+                self._liberar(reserva, por_salida=paso % 4 == 0)
+
+            nueva = Reserva.objects.filter(espacio_id=espacio_id, estado='RESERVADA').first()
+            if esperada is None:
+                self.assertIsNone(nueva, f'paso {paso}: asignada sin solicitudes del tipo')
+                self.assertEqual(EspacioParqueadero.objects.get(id=espacio_id).estado, 'LIBRE')
+                continue
+
+            self.assertIsNotNone(nueva, f'paso {paso}: no se asignó el espacio {espacio_id}')
+            solicitud = SolicitudEspera.objects.get(reserva=nueva)
+            self.assertEqual(solicitud.id, esperada[2], f'paso {paso}: no es la de mayor prioridad')
+            self.assertEqual(solicitud.estado, 'ASIGNADA')
+            self.assertEqual((nueva.fecha, nueva.hora_inicio, nueva.hora_fin, nueva.usuario_id),
+                             (solicitud.fecha, solicitud.hora_inicio, solicitud.hora_fin, solicitud.usuario_id))
+            self.assertEqual(EspacioParqueadero.objects.get(id=espacio_id).estado, 'RESERVADO')
+            del candidatas[solicitud.id]
+            activas[espacio_id] = nueva
+            asignadas += 1
+            consultas.append(len(capturadas))
+
+        self.assertGreater(asignadas, LIBERACIONES // 2)
+        self.assertLessEqual(max(consultas), CONSULTAS_MAXIMAS)
+        # Ninguna solicitud asignada dos veces ni vencida asignada
+        self.assertEqual(
+            SolicitudEspera.objects.filter(estado='ASIGNADA').count(),
+            SolicitudEspera.objects.filter(reserva__isnull=False).count(),
+        )
+        self.assertFalse(SolicitudEspera.objects.filter(fecha__lt=date.today(), estado='ASIGNADA').exists())
+        # Las vencidas se marcaron al salir de la cola
+        self.assertFalse(SolicitudEspera.objects.filter(fecha__lt=date.today(), estado='ESPERANDO').exists())
+
+    def test_liberacion_sin_solicitudes_no_agrega_consultas_por_solicitud(self):
+        SolicitudEspera.objects.update(estado='CANCELADA')
+        reserva = Reserva.objects.filter(parqueadero=self.parqueadero).select_related('espacio').first()
+        with CaptureQueriesContext(connection) as capturadas:
+            cancelar_reserva(reserva)
+        self.assertEqual(EspacioParqueadero.objects.get(id=reserva.espacio_id).estado, 'LIBRE')
+        # Solo la lectura de solicitudes nuevas de la cola
+        self.assertEqual(sum('core_solicitudespera' in c['sql'] for c in capturadas.captured_queries), 1)
+
+    def test_crear_solicitud_rechaza_si_hay_espacios_libres(self):
+        cliente = User.objects.create_user('sim_cliente_nuevo', password='x')
+        EspacioParqueadero.objects.filter(parqueadero=self.parqueadero, tipo='MOTO').update(estado='LIBRE')
+        with self.assertRaisesMessage(lista_espera.servicios.ErrorReserva, 'Hay espacios libres'):
+            lista_espera.crear_solicitud(
+                cliente, self.parqueadero, 'MOTO', self.manana, dtime(8, 0), dtime(9, 0), 'MOTO', 'ABC12D'
+            )
+        solicitud = lista_espera.crear_solicitud(
+            cliente, self.parqueadero, 'CARRO', self.manana, dtime(8, 0), dtime(9, 0), 'CARRO', 'ABC123'
+        )
+        self.assertEqual(solicitud.estado, 'ESPERANDO')
+
+    def _liberar_con_solicitud(self):
+        """Reserva activa cuyo espacio, al liberarse, queda para una única solicitud."""
+        SolicitudEspera.objects.update(estado='CANCELADA')
+        reserva = Reserva.objects.filter(parqueadero=self.parqueadero, estado='RESERVADA').select_related('espacio').first()
+        solicitud = SolicitudEspera.objects.create(
+            usuario=self.usuarios[1], parqueadero=self.parqueadero, tipo_espacio=reserva.espacio.tipo,
+            fecha=self.manana, hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0), tipo_vehiculo='CARRO', placa='QRS123',
+        )
+        return reserva, solicitud
+
+    def _archivos_qr(self):
+        directorio = os.path.join(MEDIA_TEMPORAL, 'qr')
+        return set(os.listdir(directorio)) if os.path.isdir(directorio) else set()
+
+    def test_qr_de_la_asignacion_se_genera_al_confirmar(self):
+        reserva, solicitud = self._liberar_con_solicitud()
+        archivos = self._archivos_qr()
+        with self.captureOnCommitCallbacks() as callbacks:
+            cancelar_reserva(reserva)
+            nueva = SolicitudEspera.objects.select_related('reserva').get(id=solicitud.id).reserva
+            # Dentro de la transacción de la cancelación aún no hay QR ni archivo
+            self.assertIsNone(nueva.codigo_qr)
+            self.assertEqual(self._archivos_qr(), archivos)
+
+        for callback in callbacks:
+            callback()
+        nueva.refresh_from_db()
+        self.assertTrue(nueva.codigo_qr)
+        self.assertEqual(self._archivos_qr() - archivos, {os.path.basename(nueva.codigo_qr)})
+
+    def test_asignacion_deshecha_no_deja_qr(self):
+        reserva, solicitud = self._liberar_con_solicitud()
+        archivos = self._archivos_qr()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    cancelar_reserva(reserva)
+                    self.assertTrue(SolicitudEspera.objects.filter(id=solicitud.id, reserva__isnull=False).exists())
+                    raise RuntimeError('falla después de asignar')
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self._archivos_qr(), archivos)
+        self.assertEqual(SolicitudEspera.objects.get(id=solicitud.id).estado, 'ESPERANDO')
+
+    def test_error_al_generar_qr_se_registra(self):
+        reserva, solicitud = self._liberar_con_solicitud()
+        with mock.patch.object(servicios, 'generar_qr_reserva', side_effect=OSError('disco lleno')), \
+                self.assertLogs('core.servicios', 'ERROR') as registros, \
+                self.captureOnCommitCallbacks(execute=True):
+            cancelar_reserva(reserva)
+        nueva = SolicitudEspera.objects.select_related('reserva').get(id=solicitud.id).reserva
+        self.assertIsNone(nueva.codigo_qr)
+        self.assertIn(f'reserva {nueva.id}', registros.output[0])
+        self.assertIn('disco lleno', registros.output[0])
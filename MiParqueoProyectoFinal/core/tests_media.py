@@ -0,0 +1,96 @@
+"""
+Entrega de archivos media (servir_media y core/media.py): ETag por
+contenido, revalidación con 304, caché inmutable de los QR y delegación
+al servidor web con X-Sendfile / X-Accel-Redirect.
+
+Ejecutar con:
+    python manage.py test core.tests_media
+"""
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from .media import CACHE_INMUTABLE, CACHE_REVALIDAR
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_media_')
+
+
+@override_settings(MEDIA_ROOT=Path(MEDIA_TEMPORAL), MEDIA_ENTREGA='django')
+class ServirMediaTest(SimpleTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def setUp(self):
+        self.ruta = f'qr/{uuid.uuid4()}.png'
+        self.absoluta = Path(MEDIA_TEMPORAL) / self.ruta
+        self.absoluta.parent.mkdir(parents=True, exist_ok=True)
+        self.absoluta.write_bytes(b'\x89PNG contenido del qr')
+
+    def _get(self, ruta=None, **cabeceras):
+        return self.client.get(reverse('media', args=[ruta or self.ruta]), **cabeceras)
+
+    def test_200_con_etag_y_cache_inmutable(self):
+        respuesta = self._get()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b''.join(respuesta.streaming_content), b'\x89PNG contenido del qr')
+        self.assertEqual(respuesta['Content-Type'], 'image/png')
+        self.assertRegex(respuesta['ETag'], r'^"[0-9a-f]{24}"$')
+        self.assertEqual(respuesta['Cache-Control'], CACHE_INMUTABLE)
+        self.assertIn('Last-Modified', respuesta)
+        self.assertEqual(self.client.head(reverse('media', args=[self.ruta])).status_code, 200)
+
+    def test_304_si_el_etag_coincide(self):
+        etag = self._get()['ETag']
+        for cabecera in (etag, f'W/{etag}', f'"otro", {etag}', '*'):
+            with self.subTest(if_none_match=cabecera):
+                respuesta = self._get(HTTP_IF_NONE_MATCH=cabecera)
+                self.assertEqual(respuesta.status_code, 304)
+                self.assertEqual(respuesta.content, b'')
+                self.assertEqual((respuesta['ETag'], respuesta['Cache-Control']), (etag, CACHE_INMUTABLE))
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+    def test_archivo_cambiado_tiene_otro_etag(self):
+        etag = self._get()['ETag']
+        self.absoluta.write_bytes(b'\x89PNG otro contenido')
+        estado = self.absoluta.stat()
+        os.utime(self.absoluta, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))
+
+        respuesta = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(b''.join(respuesta.streaming_content), b'\x89PNG otro contenido')
+
+    def test_fuera_de_qr_se_revalida(self):
+        (Path(MEDIA_TEMPORAL) / 'logo.png').write_bytes(b'logo')
+        self.assertEqual(self._get('logo.png')['Cache-Control'], CACHE_REVALIDAR)
+
+    def test_inexistente_o_fuera_de_media_root(self):
+        self.assertEqual(self._get('qr/no-existe.png').status_code, 404)
+        self.assertEqual(self._get('../settings.py').status_code, 404)
+        self.assertEqual(self.client.post(reverse('media', args=[self.ruta])).status_code, 405)
+
+    @override_settings(MEDIA_ENTREGA='x-sendfile')
+    def test_delegacion_x_sendfile(self):
+        respuesta = self._get()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['X-Sendfile'], str(self.absoluta))
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual((respuesta['Content-Type'], respuesta['Cache-Control']), ('image/png', CACHE_INMUTABLE))
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+    @override_settings(MEDIA_ENTREGA='x-accel-redirect', MEDIA_INTERNA_URL='/media-interna/')
+    def test_delegacion_x_accel_redirect(self):
+        respuesta = self._get()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['X-Accel-Redirect'], f'/media-interna/{self.ruta}')
+        self.assertEqual(respuesta.content, b'')
+        self.assertNotIn('X-Sendfile', respuesta)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
@@ -0,0 +1,157 @@
+"""
+Middleware de core: perfilado bajo demanda (PerfiladoMiddleware),
+instrumentación SQL (InstrumentacionSQLMiddleware) y métricas por petición
+(MetricasMiddleware), bajo WSGI y ASGI.
+
+Ejecutar con:
+    python manage.py test core.tests_middleware
+"""
+import json
+import re
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import metricas
+from .middleware import InstrumentacionSQLMiddleware, PerfiladoMiddleware
+
+PERFILES_TEMPORALES = tempfile.mkdtemp(prefix='miparqueo_perfiles_')
+
+
+@override_settings(PERFILES_DIR=Path(PERFILES_TEMPORALES))
+class PerfiladoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('perfil_admin', password='x')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PERFILES_TEMPORALES, ignore_errors=True)
+
+    def test_solo_perfilar_1_lo_solicita(self):
+        fabrica = RequestFactory()
+        casos = {
+            '': False, 'perfilar=1': True, 'a=2&perfilar=1': True, 'perfilar=0': False,
+            'noperfilar=1': False, 'perfilar=': False, 'perfilar=10': False,
+        }
+        for consulta, esperado in casos.items():
+            with self.subTest(consulta=consulta):
+                self.assertEqual(PerfiladoMiddleware._solicitado(fabrica.get(f'/?{consulta}')), esperado)
+        self.assertTrue(PerfiladoMiddleware._solicitado(fabrica.get('/', HTTP_X_MIPARQUEO_PERFILAR='1')))
+
+    def test_guarda_perfil_y_traza_sql(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get(reverse('admin_usuarios_listar'), {'perfilar': '0'})
+        self.assertNotIn('X-MiParqueo-Perfil', respuesta)
+
+        respuesta = self.client.get(reverse('admin_usuarios_listar'), {'perfilar': '1'})
+        identificador = respuesta['X-MiParqueo-Perfil']
+        datos = json.loads((Path(PERFILES_TEMPORALES) / f'{identificador}.json').read_text(encoding='utf-8'))
+        self.assertEqual((datos['usuario'], datos['estado']), ('perfil_admin', 200))
+        self.assertTrue(datos['traza_sql'])
+        self.assertTrue((Path(PERFILES_TEMPORALES) / f'{identificador}.prof').exists())
+
+    async def test_traza_sql_bajo_asgi(self):
+        # Vista síncrona bajo ASGI: el ORM corre en otro hilo que el middleware
+        await self.async_client.aforce_login(self.admin)
+        respuesta = await self.async_client.get(reverse('admin_usuarios_listar'), {'perfilar': '1'})
+        identificador = respuesta['X-MiParqueo-Perfil']
+        datos = json.loads((Path(PERFILES_TEMPORALES) / f'{identificador}.json').read_text(encoding='utf-8'))
+        self.assertTrue(datos['traza_sql'])
+
+
+@override_settings(MIPARQUEO_INSTRUMENTACION_SQL=True)
+class InstrumentacionSQLTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('instrumentacion_admin', password='x')
+
+    def _comprobar(self, respuesta, registros, consultas):
+        self.assertEqual(respuesta.status_code, 200)
+        server_timing = respuesta['Server-Timing']
+        self.assertRegex(server_timing, r'^db;dur=[\d.]+;desc="\d+ consultas", db-max;dur=[\d.]+, '
+                                        r'db-dup;desc="\d+ firmas repetidas", total;dur=[\d.]+$')
+        total = int(re.search(r'"(\d+) consultas"', server_timing).group(1))
+        if consultas is not None:
+            self.assertEqual(total, consultas)
+
+        self.assertEqual(len(registros.records), 1)
+        linea = json.loads(registros.records[0].getMessage())
+        self.assertEqual(
+            (linea['metodo'], linea['ruta'], linea['vista'], linea['estado'], linea['consultas']),
+            ('GET', reverse('admin_usuarios_listar'), 'admin_usuarios_listar', 200, total),
+        )
+        self.assertGreater(linea['duracion_ms'], 0)
+        self.assertIn('duplicadas', linea)
+
+    def test_server_timing_y_log_bajo_wsgi(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as capturadas, \
+                self.assertLogs('core.instrumentacion', 'INFO') as registros:
+            respuesta = self.client.get(reverse('admin_usuarios_listar'))
+        self._comprobar(respuesta, registros, len(capturadas))
+
+    async def test_server_timing_y_log_bajo_asgi(self):
+        # Vista síncrona bajo ASGI: las consultas corren en otro hilo que el middleware
+        await self.async_client.aforce_login(self.admin)
+        with self.assertLogs('core.instrumentacion', 'INFO') as registros:
+            respuesta = await self.async_client.get(reverse('admin_usuarios_listar'))
+        self._comprobar(respuesta, registros, None)
+        self.assertNotIn('"0 consultas"', respuesta['Server-Timing'])
+
+    def test_cadena_async_sin_salto_a_hilo(self):
+        async def vista_async(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(InstrumentacionSQLMiddleware(vista_async)))
+        self.assertFalse(iscoroutinefunction(InstrumentacionSQLMiddleware(lambda request: HttpResponse())))
+        with override_settings(MIPARQUEO_INSTRUMENTACION_SQL=False), self.assertRaises(MiddlewareNotUsed):
+            InstrumentacionSQLMiddleware(vista_async)
+
+
+@unittest.skipUnless(settings.MIPARQUEO_METRICAS and metricas.DISPONIBLE, 'Métricas desactivadas')
+class MetricasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('metricas_admin', password='x')
+
+    @staticmethod
+    def _consultas(vista):
+        """(peticiones, consultas) acumuladas del histograma de la vista."""
+        valores = [
+            metricas.REGISTRY.get_sample_value(f'miparqueo_consultas_sql_por_peticion_{sufijo}', {'vista': vista}) or 0
+            for sufijo in ('count', 'sum')
+        ]
+        return tuple(valores)
+
+    def test_cuenta_consultas_bajo_wsgi(self):
+        self.client.force_login(self.admin)
+        peticiones, consultas = self._consultas('admin_usuarios_listar')
+        self.client.get(reverse('admin_usuarios_listar'))
+        despues = self._consultas('admin_usuarios_listar')
+        self.assertEqual(despues[0], peticiones + 1)
+        self.assertGreater(despues[1], consultas)
+
+    async def test_cuenta_consultas_bajo_asgi(self):
+        await self.async_client.aforce_login(self.admin)
+        peticiones, consultas = self._consultas('admin_usuarios_listar')
+        respuesta = await self.async_client.get(reverse('admin_usuarios_listar'))
+        self.assertEqual(respuesta.status_code, 200)
+        despues = self._consultas('admin_usuarios_listar')
+        self.assertEqual(despues[0], peticiones + 1)
+        self.assertGreater(despues[1], consultas)
@@ -0,0 +1,95 @@
+"""
+Notificaciones por correo (core/notificaciones.py): cada reserva se notifica
+una sola vez, también con ejecuciones solapadas, y un fallo del servidor de
+correo deja el lote pendiente.
+
+Ejecutar con:
+    python manage.py test core.tests_notificaciones
+"""
+import shutil
+import smtplib
+import tempfile
+from datetime import date, time as dtime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import notificaciones
+from .models import EspacioParqueadero, Parqueadero, Reserva
+from .notificaciones import enviar_notificaciones
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_notificaciones_media_')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL)
+class NotificacionesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        sede = Parqueadero.objects.create(nombre='Sede Correo', codigo='correo')
+        cliente = User.objects.create_user('correo_cliente', email='cliente@campusucc.edu.co', password='x')
+        # Lejos en el futuro: solo les corresponde la confirmación
+        fecha = date.today() + timedelta(days=10)
+        cls.reservas = [
+            Reserva.objects.create(
+                usuario=cliente, espacio=EspacioParqueadero.objects.create(parqueadero=sede, numero=i, tipo='CARRO'),
+                fecha=fecha, hora_inicio=dtime(8, 0), hora_fin=dtime(9, 0), tipo_vehiculo='CARRO', placa='COR001',
+            )
+            for i in range(1, 6)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    def _sin_confirmar(self):
+        return set(Reserva.objects.filter(confirmacion_enviada_en__isnull=True).values_list('id', flat=True))
+
+    def test_cada_reserva_se_confirma_una_vez(self):
+        resumen = enviar_notificaciones(lote=2)
+        self.assertEqual((resumen['confirmaciones'], resumen['recordatorios']), (5, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(self._sin_confirmar(), set())
+        self.assertEqual(enviar_notificaciones(lote=2)['confirmaciones'], 0)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_ejecucion_solapada_no_repite(self):
+        leer = notificaciones._con_datos
+        reclamadas = [self.reservas[0].id, self.reservas[3].id]
+
+        def leer_y_ceder(reservas):
+            # Otra ejecución lee lo mismo y reclama parte antes que esta
+            datos = leer(reservas)
+            Reserva.objects.filter(id__in=reclamadas).update(confirmacion_enviada_en=timezone.now() - timedelta(seconds=1))
+            return datos
+
+        with mock.patch.object(notificaciones, '_con_datos', side_effect=leer_y_ceder):
+            resumen = enviar_notificaciones(lote=2)
+        self.assertEqual(resumen['confirmaciones'], 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            sorted(mensaje.subject.split(',')[0] for mensaje in mail.outbox),
+            [f'Reserva confirmada: espacio {numero}' for numero in (2, 3, 5)],
+        )
+
+    def test_fallo_del_servidor_deja_el_lote_pendiente(self):
+        enviar = mail.backends.locmem.EmailBackend.send_messages
+        llamadas = []
+
+        def falla_el_segundo(backend, mensajes):
+            llamadas.append(len(mensajes))
+            if len(llamadas) == 2:
+                raise smtplib.SMTPServerDisconnected('conexión perdida')
+            return enviar(backend, mensajes)
+
+        with mock.patch.object(mail.backends.locmem.EmailBackend, 'send_messages', falla_el_segundo):
+            with self.assertRaises(smtplib.SMTPException):
+                enviar_notificaciones(lote=2)
+        # El primer lote quedó marcado; el que falló y el que no se alcanzó a enviar, pendientes
+        self.assertEqual(self._sin_confirmar(), {r.id for r in self.reservas[2:]})
+        self.assertEqual(enviar_notificaciones(lote=2)['confirmaciones'], 3)
+        self.assertEqual(len(mail.outbox), 5)
@@ -0,0 +1,146 @@
+"""
+Pronóstico de demanda (core/pronostico.py) sobre un histórico pequeño que
+se puede verificar a mano: línea base por día de la semana y hora con
+decaimiento semanal, actualización incremental y regeneración.
+
+Ejecutar con:
+    python manage.py test core.tests_pronostico
+"""
+from datetime import date, time as dtime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from .models import EspacioParqueadero, Parqueadero, PerfilDemanda, PronosticoDemanda, Reserva
+from .pronostico import DECAIMIENTO_SEMANAL, DIAS_PRONOSTICO, TIPOS, actualizar_pronostico, obtener_pronostico
+
+# Lunes 2026-01-19: se procesa el histórico hasta el domingo anterior, del
+# lunes 2026-01-05 (primera reserva) al domingo 2026-01-18: 14 días
+HOY = date(2026, 1, 19)
+LUNES_1 = date(2026, 1, 5)
+LUNES_2 = date(2026, 1, 12)
+MIERCOLES_1 = date(2026, 1, 7)
+
+FILAS_PRONOSTICO = DIAS_PRONOSTICO * len(TIPOS) * 24
+
+
+def _peso(indice_dia, dias=14):
+    """Peso de un día del histórico respecto al último día procesado."""
+    return DECAIMIENTO_SEMANAL ** ((dias - 1 - indice_dia) / 7.0)
+
+
+class PronosticoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sede = Parqueadero.objects.create(nombre='Sede Pronóstico', codigo='pronostico')
+        cls.carro = EspacioParqueadero.objects.create(parqueadero=cls.sede, numero=1, tipo='CARRO')
+        cls.moto = EspacioParqueadero.objects.create(parqueadero=cls.sede, numero=2, tipo='MOTO')
+        cls.cliente = User.objects.create_user('pronostico_cliente', password='x')
+
+    def _reservas(self, *filas):
+        Reserva.objects.bulk_create([
+            Reserva(
+                usuario=self.cliente, espacio=espacio, parqueadero=self.sede, fecha=fecha,
+                hora_inicio=dtime(*inicio), hora_fin=dtime(*fin), tipo_vehiculo=espacio.tipo,
+                placa='PRO001', estado=estado,
+            )
+            for espacio, fecha, inicio, fin, estado in filas
+        ])
+
+    def _historico(self):
+        self._reservas(
+            # Lunes 1: 09:00-11:00 ocupa las horas 9 y 10 (las 11 no)
+            (self.carro, LUNES_1, (9, 0), (11, 0), 'COMPLETADA'),
+            # Lunes 2: hora 9 → 3 ocupados, hora 10 → 2
+            (self.carro, LUNES_2, (9, 30), (10, 15), 'COMPLETADA'),
+            (self.carro, LUNES_2, (9, 30), (10, 15), 'VENCIDA'),
+            (self.carro, LUNES_2, (9, 0), (10, 0), 'COMPLETADA'),
+            # Las canceladas no cuentan
+            (self.carro, LUNES_2, (12, 0), (13, 0), 'CANCELADA'),
+            # Miércoles 1 con una moto; el miércoles 2 no tiene reservas y cuenta como 0
+            (self.moto, MIERCOLES_1, (8, 0), (9, 0), 'COMPLETADA'),
+        )
+
+    def _pronostico(self, tipo, fecha, hora):
+        return PronosticoDemanda.objects.get(tipo=tipo, fecha=fecha, hora=hora).demanda
+
+    def _perfil(self):
+        return {
+            (p.tipo, p.dia_semana, p.hora): (p.suma, p.peso, p.procesado_hasta)
+            for p in PerfilDemanda.objects.all()
+        }
+
+    def test_linea_base_por_dia_y_hora_con_decaimiento(self):
+        self._historico()
+        resumen = actualizar_pronostico(hoy=HOY)
+        self.assertEqual((resumen['desde'], resumen['hasta']), (LUNES_1, date(2026, 1, 18)))
+        self.assertEqual((resumen['dias_procesados'], resumen['filas_pronostico']), (14, FILAS_PRONOSTICO))
+
+        # Lunes: días 0 y 7 del histórico; la semana reciente pesa más
+        w1, w2 = _peso(0), _peso(7)
+        self.assertAlmostEqual(w1 / w2, DECAIMIENTO_SEMANAL)
+        self.assertAlmostEqual(self._pronostico('CARRO', HOY, 9), round((1 * w1 + 3 * w2) / (w1 + w2), 2))
+        self.assertAlmostEqual(self._pronostico('CARRO', HOY, 10), round((1 * w1 + 2 * w2) / (w1 + w2), 2))
+        # Sin decaimiento el promedio sería 2.0 y 1.5
+        self.assertEqual((self._pronostico('CARRO', HOY, 9), self._pronostico('CARRO', HOY, 10)), (2.05, 1.53))
+        for hora in (8, 11, 12):
+            self.assertEqual(self._pronostico('CARRO', HOY, hora), 0)
+
+        # Miércoles: días 2 y 9, solo el primero con una moto a las 8
+        miercoles = date(2026, 1, 21)
+        w1, w2 = _peso(2), _peso(9)
+        self.assertAlmostEqual(self._pronostico('MOTO', miercoles, 8), round(w1 / (w1 + w2), 2))
+        self.assertEqual(self._pronostico('CARRO', miercoles, 8), 0)
+
+        # El perfil guarda los acumulados sin normalizar
+        suma, peso, procesado_hasta = self._perfil()[('CARRO', 0, 9)]
+        self.assertAlmostEqual(suma, 1 * _peso(0) + 3 * _peso(7))
+        self.assertAlmostEqual(peso, _peso(0) + _peso(7))
+        self.assertEqual(procesado_hasta, date(2026, 1, 18))
+
+    def test_incremental_igual_a_reconstruir(self):
+        self._historico()
+        # Tramos que no caen en semanas completas: 5, 6 y 3 días
+        for hoy, dias in ((date(2026, 1, 10), 5), (date(2026, 1, 16), 6), (HOY, 3)):
+            self.assertEqual(actualizar_pronostico(hoy=hoy)['dias_procesados'], dias)
+        incremental = self._perfil()
+        pronostico = list(PronosticoDemanda.objects.values_list('tipo', 'fecha', 'hora', 'demanda'))
+
+        self.assertEqual(actualizar_pronostico(reiniciar=True, hoy=HOY)['dias_procesados'], 14)
+        reconstruido = self._perfil()
+        self.assertEqual(incremental.keys(), reconstruido.keys())
+        for clave, (suma, peso, procesado_hasta) in reconstruido.items():
+            with self.subTest(clave=clave):
+                self.assertAlmostEqual(incremental[clave][0], suma)
+                self.assertAlmostEqual(incremental[clave][1], peso)
+                self.assertEqual(incremental[clave][2], procesado_hasta)
+        self.assertEqual(list(PronosticoDemanda.objects.values_list('tipo', 'fecha', 'hora', 'demanda')), pronostico)
+
+    def test_sin_historico_pronostico_en_cero(self):
+        resumen = actualizar_pronostico(hoy=HOY)
+        self.assertEqual((resumen['desde'], resumen['hasta'], resumen['dias_procesados']), (None, None, 0))
+        self.assertEqual(PronosticoDemanda.objects.count(), FILAS_PRONOSTICO)
+        self.assertFalse(PronosticoDemanda.objects.exclude(demanda=0).exists())
+        self.assertFalse(PerfilDemanda.objects.exists())
+
+        tabla = obtener_pronostico()
+        self.assertEqual([fila['tipo'] for fila in tabla], TIPOS)
+        self.assertEqual(len(tabla[0]['dias']), DIAS_PRONOSTICO)
+        self.assertEqual(tabla[0]['capacidad'], 1)
+
+    def test_reejecutar_reemplaza_el_pronostico(self):
+        self._historico()
+        actualizar_pronostico(hoy=HOY)
+        antes = list(PronosticoDemanda.objects.values_list('tipo', 'fecha', 'hora', 'demanda'))
+
+        # Mismo día: no hay días nuevos, pero el pronóstico se regenera igual
+        self.assertEqual(actualizar_pronostico(hoy=HOY)['dias_procesados'], 0)
+        self.assertEqual(list(PronosticoDemanda.objects.values_list('tipo', 'fecha', 'hora', 'demanda')), antes)
+
+        # Día siguiente: la ventana se corre un día y no quedan filas viejas
+        actualizar_pronostico(hoy=date(2026, 1, 20))
+        self.assertEqual(PronosticoDemanda.objects.count(), FILAS_PRONOSTICO)
+        fechas = sorted(set(PronosticoDemanda.objects.values_list('fecha', flat=True)))
+        self.assertEqual((fechas[0], fechas[-1], len(fechas)), (date(2026, 1, 20), date(2026, 1, 26), 7))
+        self.assertEqual(PerfilDemanda.objects.count(), len(TIPOS) * 7 * 24)
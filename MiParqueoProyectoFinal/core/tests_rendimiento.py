@@ -0,0 +1,514 @@
+"""
+Suite de rendimiento: recorre todas las URLs del proyecto (salvo el admin
+de Django) con el cliente de pruebas sobre un conjunto de datos generado con generar_datos_carga
+(con la mitad más antigua del histórico archivada en ReservaHistorica),
+mide latencia p50/p95 y número de consultas SQL, y falla si alguna vista
+supera su presupuesto de consultas en core/presupuestos_rendimiento.json.
+Los presupuestos de latencia dependen de la máquina: solo se comprueban
+con MIPARQUEO_BENCH_LATENCIA=1. Una URL nueva sin escenario hace fallar la suite.
+
+Ejecutar con:
+    python manage.py test core.tests_rendimiento
+
+Variables de entorno:
+    MIPARQUEO_BENCH_RESERVAS      Reservas a generar (por defecto 20000)
+    MIPARQUEO_BENCH_REPETICIONES  Peticiones medidas por escenario (por defecto 10)
+    MIPARQUEO_BENCH_LATENCIA      1 para comprobar también los presupuestos de latencia p95
+    MIPARQUEO_BENCH_TOLERANCIA    Multiplicador de los presupuestos de latencia (por defecto 1.0)
+    MIPARQUEO_BENCH_SALIDA        Ruta donde guardar el JSON de resultados (sin ella no se escribe)
+"""
+import gc
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, time as dtime, timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve, reverse
+from django.utils import timezone
+
+from . import metricas
+from .cache_espacios import invalidar_espacios_tras_escritura
+from .models import (
+    EntradaEdificio, EspacioParqueadero, Incidencia, Parqueadero, Reserva, ReservaHistorica, SolicitudEspera,
+)
+
+
+RUTA_PRESUPUESTOS = Path(__file__).resolve().parent / 'presupuestos_rendimiento.json'
+
+RESERVAS = int(os.environ.get('MIPARQUEO_BENCH_RESERVAS', 20000))
+REPETICIONES = int(os.environ.get('MIPARQUEO_BENCH_REPETICIONES', 10))
+COMPROBAR_LATENCIA = os.environ.get('MIPARQUEO_BENCH_LATENCIA') == '1'
+TOLERANCIA = float(os.environ.get('MIPARQUEO_BENCH_TOLERANCIA', 1.0))
+RUTA_SALIDA = os.environ.get('MIPARQUEO_BENCH_SALIDA')
+
+MEDIA_TEMPORAL = tempfile.mkdtemp(prefix='miparqueo_bench_media_')
+PERFILES_TEMPORALES = tempfile.mkdtemp(prefix='miparqueo_bench_perfiles_')
+
+# URLs sin escenario a propósito; el admin de Django (espacio de nombres
+# 'admin') no se recorre
+SIN_ESCENARIO = set() if metricas.DISPONIBLE else {'metricas'}
+
+
+def nombres_url(patrones=None, prefijo=''):
+    """Nombres de todas las URLs del proyecto, con su espacio de nombres (ej. 'api_v1:reservas')."""
+    for patron in get_resolver().url_patterns if patrones is None else patrones:
+        if isinstance(patron, URLResolver):
+            if patron.namespace != 'admin':
+                espacio = f'{patron.namespace}:' if patron.namespace else ''
+                yield from nombres_url(patron.url_patterns, prefijo + espacio)
+        elif patron.name:
+            yield prefijo + patron.name
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (suficiente para pocas muestras)."""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+# Límites y cupo activos pero holgados: las repeticiones de un mismo cliente
+# no se rechazan y se mide el costo de verificarlos. Sesiones como en
+# producción (MIPARQUEO_CACHE=archivos): cached_db
+@override_settings(
+    MEDIA_ROOT=MEDIA_TEMPORAL,
+    PERFILES_DIR=Path(PERFILES_TEMPORALES),
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    MIPARQUEO_LIMITE_USUARIO=(10 ** 6, 10 ** 6),
+    MIPARQUEO_LIMITE_IP=(10 ** 6, 10 ** 6),
+    MIPARQUEO_CUPO_RESERVAS=10 ** 6,
+)
+class RendimientoVistasTest(TestCase):
+    """
+    Un escenario por URL. Cada escenario define quién hace la petición y,
+    para las vistas que modifican datos, cómo preparar un estado nuevo antes
+    de cada repetición (la preparación no se mide).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generar_datos_carga',
+            usuarios=max(RESERVAS // 100, 50),
+            vigilantes=5,
+            parqueaderos=3,
+            espacios=max(RESERVAS // 200, 60) * 3,
+            reservas=RESERVAS,
+            incidencias=max(RESERVAS // 20, 100),
+            dias=120,
+            semilla=2025,
+            stdout=StringIO(),
+        )
+        # Historial y API leen también la tabla fría
+        call_command('archivar_reservas', dias=60, stdout=StringIO())
+        cls.admin = User.objects.create_superuser('bench_admin', 'bench_admin@campusucc.edu.co', 'admin123')
+        cls.cliente = User.objects.filter(username__startswith='carga_cliente_').order_by('id').first()
+        cls.vigilante = User.objects.filter(groups__name='VIGILANTE').order_by('id').first()
+        # Sede del vigilante y, por ser la primera por nombre, la de clientes y administradores
+        cls.parqueadero = Parqueadero.objects.get(codigo='sede-1')
+        cls.fecha_futura = date.today() + timedelta(days=30)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+        shutil.rmtree(PERFILES_TEMPORALES, ignore_errors=True)
+
+    # ------------------------------------------------------------
+    # Preparación de estado para las vistas de escritura
+    # ------------------------------------------------------------
+
+    def _espacio_libre(self):
+        return EspacioParqueadero.objects.filter(
+            parqueadero=self.parqueadero, estado='LIBRE', tipo='CARRO'
+        ).first()
+
+    def _nueva_reserva(self, fecha=None, **campos):
+        """Crea una reserva activa del cliente en un espacio libre."""
+        self._hora = getattr(self, '_hora', 6) % 20 + 1
+        espacio = self._espacio_libre()
+        reserva = Reserva.objects.create(
+            usuario=self.cliente,
+            espacio=espacio,
+            fecha=fecha or self.fecha_futura,
+            hora_inicio=dtime(self._hora, 0),
+            hora_fin=dtime(self._hora + 1, 0),
+            tipo_vehiculo='CARRO',
+            placa='BEN001',
+            **campos,
+        )
+        espacio.estado = 'OCUPADO' if campos.get('hora_entrada') else 'RESERVADO'
+        espacio.save()
+        return reserva
+
+    def _escenarios(self):
+        """
+        Returns:
+            list: (nombre, usuario, método, preparar) donde preparar() retorna
+                  (url, datos) para una repetición
+        """
+        cliente, vigilante, admin = self.cliente, self.vigilante, self.admin
+        reserva_cliente = Reserva.objects.filter(usuario=cliente).first()
+        espacio_cliente = EspacioParqueadero.objects.filter(parqueadero=self.parqueadero).first()
+        incidencia = Incidencia.objects.filter(parqueadero=self.parqueadero).first()
+        reserva_archivada = ReservaHistorica.objects.filter(usuario=cliente).first()
+        entrada = EntradaEdificio.objects.filter(parqueadero=self.parqueadero).first()
+        placa_hoy = (
+            Reserva.objects.filter(parqueadero=self.parqueadero, fecha=date.today(), estado='RESERVADA')
+            .values_list('placa', flat=True).first()
+            or 'ZZZ999'
+        )
+        ahora = timezone.localtime()
+
+        def fijo(nombre_url, *args, datos=None):
+            return lambda: (reverse(nombre_url, args=args), datos)
+
+        def crear_reserva():
+            espacio = self._espacio_libre()
+            return reverse('cliente_crear_reserva', args=[espacio.id]), {
+                'fecha': self.fecha_futura.isoformat(),
+                'hora_inicio': '10:00',
+                'hora_fin': '12:00',
+                'tipo_vehiculo': 'CARRO',
+                'placa': 'BEN002',
+            }
+
+        def crear_reserva_repetida():
+            # Libera el espacio de la repetición anterior para no agotar los libres
+            anterior = getattr(self, '_repetida', None)
+            Reserva.objects.filter(espacio_id=anterior, placa='BEN003').update(estado='CANCELADA')
+            EspacioParqueadero.objects.filter(id=anterior).update(estado='LIBRE')
+            # El envío original (no medido); se mide el reintento con la misma clave
+            url, datos = crear_reserva()
+            datos.update(placa='BEN003', clave_idempotencia=uuid.uuid4().hex)
+            self.client.post(url, datos)
+            self._repetida = Reserva.objects.filter(placa='BEN003', estado='RESERVADA').values_list(
+                'espacio_id', flat=True).first()
+            return url, datos
+
+        def cancelar_reserva():
+            return reverse('cliente_cancelar_reserva', args=[self._nueva_reserva().id]), None
+
+        def modificar_reserva():
+            reserva = self._nueva_reserva()
+            return reverse('cliente_modificar_reserva', args=[reserva.id]), {
+                'fecha': (self.fecha_futura + timedelta(days=1)).isoformat(),
+                'hora_inicio': '15:00',
+                'hora_fin': '16:00',
+            }
+
+        def api_crear_reserva():
+            return reverse('api_v1:reservas'), {
+                'espacio_id': self._espacio_libre().id,
+                'fecha': self.fecha_futura.isoformat(),
+                'hora_inicio': '10:00',
+                'hora_fin': '12:00',
+                'tipo_vehiculo': 'CARRO',
+                'placa': 'API001',
+            }
+
+        def api_crear_lote():
+            # Cancela el lote anterior y libera sus espacios para no agotar los libres
+            anterior = getattr(self, '_lote', [])
+            Reserva.objects.filter(espacio_id__in=anterior, placa='API002').update(estado='CANCELADA')
+            EspacioParqueadero.objects.filter(id__in=anterior).update(estado='LIBRE')
+            self._lote = list(
+                EspacioParqueadero.objects.filter(parqueadero=self.parqueadero, estado='LIBRE', tipo='CARRO')
+                .values_list('id', flat=True)[:5]
+            )
+            return reverse('api_v1:reservas_lote'), {'reservas': [{
+                'espacio_id': espacio_id,
+                'fecha': self.fecha_futura.isoformat(),
+                'hora_inicio': '07:00',
+                'hora_fin': '08:00',
+                'tipo_vehiculo': 'CARRO',
+                'placa': 'API002',
+            } for espacio_id in self._lote]}
+
+        def api_cancelar_lote():
+            return reverse('api_v1:reservas_lote_cancelar'), {
+                'ids': [self._nueva_reserva().id for _ in range(5)],
+            }
+
+        def crear_espacios_lote():
+            desde = self.parqueadero.espacios.order_by('-numero').values_list('numero', flat=True).first() + 1
+            return reverse('admin_espacios_crear_lote'), {
+                'desde': desde, 'hasta': desde + 49, 'tipo': 'CARRO', 'estado': 'LIBRE',
+            }
+
+        def cambiar_estado_fila():
+            # Alterna bloquear / liberar la primera fila (con reservas pendientes y vehículos adentro)
+            self._bloquear = not getattr(self, '_bloquear', False)
+            return reverse('admin_espacios_estado_lote'), {
+                'estado': 'BLOQUEADO' if self._bloquear else 'LIBRE', 'desde': 1, 'hasta': 20,
+            }
+
+        def lista_espera_unirse():
+            # La lista de espera solo admite tipos sin espacios libres en la sede
+            bloqueados = EspacioParqueadero.objects.filter(
+                parqueadero=self.parqueadero, tipo='DISCAPACIDAD', estado='LIBRE'
+            ).update(estado='BLOQUEADO')
+            if bloqueados:
+                invalidar_espacios_tras_escritura(self.parqueadero.id)
+            SolicitudEspera.objects.filter(usuario=cliente, estado='ESPERANDO').update(estado='CANCELADA')
+            return reverse('cliente_lista_espera'), {
+                'tipo_espacio': 'DISCAPACIDAD',
+                'fecha': self.fecha_futura.isoformat(),
+                'hora_inicio': '09:00',
+                'hora_fin': '10:00',
+                'tipo_vehiculo': 'CARRO',
+                'placa': 'ESP001',
+            }
+
+        def lista_espera_cancelar():
+            solicitud = SolicitudEspera.objects.create(
+                usuario=cliente, parqueadero=self.parqueadero, tipo_espacio='DISCAPACIDAD',
+                fecha=self.fecha_futura, hora_inicio=dtime(9, 0), hora_fin=dtime(10, 0),
+                tipo_vehiculo='CARRO', placa='ESP002',
+            )
+            return reverse('cliente_lista_espera_cancelar', args=[solicitud.id]), None
+
+        def cerrar_sesion():
+            # Cada repetición cierra una sesión nueva (el inicio no se mide)
+            self.client.force_login(cliente)
+            return reverse('logout'), None
+
+        def archivo_qr():
+            ruta = 'qr/00000000-0000-4000-8000-000000000000.png'
+            Path(MEDIA_TEMPORAL, ruta).parent.mkdir(parents=True, exist_ok=True)
+            Path(MEDIA_TEMPORAL, ruta).write_bytes(b'\x89PNG' + bytes(600))
+            return reverse('media', args=[ruta]), None
+
+        def perfil_guardado():
+            if not hasattr(self, '_perfil'):
+                self._perfil = self.client.get(reverse('home'), {'perfilar': '1'})['X-MiParqueo-Perfil']
+            return reverse('admin_perfiles_descargar', args=[self._perfil, 'sql']), None
+
+        def crear_usuario():
+            self._usuario_nuevo = getattr(self, '_usuario_nuevo', 0) + 1
+            nombre = f'bench_nuevo_{self._usuario_nuevo}'
+            return reverse('admin_usuarios_crear'), {
+                'username': nombre, 'email': f'{nombre}@campusucc.edu.co', 'first_name': 'Ana',
+                'last_name': 'Ruiz', 'password': 'clave-segura-1', 'password_confirm': 'clave-segura-1',
+                'rol': 'vigilante',
+            }
+
+        def editar_usuario():
+            return reverse('admin_usuarios_editar', args=[cliente.id]), {
+                'username': cliente.username, 'email': cliente.email, 'first_name': 'Editado',
+                'last_name': cliente.last_name, 'new_password': '', 'rol': 'cliente',
+            }
+
+        def importar_usuarios():
+            self._importacion = getattr(self, '_importacion', 0) + 1
+            filas = ['username,email,password,rol'] + [
+                f'bench_imp_{self._importacion}_{i},bench_imp_{self._importacion}_{i}@campusucc.edu.co,clave-{i},cliente'
+                for i in range(5)
+            ]
+            archivo = SimpleUploadedFile('usuarios.csv', '\n'.join(filas).encode('utf-8'), content_type='text/csv')
+            return reverse('admin_usuarios_importar'), {'archivo': archivo}
+
+        def crear_espacio():
+            numero = self.parqueadero.espacios.order_by('-numero').values_list('numero', flat=True).first() + 1
+            return reverse('admin_espacios_crear'), {'numero': numero, 'estado': 'LIBRE'}
+
+        def editar_espacio():
+            espacio = self._espacio_libre()
+            return reverse('admin_espacios_editar', args=[espacio.id]), {'numero': espacio.numero, 'estado': 'LIBRE'}
+
+        def registrar_entrada():
+            reserva = self._nueva_reserva(fecha=date.today())
+            return reverse('vigilante_registrar_entrada', args=[reserva.id]), None
+
+        def registrar_salida():
+            reserva = self._nueva_reserva(fecha=date.today(), hora_entrada=ahora.time())
+            return reverse('vigilante_registrar_salida', args=[reserva.id]), None
+
+        escenarios = [
+            ('home', cliente, 'get', fijo('home')),
+            ('login_form', cliente, 'get', fijo('login')),
+            ('logout', cliente, 'post', cerrar_sesion),
+            ('media', cliente, 'get', archivo_qr),
+            ('seleccionar_parqueadero', cliente, 'post', fijo('seleccionar_parqueadero', datos={
+                'parqueadero': self.parqueadero.id, 'next': reverse('cliente_disponibilidad'),
+            })),
+            ('cliente_disponibilidad', cliente, 'get', fijo('cliente_disponibilidad')),
+            ('cliente_disponibilidad_recomendacion', cliente, 'get',
+             lambda: (reverse('cliente_disponibilidad') + f'?entrada={entrada.id}&tipo=CARRO', None)),
+            ('cliente_crear_reserva_form', cliente, 'get',
+             lambda: (reverse('cliente_crear_reserva', args=[self._espacio_libre().id]), None)),
+            ('cliente_crear_reserva', cliente, 'post', crear_reserva),
+            ('cliente_crear_reserva_repetida', cliente, 'post', crear_reserva_repetida),
+            ('cliente_reservas_activas', cliente, 'get', fijo('cliente_reservas_activas')),
+            ('cliente_cancelar_reserva', cliente, 'post', cancelar_reserva),
+            ('cliente_historial', cliente, 'get', fijo('cliente_historial')),
+            ('cliente_confirmacion_reserva', cliente, 'get',
+             fijo('cliente_confirmacion_reserva', reserva_cliente.id)),
+            ('cliente_modificar_reserva_form', cliente, 'get',
+             lambda: (reverse('cliente_modificar_reserva', args=[self._nueva_reserva().id]), None)),
+            ('cliente_modificar_reserva', cliente, 'post', modificar_reserva),
+            ('cliente_lista_espera', cliente, 'get', fijo('cliente_lista_espera')),
+            ('cliente_lista_espera_unirse', cliente, 'post', lista_espera_unirse),
+            ('cliente_lista_espera_cancelar', cliente, 'post', lista_espera_cancelar),
+            ('vigilante_validar_placa_form', vigilante, 'get', fijo('vigilante_validar_placa')),
+            ('vigilante_validar_placa', vigilante, 'post',
+             fijo('vigilante_validar_placa', datos={'placa': placa_hoy})),
+            ('vigilante_registrar_entrada', vigilante, 'post', registrar_entrada),
+            ('vigilante_salida', vigilante, 'get', fijo('vigilante_salida')),
+            ('vigilante_registrar_salida', vigilante, 'post', registrar_salida),
+            ('vigilante_ocupacion', vigilante, 'get', fijo('vigilante_ocupacion')),
+            ('registrar_incidencia_form', vigilante, 'get', fijo('registrar_incidencia')),
+            ('registrar_incidencia', vigilante, 'post', fijo('registrar_incidencia', datos={
+                'tipo': 'DANIO_ESPACIO', 'espacio': '', 'descripcion': 'Rayón en la señalización',
+            })),
+            ('listar_incidencias', vigilante, 'get', fijo('listar_incidencias')),
+            ('listar_incidencias_busqueda', vigilante, 'get',
+             lambda: (reverse('listar_incidencias') + '?q=placa', None)),
+            ('buscar_incidencias', vigilante, 'get',
+             lambda: (reverse('buscar_incidencias') + '?q=rayon', None)),
+            ('api_parqueaderos', cliente, 'get', fijo('api_v1:parqueaderos')),
+            ('api_espacios', cliente, 'get', lambda: (reverse('api_v1:espacios') + '?estado=LIBRE', None)),
+            ('api_espacio_detalle', cliente, 'get', fijo('api_v1:espacio_detalle', espacio_cliente.id)),
+            ('api_espacio_recomendado', cliente, 'get',
+             lambda: (reverse('api_v1:espacio_recomendado') + f'?entrada_id={entrada.id}&tipo=MOTO', None)),
+            ('api_reservas', cliente, 'get', fijo('api_v1:reservas')),
+            ('api_reservas_cursor', cliente, 'get', lambda: (
+                reverse('api_v1:reservas') + '?campos=fecha,estado,espacio_numero&limite=20&cursor='
+                + self.client.get(reverse('api_v1:reservas') + '?limite=20').json()['siguiente'], None)),
+            ('api_reserva_detalle', cliente, 'get', fijo('api_v1:reserva_detalle', reserva_cliente.id)),
+            ('api_reserva_detalle_archivada', cliente, 'get',
+             fijo('api_v1:reserva_detalle', reserva_archivada.id)),
+            ('api_crear_reserva', cliente, 'post_json', api_crear_reserva),
+            ('api_cancelar_reserva', cliente, 'post',
+             lambda: (reverse('api_v1:reserva_cancelar', args=[self._nueva_reserva().id]), None)),
+            ('api_reservas_lote', cliente, 'post_json', api_crear_lote),
+            ('api_reservas_lote_cancelar', cliente, 'post_json', api_cancelar_lote),
+            ('api_incidencias', vigilante, 'get', fijo('api_v1:incidencias')),
+            ('api_incidencia_detalle', vigilante, 'get', fijo('api_v1:incidencia_detalle', incidencia.id)),
+            ('admin_panel_dashboard', admin, 'get', fijo('admin_panel_dashboard')),
+            ('admin_usuarios_listar', admin, 'get', fijo('admin_usuarios_listar')),
+            ('admin_usuarios_crear_form', admin, 'get', fijo('admin_usuarios_crear')),
+            ('admin_usuarios_crear', admin, 'post', crear_usuario),
+            ('admin_usuarios_importar_form', admin, 'get', fijo('admin_usuarios_importar')),
+            ('admin_usuarios_importar', admin, 'post', importar_usuarios),
+            ('admin_usuarios_editar_form', admin, 'get', fijo('admin_usuarios_editar', cliente.id)),
+            ('admin_usuarios_editar', admin, 'post', editar_usuario),
+            ('admin_usuarios_toggle_estado', admin, 'post', fijo('admin_usuarios_toggle_estado', vigilante.id)),
+            ('admin_espacios_listar', admin, 'get', fijo('admin_espacios_listar')),
+            ('admin_espacios_crear_form', admin, 'get', fijo('admin_espacios_crear')),
+            ('admin_espacios_crear', admin, 'post', crear_espacio),
+            ('admin_espacios_editar_form', admin, 'get',
+             lambda: (reverse('admin_espacios_editar', args=[self._espacio_libre().id]), None)),
+            ('admin_espacios_editar', admin, 'post', editar_espacio),
+            ('admin_espacios_crear_lote_form', admin, 'get', fijo('admin_espacios_crear_lote')),
+            ('admin_espacios_crear_lote', admin, 'post', crear_espacios_lote),
+            ('admin_espacios_estado_lote', admin, 'post', cambiar_estado_fila),
+            ('admin_pronostico', admin, 'get', fijo('admin_pronostico')),
+            ('admin_perfiles', admin, 'get', fijo('admin_perfiles')),
+            ('admin_perfiles_descargar', admin, 'get', perfil_guardado),
+        ]
+        if metricas.DISPONIBLE:
+            escenarios.append(('metricas', None, 'get', fijo('metricas')))
+        return escenarios
+
+    # ------------------------------------------------------------
+    # Medición
+    # ------------------------------------------------------------
+
+    def _medir(self, usuario, metodo, preparar):
+        if usuario is None:
+            self.client.logout()
+        else:
+            self.client.force_login(usuario)
+        # Petición de calentamiento: compila templates y llena cachés de conexión
+        url, datos = preparar()
+        self._peticion(metodo, url, datos)
+        # Que una recolección completa pendiente de escenarios anteriores no caiga en la medición
+        gc.collect()
+
+        tiempos, consultas = [], []
+        for _ in range(REPETICIONES):
+            url, datos = preparar()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                respuesta = self._peticion(metodo, url, datos)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(capturadas))
+            self.assertLess(respuesta.status_code, 400, f'{metodo.upper()} {url}')
+        return {
+            'p50_ms': round(percentil(tiempos, 50), 2),
+            'p95_ms': round(percentil(tiempos, 95), 2),
+            'consultas': max(consultas),
+        }
+
+    def _peticion(self, metodo, url, datos):
+        # Los on_commit de la petición (QR de las reservas) corren como en
+        # producción: entran en el tiempo y en las consultas medidas
+        with self.captureOnCommitCallbacks(execute=True):
+            if metodo == 'post_json':
+                return self.client.post(url, datos, content_type='application/json')
+            return getattr(self.client, metodo)(url, datos)
+
+    def test_presupuestos_por_vista(self):
+        presupuestos = json.loads(RUTA_PRESUPUESTOS.read_text(encoding='utf-8'))['vistas']
+
+        resultados = {}
+        regresiones = []
+        for nombre, usuario, metodo, preparar in self._escenarios():
+            medicion = self._medir(usuario, metodo, preparar)
+            presupuesto = presupuestos.get(nombre)
+            medicion['presupuesto'] = presupuesto
+            resultados[nombre] = medicion
+
+            if presupuesto is None:
+                regresiones.append(f'{nombre}: sin presupuesto en {RUTA_PRESUPUESTOS.name}')
+                continue
+            if medicion['consultas'] > presupuesto['consultas']:
+                regresiones.append(
+                    f"{nombre}: {medicion['consultas']} consultas (presupuesto {presupuesto['consultas']})"
+                )
+            if COMPROBAR_LATENCIA and medicion['p95_ms'] > presupuesto['p95_ms'] * TOLERANCIA:
+                regresiones.append(
+                    f"{nombre}: p95 {medicion['p95_ms']} ms (presupuesto {presupuesto['p95_ms']} ms)"
+                )
+
+        if RUTA_SALIDA:
+            self._guardar_resultados(resultados)
+        self.assertFalse(regresiones, 'Regresiones de rendimiento:\n  ' + '\n  '.join(regresiones))
+
+    def test_todas_las_urls_tienen_escenario(self):
+        cubiertas = set()
+        for nombre, usuario, metodo, preparar in self._escenarios():
+            if usuario is not None:
+                self.client.force_login(usuario)
+            url, _ = preparar()
+            cubiertas.add(resolve(url.split('?')[0]).view_name)
+        faltantes = sorted(set(nombres_url()) - cubiertas - SIN_ESCENARIO)
+        self.assertFalse(faltantes, f'URLs sin escenario de rendimiento: {", ".join(faltantes)}')
+
+    def _guardar_resultados(self, resultados):
+        ruta = Path(RUTA_SALIDA)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_text(json.dumps({
+            'generado_en': datetime.now().isoformat(timespec='seconds'),
+            'escala': {
+                'reservas': Reserva.objects.count(),
+                'reservas_historicas': ReservaHistorica.objects.count(),
+                'espacios': EspacioParqueadero.objects.count(),
+                'usuarios': User.objects.count(),
+                'incidencias': Incidencia.objects.count(),
+                'repeticiones': REPETICIONES,
+            },
+            'vistas': resultados,
+        }, indent=2, ensure_ascii=False), encoding='utf-8')
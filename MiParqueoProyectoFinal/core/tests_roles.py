@@ -0,0 +1,97 @@
+"""
+Resolución de roles: una consulta de grupos por usuario y por petición, y
+sin N+1 en el listado de usuarios del panel de administración.
+
+Ejecutar con:
+    python manage.py test core.tests_roles
+"""
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .roles import es_vigilante, obtener_roles, rol_principal
+from .templatetags.admin_extras import has_group
+
+
+class MemorizacionRolesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vigilantes = Group.objects.get_or_create(name='VIGILANTE')[0]
+        cls.guardia = User.objects.create_user('roles_guardia', password='x')
+        cls.guardia.groups.add(cls.vigilantes)
+
+    def test_has_group_consulta_una_vez_por_usuario(self):
+        usuario = User.objects.get(pk=self.guardia.pk)
+        with self.assertNumQueries(1):
+            for _ in range(5):
+                self.assertTrue(has_group(usuario, 'VIGILANTE'))
+            self.assertFalse(has_group(usuario, 'ADMIN'))
+            self.assertTrue(es_vigilante(usuario))
+            self.assertEqual(rol_principal(usuario), 'vigilante')
+
+        # Otra instancia (otra petición) vuelve a consultar, una sola vez
+        otra = User.objects.get(pk=self.guardia.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(obtener_roles(otra), frozenset({'VIGILANTE'}))
+            self.assertTrue(has_group(otra, 'VIGILANTE'))
+
+    def test_has_group_en_template(self):
+        usuario = User.objects.get(pk=self.guardia.pk)
+        plantilla = Template(
+            '{% load admin_extras %}'
+            '{% for i in rango %}{% if user|has_group:"VIGILANTE" %}v{% endif %}{% endfor %}'
+        )
+        with self.assertNumQueries(1):
+            salida = plantilla.render(Context({'user': usuario, 'rango': range(10)}))
+        self.assertEqual(salida, 'v' * 10)
+
+    def test_grupos_precargados_no_consultan(self):
+        usuario = User.objects.prefetch_related('groups').get(pk=self.guardia.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(has_group(usuario, 'VIGILANTE'))
+
+
+class ListadoUsuariosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('roles_admin', password='x')
+        cls.vigilantes = Group.objects.get_or_create(name='VIGILANTE')[0]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _crear_usuarios(self, desde, cantidad):
+        for i in range(desde, desde + cantidad):
+            usuario = User.objects.create_user(f'roles_u{i}', password='x')
+            if i % 2:
+                usuario.groups.add(self.vigilantes)
+
+    def _consultas_listado(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('admin_usuarios_listar'))
+        self.assertEqual(respuesta.status_code, 200)
+        return consultas
+
+    def test_sin_n_mas_1_al_crecer_el_listado(self):
+        self._crear_usuarios(0, 3)
+        base = len(self._consultas_listado())
+
+        self._crear_usuarios(3, 20)
+        with self.assertNumQueries(base):
+            respuesta = self.client.get(reverse('admin_usuarios_listar'))
+        self.assertEqual(len(respuesta.context['usuarios']), 24)
+        roles = {u.username: u.rol_display for u in respuesta.context['usuarios']}
+        self.assertEqual((roles['roles_u1'], roles['roles_u2'], roles['roles_admin']),
+                         ('vigilante', 'cliente', 'admin'))
+
+    def test_grupos_en_una_sola_consulta(self):
+        self._crear_usuarios(0, 10)
+        consultas = self._consultas_listado()
+        de_grupos = [c['sql'] for c in consultas.captured_queries
+                     if 'auth_user_groups' in c['sql'] and 'auth_group' in c['sql']]
+        self.assertEqual(len(de_grupos), 1, de_grupos)
@@ -0,0 +1,95 @@
+"""
+Sesiones: motor según el caché (cached_db solo con el caché compartido),
+ida y vuelta de la sesión, invalidación al cerrar sesión, consultas por
+petición y el barrido de sesiones vencidas (limpiar_sesiones).
+
+Ejecutar con:
+    python manage.py test core.tests_sesiones
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+MOTORES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}
+
+
+class SesionesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = User.objects.create_user('sesion_cliente', password='clave-sesion-1')
+
+    def setUp(self):
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+
+    def _entrar(self):
+        # SessionMiddleware toma el motor al cargarse: un cliente nuevo por motor
+        self.client = self.client_class()
+        respuesta = self.client.post(reverse('login'), {'username': 'sesion_cliente', 'password': 'clave-sesion-1'})
+        self.assertEqual(respuesta.status_code, 302)
+        return self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def _consultas_sesion(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('cliente_reservas_activas'))
+        self.assertEqual(respuesta.status_code, 200)
+        return sum('django_session' in consulta['sql'] for consulta in consultas.captured_queries)
+
+    def test_motor_segun_el_cache(self):
+        # Las pruebas corren con el caché en memoria de un proceso
+        self.assertFalse(settings.MIPARQUEO_CACHE_COMPARTIDO)
+        self.assertEqual(settings.SESSION_ENGINE, MOTORES['db'])
+
+    def test_ida_y_vuelta_y_consultas_por_peticion(self):
+        for nombre, motor in MOTORES.items():
+            with self.subTest(motor=nombre), override_settings(SESSION_ENGINE=motor):
+                clave = self._entrar()
+                self.assertTrue(Session.objects.filter(session_key=clave).exists())
+                self.assertEqual(SessionStore(clave).get('_auth_user_id'), str(self.cliente.id))
+                self._consultas_sesion()
+                # cached_db: desde la segunda petición la sesión sale del caché
+                self.assertEqual(self._consultas_sesion(), 1 if nombre == 'db' else 0)
+
+    def test_cerrar_sesion_invalida_la_cookie_anterior(self):
+        for nombre, motor in MOTORES.items():
+            with self.subTest(motor=nombre), override_settings(SESSION_ENGINE=motor):
+                clave = self._entrar()
+                self._consultas_sesion()
+                self.client.post(reverse('logout'))
+                self.assertFalse(Session.objects.filter(session_key=clave).exists())
+                # Un reintento con la cookie vieja ya no está autenticado
+                self.client.cookies[settings.SESSION_COOKIE_NAME] = clave
+                respuesta = self.client.get(reverse('cliente_reservas_activas'))
+                self.assertRedirects(respuesta, f"{reverse('login')}?next={reverse('cliente_reservas_activas')}",
+                                     fetch_redirect_response=False)
+
+    def test_limpiar_sesiones_por_lotes(self):
+        ahora = timezone.now()
+        Session.objects.bulk_create(
+            Session(session_key=f'vencida{i:033d}', session_data='', expire_date=ahora - timedelta(days=1))
+            for i in range(5)
+        )
+        Session.objects.create(session_key='vigente' + '0' * 33, session_data='', expire_date=ahora + timedelta(days=1))
+
+        salida = StringIO()
+        call_command('limpiar_sesiones', lote=2, stdout=salida)
+        self.assertIn('[OK] 5 sesiones vencidas eliminadas en 3 lote(s)', salida.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['vigente' + '0' * 33])
+
+        salida = StringIO()
+        call_command('limpiar_sesiones', stdout=salida)
+        self.assertIn('[INFO] No hay sesiones vencidas', salida.getvalue())
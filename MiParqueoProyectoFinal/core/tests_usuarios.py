@@ -0,0 +1,112 @@
+"""
+Gestión de usuarios del panel de administración (alta individual e
+importación desde CSV).
+
+Ejecutar con:
+    python manage.py test core.tests_usuarios
+"""
+import io
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from . import views
+from .importacion import IMPORTACION_MAXIMO_FILAS_WEB, leer_csv
+
+
+class AltaUsuarioTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('usuarios_admin', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _crear(self, **cambios):
+        datos = dict({
+            'username': 'nuevo', 'email': 'Nuevo@Campusucc.EDU.CO', 'first_name': 'Ana', 'last_name': 'Ruiz',
+            'password': 'clave-segura-1', 'password_confirm': 'clave-segura-1', 'rol': 'cliente',
+        }, **cambios)
+        return self.client.post(reverse('admin_usuarios_crear'), datos)
+
+    def test_crea_usuario_con_rol(self):
+        self.assertRedirects(self._crear(rol='vigilante'), reverse('admin_usuarios_listar'))
+        usuario = User.objects.get(username='nuevo')
+        self.assertTrue(usuario.check_password('clave-segura-1'))
+        self.assertEqual(usuario.email, 'Nuevo@campusucc.edu.co')
+        self.assertEqual(list(usuario.groups.values_list('name', flat=True)), ['VIGILANTE'])
+        self.assertFalse(usuario.is_superuser)
+
+        self._crear(username='jefa', email='jefa@campusucc.edu.co', rol='admin')
+        jefa = User.objects.get(username='jefa')
+        self.assertTrue(jefa.is_superuser and jefa.is_staff)
+
+    def test_hash_fuera_de_la_transaccion(self):
+        # TestCase ya abre transacciones: la vista no debe haber agregado otra al calcular el hash
+        profundidad = len(connection.savepoint_ids)
+        dentro = []
+
+        def hash_registrado(password):
+            dentro.append(len(connection.savepoint_ids) > profundidad)
+            return make_password(password)
+
+        with mock.patch.object(views, 'make_password', side_effect=hash_registrado):
+            self._crear()
+        self.assertEqual(dentro, [False])
+        self.assertTrue(User.objects.get(username='nuevo').check_password('clave-segura-1'))
+
+    def test_validaciones(self):
+        self._crear(password_confirm='otra')
+        self._crear(username='usuarios_admin')
+        self._crear(email='')
+        self.assertFalse(User.objects.exclude(username='usuarios_admin').exists())
+
+
+class ImportacionUsuariosTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('importar_admin', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    @staticmethod
+    def _csv(filas):
+        lineas = ['username,email,password,rol'] + [
+            f'importado{i},importado{i}@campusucc.edu.co,clave-{i},{rol}' for i, rol in enumerate(filas)
+        ]
+        return '\n'.join(lineas) + '\n'
+
+    def _importar(self, contenido, **datos):
+        archivo = SimpleUploadedFile('usuarios.csv', contenido.encode('utf-8'), content_type='text/csv')
+        return self.client.post(reverse('admin_usuarios_importar'), dict(datos, archivo=archivo), follow=True)
+
+    def test_importa_archivo_pequeno(self):
+        respuesta = self._importar(self._csv(['cliente', 'vigilante', 'admin']))
+        self.assertContains(respuesta, '3 usuarios importados.')
+        self.assertTrue(User.objects.get(username='importado0').check_password('clave-0'))
+        self.assertTrue(User.objects.get(username='importado1').groups.filter(name='VIGILANTE').exists())
+        self.assertTrue(User.objects.get(username='importado2').is_superuser)
+
+    def test_filas_con_error_rechazan_el_archivo(self):
+        respuesta = self._importar(self._csv(['cliente', 'jefe']))
+        self.assertContains(respuesta, 'no se importó ningún usuario')
+        self.assertFalse(User.objects.filter(username__startswith='importado').exists())
+
+    def test_archivo_grande_se_deriva_al_comando(self):
+        contenido = self._csv(['cliente'] * (IMPORTACION_MAXIMO_FILAS_WEB + 1))
+        with mock.patch('core.importacion.hashear_passwords') as hashear:
+            respuesta = self._importar(contenido)
+        hashear.assert_not_called()
+        self.assertContains(respuesta, f'Máximo {IMPORTACION_MAXIMO_FILAS_WEB} usuarios por archivo.')
+        self.assertContains(respuesta, 'Para archivos más grandes use: python manage.py importar_usuarios')
+        self.assertFalse(User.objects.filter(username__startswith='importado').exists())
+        # El comando (límite general) sí lo acepta
+        self.assertEqual(len(leer_csv(io.StringIO(contenido))), IMPORTACION_MAXIMO_FILAS_WEB + 1)
@@ -0,0 +1,26 @@
+"""
+Rutas de la API JSON v1, montadas en /api/v1/ (ver core/api.py).
+"""
+from django.urls import path
+from . import api
+
+app_name = 'api_v1'
+
+urlpatterns = [
+    # Parqueaderos (sedes) y espacios
+    path('parqueaderos/', api.parqueaderos, name='parqueaderos'),
+    path('espacios/recomendado/', api.espacio_recomendado, name='espacio_recomendado'),
+    path('espacios/', api.espacios, name='espacios'),
+    path('espacios/<int:espacio_id>/', api.espacio_detalle, name='espacio_detalle'),
+    
+    # Reservas del usuario autenticado
+    path('reservas/', api.reservas, name='reservas'),
+    path('reservas/lote/', api.reservas_lote, name='reservas_lote'),
+    path('reservas/lote/cancelar/', api.reservas_lote_cancelar, name='reservas_lote_cancelar'),
+    path('reservas/<int:reserva_id>/', api.reserva_detalle, name='reserva_detalle'),
+    path('reservas/<int:reserva_id>/cancelar/', api.reserva_cancelar, name='reserva_cancelar'),
+    
+    # Incidencias (vigilantes y administradores)
+    path('incidencias/', api.incidencias, name='incidencias'),
+    path('incidencias/<int:incidencia_id>/', api.incidencia_detalle, name='incidencia_detalle'),
+]
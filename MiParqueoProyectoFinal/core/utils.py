@@ -4,10 +4,12 @@ Incluye funciones auxiliares como generación de códigos QR.
 """
 import os
 import uuid
-import qrcode
 from django.conf import settings
 
+from .metricas import qr_duracion
 
+
+@qr_duracion.time()
 def generar_qr_reserva(reserva):
     """
     Genera un código QR único para una reserva.
@@ -18,6 +20,9 @@ def generar_qr_reserva(reserva):
     Returns:
         str: Ruta relativa del archivo QR generado (ej: 'qr/abc123.png')
     """
+    # qrcode (y PIL) se importan en la primera reserva, no al arrancar el worker
+    import qrcode
+
     # Generar UUID único
     codigo_unico = str(uuid.uuid4())
     
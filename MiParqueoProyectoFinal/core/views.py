@@ -2,11 +2,39 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
+from django.http import (
+    JsonResponse, FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified,
+)
+from django.utils.http import http_date, url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_safe
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q, Max
 from datetime import datetime, date, timedelta
-from .models import EspacioParqueadero, Reserva, Incidencia
-from .utils import generar_qr_reserva
+from urllib.parse import quote
+import io
+import os
+import uuid
+from .models import EspacioParqueadero, Reserva, Incidencia, PronosticoDemanda, SolicitudEspera
+from .servicios import (
+    ErrorReserva, crear_reserva, cancelar_reserva, modificar_reserva, validar_modificable,
+    ErrorEspacios, LOTE_ESPACIOS_MAXIMO, crear_espacios_rango, cambiar_estado_espacios,
+)
+from .importacion import ErrorImportacion, IMPORTACION_MAXIMO_FILAS_WEB, importar_usuarios
+from .busqueda import buscar_incidencias as buscar_texto_incidencias
+from .roles import es_vigilante as usuario_es_vigilante, rol_principal
+from .pronostico import obtener_pronostico
+from .archivo import historial_usuario
+from .recomendacion import recomendacion_para
+from .idempotencia import idempotente
+from .limites import limitar_reservas
+from .lista_espera import asignar_espacios_liberados, cancelar_solicitud, crear_solicitud, vencer_solicitudes
+from .perfiles import listar_perfiles, ruta_perfil
+from .cache_espacios import version_espacios, conteos_por_estado
+from .parqueaderos import parqueadero_actual, parqueaderos_permitidos, seleccionar as seleccionar_sede
+from .media import resolver_ruta, etag_archivo, cache_control, tipo_contenido, coincide_etag
+from . import metricas
 
 
 # ============================================================
@@ -30,7 +58,7 @@ class CustomLoginView(LoginView):
             return '/admin-panel/'
         
         # Si pertenece al grupo VIGILANTE
-        if user.groups.filter(name='VIGILANTE').exists():
+        if usuario_es_vigilante(user):
             return '/vigilante/validar-placa/'
         
         # Usuario normal (cliente)
@@ -50,13 +78,33 @@ def home_view(request):
         return redirect('admin_panel_dashboard')
     
     # Si pertenece al grupo VIGILANTE
-    if user.groups.filter(name='VIGILANTE').exists():
+    if usuario_es_vigilante(user):
         return redirect('vigilante_validar_placa')
     
     # Usuario normal (cliente)
     return redirect('cliente_disponibilidad')
 
 
+@login_required
+def seleccionar_parqueadero(request):
+    """
+    Cambia la sede (parqueadero) en la que trabaja el usuario y vuelve a la
+    página desde la que se eligió.
+    """
+    if request.method == 'POST':
+        try:
+            parqueadero = seleccionar_sede(request, int(request.POST.get('parqueadero', '')))
+        except ValueError:
+            parqueadero = None
+        if parqueadero is None:
+            messages.error(request, 'No tiene acceso a ese parqueadero.')
+    
+    siguiente = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(siguiente, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return redirect(siguiente)
+    return redirect('home')
+
+
 # ============================================================
 # VISTAS PARA CLIENTE
 # ============================================================
@@ -67,16 +115,34 @@ def cliente_disponibilidad(request):
     HU 007 – Consultar disponibilidad de espacios
     Muestra todos los espacios con su estado actual.
     Solo los espacios LIBRES pueden ser reservados.
+    Solo se muestran los espacios de la sede actual. La grilla se cachea por
+    sede y versión del estado de sus espacios: el queryset solo se evalúa si
+    el fragmento no está en caché.
+    Con ?entrada=<id>&tipo=<tipo> recomienda el espacio libre más cercano a
+    esa entrada de edificio.
     """
-    espacios = EspacioParqueadero.objects.all()
+    parqueadero = parqueadero_actual(request)
+    espacios = EspacioParqueadero.objects.filter(parqueadero=parqueadero)
+    version = version_espacios(parqueadero.id)
+    recomendacion = None
+    if request.GET.get('entrada'):
+        recomendacion = recomendacion_para(
+            parqueadero, request.GET['entrada'], request.GET.get('tipo', 'CARRO'), version
+        )
     
     context = {
         'espacios': espacios,
+        'parqueadero': parqueadero,
+        'version_espacios': version,
+        'recomendacion': recomendacion,
+        'tipos_espacio': EspacioParqueadero.TIPO_CHOICES,
         'es_cliente': True,
     }
     return render(request, 'cliente/disponibilidad.html', context)
 
 
+@idempotente('POST')
+@limitar_reservas('POST')
 @login_required
 def cliente_crear_reserva(request, espacio_id):
     """
@@ -84,10 +150,15 @@ def cliente_crear_reserva(request, espacio_id):
     Formulario para crear una nueva reserva de espacio.
     Valida conflictos de horario y tipo de vehículo.
     """
-    espacio = get_object_or_404(EspacioParqueadero, id=espacio_id)
+    # Solo espacios de las sedes activas en las que puede reservar el usuario
+    espacio = get_object_or_404(
+        EspacioParqueadero, id=espacio_id, parqueadero__in=parqueaderos_permitidos(request.user)
+    )
     
     # Verificar que el espacio esté libre
     if espacio.estado != 'LIBRE':
+        if request.method == 'POST':
+            metricas.intentos_reserva.labels('no_disponible').inc()
         messages.error(request, 'El espacio seleccionado no está disponible.')
         return redirect('cliente_disponibilidad')
     
@@ -105,64 +176,21 @@ def cliente_crear_reserva(request, espacio_id):
             hora_inicio_obj = datetime.strptime(hora_inicio, '%H:%M').time()
             hora_fin_obj = datetime.strptime(hora_fin, '%H:%M').time()
             
-            # Validar que la fecha sea hoy o futura
-            if fecha_obj < date.today():
-                messages.error(request, 'No se pueden hacer reservas para fechas pasadas.')
-                return redirect('cliente_crear_reserva', espacio_id=espacio_id)
-            
-            # Validar que hora_fin sea mayor que hora_inicio
-            if hora_inicio_obj >= hora_fin_obj:
-                messages.error(request, 'La hora de fin debe ser posterior a la hora de inicio.')
-                return redirect('cliente_crear_reserva', espacio_id=espacio_id)
-            
-            # Validar compatibilidad de vehículo con espacio
-            if tipo_vehiculo == 'CARRO' and espacio.tipo == 'MOTO':
-                messages.error(request, 'No se puede reservar un espacio de moto para un carro.')
-                return redirect('cliente_crear_reserva', espacio_id=espacio_id)
-            
-            # Validar conflictos de horario para el mismo espacio
-            reservas_conflicto = Reserva.objects.filter(
-                espacio=espacio,
-                fecha=fecha_obj,
-                estado='RESERVADA'
-            ).filter(
-                Q(hora_inicio__lt=hora_fin_obj, hora_fin__gt=hora_inicio_obj)
-            )
-            
-            if reservas_conflicto.exists():
-                messages.error(request, 'Ya existe una reserva en ese horario para este espacio.')
-                return redirect('cliente_crear_reserva', espacio_id=espacio_id)
-            
-            # Crear la reserva
-            reserva = Reserva.objects.create(
-                usuario=request.user,
-                espacio=espacio,
-                fecha=fecha_obj,
-                hora_inicio=hora_inicio_obj,
-                hora_fin=hora_fin_obj,
-                tipo_vehiculo=tipo_vehiculo,
-                placa=placa,
-                estado='RESERVADA'
+            # Validación, conflictos de horario, creación y QR: core/servicios.py
+            reserva = crear_reserva(
+                request.user, espacio, fecha_obj, hora_inicio_obj, hora_fin_obj, tipo_vehiculo, placa
             )
             
-            # Generar código QR para la reserva
-            try:
-                ruta_qr = generar_qr_reserva(reserva)
-                reserva.codigo_qr = ruta_qr
-                reserva.save()
-            except Exception as e:
-                # Si falla la generación del QR, continuar sin QR
-                # La reserva ya fue creada exitosamente
-                print(f"Error al generar QR: {str(e)}")
-            
-            # Cambiar estado del espacio a RESERVADO
-            espacio.estado = 'RESERVADO'
-            espacio.save()
-            
             messages.success(request, f'Reserva creada exitosamente para el espacio {espacio.numero}. Código QR generado.')
             return redirect('cliente_confirmacion_reserva', reserva_id=reserva.id)
             
+        except ErrorReserva as e:
+            if e.motivo:
+                metricas.intentos_reserva.labels(e.motivo).inc()
+            messages.error(request, str(e))
+            return redirect('cliente_crear_reserva', espacio_id=espacio_id)
         except Exception as e:
+            metricas.intentos_reserva.labels('error').inc()
             messages.error(request, f'Error al crear la reserva: {str(e)}')
             return redirect('cliente_crear_reserva', espacio_id=espacio_id)
     
@@ -170,6 +198,8 @@ def cliente_crear_reserva(request, espacio_id):
         'espacio': espacio,
         'fecha_minima': date.today().isoformat(),
         'es_cliente': True,
+        # Un doble envío del formulario repite la respuesta (core/idempotencia.py)
+        'clave_idempotencia': uuid.uuid4().hex,
     }
     return render(request, 'cliente/crear_reserva.html', context)
 
@@ -193,6 +223,7 @@ def cliente_reservas_activas(request):
     return render(request, 'cliente/reservas_activas.html', context)
 
 
+@limitar_reservas()
 @login_required
 def cliente_cancelar_reserva(request, reserva_id):
     """
@@ -201,25 +232,12 @@ def cliente_cancelar_reserva(request, reserva_id):
     """
     reserva = get_object_or_404(Reserva, id=reserva_id, usuario=request.user)
     
-    # Validar que la reserva esté en estado RESERVADA
-    if reserva.estado != 'RESERVADA':
-        messages.error(request, 'Solo se pueden cancelar reservas activas.')
-        return redirect('cliente_reservas_activas')
-    
-    # Validar que no haya iniciado (no tenga hora_entrada)
-    if reserva.hora_entrada:
-        messages.error(request, 'No se puede cancelar una reserva que ya ha iniciado.')
+    try:
+        cancelar_reserva(reserva)
+    except ErrorReserva as e:
+        messages.error(request, str(e))
         return redirect('cliente_reservas_activas')
     
-    # Cancelar la reserva
-    reserva.estado = 'CANCELADA'
-    reserva.save()
-    
-    # Liberar el espacio
-    espacio = reserva.espacio
-    espacio.estado = 'LIBRE'
-    espacio.save()
-    
     messages.success(request, f'Reserva #{reserva.id} cancelada exitosamente.')
     return redirect('cliente_reservas_activas')
 
@@ -228,11 +246,10 @@ def cliente_cancelar_reserva(request, reserva_id):
 def cliente_historial(request):
     """
     HU 011 – Ver historial de reservas
-    Muestra todas las reservas del usuario con todos los estados.
+    Muestra todas las reservas del usuario con todos los estados, incluidas
+    las archivadas en ReservaHistorica.
     """
-    reservas = Reserva.objects.filter(
-        usuario=request.user
-    ).select_related('espacio').order_by('-fecha', '-hora_inicio')
+    reservas = historial_usuario(request.user)
     
     context = {
         'reservas': reservas,
@@ -256,6 +273,7 @@ def cliente_confirmacion_reserva(request, reserva_id):
     return render(request, 'cliente/confirmacion_reserva.html', context)
 
 
+@limitar_reservas('POST')
 @login_required
 def cliente_modificar_reserva(request, reserva_id):
     """
@@ -267,18 +285,11 @@ def cliente_modificar_reserva(request, reserva_id):
     """
     reserva = get_object_or_404(Reserva, id=reserva_id, usuario=request.user)
     
-    # Validar estado
-    if reserva.estado != 'RESERVADA':
-        messages.error(request, 'Solo se pueden modificar reservas activas.')
-        return redirect('cliente_historial')
-    
-    # Validar tiempo mínimo (15 min antes)
-    ahora = timezone.now()
-    inicio_reserva = timezone.make_aware(datetime.combine(reserva.fecha, reserva.hora_inicio))
-    tiempo_restante = inicio_reserva - ahora
-    
-    if tiempo_restante.total_seconds() < 900:  # 15 minutos * 60 segundos
-        messages.error(request, 'No puede modificar una reserva a menos de 15 minutos de su inicio.')
+    # Solo reservas activas y con más de 15 minutos antes del inicio
+    try:
+        validar_modificable(reserva)
+    except ErrorReserva as e:
+        messages.error(request, str(e))
         return redirect('cliente_historial')
         
     if request.method == 'POST':
@@ -291,46 +302,15 @@ def cliente_modificar_reserva(request, reserva_id):
             nueva_hora_inicio = datetime.strptime(nueva_hora_inicio_str, '%H:%M').time()
             nueva_hora_fin = datetime.strptime(nueva_hora_fin_str, '%H:%M').time()
             
-            # Re-validar tiempo mínimo con la fecha original (por seguridad)
-            if tiempo_restante.total_seconds() < 900:
-                messages.error(request, 'El tiempo límite para modificar ha expirado.')
-                return redirect('cliente_historial')
-                
-            # Validar que la nueva fecha/hora sea futura
-            nuevo_inicio = timezone.make_aware(datetime.combine(nueva_fecha, nueva_hora_inicio))
-            if nuevo_inicio <= ahora:
-                messages.error(request, 'La nueva fecha y hora deben ser futuras.')
-            else:
-                # Validar solapamiento (excluyendo la reserva actual)
-                solapamiento = Reserva.objects.filter(
-                    espacio=reserva.espacio,
-                    fecha=nueva_fecha,
-                    estado='RESERVADA'
-                ).exclude(id=reserva.id).filter(
-                    Q(hora_inicio__lt=nueva_hora_fin) & Q(hora_fin__gt=nueva_hora_inicio)
-                ).exists()
-                
-                if solapamiento:
-                    messages.error(request, 'El espacio no está disponible en el nuevo horario seleccionado.')
-                else:
-                    # Todo válido, guardar cambios
-                    reserva.fecha = nueva_fecha
-                    reserva.hora_inicio = nueva_hora_inicio
-                    reserva.hora_fin = nueva_hora_fin
-                    
-                    # Regenerar QR con los nuevos datos
-                    try:
-                        ruta_qr = generar_qr_reserva(reserva)
-                        reserva.codigo_qr = ruta_qr
-                    except Exception as e:
-                        print(f"Error al regenerar QR: {str(e)}")
-                        
-                    reserva.save()
-                    messages.success(request, 'Reserva modificada exitosamente.')
-                    return redirect('cliente_historial')
+            # Horario futuro, sin solapamiento y QR regenerado: core/servicios.py
+            modificar_reserva(reserva, nueva_fecha, nueva_hora_inicio, nueva_hora_fin)
+            messages.success(request, 'Reserva modificada exitosamente.')
+            return redirect('cliente_historial')
                     
         except ValueError:
             messages.error(request, 'Formato de fecha u hora inválido.')
+        except ErrorReserva as e:
+            messages.error(request, str(e))
             
     context = {
         'reserva': reserva,
@@ -342,6 +322,66 @@ def cliente_modificar_reserva(request, reserva_id):
     return render(request, 'cliente/modificar_reserva.html', context)
 
 
+@login_required
+def cliente_lista_espera(request):
+    """
+    Lista de espera de la sede actual: el cliente pide un tipo de espacio
+    para una franja y, cuando un espacio de ese tipo se libera, la reserva
+    se crea automáticamente (core/lista_espera.py).
+    """
+    parqueadero = parqueadero_actual(request)
+    
+    if request.method == 'POST':
+        try:
+            solicitud = crear_solicitud(
+                request.user,
+                parqueadero,
+                request.POST.get('tipo_espacio'),
+                datetime.strptime(request.POST.get('fecha', ''), '%Y-%m-%d').date(),
+                datetime.strptime(request.POST.get('hora_inicio', ''), '%H:%M').time(),
+                datetime.strptime(request.POST.get('hora_fin', ''), '%H:%M').time(),
+                request.POST.get('tipo_vehiculo'),
+                request.POST.get('placa', '').upper(),
+            )
+            messages.success(
+                request,
+                f'Quedó en lista de espera para el {solicitud.fecha:%d/%m/%Y}. '
+                'Le enviaremos la reserva por correo cuando se libere un espacio.'
+            )
+            return redirect('cliente_lista_espera')
+        except ValueError:
+            messages.error(request, 'Formato de fecha u hora inválido.')
+        except ErrorReserva as e:
+            messages.error(request, str(e))
+    
+    vencer_solicitudes(request.user)
+    solicitudes = SolicitudEspera.objects.filter(
+        usuario=request.user, fecha__gte=date.today() - timedelta(days=7)
+    ).select_related('parqueadero', 'reserva__espacio').order_by('-fecha', '-hora_inicio')
+    
+    context = {
+        'solicitudes': solicitudes,
+        'parqueadero': parqueadero,
+        'tipos_espacio': EspacioParqueadero.TIPO_CHOICES,
+        'fecha_minima': date.today().isoformat(),
+        'es_cliente': True,
+    }
+    return render(request, 'cliente/lista_espera.html', context)
+
+
+@login_required
+def cliente_lista_espera_cancelar(request, solicitud_id):
+    """Retira una solicitud propia de la lista de espera."""
+    solicitud = get_object_or_404(SolicitudEspera, id=solicitud_id, usuario=request.user)
+    if request.method == 'POST':
+        try:
+            cancelar_solicitud(solicitud)
+            messages.success(request, 'Solicitud retirada de la lista de espera.')
+        except ErrorReserva as e:
+            messages.error(request, str(e))
+    return redirect('cliente_lista_espera')
+
+
 # ============================================================
 # VISTAS PARA VIGILANTE
 # ============================================================
@@ -360,9 +400,10 @@ def vigilante_validar_placa(request):
         placa_buscada = placa
         
         if placa:
-            # Buscar reserva activa para la fecha de hoy
+            # Buscar reserva activa para la fecha de hoy en la sede del vigilante
             hoy = date.today()
             reservas = Reserva.objects.filter(
+                parqueadero=parqueadero_actual(request),
                 placa=placa,
                 fecha=hoy,
                 estado='RESERVADA'
@@ -370,8 +411,10 @@ def vigilante_validar_placa(request):
             
             if reservas.exists():
                 reserva = reservas.first()
+                metricas.validaciones_placa.labels('encontrada').inc()
                 messages.success(request, f'Reserva encontrada para la placa {placa}.')
             else:
+                metricas.validaciones_placa.labels('no_encontrada').inc()
                 messages.warning(request, f'No se encontró ninguna reserva activa para la placa {placa} en la fecha de hoy.')
         else:
             messages.error(request, 'Por favor ingrese una placa válida.')
@@ -380,17 +423,22 @@ def vigilante_validar_placa(request):
         'reserva': reserva,
         'placa_buscada': placa_buscada,
         'es_vigilante': True,
+        # Un doble toque en la tableta repite la respuesta (core/idempotencia.py)
+        'clave_idempotencia': uuid.uuid4().hex,
     }
     return render(request, 'vigilante/validar_placa.html', context)
 
 
+@idempotente()
 @login_required
+@transaction.atomic
 def vigilante_registrar_entrada(request, reserva_id):
     """
     HU 016 – Registrar entrada de vehículo
     Registra la hora de entrada real y cambia el estado del espacio a OCUPADO.
+    Solo reservas de la sede del vigilante.
     """
-    reserva = get_object_or_404(Reserva, id=reserva_id)
+    reserva = get_object_or_404(Reserva, id=reserva_id, parqueadero=parqueadero_actual(request))
     
     # Validar que la reserva esté activa
     if reserva.estado != 'RESERVADA':
@@ -412,6 +460,7 @@ def vigilante_registrar_entrada(request, reserva_id):
     espacio.estado = 'OCUPADO'
     espacio.save()
     
+    metricas.registros_porteria.labels('entrada').inc()
     messages.success(request, f'Entrada registrada exitosamente para la placa {reserva.placa} a las {now.strftime("%H:%M")}.')
     return redirect('vigilante_validar_placa')
 
@@ -423,8 +472,9 @@ def vigilante_salida(request):
     Muestra las reservas con entrada registrada y sin salida.
     Permite registrar la salida del vehículo.
     """
-    # Obtener reservas con entrada pero sin salida
+    # Obtener reservas de la sede con entrada pero sin salida
     reservas_en_uso = Reserva.objects.filter(
+        parqueadero=parqueadero_actual(request),
         estado='RESERVADA',
         hora_entrada__isnull=False,
         hora_salida__isnull=True
@@ -433,17 +483,22 @@ def vigilante_salida(request):
     context = {
         'reservas': reservas_en_uso,
         'es_vigilante': True,
+        # Prefijo de la clave de idempotencia de cada salida (una por reserva)
+        'clave_idempotencia': uuid.uuid4().hex,
     }
     return render(request, 'vigilante/salida.html', context)
 
 
+@idempotente()
 @login_required
+@transaction.atomic
 def vigilante_registrar_salida(request, reserva_id):
     """
     HU 017 – Registrar salida de vehículo
     Registra la salida, libera el espacio y completa la reserva.
+    Solo reservas de la sede del vigilante.
     """
-    reserva = get_object_or_404(Reserva, id=reserva_id)
+    reserva = get_object_or_404(Reserva, id=reserva_id, parqueadero=parqueadero_actual(request))
     
     # Validar que tenga entrada registrada
     if not reserva.hora_entrada:
@@ -461,12 +516,16 @@ def vigilante_registrar_salida(request, reserva_id):
     reserva.estado = 'COMPLETADA'
     reserva.save()
     
-    # Liberar el espacio
+    # Liberar el espacio (y asignarlo a la lista de espera, si hay solicitudes)
     espacio = reserva.espacio
     espacio.estado = 'LIBRE'
     espacio.save()
+    asignadas = asignar_espacios_liberados([espacio])
     
+    metricas.registros_porteria.labels('salida').inc()
     messages.success(request, f'Salida registrada exitosamente para la placa {reserva.placa} a las {now.strftime("%H:%M")}.')
+    if asignadas:
+        messages.info(request, f'El espacio {espacio.numero} quedó reservado para la placa {asignadas[0].placa} (lista de espera).')
     return redirect('vigilante_salida')
 
 
@@ -474,24 +533,25 @@ def vigilante_registrar_salida(request, reserva_id):
 def vigilante_ocupacion(request):
     """
     HU 018 – Ver ocupación actual del parqueadero
-    Muestra todos los espacios con su estado actual.
+    Muestra todos los espacios de la sede actual con su estado.
+    Estadísticas y grilla se cachean por sede y versión del estado de sus espacios.
     """
-    espacios = EspacioParqueadero.objects.all()
+    parqueadero = parqueadero_actual(request)
+    espacios = EspacioParqueadero.objects.filter(parqueadero=parqueadero)
     
     # Estadísticas
-    total = espacios.count()
-    libres = espacios.filter(estado='LIBRE').count()
-    ocupados = espacios.filter(estado='OCUPADO').count()
-    reservados = espacios.filter(estado='RESERVADO').count()
-    bloqueados = espacios.filter(estado='BLOQUEADO').count()
+    version = version_espacios(parqueadero.id)
+    conteos = conteos_por_estado(parqueadero.id, version)
     
     context = {
         'espacios': espacios,
-        'total': total,
-        'libres': libres,
-        'ocupados': ocupados,
-        'reservados': reservados,
-        'bloqueados': bloqueados,
+        'parqueadero': parqueadero,
+        'version_espacios': version,
+        'total': sum(conteos.values()),
+        'libres': conteos['LIBRE'],
+        'ocupados': conteos['OCUPADO'],
+        'reservados': conteos['RESERVADO'],
+        'bloqueados': conteos['BLOQUEADO'],
         'es_vigilante': True,
     }
     return render(request, 'vigilante/ocupacion.html', context)
@@ -508,14 +568,15 @@ def registrar_incidencia(request):
     Disponible para vigilantes y administradores.
     """
     # Verificar que el usuario sea vigilante o superuser
-    es_vigilante = request.user.groups.filter(name='VIGILANTE').exists()
+    es_vigilante = usuario_es_vigilante(request.user)
     es_admin = request.user.is_superuser
     
     if not (es_vigilante or es_admin):
         messages.error(request, 'No tiene permisos para registrar incidencias.')
         return redirect('home')
     
-    espacios = EspacioParqueadero.objects.all().order_by('numero')
+    parqueadero = parqueadero_actual(request)
+    espacios = EspacioParqueadero.objects.filter(parqueadero=parqueadero).order_by('numero')
     
     if request.method == 'POST':
         tipo = request.POST.get('tipo')
@@ -535,12 +596,13 @@ def registrar_incidencia(request):
         espacio = None
         if espacio_id:
             try:
-                espacio = EspacioParqueadero.objects.get(id=espacio_id)
-            except EspacioParqueadero.DoesNotExist:
+                espacio = espacios.get(id=espacio_id)
+            except (EspacioParqueadero.DoesNotExist, ValueError):
                 pass
         
         # Crear la incidencia
         incidencia = Incidencia.objects.create(
+            parqueadero=parqueadero,
             tipo=tipo,
             espacio=espacio,
             descripcion=descripcion,
@@ -564,45 +626,136 @@ def listar_incidencias(request):
     Disponible para vigilantes y administradores.
     """
     # Verificar que el usuario sea vigilante o superuser
-    es_vigilante = request.user.groups.filter(name='VIGILANTE').exists()
+    es_vigilante = usuario_es_vigilante(request.user)
     es_admin = request.user.is_superuser
     
     if not (es_vigilante or es_admin):
         messages.error(request, 'No tiene permisos para ver incidencias.')
         return redirect('home')
     
-    # Obtener todas las incidencias
-    incidencias = Incidencia.objects.all().select_related('espacio', 'reportado_por').order_by('-fecha_hora')
-    
-    # Filtrar por tipo si se proporciona
     tipo_filtro = request.GET.get('tipo')
-    if tipo_filtro:
-        incidencias = incidencias.filter(tipo=tipo_filtro)
-    
-    # Estadísticas por tipo (usar todas las incidencias, no solo las filtradas)
-    todas_incidencias = Incidencia.objects.all()
-    stats = {
-        'SIN_RESERVA': todas_incidencias.filter(tipo='SIN_RESERVA').count(),
-        'DANIO_ESPACIO': todas_incidencias.filter(tipo='DANIO_ESPACIO').count(),
-        'OCUPACION_INDEBIDA': todas_incidencias.filter(tipo='OCUPACION_INDEBIDA').count(),
-        'OTRO': todas_incidencias.filter(tipo='OTRO').count(),
-    }
+    busqueda = request.GET.get('q', '').strip()
+    parqueadero = parqueadero_actual(request)
+    
+    if busqueda:
+        # Búsqueda de texto completo, ordenada por relevancia
+        incidencias = buscar_texto_incidencias(busqueda, tipo=tipo_filtro, parqueadero_id=parqueadero.id)
+    else:
+        # Obtener las incidencias de la sede
+        incidencias = Incidencia.objects.filter(
+            parqueadero=parqueadero
+        ).select_related('espacio', 'reportado_por').order_by('-fecha_hora')
+        
+        # Filtrar por tipo si se proporciona
+        if tipo_filtro:
+            incidencias = incidencias.filter(tipo=tipo_filtro)
+    
+    # Estadísticas por tipo de la sede (no solo las filtradas), en una sola consulta agrupada
+    stats = dict.fromkeys(['SIN_RESERVA', 'DANIO_ESPACIO', 'OCUPACION_INDEBIDA', 'OTRO'], 0)
+    stats.update(
+        fila for fila in Incidencia.objects.filter(parqueadero=parqueadero)
+        .order_by().values_list('tipo').annotate(total=Count('id'))
+        if fila[0] in stats
+    )
     
     context = {
         'incidencias': incidencias,
         'tipo_filtro': tipo_filtro,
+        'busqueda': busqueda,
         'stats': stats,
         'es_vigilante': es_vigilante or es_admin,  # Superuser también ve menú de vigilante
     }
     return render(request, 'vigilante/listar_incidencias.html', context)
 
 
+@login_required
+def buscar_incidencias(request):
+    """
+    Endpoint JSON de búsqueda de texto completo sobre las incidencias.
+    Devuelve los resultados ordenados por relevancia con el fragmento
+    de la descripción resaltado.
+    Disponible para vigilantes y administradores.
+    """
+    es_vigilante = usuario_es_vigilante(request.user)
+    if not (es_vigilante or request.user.is_superuser):
+        return JsonResponse({'error': 'No tiene permisos para buscar incidencias.'}, status=403)
+    
+    busqueda = request.GET.get('q', '').strip()
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 20)), 100))
+    except ValueError:
+        limite = 20
+    
+    incidencias = buscar_texto_incidencias(
+        busqueda, tipo=request.GET.get('tipo'), limite=limite, parqueadero_id=parqueadero_actual(request).id
+    )
+    
+    resultados = [
+        {
+            'id': incidencia.id,
+            'tipo': incidencia.tipo,
+            'espacio': incidencia.espacio.numero if incidencia.espacio else None,
+            'fragmento': incidencia.fragmento,
+            'reportado_por': incidencia.reportado_por.username,
+            'fecha_hora': incidencia.fecha_hora.isoformat(),
+        }
+        for incidencia in incidencias
+    ]
+    return JsonResponse({'q': busqueda, 'resultados': resultados})
+
+
 # ============================================================
 # VISTAS PARA PANEL DE ADMINISTRACIÓN
 # ============================================================
 
+def metricas_prometheus(request):
+    """
+    Exposición de métricas en formato de texto de Prometheus.
+    Sin autenticación de usuario: solo responde a las IPs de
+    METRICAS_IPS_PERMITIDAS (el servidor Prometheus).
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICAS_IPS_PERMITIDAS:
+        return HttpResponseForbidden()
+    if not metricas.DISPONIBLE:
+        return HttpResponse('prometheus_client no está instalado.\n', status=503, content_type='text/plain')
+    return HttpResponse(metricas.exportar(), content_type=metricas.CONTENT_TYPE_LATEST)
+
+
+@require_safe
+def servir_media(request, ruta):
+    """
+    Entrega los archivos de MEDIA_ROOT (códigos QR) con ETag por contenido,
+    304 para revalidaciones y caché inmutable para los QR.
+    Según MEDIA_ENTREGA el archivo lo envía Django (FileResponse) o el
+    servidor web (X-Sendfile / X-Accel-Redirect).
+    """
+    absoluta = resolver_ruta(ruta)
+    if absoluta is None:
+        raise Http404('Archivo no encontrado.')
+    
+    estado = os.stat(absoluta)
+    etag = etag_archivo(absoluta, estado)
+    
+    if coincide_etag(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_ENTREGA == 'x-sendfile':
+        response = HttpResponse(content_type=tipo_contenido(ruta))
+        response['X-Sendfile'] = absoluta
+    elif settings.MEDIA_ENTREGA == 'x-accel-redirect':
+        response = HttpResponse(content_type=tipo_contenido(ruta))
+        response['X-Accel-Redirect'] = settings.MEDIA_INTERNA_URL + quote(ruta)
+    else:
+        response = FileResponse(open(absoluta, 'rb'), content_type=tipo_contenido(ruta))
+    
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control(ruta)
+    response['Last-Modified'] = http_date(estado.st_mtime)
+    return response
+
+
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.decorators import user_passes_test
+from django.contrib.auth.hashers import make_password
 
 def es_superuser(user):
     """Verifica que el usuario sea superuser"""
@@ -676,15 +829,11 @@ def admin_usuarios_listar(request):
     elif rol == 'admin':
         usuarios = usuarios.filter(is_superuser=True)
     
-    # Pre-calcular roles para evitar lógica compleja en el template
+    # Pre-calcular roles para evitar lógica compleja en el template.
+    # Los grupos se precargan en una sola consulta (evita N+1)
     usuarios_con_rol = []
-    for usuario in usuarios:
-        if usuario.is_superuser:
-            usuario.rol_display = 'admin'
-        elif usuario.groups.filter(name='VIGILANTE').exists():
-            usuario.rol_display = 'vigilante'
-        else:
-            usuario.rol_display = 'cliente'
+    for usuario in usuarios.prefetch_related('groups'):
+        usuario.rol_display = rol_principal(usuario)
         usuarios_con_rol.append(usuario)
     
     context = {
@@ -721,23 +870,26 @@ def admin_usuarios_crear(request):
         elif User.objects.filter(email=email).exists():
             messages.error(request, 'El email ya está registrado.')
         else:
-            # Crear usuario
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                password=password,
-                first_name=first_name,
-                last_name=last_name
-            )
-            
-            # Asignar rol
-            if rol == 'vigilante':
-                grupo_vigilante, _ = Group.objects.get_or_create(name='VIGILANTE')
-                user.groups.add(grupo_vigilante)
-            elif rol == 'admin':
-                user.is_superuser = True
-                user.is_staff = True
-                user.save()
+            # El hash (PBKDF2, cientos de ms) se calcula antes de abrir la
+            # transacción: no retiene el cerrojo de escritura de SQLite
+            password_hash = make_password(password)
+            es_admin = rol == 'admin'
+            with transaction.atomic():
+                # Crear usuario
+                user = User.objects.create(
+                    username=User.normalize_username(username),
+                    email=User.objects.normalize_email(email),
+                    password=password_hash,
+                    first_name=first_name or '',
+                    last_name=last_name or '',
+                    is_staff=es_admin,
+                    is_superuser=es_admin,
+                )
+                
+                # Asignar rol
+                if rol == 'vigilante':
+                    grupo_vigilante, _ = Group.objects.get_or_create(name='VIGILANTE')
+                    user.groups.add(grupo_vigilante)
             
             messages.success(request, f'Usuario {username} creado exitosamente.')
             return redirect('admin_usuarios_listar')
@@ -764,33 +916,29 @@ def admin_usuarios_editar(request, user_id):
         if new_password:
             usuario.set_password(new_password)
         
-        # Actualizar rol
+        # Actualizar rol (el hash de la contraseña ya se calculó fuera de la transacción)
         rol = request.POST.get('rol')
-        usuario.groups.clear()
-        
-        if rol == 'vigilante':
-            grupo_vigilante, _ = Group.objects.get_or_create(name='VIGILANTE')
-            usuario.groups.add(grupo_vigilante)
-            usuario.is_superuser = False
-            usuario.is_staff = False
-        elif rol == 'admin':
-            usuario.is_superuser = True
-            usuario.is_staff = True
-        else:  # cliente
-            usuario.is_superuser = False
-            usuario.is_staff = False
-        
-        usuario.save()
+        with transaction.atomic():
+            usuario.groups.clear()
+            
+            if rol == 'vigilante':
+                grupo_vigilante, _ = Group.objects.get_or_create(name='VIGILANTE')
+                usuario.groups.add(grupo_vigilante)
+                usuario.is_superuser = False
+                usuario.is_staff = False
+            elif rol == 'admin':
+                usuario.is_superuser = True
+                usuario.is_staff = True
+            else:  # cliente
+                usuario.is_superuser = False
+                usuario.is_staff = False
+            
+            usuario.save()
         messages.success(request, f'Usuario {usuario.username} actualizado exitosamente.')
         return redirect('admin_usuarios_listar')
     
     # Determinar rol actual
-    if usuario.is_superuser:
-        rol_actual = 'admin'
-    elif usuario.groups.filter(name='VIGILANTE').exists():
-        rol_actual = 'vigilante'
-    else:
-        rol_actual = 'cliente'
+    rol_actual = rol_principal(usuario)
     
     context = {
         'usuario': usuario,
@@ -821,6 +969,91 @@ def admin_usuarios_toggle_estado(request, user_id):
     return redirect('admin_usuarios_listar')
 
 
+@login_required
+@user_passes_test(es_superuser)
+def admin_usuarios_importar(request):
+    """
+    Importa usuarios desde un CSV: validación completa, hash de contraseñas en
+    paralelo e inserción por lotes (ver core/importacion.py). El hash corre
+    dentro de la petición: hasta IMPORTACION_MAXIMO_FILAS_WEB usuarios; los
+    archivos grandes van por el comando importar_usuarios.
+    """
+    errores = []
+    if request.method == 'POST':
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            messages.error(request, 'Seleccione un archivo CSV.')
+        else:
+            try:
+                texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+                resumen = importar_usuarios(
+                    texto,
+                    omitir_errores=request.POST.get('omitir_errores') == 'on',
+                    maximo_filas=IMPORTACION_MAXIMO_FILAS_WEB,
+                )
+            except UnicodeDecodeError:
+                messages.error(request, 'El archivo debe estar codificado en UTF-8.')
+            except ErrorImportacion as e:
+                messages.error(request, str(e))
+                errores = e.errores
+            else:
+                mensaje = f"{resumen['creados']} usuarios importados."
+                if resumen['errores']:
+                    mensaje += f" {len(resumen['errores'])} filas con errores se omitieron."
+                messages.success(request, mensaje)
+                return redirect('admin_usuarios_listar')
+    
+    context = {
+        'errores': errores[:100],
+        'errores_ocultos': max(len(errores) - 100, 0),
+        'maximo': IMPORTACION_MAXIMO_FILAS_WEB,
+    }
+    return render(request, 'admin_panel/usuarios/importar.html', context)
+
+
+@login_required
+@user_passes_test(es_superuser)
+def admin_pronostico(request):
+    """
+    Muestra el pronóstico de demanda horaria por tipo de espacio para los
+    próximos días, comparado con la capacidad disponible de cada tipo.
+    """
+    pronostico = obtener_pronostico()
+    generado_en = PronosticoDemanda.objects.aggregate(ultimo=Max('generado_en'))['ultimo']
+    
+    context = {
+        'pronostico': pronostico,
+        'generado_en': generado_en,
+        'horas': range(24),
+    }
+    return render(request, 'admin_panel/pronostico.html', context)
+
+
+@login_required
+@user_passes_test(es_superuser)
+def admin_perfiles(request):
+    """
+    Lista los perfiles de peticiones capturados con ?perfilar=1
+    o la cabecera X-MiParqueo-Perfilar.
+    """
+    context = {
+        'perfiles': listar_perfiles(),
+    }
+    return render(request, 'admin_panel/perfiles.html', context)
+
+
+@login_required
+@user_passes_test(es_superuser)
+def admin_perfiles_descargar(request, identificador, tipo):
+    """
+    Descarga el perfil cProfile (.prof) o la traza SQL (.json) de una petición.
+    """
+    ruta = ruta_perfil(identificador, tipo)
+    if ruta is None:
+        raise Http404('Perfil no encontrado')
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=ruta.name)
+
+
 # ============================================================
 # GESTIÓN DE ESPACIOS DE PARQUEADERO (ADMIN)
 # ============================================================
@@ -829,9 +1062,10 @@ def admin_usuarios_toggle_estado(request, user_id):
 @user_passes_test(es_superuser)
 def admin_espacios_listar(request):
     """
-    Lista todos los espacios de parqueadero con búsqueda y filtros.
+    Lista los espacios de la sede actual con búsqueda y filtros.
     """
-    espacios = EspacioParqueadero.objects.all().order_by('numero')
+    parqueadero = parqueadero_actual(request)
+    espacios = EspacioParqueadero.objects.filter(parqueadero=parqueadero).order_by('numero')
     
     # Búsqueda por número
     search = request.GET.get('search', '')
@@ -845,6 +1079,7 @@ def admin_espacios_listar(request):
     
     context = {
         'espacios': espacios,
+        'parqueadero': parqueadero,
         'search': search,
         'estado': estado,
     }
@@ -855,27 +1090,30 @@ def admin_espacios_listar(request):
 @user_passes_test(es_superuser)
 def admin_espacios_crear(request):
     """
-    Crea un nuevo espacio de parqueadero.
+    Crea un nuevo espacio de parqueadero en la sede actual.
     """
+    parqueadero = parqueadero_actual(request)
+    
     if request.method == 'POST':
         numero = request.POST.get('numero')
         estado = request.POST.get('estado', 'DISPONIBLE')
         
-        # Validaciones
+        # Validaciones (el número es único dentro de la sede)
         if not numero:
             messages.error(request, 'El número de espacio es obligatorio.')
-        elif EspacioParqueadero.objects.filter(numero=numero).exists():
-            messages.error(request, f'El espacio {numero} ya existe.')
+        elif EspacioParqueadero.objects.filter(parqueadero=parqueadero, numero=numero).exists():
+            messages.error(request, f'El espacio {numero} ya existe en {parqueadero.nombre}.')
         else:
             # Crear espacio
             EspacioParqueadero.objects.create(
+                parqueadero=parqueadero,
                 numero=numero,
                 estado=estado
             )
             messages.success(request, f'Espacio {numero} creado exitosamente.')
             return redirect('admin_espacios_listar')
     
-    return render(request, 'admin_panel/espacios/crear.html')
+    return render(request, 'admin_panel/espacios/crear.html', {'parqueadero': parqueadero})
 
 
 @login_required
@@ -884,14 +1122,16 @@ def admin_espacios_editar(request, espacio_id):
     """
     Edita un espacio de parqueadero existente.
     """
-    espacio = get_object_or_404(EspacioParqueadero, id=espacio_id)
+    espacio = get_object_or_404(EspacioParqueadero.objects.select_related('parqueadero'), id=espacio_id)
     
     if request.method == 'POST':
         numero = request.POST.get('numero')
         estado = request.POST.get('estado')
         
-        # Validar que el número no esté en uso por otro espacio
-        if EspacioParqueadero.objects.filter(numero=numero).exclude(id=espacio_id).exists():
+        # Validar que el número no esté en uso por otro espacio de la misma sede
+        if EspacioParqueadero.objects.filter(
+            parqueadero_id=espacio.parqueadero_id, numero=numero
+        ).exclude(id=espacio_id).exists():
             messages.error(request, f'El número {numero} ya está en uso por otro espacio.')
         else:
             espacio.numero = numero
@@ -906,3 +1146,85 @@ def admin_espacios_editar(request, espacio_id):
     }
     return render(request, 'admin_panel/espacios/editar.html', context)
 
+
+
+@login_required
+@user_passes_test(es_superuser)
+def admin_espacios_crear_lote(request):
+    """
+    Crea un rango de espacios (ej. 301 a 600) de la sede actual en un solo
+    INSERT por lotes.
+    """
+    parqueadero = parqueadero_actual(request)
+    
+    if request.method == 'POST':
+        try:
+            desde = int(request.POST.get('desde', ''))
+            hasta = int(request.POST.get('hasta', ''))
+            resumen = crear_espacios_rango(
+                parqueadero,
+                desde,
+                hasta,
+                request.POST.get('tipo'),
+                request.POST.get('estado', 'LIBRE'),
+                omitir_existentes=request.POST.get('omitir_existentes') == 'on',
+            )
+        except ValueError:
+            messages.error(request, 'El rango debe ser numérico.')
+        except ErrorEspacios as e:
+            messages.error(request, str(e))
+        else:
+            mensaje = f"{resumen['creados']} espacios creados ({desde} a {hasta})."
+            if resumen['existentes']:
+                mensaje += f" {len(resumen['existentes'])} ya existían y se omitieron."
+            messages.success(request, mensaje)
+            return redirect('admin_espacios_listar')
+    
+    context = {
+        'parqueadero': parqueadero,
+        'tipos': EspacioParqueadero.TIPO_CHOICES,
+        'estados': EspacioParqueadero.ESTADO_CHOICES,
+        'maximo': LOTE_ESPACIOS_MAXIMO,
+    }
+    return render(request, 'admin_panel/espacios/crear_lote.html', context)
+
+
+@login_required
+@user_passes_test(es_superuser)
+def admin_espacios_estado_lote(request):
+    """
+    Cambia el estado de los espacios marcados en el listado, o de un rango
+    de números de la sede actual, con un solo UPDATE. Al bloquear se cancelan
+    las reservas pendientes de esos espacios; al liberar u ocupar, los
+    espacios con reservas pendientes se omiten.
+    """
+    if request.method != 'POST':
+        return redirect('admin_espacios_listar')
+    
+    parqueadero = parqueadero_actual(request)
+    desde = request.POST.get('desde', '').strip()
+    hasta = request.POST.get('hasta', '').strip()
+    try:
+        if desde or hasta:
+            espacios = EspacioParqueadero.objects.filter(numero__range=(int(desde), int(hasta)))
+        else:
+            ids = [int(espacio_id) for espacio_id in request.POST.getlist('espacios')]
+            espacios = EspacioParqueadero.objects.filter(id__in=ids)
+        resumen = cambiar_estado_espacios(parqueadero, espacios, request.POST.get('estado'))
+    except ValueError:
+        messages.error(request, 'El rango debe ser numérico.')
+    except ErrorEspacios as e:
+        messages.error(request, str(e))
+    else:
+        mensaje = f"{resumen['actualizados']} espacios actualizados."
+        if resumen['reservas_canceladas']:
+            mensaje += f" {resumen['reservas_canceladas']} reservas pendientes canceladas."
+        if resumen['omitidos_en_uso']:
+            mensaje += f" {resumen['omitidos_en_uso']} espacios con vehículo adentro no se modificaron."
+        if resumen['omitidos_reservados']:
+            mensaje += (
+                f" {resumen['omitidos_reservados']} espacios con reservas pendientes no se modificaron"
+                " (bloquéelos para cancelarlas)."
+            )
+        messages.success(request, mensaje)
+    return redirect('admin_espacios_listar')
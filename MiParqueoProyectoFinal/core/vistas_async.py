@@ -0,0 +1,195 @@
+"""
+Versiones asíncronas de las vistas de lectura más consultadas.
+
+Bajo ASGI una vista síncrona ocupa un hilo del pool durante toda la
+petición; los tableros de ocupación que consultan cada pocos segundos
+terminan agotándolo. Estas vistas usan el ORM async (aget, acount,
+iteración async) y dejan resueltos el usuario y sus roles antes de
+renderizar, así el template no hace ninguna consulta.
+
+Se montan en lugar de las de core/views.py cuando MIPARQUEO_VISTAS_ASYNC
+es True (por defecto al arrancar con mi_parqueo/asgi.py). Bajo WSGI se
+mantienen las síncronas: una vista async ahí cuesta un bucle de eventos
+por petición.
+"""
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count
+from django.shortcuts import redirect, render
+
+from .archivo import ahistorial_usuario
+from .busqueda import buscar_incidencias as buscar_texto_incidencias
+from .cache_espacios import aconteos_por_estado, grilla_cacheada, version_espacios
+from .models import EspacioParqueadero, Incidencia, Reserva
+from .parqueaderos import aparqueadero_actual
+from .recomendacion import recomendacion_para
+from .roles import aobtener_roles, es_vigilante as usuario_es_vigilante
+
+
+async def _usuario_resuelto(request):
+    """
+    Carga el usuario y sus roles con el ORM async y los deja en request.user,
+    para que los context processors y templates no consulten la base de datos.
+    """
+    usuario = await request.auser()
+    await aobtener_roles(usuario)
+    request.user = usuario
+    return usuario
+
+
+async def _espacios(nombre_grilla, parqueadero, version):
+    """
+    Espacios de la sede para la grilla: si el fragmento ya está en caché se
+    pasa el HTML y no se consulta la tabla.
+
+    Returns:
+        tuple: (espacios, grilla_html)
+    """
+    grilla_html = grilla_cacheada(nombre_grilla, parqueadero.id, version)
+    if grilla_html is not None:
+        return [], grilla_html
+    return [espacio async for espacio in EspacioParqueadero.objects.filter(parqueadero=parqueadero)], None
+
+
+@login_required
+async def cliente_disponibilidad(request):
+    """
+    HU 007 – Consultar disponibilidad de espacios (versión async)
+    """
+    await _usuario_resuelto(request)
+    parqueadero = await aparqueadero_actual(request)
+    version = version_espacios(parqueadero.id)
+    espacios, grilla_html = await _espacios('grilla_disponibilidad', parqueadero, version)
+    recomendacion = None
+    if request.GET.get('entrada'):
+        # Solo consulta la base de datos si el índice debe resincronizarse
+        recomendacion = await sync_to_async(recomendacion_para)(
+            parqueadero, request.GET['entrada'], request.GET.get('tipo', 'CARRO'), version
+        )
+
+    context = {
+        'espacios': espacios,
+        'grilla_html': grilla_html,
+        'parqueadero': parqueadero,
+        'version_espacios': version,
+        'recomendacion': recomendacion,
+        'tipos_espacio': EspacioParqueadero.TIPO_CHOICES,
+        'es_cliente': True,
+    }
+    return render(request, 'cliente/disponibilidad.html', context)
+
+
+@login_required
+async def cliente_historial(request):
+    """
+    HU 011 – Ver historial de reservas (versión async)
+    """
+    usuario = await _usuario_resuelto(request)
+    reservas = await ahistorial_usuario(usuario)
+
+    context = {
+        'reservas': reservas,
+        'es_cliente': True,
+    }
+    return render(request, 'cliente/historial.html', context)
+
+
+@login_required
+async def vigilante_salida(request):
+    """
+    HU 017 – Registrar salida de vehículo (versión async del listado)
+    """
+    await _usuario_resuelto(request)
+    parqueadero = await aparqueadero_actual(request)
+    reservas_en_uso = [
+        reserva async for reserva in Reserva.objects.filter(
+            parqueadero=parqueadero,
+            estado='RESERVADA',
+            hora_entrada__isnull=False,
+            hora_salida__isnull=True
+        ).select_related('espacio', 'usuario')
+    ]
+
+    context = {
+        'reservas': reservas_en_uso,
+        'es_vigilante': True,
+        'clave_idempotencia': uuid.uuid4().hex,
+    }
+    return render(request, 'vigilante/salida.html', context)
+
+
+@login_required
+async def vigilante_ocupacion(request):
+    """
+    HU 018 – Ver ocupación actual del parqueadero (versión async)
+    """
+    await _usuario_resuelto(request)
+    parqueadero = await aparqueadero_actual(request)
+    version = version_espacios(parqueadero.id)
+    conteos = await aconteos_por_estado(parqueadero.id, version)
+    espacios, grilla_html = await _espacios('grilla_ocupacion', parqueadero, version)
+
+    context = {
+        'espacios': espacios,
+        'grilla_html': grilla_html,
+        'parqueadero': parqueadero,
+        'version_espacios': version,
+        'total': sum(conteos.values()),
+        'libres': conteos['LIBRE'],
+        'ocupados': conteos['OCUPADO'],
+        'reservados': conteos['RESERVADO'],
+        'bloqueados': conteos['BLOQUEADO'],
+        'es_vigilante': True,
+    }
+    return render(request, 'vigilante/ocupacion.html', context)
+
+
+@login_required
+async def listar_incidencias(request):
+    """
+    Listado de incidencias para vigilantes y administradores (versión async)
+    """
+    usuario = await _usuario_resuelto(request)
+    es_vigilante = usuario_es_vigilante(usuario)
+    es_admin = usuario.is_superuser
+
+    if not (es_vigilante or es_admin):
+        messages.error(request, 'No tiene permisos para ver incidencias.')
+        return redirect('home')
+
+    tipo_filtro = request.GET.get('tipo')
+    busqueda = request.GET.get('q', '').strip()
+    parqueadero = await aparqueadero_actual(request)
+
+    if busqueda:
+        # La búsqueda FTS5 usa SQL crudo: se ejecuta en el hilo del ORM
+        incidencias = await sync_to_async(buscar_texto_incidencias)(
+            busqueda, tipo=tipo_filtro, parqueadero_id=parqueadero.id
+        )
+    else:
+        consulta = Incidencia.objects.filter(
+            parqueadero=parqueadero
+        ).select_related('espacio', 'reportado_por').order_by('-fecha_hora')
+        if tipo_filtro:
+            consulta = consulta.filter(tipo=tipo_filtro)
+        incidencias = [incidencia async for incidencia in consulta]
+
+    # Estadísticas por tipo en una sola consulta agrupada
+    stats = dict.fromkeys(['SIN_RESERVA', 'DANIO_ESPACIO', 'OCUPACION_INDEBIDA', 'OTRO'], 0)
+    por_tipo = (
+        Incidencia.objects.filter(parqueadero=parqueadero)
+        .order_by().values_list('tipo').annotate(total=Count('id'))
+    )
+    stats.update([fila async for fila in por_tipo if fila[0] in stats])
+
+    context = {
+        'incidencias': incidencias,
+        'tipo_filtro': tipo_filtro,
+        'busqueda': busqueda,
+        'stats': stats,
+        'es_vigilante': es_vigilante or es_admin,  # Superuser también ve menú de vigilante
+    }
+    return render(request, 'vigilante/listar_incidencias.html', context)
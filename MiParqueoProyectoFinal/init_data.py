@@ -17,7 +17,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
 django.setup()
 
 from django.contrib.auth.models import User, Group
-from core.models import EspacioParqueadero
+from core.models import EntradaEdificio, EspacioParqueadero, Parqueadero
 
 def crear_datos_iniciales():
     print("=" * 60)
@@ -83,33 +83,53 @@ def crear_datos_iniciales():
     
     print("\n   Todos los clientes tienen contraseña: cliente123")
     
-    # 5. Crear espacios de parqueadero
+    # 5. Crear la sede y sus espacios de parqueadero
     print("\n5. Creando espacios de parqueadero...")
-    if EspacioParqueadero.objects.count() == 0:
+    sede, created = Parqueadero.objects.get_or_create(
+        codigo='principal', defaults={'nombre': 'Sede Principal'}
+    )
+    sede.vigilantes.add(vigilante)
+    if created:
+        print(f"   [OK] Parqueadero '{sede.nombre}' creado (vigilante asignado)")
+    for nombre, x, y in (('Bloque A', 0.0, -5.0), ('Bloque B', 60.0, -5.0)):
+        EntradaEdificio.objects.get_or_create(parqueadero=sede, nombre=nombre, defaults={'x': x, 'y': y})
+    if not sede.espacios.exists():
         espacios = []
         
-        # 20 espacios para carros (1-20)
+        # 20 espacios para carros (1-20), en fila frente a los bloques
         for i in range(1, 21):
             espacios.append(EspacioParqueadero(
+                parqueadero=sede,
                 numero=i,
                 tipo='CARRO',
-                estado='LIBRE'
+                estado='LIBRE',
+                zona='A',
+                x=(i - 1) * 2.5,
+                y=0.0
             ))
         
-        # 10 espacios para motos (21-30)
+        # 10 espacios para motos (21-30), en la segunda fila
         for i in range(21, 31):
             espacios.append(EspacioParqueadero(
+                parqueadero=sede,
                 numero=i,
                 tipo='MOTO',
-                estado='LIBRE'
+                estado='LIBRE',
+                zona='B',
+                x=(i - 21) * 1.5,
+                y=6.0
             ))
         
-        # 3 espacios para discapacidad (31-33)
+        # 3 espacios para discapacidad (31-33), junto al Bloque B
         for i in range(31, 34):
             espacios.append(EspacioParqueadero(
+                parqueadero=sede,
                 numero=i,
                 tipo='DISCAPACIDAD',
-                estado='LIBRE'
+                estado='LIBRE',
+                zona='A',
+                x=55.0 + (i - 31) * 3.5,
+                y=0.0
             ))
         
         EspacioParqueadero.objects.bulk_create(espacios)
@@ -118,7 +138,7 @@ def crear_datos_iniciales():
         print("     - 10 espacios para MOTO (21-30)")
         print("     - 3 espacios para DISCAPACIDAD (31-33)")
     else:
-        print(f"   [INFO] Ya existen {EspacioParqueadero.objects.count()} espacios")
+        print(f"   [INFO] Ya existen {sede.espacios.count()} espacios en {sede.nombre}")
     
     print("\n" + "=" * 60)
     print("INICIALIZACION COMPLETADA")
@@ -0,0 +1,121 @@
+"""
+Calentamiento del proceso al arrancar (lo llaman wsgi.py y asgi.py).
+
+Sin esto, la primera petición que llega a cada worker carga el URLconf
+(importa core.views y sus dependencias) y compila el template que toque;
+con autoescalado esa primera petición es la más lenta de todas. Aquí se
+hace ese trabajo antes de aceptar tráfico: el loader cacheado de
+settings.TEMPLATES conserva los templates compilados durante toda la vida
+del proceso.
+"""
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def precompilar_templates():
+    """
+    Compila todos los templates de los directorios DIRS de cada motor.
+
+    Returns:
+        int: Templates compilados
+    """
+    compilados = 0
+    for motor in engines.all():
+        for directorio in motor.dirs:
+            for ruta in sorted(Path(directorio).rglob('*.html')):
+                nombre = ruta.relative_to(directorio).as_posix()
+                try:
+                    motor.get_template(nombre)
+                except TemplateSyntaxError as e:
+                    logger.warning('No se pudo precompilar %s: %s', nombre, e)
+                    continue
+                compilados += 1
+    return compilados
+
+
+def calentar():
+    """
+    Carga el URLconf y precompila los templates.
+
+    Returns:
+        dict: Templates compilados y duración en milisegundos
+    """
+    inicio = time.perf_counter()
+    get_resolver().url_patterns
+    compilados = precompilar_templates()
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    logger.info('Arranque: %d templates precompilados en %.0f ms', compilados, duracion_ms)
+    return {'templates': compilados, 'duracion_ms': duracion_ms}
+
+
+# Proceso hijo: arranca la aplicación WSGI y atiende una petición sin servidor HTTP
+_SCRIPT_PRIMERA_PETICION = """
+import json, os, sys, time
+inicio = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+from mi_parqueo.wsgi import application
+listo = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+entorno = {'PATH_INFO': sys.argv[1], 'REQUEST_METHOD': 'GET'}
+setup_testing_defaults(entorno)
+estado = []
+b''.join(application(entorno, lambda s, h, exc_info=None: estado.append(s)))
+fin = time.perf_counter()
+print(json.dumps({
+    'estado': estado[0],
+    'importar_ms': (listo - inicio) * 1000,
+    'primera_peticion_ms': (fin - listo) * 1000,
+    'cargados': [m for m in ('qrcode', 'PIL', 'numpy') if m in sys.modules],
+}))
+"""
+
+PATRON_IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def medir_arranque(url='/login/', importtime=False, entorno=None):
+    """
+    Mide en un proceso nuevo el tiempo desde el inicio hasta la primera
+    respuesta servida por la aplicación WSGI.
+
+    Args:
+        url: Ruta de la primera petición
+        importtime: Si True, incluye el tiempo de importación por módulo (-X importtime)
+        entorno: Variables de entorno adicionales para el proceso hijo
+
+    Returns:
+        dict: estado, proceso_ms (incluye el intérprete), importar_ms,
+              primera_peticion_ms, cargados y, con importtime, modulos
+              como lista de (modulo, propio_us, acumulado_us, nivel)
+    """
+    comando = [sys.executable]
+    if importtime:
+        comando += ['-X', 'importtime']
+    comando += ['-c', _SCRIPT_PRIMERA_PETICION, url]
+
+    inicio = time.perf_counter()
+    resultado = subprocess.run(
+        comando, cwd=settings.BASE_DIR, env={**os.environ, **(entorno or {})},
+        capture_output=True, text=True, check=True,
+    )
+    proceso_ms = (time.perf_counter() - inicio) * 1000
+
+    medicion = json.loads(resultado.stdout.strip().splitlines()[-1])
+    medicion['proceso_ms'] = proceso_ms
+    if importtime:
+        medicion['modulos'] = [
+            (m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+            for m in map(PATRON_IMPORTTIME.match, resultado.stderr.splitlines()) if m
+        ]
+    return medicion
@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
+# Bajo ASGI las vistas de lectura frecuentes usan sus versiones async
+os.environ.setdefault('MIPARQUEO_VISTAS_ASYNC', '1')
 
 application = get_asgi_application()
+
+# URLconf y templates listos antes de la primera petición (ver mi_parqueo/arranque.py)
+from mi_parqueo.arranque import calentar  # noqa: E402
+
+calentar()
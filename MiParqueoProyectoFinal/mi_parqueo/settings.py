@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,10 +45,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.MetricasMiddleware',
+    'core.middleware.InstrumentacionSQLMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,12 +62,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.parqueaderos.contexto',
+            ],
+            # Loader cacheado explícito (en lugar de APP_DIRS): cada template se
+            # compila una vez por proceso; mi_parqueo/arranque.py los precompila al iniciar
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -76,10 +90,101 @@ WSGI_APPLICATION = 'mi_parqueo.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('MIPARQUEO_BD_NOMBRE', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Perfil de producción de SQLite (MIPARQUEO_PERFIL_BD=produccion):
+# - WAL: los lectores no bloquean al escritor ni al revés
+# - busy_timeout: un escritor espera el bloqueo hasta 5 s en lugar de fallar
+# - synchronous=NORMAL: en WAL sigue siendo seguro ante caídas del proceso
+# - mmap_size / cache_size: 256 MB mapeados y 64 MB de caché de páginas por conexión
+# - BEGIN IMMEDIATE: transaction.atomic() toma el bloqueo de escritura al empezar,
+#   así una transacción de lectura-escritura nunca falla al promoverse a escritora
+# - Conexiones persistentes (CONN_MAX_AGE) para no repetir los pragmas en cada petición
+SQLITE_PRAGMAS_PRODUCCION = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA busy_timeout=5000;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA mmap_size=268435456;'
+    'PRAGMA cache_size=-65536;'
+    'PRAGMA temp_store=MEMORY;'
+)
+
+if os.environ.get('MIPARQUEO_PERFIL_BD') == 'produccion':
+    DATABASES['default'].update({
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS_PRODUCCION,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+
+# Caché (grillas de espacios, core/cache_espacios.py)
+# MIPARQUEO_CACHE=archivos comparte el caché entre procesos (varios workers);
+# el de memoria local solo sirve para un único proceso (desarrollo y pruebas).
+MIPARQUEO_CACHE_COMPARTIDO = os.environ.get('MIPARQUEO_CACHE') == 'archivos'
+if MIPARQUEO_CACHE_COMPARTIDO:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache' / 'general',
+            'OPTIONS': {'MAX_ENTRIES': 2000},
+        },
+        'sesiones': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache' / 'sesiones',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'idempotencia': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache' / 'idempotencia',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'miparqueo',
+            'OPTIONS': {'MAX_ENTRIES': 2000},
+        },
+        'sesiones': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'miparqueo-sesiones',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+        'idempotencia': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'miparqueo-idempotencia',
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+    }
+
+# El caché en memoria local es de un solo proceso: con varios workers cada uno
+# tendría sus propias grillas (que otro worker ya cambió), límites, cupos,
+# cerrojos de idempotencia y sesiones. WEB_CONCURRENCY es el número de
+# workers que leen gunicorn y uvicorn; con más de uno se exige el caché compartido.
+if int(os.environ.get('WEB_CONCURRENCY') or 1) > 1 and not MIPARQUEO_CACHE_COMPARTIDO:
+    raise ImproperlyConfigured(
+        'WEB_CONCURRENCY > 1 requiere MIPARQUEO_CACHE=archivos: '
+        'el caché en memoria local no se comparte entre procesos.'
+    )
+
+# Sesiones: con el caché compartido, lectura desde caché y escritura en
+# caché + django_session. Una petición autenticada ya no consulta
+# django_session mientras la sesión esté en caché; si se pierde (reinicio,
+# desalojo) se recarga desde la tabla. Con el caché en memoria de cada
+# proceso, un cierre de sesión (o cycle_key) en un worker dejaría la sesión
+# vieja válida en el caché de los demás: se usa solo la tabla.
+# Las sesiones vencidas se eliminan con: python manage.py limpiar_sesiones (cron diario).
+if MIPARQUEO_CACHE_COMPARTIDO:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+SESSION_CACHE_ALIAS = 'sesiones'
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,6 +226,11 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Entrega de media (core/media.py): 'django' (FileResponse/sendfile),
+# 'x-sendfile' (Apache/lighttpd) o 'x-accel-redirect' (nginx, ver README)
+MEDIA_ENTREGA = os.environ.get('MIPARQUEO_MEDIA_ENTREGA', 'django')
+MEDIA_INTERNA_URL = '/media-interna/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -130,3 +240,80 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Instrumentación SQL por petición (cabecera Server-Timing + log JSON).
+# Desactivada no tiene costo: el middleware se descarta al arrancar.
+MIPARQUEO_INSTRUMENTACION_SQL = False
+
+# Métricas Prometheus en /metrics (requiere prometheus_client).
+# Con varios procesos definir PROMETHEUS_MULTIPROC_DIR antes de arrancar.
+MIPARQUEO_METRICAS = os.environ.get('MIPARQUEO_METRICAS', '1') == '1'
+# Direcciones que pueden leer /metrics (el servidor Prometheus)
+METRICAS_IPS_PERMITIDAS = ['127.0.0.1', '::1']
+
+# Vistas de lectura async (core/vistas_async.py). mi_parqueo/asgi.py las activa
+# por defecto; bajo WSGI se usan las síncronas.
+MIPARQUEO_VISTAS_ASYNC = os.environ.get('MIPARQUEO_VISTAS_ASYNC') == '1'
+
+# Reservas terminadas con fecha anterior a este número de días se mueven a
+# ReservaHistorica con: python manage.py archivar_reservas (core/archivo.py)
+MIPARQUEO_ARCHIVO_DIAS = int(os.environ.get('MIPARQUEO_ARCHIVO_DIAS', '180'))
+
+# Correo de confirmaciones y recordatorios (python manage.py enviar_notificaciones,
+# core/notificaciones.py). Por defecto los mensajes se escriben en la consola;
+# MIPARQUEO_EMAIL=smtp los envía por MIPARQUEO_EMAIL_HOST:MIPARQUEO_EMAIL_PORT.
+if os.environ.get('MIPARQUEO_EMAIL') == 'smtp':
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_HOST = os.environ.get('MIPARQUEO_EMAIL_HOST', 'localhost')
+    EMAIL_PORT = int(os.environ.get('MIPARQUEO_EMAIL_PORT', '587'))
+    EMAIL_HOST_USER = os.environ.get('MIPARQUEO_EMAIL_USUARIO', '')
+    EMAIL_HOST_PASSWORD = os.environ.get('MIPARQUEO_EMAIL_CLAVE', '')
+    EMAIL_USE_TLS = EMAIL_PORT == 587
+else:
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'MiParqueo <no-responder@campusucc.edu.co>'
+# Anticipación del recordatorio: reservas que empiezan en los próximos N minutos
+MIPARQUEO_RECORDATORIO_MINUTOS = int(os.environ.get('MIPARQUEO_RECORDATORIO_MINUTOS', '30'))
+
+# Límites de escritura de reservas (core/limites.py): (capacidad de la cubeta,
+# fichas recuperadas por minuto) por usuario y por IP; None desactiva el límite.
+# La cubeta por IP es más amplia: la red del campus sale por pocas direcciones.
+MIPARQUEO_LIMITE_USUARIO = (10, 6)
+MIPARQUEO_LIMITE_IP = (120, 120)
+# Reservas activas (RESERVADA) simultáneas por usuario; None sin cupo
+# (MIPARQUEO_CUPO_RESERVAS= vacío)
+_cupo_reservas = os.environ.get('MIPARQUEO_CUPO_RESERVAS', '5').strip()
+MIPARQUEO_CUPO_RESERVAS = int(_cupo_reservas) if _cupo_reservas else None
+
+# Idempotency-Key en crear reserva y entrada/salida de portería (core/idempotencia.py):
+# segundos que se guarda la respuesta y que espera un reintento simultáneo
+MIPARQUEO_IDEMPOTENCIA_TTL = 24 * 60 * 60
+MIPARQUEO_IDEMPOTENCIA_ESPERA = 10
+
+# Perfilado bajo demanda (?perfilar=1 o cabecera X-MiParqueo-Perfilar, solo superusuarios)
+PERFILES_DIR = BASE_DIR / 'perfiles'
+PERFILES_MAXIMO = 100
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        # Cada 500 con su traza también con DEBUG = False (gunicorn, waitress
+        # y uvicorn guardan la salida de error); benchmarks/carga_pico.py
+        # cuenta aquí los "database is locked"
+        'django.request': {
+            'handlers': ['console'],
+            'level': 'ERROR',
+            'propagate': False,
+        },
+    },
+}
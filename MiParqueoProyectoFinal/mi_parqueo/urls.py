@@ -17,9 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth.views import LogoutView
-from core.views import CustomLoginView
+from core.views import CustomLoginView, metricas_prometheus, servir_media
 from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     # Panel de administración
@@ -29,11 +28,16 @@ urlpatterns = [
     path('login/', CustomLoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(next_page='login'), name='logout'),
     
+    # Métricas para Prometheus (solo IPs locales)
+    path('metrics', metricas_prometheus, name='metricas'),
+    
+    # Archivos media (códigos QR), también en producción: ver MEDIA_ENTREGA
+    path(settings.MEDIA_URL.lstrip('/') + '<path:ruta>', servir_media, name='media'),
+    
+    # API JSON para la app móvil (versionada)
+    path('api/v1/', include('core.urls_api')),
+    
     # URLs de la aplicación core
     path('', include('core.urls')),
 ]
 
-# Servir archivos media en modo DEBUG
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mi_parqueo.settings')
 
 application = get_wsgi_application()
+
+# URLconf y templates listos antes de la primera petición (ver mi_parqueo/arranque.py)
+from mi_parqueo.arranque import calentar  # noqa: E402
+
+calentar()